@@ -0,0 +1,64 @@
+"""indices dos filtros quentes (pis, veiculacoes, entregas, faturamentos, anexos)
+
+Revision ID: a16c16438b20
+Revises: 52222b71a2cb
+Create Date: 2026-10-19 10:12:31.402118
+
+Idempotente: bancos criados pelo init_db() já podem ter estes índices
+(o init_db cria os índices dos models que faltarem), então cada um só é
+criado se a tabela existir e o índice ainda não.
+Conferência dos planos: python -m app.scripts.auditar_indices
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a16c16438b20'
+down_revision: Union[str, Sequence[str], None] = '52222b71a2cb'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# (tabela, nome, colunas) — mesmos nomes dos __table_args__ em app/models.py
+INDICES = [
+    ('pis_cadastro', 'ix_pis_cadastro_executivo_data_venda', ['executivo', 'data_venda']),
+    ('pis_cadastro', 'ix_pis_cadastro_diretoria_data_venda', ['diretoria', 'data_venda']),
+    ('pis_cadastro', 'ix_pis_cadastro_tipo_data_venda', ['tipo_pi', 'data_venda']),
+    ('pis_cadastro', 'ix_pis_cadastro_matriz_tipo', ['numero_pi_matriz', 'tipo_pi']),
+    ('pis_cadastro', 'ix_pis_cadastro_normal_tipo', ['numero_pi_normal', 'tipo_pi']),
+    ('pis_cadastro', 'ix_pis_cadastro_agencia_id', ['agencia_id']),
+    ('pis_cadastro', 'ix_pis_cadastro_anunciante_id', ['anunciante_id']),
+    ('veiculacoes', 'ix_veiculacoes_pi_id', ['pi_id']),
+    ('veiculacoes', 'ix_veiculacoes_produto_id', ['produto_id']),
+    ('entregas', 'ix_entregas_pi_id_data', ['pi_id', 'data_entrega']),
+    ('entregas', 'ix_entregas_veiculacao_id_data', ['veiculacao_id', 'data_entrega']),
+    ('faturamentos', 'ix_faturamentos_status_enviado_em', ['status', 'enviado_em']),
+    ('faturamentos', 'ix_faturamentos_enviado_em', ['enviado_em']),
+    ('pi_anexos', 'ix_pi_anexos_pi_id', ['pi_id']),
+    ('faturamento_anexos', 'ix_faturamento_anexos_faturamento_id', ['faturamento_id']),
+]
+
+
+def _existentes(insp, tabela: str) -> set:
+    return {i['name'] for i in insp.get_indexes(tabela)}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    insp = sa.inspect(op.get_bind())
+    tabelas = set(insp.get_table_names())
+    for tabela, nome, colunas in INDICES:
+        if tabela in tabelas and nome not in _existentes(insp, tabela):
+            op.create_index(nome, tabela, colunas)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    insp = sa.inspect(op.get_bind())
+    tabelas = set(insp.get_table_names())
+    for tabela, nome, _ in reversed(INDICES):
+        if tabela in tabelas and nome in _existentes(insp, tabela):
+            op.drop_index(nome, table_name=tabela)
@@ -0,0 +1,59 @@
+"""versao de linha (versao + atualizado_em) em pis, veiculacoes e entregas
+
+Revision ID: c7e2a9d41f53
+Revises: a16c16438b20
+Create Date: 2026-10-19 14:03:17.552904
+
+Idempotente como a anterior: o init_db() também adiciona estas colunas
+(nullable / com server_default) em bancos que ainda não as têm.
+Usadas no ETag/If-None-Match dos detalhes e no If-Match dos PUTs
+(app/core/versionamento.py).
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c7e2a9d41f53'
+down_revision: Union[str, Sequence[str], None] = 'a16c16438b20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+TABELAS = ['pis_cadastro', 'veiculacoes', 'entregas']
+
+
+def _colunas(insp, tabela: str) -> set:
+    return {c['name'] for c in insp.get_columns(tabela)}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    insp = sa.inspect(op.get_bind())
+    existentes = set(insp.get_table_names())
+    for tabela in TABELAS:
+        if tabela not in existentes:
+            continue
+        cols = _colunas(insp, tabela)
+        with op.batch_alter_table(tabela, schema=None) as batch_op:
+            if 'versao' not in cols:
+                batch_op.add_column(sa.Column('versao', sa.Integer(), server_default=sa.text('1'), nullable=False))
+            if 'atualizado_em' not in cols:
+                batch_op.add_column(sa.Column('atualizado_em', sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    insp = sa.inspect(op.get_bind())
+    existentes = set(insp.get_table_names())
+    for tabela in reversed(TABELAS):
+        if tabela not in existentes:
+            continue
+        cols = _colunas(insp, tabela)
+        with op.batch_alter_table(tabela, schema=None) as batch_op:
+            if 'atualizado_em' in cols:
+                batch_op.drop_column('atualizado_em')
+            if 'versao' in cols:
+                batch_op.drop_column('versao')
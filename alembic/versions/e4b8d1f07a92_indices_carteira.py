@@ -0,0 +1,73 @@
+"""indices da carteira do executivo (agencias, anunciantes)
+
+Revision ID: e4b8d1f07a92
+Revises: c7e2a9d41f53
+Create Date: 2026-10-19 16:41:08.213577
+
+Idempotente como as anteriores (o init_db() cria os mesmos índices):
+- (executivo, nome, id): filtro por executivo + keyset de /me/carteira/*;
+- ix_*_executivo (só executivo) sai: é prefixo à esquerda do composto;
+- Postgres: GIN pg_trgm em lower(nome) para o '%q%' da busca da carteira.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e4b8d1f07a92'
+down_revision: Union[str, Sequence[str], None] = 'c7e2a9d41f53'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# (tabela, coluna do nome) — mesmos nomes dos __table_args__ em app/models.py
+TABELAS = [
+    ('agencias', 'nome_agencia'),
+    ('anunciantes', 'nome_anunciante'),
+]
+
+
+def _existentes(insp, tabela: str) -> set:
+    return {i['name'] for i in insp.get_indexes(tabela)}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+    insp = sa.inspect(bind)
+    tabelas = set(insp.get_table_names())
+    postgres = bind.dialect.name == 'postgresql'
+    if postgres:
+        op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for tabela, nome in TABELAS:
+        if tabela not in tabelas:
+            continue
+        existentes = _existentes(insp, tabela)
+        if f'ix_{tabela}_executivo_nome_id' not in existentes:
+            op.create_index(f'ix_{tabela}_executivo_nome_id', tabela, ['executivo', nome, 'id'])
+        if f'ix_{tabela}_executivo' in existentes:
+            op.drop_index(f'ix_{tabela}_executivo', table_name=tabela)
+        if postgres:
+            op.execute(
+                f'CREATE INDEX IF NOT EXISTS ix_{tabela}_nome_lower_trgm ON {tabela} '
+                f'USING gin (lower({nome}) gin_trgm_ops)'
+            )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    bind = op.get_bind()
+    insp = sa.inspect(bind)
+    tabelas = set(insp.get_table_names())
+    for tabela, _ in reversed(TABELAS):
+        if tabela not in tabelas:
+            continue
+        if bind.dialect.name == 'postgresql':
+            op.execute(f'DROP INDEX IF EXISTS ix_{tabela}_nome_lower_trgm')
+        existentes = _existentes(insp, tabela)
+        if f'ix_{tabela}_executivo' not in existentes:
+            op.create_index(f'ix_{tabela}_executivo', tabela, ['executivo'])
+        if f'ix_{tabela}_executivo_nome_id' in existentes:
+            op.drop_index(f'ix_{tabela}_executivo_nome_id', table_name=tabela)
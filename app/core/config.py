@@ -42,3 +42,79 @@ RESET_TOKEN_EXPIRES_MINUTES = int(os.getenv("RESET_TOKEN_EXPIRES_MINUTES", "30")
 
 # Alias de compatibilidade (algum arquivo está importando esse nome)
 RESET_TOKEN_MINUTES = int(os.getenv("RESET_TOKEN_MINUTES", str(RESET_TOKEN_EXPIRES_MINUTES)))
+
+# =========================
+# Slow-query log (estatísticas por fingerprint de SQL)
+# =========================
+SLOW_QUERY_LOG = os.getenv("SLOW_QUERY_LOG", "1") == "1"
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200"))
+SLOW_QUERY_EXPLAIN = os.getenv("SLOW_QUERY_EXPLAIN", "0") == "1"
+SLOW_QUERY_MAX_FINGERPRINTS = int(os.getenv("SLOW_QUERY_MAX_FINGERPRINTS", "500"))
+
+# =========================
+# Fila de e-mails (outbox) — as rotas só enfileiram
+# =========================
+EMAIL_OUTBOX_WORKER = os.getenv("EMAIL_OUTBOX_WORKER", "1") == "1"
+EMAIL_OUTBOX_INTERVAL_S = float(os.getenv("EMAIL_OUTBOX_INTERVAL_S", "5"))
+EMAIL_OUTBOX_BATCH = int(os.getenv("EMAIL_OUTBOX_BATCH", "20"))
+EMAIL_OUTBOX_MAX_TENTATIVAS = int(os.getenv("EMAIL_OUTBOX_MAX_TENTATIVAS", "6"))
+EMAIL_OUTBOX_BACKOFF_S = float(os.getenv("EMAIL_OUTBOX_BACKOFF_S", "30"))
+
+# =========================
+# Consulta de CNPJ (BrasilAPI) com cache no banco
+# =========================
+CNPJ_LOOKUP_PROVIDER = os.getenv("CNPJ_LOOKUP_PROVIDER", "brasilapi")  # brasilapi | local
+CNPJ_LOOKUP_LOCAL_FILE = os.getenv("CNPJ_LOOKUP_LOCAL_FILE", "")  # JSON {cnpj: payload} p/ provider local
+BRASILAPI_CNPJ_URL = os.getenv("BRASILAPI_CNPJ_URL", "https://brasilapi.com.br/api/cnpj/v1/{cnpj}")
+BRASILAPI_TIMEOUT_S = float(os.getenv("BRASILAPI_TIMEOUT_S", "8"))
+CNPJ_CACHE_TTL_HORAS = float(os.getenv("CNPJ_CACHE_TTL_HORAS", "720"))  # 30 dias
+CNPJ_CACHE_TTL_NEGATIVO_HORAS = float(os.getenv("CNPJ_CACHE_TTL_NEGATIVO_HORAS", "24"))
+CNPJ_LOOKUP_MAX_SIMULTANEAS = int(os.getenv("CNPJ_LOOKUP_MAX_SIMULTANEAS", "4"))
+
+# =========================
+# Cache de listas de referência (produtos, executivos, PIs ativos) com ETag
+# =========================
+REF_CACHE_TTL_S = float(os.getenv("REF_CACHE_TTL_S", "60"))  # 0 = só invalida por versão
+
+# =========================
+# Leituras pesadas das rotas async (vendas, /me, agenda, listagem de faturamentos)
+# =========================
+# threads próprias (fora do threadpool do Starlette); manter <= pool do engine (5 + 10)
+DB_LEITURA_THREADS = int(os.getenv("DB_LEITURA_THREADS", "8"))  # 0 = threadpool padrão do Starlette
+
+# =========================
+# Eventos em tempo real (SSE: GET /eventos/stream)
+# =========================
+# auto -> postgres (LISTEN/NOTIFY) se o banco for Postgres; senão local
+# local -> só o próprio processo (1 worker)
+# arquivo -> JSONL compartilhado entre workers da mesma máquina (stand-in sem Postgres)
+EVENTOS_BACKEND = (os.getenv("EVENTOS_BACKEND", "auto") or "auto").strip().lower()
+EVENTOS_CANAL = os.getenv("EVENTOS_CANAL", "veiculacoes_eventos")
+EVENTOS_ARQUIVO = os.getenv("EVENTOS_ARQUIVO", "uploads/eventos.jsonl")
+EVENTOS_ARQUIVO_MAX_BYTES = int(os.getenv("EVENTOS_ARQUIVO_MAX_BYTES", str(5 * 1024 * 1024)))
+EVENTOS_HEARTBEAT_S = float(os.getenv("EVENTOS_HEARTBEAT_S", "15"))
+EVENTOS_BUFFER = int(os.getenv("EVENTOS_BUFFER", "1000"))  # replay por Last-Event-ID
+EVENTOS_FILA = int(os.getenv("EVENTOS_FILA", "256"))  # por conexão; estourou -> evento "reset"
+EVENTOS_MAX_CONEXOES = int(os.getenv("EVENTOS_MAX_CONEXOES", "500"))
+
+# =========================
+# Jobs em background (tabela jobs) — PDF, Drive, geração de faturamentos
+# =========================
+# Por padrão a API só enfileira: quem executa é o processo dedicado
+# (python -m app.scripts.worker_jobs). JOBS_WORKER=1 -> cada processo do
+# uvicorn também executa jobs (deploy simples, sem worker separado)
+JOBS_WORKER = os.getenv("JOBS_WORKER", "0") == "1"
+JOBS_THREADS = int(os.getenv("JOBS_THREADS", "2"))  # por processo
+JOBS_INTERVALO_S = float(os.getenv("JOBS_INTERVALO_S", "2"))  # polling da fila
+JOBS_MAX_TENTATIVAS = int(os.getenv("JOBS_MAX_TENTATIVAS", "5"))
+JOBS_BACKOFF_S = float(os.getenv("JOBS_BACKOFF_S", "10"))
+JOBS_RESERVA_EXPIRA_S = float(os.getenv("JOBS_RESERVA_EXPIRA_S", "900"))  # EXECUTANDO sem batimento há mais que isso = worker morreu
+JOBS_BATIMENTO_S = float(os.getenv("JOBS_BATIMENTO_S", "60"))  # worker avisa que o job segue vivo (bem menor que a expiração)
+JOBS_RETENCAO_DIAS = float(os.getenv("JOBS_RETENCAO_DIAS", "14"))  # CONCLUIDO/FALHOU mais antigos são apagados
+
+# =========================
+# Receita por competência (GET /vendas/competencia)
+# =========================
+# tabela mensal em memória: recalcula quando a impressão digital muda ou, no
+# máximo, a cada COMPETENCIA_TTL_S (renomear produto em outro processo não muda a impressão)
+COMPETENCIA_TTL_S = float(os.getenv("COMPETENCIA_TTL_S", "300"))
@@ -18,12 +18,42 @@ def _smtp_is_configured() -> bool:
     return bool(SMTP_HOST and SMTP_PORT and SMTP_FROM)
 
 
+def build_message(to_email: str, subject: str, body: str) -> MIMEMultipart:
+    msg = MIMEMultipart()
+    msg["From"] = SMTP_FROM
+    msg["To"] = to_email
+    msg["Subject"] = subject
+
+    msg.attach(MIMEText(body or "", "plain", "utf-8"))
+    return msg
+
+
+def open_smtp(timeout: float = 20) -> smtplib.SMTP:
+    """Abre (e autentica) uma conexão SMTP. Quem chama é responsável por fechar (quit)."""
+    server = smtplib.SMTP(SMTP_HOST, SMTP_PORT, timeout=timeout)
+    try:
+        server.ehlo()
+        if SMTP_TLS:
+            server.starttls()
+            server.ehlo()
+
+        # login é opcional (alguns SMTP internos não exigem)
+        if SMTP_USER and SMTP_PASS:
+            server.login(SMTP_USER, SMTP_PASS)
+    except Exception:
+        server.close()
+        raise
+    return server
+
+
 def send_email(to_email: str, subject: str, body: str) -> bool:
     """
-    Envia e-mail via SMTP.
+    Envia e-mail via SMTP, na hora (bloqueia até o servidor responder).
     - Retorna True se enviou.
     - Retorna False se SMTP não está configurado ou se falhou.
     Nunca levanta exceção para não derrubar API.
+
+    ⚠️ Em rotas, use app.core.email_outbox.enqueue_email (não bloqueia a request).
     """
     to_email = (to_email or "").strip()
     if not to_email:
@@ -33,25 +63,17 @@ def send_email(to_email: str, subject: str, body: str) -> bool:
         print("📭 SMTP não configurado. E-mail não enviado:", {"to": to_email, "subject": subject})
         return False
 
-    msg = MIMEMultipart()
-    msg["From"] = SMTP_FROM
-    msg["To"] = to_email
-    msg["Subject"] = subject
-
-    msg.attach(MIMEText(body or "", "plain", "utf-8"))
+    msg = build_message(to_email, subject, body)
 
     try:
-        with smtplib.SMTP(SMTP_HOST, SMTP_PORT, timeout=20) as server:
-            server.ehlo()
-            if SMTP_TLS:
-                server.starttls()
-                server.ehlo()
-
-            # login é opcional (alguns SMTP internos não exigem)
-            if SMTP_USER and SMTP_PASS:
-                server.login(SMTP_USER, SMTP_PASS)
-
+        server = open_smtp()
+        try:
             server.sendmail(SMTP_FROM, [to_email], msg.as_string())
+        finally:
+            try:
+                server.quit()
+            except Exception:
+                server.close()
         print("✅ E-mail enviado:", {"to": to_email, "subject": subject})
         return True
 
@@ -0,0 +1,309 @@
+# app/core/email_outbox.py
+"""
+Fila persistente de e-mails (tabela email_outbox).
+
+- Rotas chamam enqueue_email(...) e seguem: nada de SMTP dentro da request.
+- Um worker em background (thread por processo do uvicorn) pega lotes de
+  pendentes, envia todos pela MESMA conexão SMTP e registra o resultado.
+- Falha temporária: nova tentativa com backoff exponencial
+  (EMAIL_OUTBOX_BACKOFF_S * 2^(n-1), até 6h) até EMAIL_OUTBOX_MAX_TENTATIVAS.
+- Falha permanente (destinatário recusado / 5xx): FALHOU direto.
+- E-mail com prazo (expira_em, ex.: reset de senha): o backoff nunca passa do
+  prazo e, vencido, o item vira FALHOU sem ser enviado.
+- SMTP não configurado: nada é enviado; enqueue_email já grava FALHOU
+  ("SMTP não configurado") em vez de deixar o item parado na fila.
+- Vários workers (vários processos) podem rodar juntos: cada item é "reservado"
+  com UPDATE condicional (PENDENTE -> ENVIANDO) antes do envio.
+- Reserva, backoff e o evento que acorda o worker são os mesmos dos jobs
+  (app/core/fila.py).
+
+Para testar localmente: python -m app.scripts.smtp_local (SMTP fake na porta 1025)
+e SMTP_HOST=127.0.0.1 SMTP_PORT=1025 SMTP_TLS=0.
+"""
+from __future__ import annotations
+
+import smtplib
+import threading
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy.orm import Session
+
+from app.core.config import (
+    SMTP_FROM,
+    EMAIL_OUTBOX_WORKER,
+    EMAIL_OUTBOX_INTERVAL_S,
+    EMAIL_OUTBOX_BATCH,
+    EMAIL_OUTBOX_MAX_TENTATIVAS,
+    EMAIL_OUTBOX_BACKOFF_S,
+)
+from app.core import fila
+from app.core.email import _smtp_is_configured, build_message, open_smtp
+from app.models_email_outbox import EmailOutbox
+
+# item em ENVIANDO há mais que isso = worker morreu no meio; volta para a fila
+RESERVA_EXPIRA = timedelta(minutes=10)
+
+_despertador = fila.Despertador()
+
+
+# ==========================================================
+# Enfileirar (usado pelas rotas)
+# ==========================================================
+SEM_SMTP = "SMTP não configurado"
+
+
+def enqueue_email(
+    db: Session,
+    to_email: str,
+    subject: str,
+    body: str,
+    *,
+    expira_em: Optional[datetime] = None,
+) -> Optional[EmailOutbox]:
+    """
+    Grava o e-mail na fila. `expira_em` (UTC): depois disso o e-mail não é
+    mais enviado (ex.: link com validade).
+    """
+    to_email = (to_email or "").strip()
+    if not to_email:
+        return None
+
+    now = datetime.utcnow()
+    configurado = _smtp_is_configured()
+    item = EmailOutbox(
+        to_email=to_email,
+        subject=subject,
+        body=body or "",
+        status="PENDENTE" if configurado else "FALHOU",
+        tentativas=0,
+        proximo_envio_em=now,
+        ultimo_erro=None if configurado else SEM_SMTP,
+        expira_em=expira_em,
+        created_at=now,
+        updated_at=now,
+    )
+    db.add(item)
+    db.commit()
+    db.refresh(item)
+
+    if not configurado:
+        print("⚠️ SMTP não configurado: e-mail NÃO será enviado (FALHOU):", {"id": item.id, "to": to_email, "subject": subject})
+        return item
+
+    _despertador.acordar()  # acorda o worker deste processo
+    return item
+
+
+# ==========================================================
+# Processamento de um lote
+# ==========================================================
+def _backoff(tentativas: int) -> timedelta:
+    return fila.backoff(tentativas, EMAIL_OUTBOX_BACKOFF_S)
+
+
+def _expirado(item: EmailOutbox, now: datetime) -> bool:
+    return item.expira_em is not None and item.expira_em <= now
+
+
+def _erro_permanente(e: Exception) -> bool:
+    if isinstance(e, smtplib.SMTPRecipientsRefused):
+        return True
+    if isinstance(e, smtplib.SMTPAuthenticationError):
+        return False  # problema de configuração: vale tentar de novo depois
+    code = getattr(e, "smtp_code", None)
+    return isinstance(code, int) and 500 <= code < 600
+
+
+def _erro_de_conexao(e: Exception) -> bool:
+    # SMTPException herda de OSError: só socket/timeout e desconexão invalidam a conexão
+    if isinstance(e, (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError)):
+        return True
+    return isinstance(e, OSError) and not isinstance(e, smtplib.SMTPException)
+
+
+def _reservar(db: Session, limite: int) -> List[EmailOutbox]:
+    now = datetime.utcnow()
+
+    (
+        db.query(EmailOutbox)
+        .filter(EmailOutbox.status == "ENVIANDO", EmailOutbox.updated_at < now - RESERVA_EXPIRA)
+        .update({"status": "PENDENTE", "updated_at": now}, synchronize_session=False)
+    )
+    # prazo vencido na fila: não envia mais (link de reset já não vale)
+    (
+        db.query(EmailOutbox)
+        .filter(EmailOutbox.status == "PENDENTE", EmailOutbox.expira_em.isnot(None), EmailOutbox.expira_em <= now)
+        .update({"status": "FALHOU", "ultimo_erro": "expirado", "updated_at": now}, synchronize_session=False)
+    )
+
+    reservados = fila.reservar(
+        db,
+        EmailOutbox,
+        prontos=(EmailOutbox.status == "PENDENTE", EmailOutbox.proximo_envio_em <= now),
+        ordem=(EmailOutbox.proximo_envio_em, EmailOutbox.id),
+        limite=limite,
+        valores={"status": "ENVIANDO", "updated_at": now},
+    )
+
+    if not reservados:
+        return []
+    return db.query(EmailOutbox).filter(EmailOutbox.id.in_(reservados)).order_by(EmailOutbox.id).all()
+
+
+def _fechar(server) -> None:
+    if server is None:
+        return
+    try:
+        server.quit()
+    except Exception:
+        try:
+            server.close()
+        except Exception:
+            pass
+
+
+def processar_lote(
+    db: Session,
+    *,
+    limite: Optional[int] = None,
+    conectar: Callable[[], smtplib.SMTP] = open_smtp,
+) -> Dict[str, int]:
+    """
+    Envia um lote de pendentes numa única conexão SMTP.
+    Retorna {"enviados": n, "reagendados": n, "falhos": n}.
+    """
+    itens = _reservar(db, limite or EMAIL_OUTBOX_BATCH)
+    res = {"enviados": 0, "reagendados": 0, "falhos": 0}
+    if not itens:
+        return res
+
+    server = None
+    try:
+        for item in itens:
+            now = datetime.utcnow()
+            if _expirado(item, now):
+                item.status = "FALHOU"
+                item.ultimo_erro = "expirado"
+                item.updated_at = now
+                res["falhos"] += 1
+                db.commit()
+                continue
+            try:
+                msg = build_message(item.to_email, item.subject, item.body or "").as_string()
+                if server is None:
+                    server = conectar()
+                try:
+                    server.sendmail(SMTP_FROM, [item.to_email], msg)
+                except smtplib.SMTPServerDisconnected:
+                    # conexão reaproveitada caiu (timeout do servidor): reconecta uma vez
+                    _fechar(server)
+                    server = conectar()
+                    server.sendmail(SMTP_FROM, [item.to_email], msg)
+
+                item.status = "ENVIADO"
+                item.enviado_em = now
+                item.ultimo_erro = None
+                res["enviados"] += 1
+
+            except Exception as e:
+                if _erro_de_conexao(e):
+                    _fechar(server)
+                    server = None
+
+                item.tentativas = int(item.tentativas or 0) + 1
+                item.ultimo_erro = f"{type(e).__name__}: {e}"[:500]
+                if _erro_permanente(e) or item.tentativas >= EMAIL_OUTBOX_MAX_TENTATIVAS:
+                    item.status = "FALHOU"
+                    res["falhos"] += 1
+                    print("❌ E-mail descartado:", {"id": item.id, "to": item.to_email, "erro": item.ultimo_erro})
+                elif item.expira_em is not None and now + _backoff(item.tentativas) >= item.expira_em:
+                    # a próxima tentativa já cairia depois do prazo
+                    item.status = "FALHOU"
+                    res["falhos"] += 1
+                    print("❌ E-mail descartado (prazo):", {"id": item.id, "to": item.to_email, "erro": item.ultimo_erro})
+                else:
+                    item.status = "PENDENTE"
+                    item.proximo_envio_em = now + _backoff(item.tentativas)
+                    res["reagendados"] += 1
+
+            item.updated_at = now
+            db.commit()  # resultado de cada item fica gravado mesmo se o lote parar no meio
+    finally:
+        _fechar(server)
+
+    if res["enviados"]:
+        print(f"✅ E-mails enviados: {res['enviados']} (reagendados: {res['reagendados']}, falhos: {res['falhos']})")
+    return res
+
+
+# ==========================================================
+# Worker em background
+# ==========================================================
+_worker: Optional[threading.Thread] = None
+_stop = threading.Event()
+
+
+def _loop(session_factory) -> None:
+    while not _stop.is_set():
+        try:
+            while not _stop.is_set():
+                db = session_factory()
+                try:
+                    res = processar_lote(db)
+                finally:
+                    db.close()
+                # lote cheio: provavelmente tem mais na fila
+                if sum(res.values()) < EMAIL_OUTBOX_BATCH:
+                    break
+        except Exception as e:
+            print("⚠️ Worker de e-mail falhou neste ciclo:", repr(e))
+
+        _despertador.dormir(EMAIL_OUTBOX_INTERVAL_S)
+
+
+def _avisar_sem_smtp() -> None:
+    """Sem SMTP não há worker: avisa quantos e-mails antigos estão parados na fila."""
+    from app.database import SessionLocal
+
+    pendentes = 0
+    try:
+        db = SessionLocal()
+        try:
+            pendentes = db.query(EmailOutbox).filter(EmailOutbox.status.in_(("PENDENTE", "ENVIANDO"))).count()
+        finally:
+            db.close()
+    except Exception as e:
+        print("⚠️ Não foi possível contar a fila de e-mails:", repr(e))
+    print(
+        f"⚠️ SMTP não configurado: worker de e-mail NÃO iniciado. "
+        f"Novos e-mails são gravados como FALHOU; {pendentes} pendente(s) antigos parados na fila."
+    )
+
+
+def start_email_worker() -> bool:
+    global _worker
+    if not EMAIL_OUTBOX_WORKER:
+        return False
+    if not _smtp_is_configured():
+        _avisar_sem_smtp()
+        return False
+    if _worker is not None and _worker.is_alive():
+        return True
+
+    from app.database import SessionLocal
+
+    _stop.clear()
+    _worker = threading.Thread(target=_loop, args=(SessionLocal,), name="email-outbox", daemon=True)
+    _worker.start()
+    return True
+
+
+def stop_email_worker(timeout: float = 10.0) -> None:
+    global _worker
+    if _worker is None:
+        return
+    _stop.set()
+    _despertador.acordar()
+    _worker.join(timeout=timeout)
+    _worker = None
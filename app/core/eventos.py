@@ -0,0 +1,425 @@
+# app/core/eventos.py
+"""
+Eventos de mudança (faturamento / entrega) para o feed SSE (GET /eventos/stream).
+
+- Os CRUDs chamam publicar_faturamento / publicar_entrega DEPOIS do commit:
+  rollback não gera evento e falha ao publicar nunca derruba a escrita.
+- Evento compacto: {"id", "tipo", "dados": {ids, pi_id, status, versao}}.
+  O executivo do PI vai junto só para o filtro por carteira (a rota remove
+  antes de mandar para o cliente).
+- Cada processo tem um Broadcaster: uma asyncio.Queue por conexão SSE e um
+  buffer circular (EVENTOS_BUFFER) para o replay via Last-Event-ID.
+  Fila cheia (cliente lento) -> descarta e manda "reset" (o front recarrega).
+- Backend entre workers (EVENTOS_BACKEND):
+    local    -> só o próprio processo (1 worker)
+    postgres -> pg_notify no primário + thread com LISTEN (conexão psycopg2 dedicada)
+    arquivo  -> JSONL compartilhado (workers na mesma máquina, sem Postgres)
+    auto     -> postgres se o banco for Postgres, senão local
+  Nos backends entre workers o próprio processo também recebe pelo backend,
+  então todos os workers veem os eventos na mesma ordem e com o mesmo id.
+- A thread do backend só sobe na primeira conexão SSE do processo.
+"""
+from __future__ import annotations
+
+import abc
+import asyncio
+import json
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.core.config import (
+    EVENTOS_ARQUIVO,
+    EVENTOS_ARQUIVO_MAX_BYTES,
+    EVENTOS_BACKEND,
+    EVENTOS_BUFFER,
+    EVENTOS_CANAL,
+    EVENTOS_FILA,
+    EVENTOS_MAX_CONEXOES,
+)
+
+RESET = "reset"  # evento de controle: o cliente perdeu eventos e deve recarregar
+
+_id_lock = threading.Lock()
+_ultimo_id = 0
+
+
+def _novo_id() -> int:
+    """Microssegundos desde a época (crescente no processo; entre workers, pelo relógio)."""
+    global _ultimo_id
+    with _id_lock:
+        agora = time.time_ns() // 1000
+        _ultimo_id = agora if agora > _ultimo_id else _ultimo_id + 1
+        return _ultimo_id
+
+
+# =========================
+# Broadcaster (por processo)
+# =========================
+class Assinatura:
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+        self.fila: asyncio.Queue = asyncio.Queue(maxsize=EVENTOS_FILA)
+
+    def _entregar(self, ev: Dict[str, Any]) -> None:
+        # roda no event loop da conexão
+        if self.fila.full():
+            while not self.fila.empty():
+                self.fila.get_nowait()
+            ev = {"id": ev["id"], "tipo": RESET, "dados": {"motivo": "fila cheia"}}
+        self.fila.put_nowait(ev)
+
+
+class Broadcaster:
+    def __init__(self, buffer: int = EVENTOS_BUFFER):
+        self._lock = threading.Lock()
+        self._assinaturas: List[Assinatura] = []
+        self._buffer: Deque[Dict[str, Any]] = deque(maxlen=max(buffer, 1))
+        self._desde = _novo_id()  # eventos anteriores a isto este processo não viu
+
+    @property
+    def conexoes(self) -> int:
+        return len(self._assinaturas)
+
+    def entregar(self, ev: Dict[str, Any]) -> None:
+        """Thread-safe: chamado pelo CRUD (local) ou pela thread do backend."""
+        with self._lock:
+            if len(self._buffer) == self._buffer.maxlen:
+                self._desde = self._buffer[0]["id"]
+            self._buffer.append(ev)
+            alvos = list(self._assinaturas)
+        for a in alvos:
+            try:
+                a.loop.call_soon_threadsafe(a._entregar, ev)
+            except RuntimeError:  # loop já fechado
+                self.sair(a)
+
+    def entrar(self, ultimo_id: Optional[int] = None) -> Tuple[Assinatura, List[Dict[str, Any]]]:
+        """
+        Registra a conexão e devolve os eventos a reenviar (id > ultimo_id).
+        Se ultimo_id é anterior ao que este processo ainda tem, devolve um "reset".
+        """
+        a = Assinatura(asyncio.get_running_loop())
+        with self._lock:
+            if len(self._assinaturas) >= EVENTOS_MAX_CONEXOES:
+                raise ConexoesEsgotadas(f"Limite de {EVENTOS_MAX_CONEXOES} conexões de eventos atingido.")
+            self._assinaturas.append(a)
+            if ultimo_id is None:
+                return a, []
+            if ultimo_id < self._desde:
+                return a, [{"id": self._desde, "tipo": RESET, "dados": {"motivo": "Last-Event-ID expirado"}}]
+            return a, [ev for ev in self._buffer if ev["id"] > ultimo_id]
+
+    def reiniciar(self, avisar: bool) -> None:
+        """Backend (re)conectou: o que veio antes pode ter se perdido."""
+        with self._lock:
+            self._buffer.clear()
+            self._desde = _novo_id()
+            alvos = list(self._assinaturas) if avisar else []
+        ev = {"id": self._desde, "tipo": RESET, "dados": {"motivo": "backend reconectado"}}
+        for a in alvos:
+            try:
+                a.loop.call_soon_threadsafe(a._entregar, ev)
+            except RuntimeError:
+                self.sair(a)
+
+    def sair(self, a: Assinatura) -> None:
+        with self._lock:
+            if a in self._assinaturas:
+                self._assinaturas.remove(a)
+
+
+class ConexoesEsgotadas(RuntimeError):
+    pass
+
+
+broadcaster = Broadcaster()
+
+
+# =========================
+# Backends
+# =========================
+class _BackendLocal:
+    nome = "local"
+
+    def publicar(self, ev: Dict[str, Any]) -> None:
+        broadcaster.entregar(ev)
+
+    def iniciar(self) -> None:
+        pass
+
+    def parar(self) -> None:
+        pass
+
+
+class _BackendComThread(abc.ABC):
+    """Base dos backends entre workers: uma thread daemon que escuta e entrega localmente."""
+
+    nome = ""
+
+    def __init__(self):
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._pronto = threading.Event()
+        self._conexoes = 0
+
+    def iniciar(self, timeout: float = 5.0) -> None:
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._pronto.clear()
+                self._thread = threading.Thread(target=self._rodar, name=f"eventos-{self.nome}", daemon=True)
+                self._thread.start()
+        # o replay do Last-Event-ID só vale depois que o listener está escutando
+        self._pronto.wait(timeout)
+
+    def parar(self, timeout: float = 5.0) -> None:
+        with self._lock:
+            t, self._thread = self._thread, None
+        if t is not None:
+            self._stop.set()
+            t.join(timeout=timeout)
+
+    def _rodar(self) -> None:
+        espera = 1.0
+        while not self._stop.is_set():
+            try:
+                self._escutar()
+                espera = 1.0
+            except Exception as e:  # noqa: BLE001
+                print(f"⚠️ Eventos ({self.nome}): listener caiu, reconectando em {espera:.0f}s:", repr(e))
+                if self._stop.wait(espera):
+                    return
+                espera = min(espera * 2, 30.0)
+
+    @abc.abstractmethod
+    def _escutar(self) -> None:
+        """Conecta, chama _escutando() e entrega os eventos até cair ou _stop (bloqueante)."""
+
+    def _escutando(self) -> None:
+        """Chamado por _escutar quando já está recebendo: daqui pra frente nada se perde."""
+        broadcaster.reiniciar(avisar=self._conexoes > 0)
+        self._conexoes += 1
+        self._pronto.set()
+
+    @staticmethod
+    def _decodificar(linha: str) -> Optional[Dict[str, Any]]:
+        try:
+            ev = json.loads(linha)
+        except ValueError:
+            return None
+        return ev if isinstance(ev, dict) and "id" in ev and "tipo" in ev else None
+
+
+class _BackendPostgres(_BackendComThread):
+    """pg_notify (payload < 8000 bytes: os eventos são compactos) + LISTEN numa conexão dedicada."""
+
+    nome = "postgres"
+
+    def publicar(self, ev: Dict[str, Any]) -> None:
+        from app.database import engine  # primário (o NOTIFY é uma escrita)
+
+        with engine.begin() as conn:
+            conn.execute(text("SELECT pg_notify(:canal, :payload)"), {"canal": EVENTOS_CANAL, "payload": _json(ev)})
+
+    def _escutar(self) -> None:
+        import select
+
+        from app.database import engine
+
+        fairy = engine.raw_connection()
+        fairy.detach()  # conexão fica fora do pool (LISTEN é por sessão)
+        conn = fairy.driver_connection
+        try:
+            conn.autocommit = True
+            with conn.cursor() as cur:
+                cur.execute(f'LISTEN "{EVENTOS_CANAL}"')
+            self._escutando()
+            while not self._stop.is_set():
+                if select.select([conn], [], [], 5.0) == ([], [], []):
+                    continue
+                conn.poll()
+                while conn.notifies:
+                    ev = self._decodificar(conn.notifies.pop(0).payload)
+                    if ev is not None:
+                        broadcaster.entregar(ev)
+        finally:
+            try:
+                conn.close()
+            except Exception:  # noqa: BLE001
+                pass
+
+
+class _BackendArquivo(_BackendComThread):
+    """
+    Stand-in sem Postgres: cada publicação é UMA linha JSON anexada (O_APPEND)
+    ao arquivo; cada processo acompanha o arquivo (tail). Passou de
+    EVENTOS_ARQUIVO_MAX_BYTES, o arquivo é rotacionado (.1) e os leitores
+    terminam o antigo antes de trocar.
+    """
+
+    nome = "arquivo"
+    INTERVALO_S = 0.2
+
+    def __init__(self, caminho: str = EVENTOS_ARQUIVO):
+        super().__init__()
+        self.caminho = caminho
+
+    def publicar(self, ev: Dict[str, Any]) -> None:
+        os.makedirs(os.path.dirname(self.caminho) or ".", exist_ok=True)
+        try:
+            if os.path.getsize(self.caminho) > EVENTOS_ARQUIVO_MAX_BYTES:
+                os.replace(self.caminho, self.caminho + ".1")
+        except FileNotFoundError:
+            pass
+        fd = os.open(self.caminho, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, (_json(ev) + "\n").encode("utf-8"))
+        finally:
+            os.close(fd)
+
+    def _abrir(self, do_fim: bool):
+        os.makedirs(os.path.dirname(self.caminho) or ".", exist_ok=True)
+        f = open(self.caminho, "a+b")
+        f.seek(0, os.SEEK_END if do_fim else os.SEEK_SET)
+        return f
+
+    def _escutar(self) -> None:
+        f = self._abrir(do_fim=True)
+        resto = b""
+        self._escutando()
+        try:
+            while not self._stop.is_set():
+                bloco = f.read()
+                if bloco:
+                    linhas = (resto + bloco).split(b"\n")
+                    resto = linhas.pop()  # linha ainda incompleta
+                    for linha in linhas:
+                        ev = self._decodificar(linha.decode("utf-8", "replace"))
+                        if ev is not None:
+                            broadcaster.entregar(ev)
+                    continue
+                try:
+                    rotacionou = os.stat(self.caminho).st_ino != os.fstat(f.fileno()).st_ino
+                except FileNotFoundError:
+                    rotacionou = False
+                if rotacionou:
+                    f.close()
+                    f, resto = self._abrir(do_fim=False), b""
+                    continue
+                self._stop.wait(self.INTERVALO_S)
+        finally:
+            f.close()
+
+
+def _escolher_backend():
+    nome = EVENTOS_BACKEND
+    if nome == "auto":
+        from app.database import engine
+
+        nome = "postgres" if engine.dialect.name == "postgresql" else "local"
+    if nome == "postgres":
+        return _BackendPostgres()
+    if nome == "arquivo":
+        return _BackendArquivo()
+    if nome != "local":
+        print(f"⚠️ EVENTOS_BACKEND={EVENTOS_BACKEND!r} desconhecido; usando local.")
+    return _BackendLocal()
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def backend():
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                _backend = _escolher_backend()
+    return _backend
+
+
+def fechar() -> None:
+    """Para a thread do backend (shutdown do app)."""
+    global _backend
+    with _backend_lock:
+        b, _backend = _backend, None
+    if b is not None:
+        b.parar()
+
+
+async def assinar(ultimo_id: Optional[int] = None) -> Tuple[Assinatura, List[Dict[str, Any]]]:
+    """Conexão SSE nova: sobe o listener do backend (1ª vez, fora do loop) e registra no broadcaster."""
+    await asyncio.to_thread(backend().iniciar)
+    return broadcaster.entrar(ultimo_id)
+
+
+# =========================
+# Publicação (chamada pelos CRUDs, depois do commit)
+# =========================
+def _json(ev: Dict[str, Any]) -> str:
+    return json.dumps(ev, ensure_ascii=False, separators=(",", ":"), default=str)
+
+
+def publicar(tipo: str, dados: Dict[str, Any], executivo: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    ev: Dict[str, Any] = {"id": _novo_id(), "tipo": tipo, "dados": dados}
+    if executivo:
+        ev["executivo"] = executivo
+    try:
+        backend().publicar(ev)
+    except Exception as e:  # noqa: BLE001
+        print(f"⚠️ Falha ao publicar evento {tipo}:", repr(e))
+        return None
+    return ev
+
+
+def _pi_e_executivo(db: Session, entrega_id: Optional[int]) -> Tuple[Optional[int], Optional[str]]:
+    """PI da entrega (entrega.pi_id ou o da veiculação) + executivo do PI: 1 SELECT."""
+    if not entrega_id:
+        return None, None
+    row = db.execute(
+        text(
+            "SELECT p.id, p.executivo FROM entregas e "
+            "LEFT JOIN veiculacoes v ON v.id = e.veiculacao_id "
+            "JOIN pis_cadastro p ON p.id = COALESCE(e.pi_id, v.pi_id) "
+            "WHERE e.id = :id"
+        ),
+        {"id": entrega_id},
+    ).first()
+    return (row[0], row[1]) if row else (None, None)
+
+
+def publicar_faturamento(db: Session, acao: str, fat: Any, **extra: Any) -> None:
+    try:
+        pi_id, executivo = _pi_e_executivo(db, fat.entrega_id)
+    except Exception as e:  # noqa: BLE001
+        print("⚠️ Evento de faturamento sem PI:", repr(e))
+        pi_id, executivo = None, None
+    dados = {"faturamento_id": fat.id, "entrega_id": fat.entrega_id, "pi_id": pi_id, "status": fat.status, **extra}
+    publicar(f"faturamento.{acao}", dados, executivo)
+
+
+def publicar_entrega(
+    db: Session, acao: str, ent: Any, pi: Optional[Tuple[Optional[int], Optional[str]]] = None
+) -> None:
+    """`pi` = (pi_id, executivo) já resolvidos (ex.: antes de um delete)."""
+    try:
+        pi_id, executivo = pi if pi is not None else _pi_e_executivo(db, ent.id)
+    except Exception as e:  # noqa: BLE001
+        print("⚠️ Evento de entrega sem PI:", repr(e))
+        pi_id, executivo = ent.pi_id, None
+    dados = {
+        "entrega_id": ent.id,
+        "veiculacao_id": ent.veiculacao_id,
+        "pi_id": pi_id,
+        "foi_entregue": ent.foi_entregue,
+        "versao": None if acao == "removida" else ent.versao,
+    }
+    publicar(f"entrega.{acao}", dados, executivo)
@@ -0,0 +1,204 @@
+# app/core/fast_json.py
+"""
+Caminho rápido de serialização para listagens grandes.
+
+O caminho padrão do FastAPI para `response_model=List[X]` é:
+  ORM -> dict/Model (na rota) -> validação de novo contra o response_model
+  -> jsonable_encoder -> json.dumps
+
+Aqui:
+  SELECT só das colunas do schema (tuplas) -> dict(zip(campos, linha)) -> orjson
+
+- A forma de cada linha segue o schema de saída (mesmos campos, mesma ordem).
+- A primeira linha de cada resposta é validada com o TypeAdapter do schema:
+  se a projeção divergir do contrato, o erro aparece na hora (custo de 1 linha).
+- Em TODAS as linhas: NaN/Infinity são rejeitados (ValueError "Out of range
+  float values...", cai no handler de NaN do app/main.py) e NULL em campo que
+  o schema não aceita como None faz a linha passar pela validação completa
+  (mesmo erro do caminho padrão com response_model).
+
+Opt-in por router:
+    router = APIRouter(prefix="/pis", default_response_class=FastJSONResponse)
+e, na rota de listagem, devolver `SERIALIZER.response(linhas)`.
+"""
+from __future__ import annotations
+
+import json
+import math
+import typing
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple, Type
+
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel, TypeAdapter
+from sqlalchemy import null
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - fallback sem orjson
+    orjson = None
+
+_NAN_MSG = "Out of range float values are not JSON compliant"
+
+
+def _default(o: Any) -> Any:
+    if isinstance(o, (datetime, date)):
+        return o.isoformat()
+    if isinstance(o, BaseModel):
+        return o.model_dump(mode="json")
+    raise TypeError(f"Tipo não serializável em JSON: {type(o).__name__}")
+
+
+def dumps(content: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(
+        content, default=_default, ensure_ascii=False, allow_nan=False, separators=(",", ":")
+    ).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse com orjson (datas nativas). Aceita bytes já serializados."""
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, (bytes, bytearray)):
+            return bytes(content)
+        if orjson is not None and _tem_nan(content):
+            raise ValueError(_NAN_MSG)
+        return dumps(content)
+
+
+def _tem_nan(obj: Any) -> bool:
+    # orjson grava NaN como null silenciosamente; o contrato da API é recusar
+    if isinstance(obj, float):
+        return math.isnan(obj) or math.isinf(obj)
+    if isinstance(obj, dict):
+        return any(_tem_nan(v) for v in obj.values())
+    if isinstance(obj, (list, tuple)):
+        return any(_tem_nan(v) for v in obj)
+    return False
+
+
+def _aceita_float(annotation: Any) -> bool:
+    if annotation is float:
+        return True
+    return any(_aceita_float(a) for a in typing.get_args(annotation))
+
+
+def _aninhado(annotation: Any) -> bool:
+    """Model/lista/dict: NaN pode estar dentro (checado com _tem_nan)."""
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return True
+    if typing.get_origin(annotation) in (list, dict, tuple, set):
+        return True
+    return any(_aninhado(a) for a in typing.get_args(annotation))
+
+
+def _aceita_none(annotation: Any) -> bool:
+    if annotation is None or annotation is type(None) or annotation is Any:
+        return True
+    return any(_aceita_none(a) for a in typing.get_args(annotation))
+
+
+class RowSerializer:
+    """
+    Serializador de linhas SQL para um schema Pydantic de saída.
+
+        PI_ROWS = RowSerializer(PIOut)
+        linhas = db.execute(select(*PI_ROWS.colunas(PI))).all()
+        return PI_ROWS.response(linhas)
+    """
+
+    def __init__(self, schema: Type[BaseModel]):
+        self.schema = schema
+        self.campos: Tuple[str, ...] = tuple(schema.model_fields.keys())
+        self._idx_float = tuple(
+            i for i, nome in enumerate(self.campos) if _aceita_float(schema.model_fields[nome].annotation)
+        )
+        self._idx_aninhado = tuple(
+            i for i, nome in enumerate(self.campos) if _aninhado(schema.model_fields[nome].annotation)
+        )
+        self._idx_obrigatorio = tuple(
+            i for i, nome in enumerate(self.campos) if not _aceita_none(schema.model_fields[nome].annotation)
+        )
+        self._adapter = TypeAdapter(schema)
+
+    # ---------- projeção ----------
+    def colunas(self, orm_cls: Any, **sobrescritas: Any) -> List[Any]:
+        """
+        Uma coluna SQL por campo do schema (mesma ordem):
+        sobrescrita explícita > atributo do model ORM > NULL.
+        """
+        cols = []
+        for nome in self.campos:
+            if nome in sobrescritas:
+                col = sobrescritas[nome]
+            else:
+                col = getattr(orm_cls, nome, None)
+                if col is None or not hasattr(col, "label"):
+                    col = null()
+            cols.append(col.label(nome) if hasattr(col, "label") else col)
+        return cols
+
+    # ---------- linhas ----------
+    def _checar(self, valores: Sequence[Any], item: Any) -> None:
+        """NaN/inf nos floats e NULL em campo obrigatório (valores na ordem de self.campos)."""
+        for i in self._idx_float:
+            v = valores[i]
+            if v is not None and (v != v or v in (math.inf, -math.inf)):
+                raise ValueError(_NAN_MSG)
+        for i in self._idx_aninhado:
+            if _tem_nan(valores[i]):
+                raise ValueError(_NAN_MSG)
+        for i in self._idx_obrigatorio:
+            if valores[i] is None:
+                self.conferir(item if isinstance(item, dict) else dict(zip(self.campos, valores)))
+                return
+
+    def to_dicts(self, linhas: Iterable[Sequence[Any]]) -> List[Dict[str, Any]]:
+        campos = self.campos
+        out: List[Dict[str, Any]] = []
+        for linha in linhas:
+            self._checar(linha, None)
+            out.append(dict(zip(campos, linha)))
+        if out:
+            self.conferir(out[0])
+        return out
+
+    def conferir(self, item: Dict[str, Any]) -> None:
+        """Valida uma amostra contra o schema (garante que a projeção segue o contrato)."""
+        self._adapter.validate_python(item)
+
+    def response(
+        self,
+        linhas: Iterable[Sequence[Any]],
+        *,
+        status_code: int = 200,
+        headers: Optional[Dict[str, str]] = None,
+    ) -> FastJSONResponse:
+        return fast_response(self.to_dicts(linhas), status_code=status_code, headers=headers)
+
+    def response_itens(
+        self,
+        itens: List[Dict[str, Any]],
+        *,
+        status_code: int = 200,
+        headers: Optional[Dict[str, str]] = None,
+    ) -> FastJSONResponse:
+        """Para dicts montados na rota (campos derivados); confere a 1ª linha contra o schema."""
+        campos = self.campos
+        for it in itens:
+            self._checar([it.get(c) for c in campos], it)
+        if itens:
+            self.conferir(itens[0])
+        return fast_response(itens, status_code=status_code, headers=headers)
+
+
+def fast_response(
+    itens: Any,
+    *,
+    status_code: int = 200,
+    headers: Optional[Dict[str, str]] = None,
+) -> FastJSONResponse:
+    """Resposta já serializada: o FastAPI não revalida contra o response_model."""
+    return FastJSONResponse(content=dumps(itens), status_code=status_code, headers=headers)
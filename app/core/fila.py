@@ -0,0 +1,83 @@
+# app/core/fila.py
+"""
+Primitivas das filas persistentes (email_outbox e jobs).
+
+As duas tabelas seguem o mesmo ciclo: PENDENTE -> reservado por um worker
+(UPDATE condicional) -> final ou de volta à fila com backoff exponencial.
+O que muda entre elas (envio por SMTP em lote x tarefa por job, recuperação
+de reservas perdidas) fica em cada módulo; aqui só o que é comum.
+"""
+from __future__ import annotations
+
+import threading
+from datetime import timedelta
+from typing import Any, Dict, List, Sequence
+
+from sqlalchemy.orm import Session
+
+BACKOFF_MAX = timedelta(hours=6)
+
+
+def backoff(tentativas: int, base_s: float, maximo: timedelta = BACKOFF_MAX) -> timedelta:
+    """base_s * 2^(tentativas-1), limitado a `maximo`."""
+    segundos = base_s * (2 ** max(0, tentativas - 1))
+    return min(timedelta(seconds=segundos), maximo)
+
+
+class Despertador:
+    """Acorda o worker do processo quando algo entra na fila (sem isso ele dorme o intervalo todo)."""
+
+    def __init__(self):
+        self._evento = threading.Event()
+
+    def acordar(self) -> None:
+        self._evento.set()
+
+    def dormir(self, timeout: float) -> None:
+        self._evento.wait(timeout)
+        self._evento.clear()
+
+
+def reservar(
+    db: Session,
+    modelo,
+    *,
+    prontos: Sequence[Any],
+    ordem: Sequence[Any],
+    limite: int,
+    valores: Dict[str, Any],
+    de: str = "PENDENTE",
+) -> List[int]:
+    """
+    Até `limite` ids que satisfazem `prontos`, reservados um a um com
+    UPDATE ... WHERE id = :id AND status = :de (o worker que chega depois
+    não pega o mesmo item). Faz commit; devolve os ids reservados.
+    """
+    ids = [i for (i,) in db.query(modelo.id).filter(*prontos).order_by(*ordem).limit(limite).all()]
+
+    reservados: List[int] = []
+    for i in ids:
+        n = (
+            db.query(modelo)
+            .filter(modelo.id == i, modelo.status == de)
+            .update(valores, synchronize_session=False)
+        )
+        if n:
+            reservados.append(i)
+    db.commit()
+    return reservados
+
+
+def finalizar(db: Session, modelo, item_id: int, valores: Dict[str, Any], **ainda: Any) -> bool:
+    """
+    Grava o desfecho só se o item continua como estava na reserva
+    (ex.: status="EXECUTANDO", worker=eu). Faz commit. False = a reserva
+    foi perdida e outro worker assumiu: o desfecho deste é descartado.
+    """
+    n = (
+        db.query(modelo)
+        .filter(modelo.id == item_id, *(getattr(modelo, k) == v for k, v in ainda.items()))
+        .update(valores, synchronize_session=False)
+    )
+    db.commit()
+    return bool(n)
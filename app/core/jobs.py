@@ -0,0 +1,478 @@
+# app/core/jobs.py
+"""
+Jobs em background com fila persistente (tabela jobs) — mesmo desenho do
+outbox de e-mails (app/core/email_outbox.py), para qualquer tarefa pesada;
+reserva, backoff e o evento que acorda o worker vêm de app/core/fila.py.
+
+- Rotas chamam enfileirar(db, "tipo", payload, ...) e devolvem 202 com o id;
+  o cliente acompanha em GET /jobs/{id} (status + resultado).
+- Tarefas são funções registradas com @tarefa("tipo") (app/core/tarefas.py):
+  recebem (db, payload, arquivo) e devolvem algo serializável em JSON.
+- Idempotência: enfileirar com a mesma chave (por tipo) devolve o job já
+  existente (coluna unique; duas requisições simultâneas caem no mesmo
+  registro). A mesma chave em tipos diferentes são jobs diferentes.
+- Falha: nova tentativa com backoff exponencial (JOBS_BACKOFF_S * 2^(n-1),
+  até 6h) até max_tentativas; ErroPermanente (payload inválido, PI que não
+  existe...) vai direto para FALHOU.
+- Vários workers (threads e processos) juntos: cada job é reservado com
+  UPDATE condicional (PENDENTE -> EXECUTANDO). Enquanto executa, o worker
+  grava um batimento (batimento_em) a cada JOBS_BATIMENTO_S; job sem
+  batimento há mais de JOBS_RESERVA_EXPIRA_S (worker morreu) volta para a
+  fila contando como tentativa, e FALHA quando esgota max_tentativas.
+  O desfecho só é gravado se o job ainda é deste worker (UPDATE ... WHERE
+  status='EXECUTANDO' AND worker=eu): se a reserva expirou e outro worker
+  assumiu, o resultado desta execução é descartado.
+- Worker: processos dedicados (python -m app.scripts.worker_jobs --threads 4);
+  JOBS_WORKER=1 também roda thread(s) dentro do uvicorn (deploy simples).
+"""
+from __future__ import annotations
+
+import json
+import os
+import socket
+import threading
+import traceback
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from sqlalchemy import and_, func, or_, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.core import fila
+from app.core.config import (
+    JOBS_WORKER,
+    JOBS_THREADS,
+    JOBS_INTERVALO_S,
+    JOBS_MAX_TENTATIVAS,
+    JOBS_BACKOFF_S,
+    JOBS_RESERVA_EXPIRA_S,
+    JOBS_BATIMENTO_S,
+    JOBS_RETENCAO_DIAS,
+)
+from app.models_jobs import Job
+
+STATUS = ("PENDENTE", "EXECUTANDO", "CONCLUIDO", "FALHOU")
+FINAIS = ("CONCLUIDO", "FALHOU")
+
+_despertador = fila.Despertador()
+
+
+class ErroPermanente(ValueError):
+    """Tentar de novo não adianta (entrada inválida): o job vai direto para FALHOU."""
+
+
+# ==========================================================
+# Registro de tarefas
+# ==========================================================
+Tarefa = Callable[[Session, Dict[str, Any], Optional[bytes]], Any]
+_tarefas: Dict[str, Tarefa] = {}
+
+
+def tarefa(tipo: str) -> Callable[[Tarefa], Tarefa]:
+    def registrar(fn: Tarefa) -> Tarefa:
+        _tarefas[tipo] = fn
+        return fn
+
+    return registrar
+
+
+def tipos_registrados() -> List[str]:
+    _carregar_tarefas()
+    return sorted(_tarefas)
+
+
+def _carregar_tarefas() -> None:
+    # as tarefas importam CRUDs/utils pesados: só quando alguém vai executar ou validar
+    import app.core.tarefas  # noqa: F401
+
+
+# ==========================================================
+# Enfileirar (usado pelas rotas)
+# ==========================================================
+def _json(v: Any) -> Optional[str]:
+    return None if v is None else json.dumps(v, ensure_ascii=False, default=str)
+
+
+def enfileirar(
+    db: Session,
+    tipo: str,
+    payload: Optional[Dict[str, Any]] = None,
+    *,
+    arquivo: Optional[bytes] = None,
+    chave: Optional[str] = None,
+    criado_por: Optional[int] = None,
+    max_tentativas: Optional[int] = None,
+) -> Job:
+    """Grava o job (commit) e acorda o worker deste processo. Com `chave`, devolve o job já existente."""
+    _carregar_tarefas()
+    if tipo not in _tarefas:
+        raise ValueError(f"Tipo de job desconhecido: {tipo}")
+
+    chave = (chave or "").strip() or None
+    if chave:
+        chave = f"{tipo}:{chave}"[:200]  # mesma chave em outra rota/tipo não devolve o job errado
+        existente = db.query(Job).filter(Job.chave_idempotencia == chave).first()
+        if existente is not None:
+            return existente
+
+    now = datetime.utcnow()
+    job = Job(
+        tipo=tipo,
+        payload=_json(payload or {}),
+        arquivo=arquivo,
+        chave_idempotencia=chave,
+        status="PENDENTE",
+        tentativas=0,
+        max_tentativas=max_tentativas or JOBS_MAX_TENTATIVAS,
+        proxima_execucao_em=now,
+        criado_por=criado_por,
+        created_at=now,
+        updated_at=now,
+    )
+    db.add(job)
+    try:
+        db.commit()
+    except IntegrityError:
+        # outra requisição com a mesma chave gravou primeiro
+        db.rollback()
+        existente = db.query(Job).filter(Job.chave_idempotencia == chave).first() if chave else None
+        if existente is None:
+            raise
+        return existente
+    db.refresh(job)
+
+    _despertador.acordar()
+    return job
+
+
+def chave_da_requisicao(valor: Optional[str], user_id: Optional[int]) -> Optional[str]:
+    """Idempotency-Key do cliente, separada por usuário (chaves de usuários diferentes não colidem)."""
+    valor = (valor or "").strip()
+    if not valor:
+        return None
+    return f"{user_id or 0}:{valor}"[:200]
+
+
+def para_dict(job: Job, *, com_resultado: bool = True) -> Dict[str, Any]:
+    out = {
+        "id": job.id,
+        "tipo": job.tipo,
+        "status": job.status,
+        "tentativas": job.tentativas,
+        "max_tentativas": job.max_tentativas,
+        "proxima_execucao_em": job.proxima_execucao_em,
+        "ultimo_erro": job.ultimo_erro,
+        "criado_por": job.criado_por,
+        "created_at": job.created_at,
+        "updated_at": job.updated_at,
+        "iniciado_em": job.iniciado_em,
+        "concluido_em": job.concluido_em,
+    }
+    if com_resultado:
+        out["resultado"] = json.loads(job.resultado) if job.resultado else None
+    return out
+
+
+def resposta_aceita(job: Job):
+    """202 Accepted + Location do status (mesmo corpo para um reenvio com a mesma Idempotency-Key)."""
+    from fastapi.responses import JSONResponse
+
+    url = f"/jobs/{job.id}"
+    return JSONResponse(
+        status_code=202,
+        content={"job_id": job.id, "tipo": job.tipo, "status": job.status, "url": url},
+        headers={"Location": url},
+    )
+
+
+def reenfileirar(db: Session, job_id: int) -> Optional[Job]:
+    """FALHOU -> PENDENTE (nova rodada de tentativas). Só funciona para jobs que ainda têm o payload."""
+    job = db.get(Job, job_id)
+    if job is None:
+        return None
+    if job.status != "FALHOU":
+        raise ValueError("Só jobs com status FALHOU podem ser reexecutados.")
+    now = datetime.utcnow()
+    job.status = "PENDENTE"
+    job.tentativas = 0
+    job.proxima_execucao_em = now
+    job.updated_at = now
+    job.concluido_em = None
+    db.commit()
+    _despertador.acordar()
+    return job
+
+
+# ==========================================================
+# Execução
+# ==========================================================
+def _backoff(tentativas: int) -> timedelta:
+    return fila.backoff(tentativas, JOBS_BACKOFF_S)
+
+
+def _nome_worker() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{threading.current_thread().name}"[:120]
+
+
+RESERVA_PERDIDA = "Reserva expirou (worker parou sem concluir)"
+
+
+def _recuperar_abandonados(db: Session, now: datetime) -> None:
+    """EXECUTANDO sem batimento: conta como tentativa; esgotou -> FALHOU, senão volta à fila."""
+    sem_batimento = and_(
+        Job.status == "EXECUTANDO",
+        func.coalesce(Job.batimento_em, Job.updated_at) < now - timedelta(seconds=JOBS_RESERVA_EXPIRA_S),
+    )
+    comum = {"tentativas": Job.tentativas + 1, "ultimo_erro": RESERVA_PERDIDA, "updated_at": now}
+    (
+        db.query(Job)
+        .filter(sem_batimento, Job.tentativas + 1 >= Job.max_tentativas)
+        .update({**comum, "status": "FALHOU", "concluido_em": now}, synchronize_session=False)
+    )
+    (
+        db.query(Job)
+        .filter(sem_batimento)
+        .update({**comum, "status": "PENDENTE", "proxima_execucao_em": now}, synchronize_session=False)
+    )
+
+
+def _reservar(db: Session, limite: int, tipos: Optional[Sequence[str]] = None) -> List[Job]:
+    now = datetime.utcnow()
+    _recuperar_abandonados(db, now)
+
+    prontos = [Job.status == "PENDENTE", Job.proxima_execucao_em <= now]
+    if tipos:
+        prontos.append(Job.tipo.in_(list(tipos)))
+    reservados = fila.reservar(
+        db,
+        Job,
+        prontos=prontos,
+        ordem=(Job.proxima_execucao_em, Job.id),
+        limite=limite,
+        valores={"status": "EXECUTANDO", "updated_at": now, "iniciado_em": now, "batimento_em": now, "worker": _nome_worker()},
+    )
+
+    if not reservados:
+        return []
+    return db.query(Job).filter(Job.id.in_(reservados)).order_by(Job.id).all()
+
+
+class _Batimento:
+    """
+    Thread que grava batimento_em a cada JOBS_BATIMENTO_S enquanto a tarefa
+    roda (conexão própria: a sessão da tarefa pode estar no meio de uma transação).
+    """
+
+    def __init__(self, engine, job_id: int, worker: Optional[str], intervalo_s: Optional[float] = None):
+        self.engine = engine
+        self.job_id = job_id
+        self.worker = worker
+        self.intervalo_s = JOBS_BATIMENTO_S if intervalo_s is None else intervalo_s
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._loop, name=f"jobs-batimento-{job_id}", daemon=True)
+
+    def _loop(self) -> None:
+        while not self._stop.wait(self.intervalo_s):
+            try:
+                with self.engine.begin() as conn:
+                    conn.execute(
+                        update(Job)
+                        .where(Job.id == self.job_id, Job.status == "EXECUTANDO", Job.worker == self.worker)
+                        .values(batimento_em=datetime.utcnow())
+                    )
+            except Exception as e:
+                print("⚠️ Batimento do job falhou:", {"id": self.job_id, "erro": repr(e)})
+
+    def __enter__(self) -> "_Batimento":
+        if self.intervalo_s > 0:
+            self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join(timeout=5)
+
+
+def _executar(db: Session, job: Job) -> Optional[str]:
+    """
+    Roda a tarefa e grava o resultado. Devolve "concluidos" | "reagendados" | "falhos",
+    ou None se a reserva foi perdida no meio (outro worker assumiu; nada é gravado).
+    """
+    fn = _tarefas.get(job.tipo)
+    job_id, tipo, worker = job.id, job.tipo, job.worker
+    tentativas = int(job.tentativas or 0) + 1
+    try:
+        if fn is None:
+            raise ErroPermanente(f"Tipo de job desconhecido: {tipo}")
+        payload = json.loads(job.payload) if job.payload else {}
+        with _Batimento(db.get_bind(), job_id, worker):
+            resultado = fn(db, payload, job.arquivo)
+    except Exception as e:
+        db.rollback()  # a tarefa pode ter deixado a sessão no meio de uma transação
+        now = datetime.utcnow()
+        erro = f"{type(e).__name__}: {e}"[:500]
+        valores: Dict[str, Any] = {"tentativas": tentativas, "ultimo_erro": erro, "updated_at": now}
+        if isinstance(e, ValueError) or tentativas >= job.max_tentativas:
+            valores.update(status="FALHOU", concluido_em=now)
+            res = "falhos"
+        else:
+            valores.update(status="PENDENTE", proxima_execucao_em=now + _backoff(tentativas))
+            res = "reagendados"
+        if not fila.finalizar(db, Job, job_id, valores, status="EXECUTANDO", worker=worker):
+            print("⚠️ Job reassumido por outro worker: falha descartada:", {"id": job_id, "tipo": tipo, "erro": erro})
+            return None
+        if res == "falhos":
+            if not isinstance(e, ValueError):
+                traceback.print_exc()
+            print("❌ Job falhou:", {"id": job_id, "tipo": tipo, "erro": erro})
+        else:
+            print("⚠️ Job reagendado:", {"id": job_id, "tipo": tipo, "tentativa": tentativas, "erro": erro})
+        return res
+
+    now = datetime.utcnow()
+    concluido = fila.finalizar(
+        db,
+        Job,
+        job_id,
+        {
+            "status": "CONCLUIDO",
+            "resultado": _json(resultado),
+            "ultimo_erro": None,
+            "arquivo": None,  # o upload já foi processado: não guarda o binário para sempre
+            "tentativas": tentativas,
+            "concluido_em": now,
+            "updated_at": now,
+        },
+        status="EXECUTANDO",
+        worker=worker,
+    )
+    if not concluido:
+        print("⚠️ Job reassumido por outro worker: resultado descartado:", {"id": job_id, "tipo": tipo})
+        return None
+    return "concluidos"
+
+
+def processar_lote(db: Session, *, limite: int = 1, tipos: Optional[Sequence[str]] = None) -> Dict[str, int]:
+    """
+    Reserva e executa até `limite` jobs, um de cada vez, cada um com o resultado
+    gravado na hora. Retorna {"concluidos": n, "reagendados": n, "falhos": n}.
+    """
+    _carregar_tarefas()
+    res = {"concluidos": 0, "reagendados": 0, "falhos": 0}
+    for job in _reservar(db, limite, tipos):
+        r = _executar(db, job)
+        if r is not None:
+            res[r] += 1
+    return res
+
+
+def limpar_antigos(db: Session, dias: float = JOBS_RETENCAO_DIAS) -> int:
+    """Apaga jobs terminados há mais de `dias` (o histórico não cresce para sempre)."""
+    if dias <= 0:
+        return 0
+    limite = datetime.utcnow() - timedelta(days=dias)
+    n = (
+        db.query(Job)
+        .filter(Job.status.in_(FINAIS), or_(Job.concluido_em < limite, and_(Job.concluido_em.is_(None), Job.updated_at < limite)))
+        .delete(synchronize_session=False)
+    )
+    db.commit()
+    return n
+
+
+# ==========================================================
+# Worker (pool de threads por processo)
+# ==========================================================
+class Worker:
+    """
+    `threads` laços independentes: cada um reserva 1 job, executa e volta para
+    a fila na hora; sem trabalho, dorme até JOBS_INTERVALO_S (ou até um
+    enfileirar() deste processo acordá-lo).
+    """
+
+    def __init__(self, threads: int = JOBS_THREADS, tipos: Optional[Sequence[str]] = None, intervalo_s: float = JOBS_INTERVALO_S):
+        self.threads = max(1, int(threads))
+        self.tipos = list(tipos) if tipos else None
+        self.intervalo_s = intervalo_s
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+
+    def _loop(self, session_factory) -> None:
+        while not self._stop.is_set():
+            feito = 0
+            try:
+                db = session_factory()
+                try:
+                    feito = sum(processar_lote(db, limite=1, tipos=self.tipos).values())
+                finally:
+                    db.close()
+            except Exception as e:
+                print("⚠️ Worker de jobs falhou neste ciclo:", repr(e))
+            if feito:
+                continue  # pode ter mais na fila
+            _despertador.dormir(self.intervalo_s)
+
+    def _limpeza(self, session_factory) -> None:
+        while not self._stop.wait(3600):
+            try:
+                db = session_factory()
+                try:
+                    n = limpar_antigos(db)
+                finally:
+                    db.close()
+                if n:
+                    print(f"🧹 Jobs antigos removidos: {n}")
+            except Exception as e:
+                print("⚠️ Limpeza de jobs falhou:", repr(e))
+
+    def iniciar(self) -> "Worker":
+        from app.database import SessionLocal
+
+        _carregar_tarefas()
+        self._stop.clear()
+        alvos = [(self._loop, f"jobs-{i + 1}") for i in range(self.threads)] + [(self._limpeza, "jobs-limpeza")]
+        for alvo, nome in alvos:
+            t = threading.Thread(target=alvo, args=(SessionLocal,), name=nome, daemon=True)
+            t.start()
+            self._threads.append(t)
+        return self
+
+    def pedir_parada(self) -> None:
+        """Os laços terminam o job em andamento e saem (seguro dentro de handler de sinal)."""
+        self._stop.set()
+        _despertador.acordar()
+
+    def parar(self, timeout: float = 10.0) -> None:
+        self.pedir_parada()
+        for t in self._threads:
+            t.join(timeout=timeout)
+        self._threads.clear()
+
+    def aguardar(self) -> None:
+        """Bloqueia até parar() (usado pelo processo dedicado)."""
+        while not self._stop.wait(1):
+            pass
+
+
+_worker: Optional[Worker] = None
+
+
+def start_jobs_worker() -> bool:
+    global _worker
+    if not JOBS_WORKER:
+        print("ℹ️ Jobs: a API só enfileira (worker: python -m app.scripts.worker_jobs; JOBS_WORKER=1 roda aqui).")
+        return False
+    if _worker is not None:
+        return True
+    _worker = Worker().iniciar()
+    return True
+
+
+def stop_jobs_worker(timeout: float = 10.0) -> None:
+    global _worker
+    if _worker is None:
+        return
+    _worker.parar(timeout=timeout)
+    _worker = None
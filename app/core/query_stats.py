@@ -0,0 +1,329 @@
+# app/core/query_stats.py
+"""
+Registro de queries por "fingerprint" (SQL normalizado, sem parâmetros).
+
+- Cada statement executado pelo engine é normalizado (literais, placeholders e
+  listas de IN viram "?") e agregado em uma tabela em memória:
+  count / total_ms / max_ms / p95_ms.
+- A tabela é limitada (SLOW_QUERY_MAX_FINGERPRINTS): quando enche, sai o
+  fingerprint com menor tempo total acumulado.
+- Opcionalmente captura o EXPLAIN de SELECTs acima do limite de lentidão.
+
+Uso:
+    from app.core.query_stats import install
+    install(engine)
+
+Os dados ficam expostos em GET /admin/db/queries (somente admin).
+"""
+from __future__ import annotations
+
+import math
+import re
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from functools import lru_cache
+from typing import Any, Deque, Dict, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.core.config import (
+    SLOW_QUERY_LOG,
+    SLOW_QUERY_MS,
+    SLOW_QUERY_EXPLAIN,
+    SLOW_QUERY_MAX_FINGERPRINTS,
+)
+
+# =========================
+# Normalização (fingerprint)
+# =========================
+_RE_COMMENT = re.compile(r"/\*.*?\*/|--[^\n]*", re.S)
+_RE_STR = re.compile(r"'(?:[^']|'')*'")
+# %(nome)s (psycopg2), %s, :nome (sem pegar casts ::text), $1 (asyncpg), ? (sqlite)
+_RE_PARAM = re.compile(r"%\(\w+\)s|%s|(?<![:\w]):\w+|\$\d+|\?")
+_RE_NUM = re.compile(r"\b\d+(?:\.\d+)?\b")
+_RE_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_RE_VALUES_LIST = re.compile(r"(\(\?\+?\))(?:\s*,\s*\(\?\+?\))+")
+_RE_WS = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=4096)
+def fingerprint(statement: str) -> str:
+    """
+    Normaliza o SQL para agrupar execuções equivalentes:
+      SELECT ... WHERE id IN (?, ?, ?) LIMIT 10  ->  SELECT ... WHERE id IN (?+) LIMIT ?
+    Memoizado pelo texto: o SQL compilado pelo SQLAlchemy se repete (cache de
+    compilação), então as regex só rodam na 1ª vez de cada statement.
+    """
+    s = _RE_COMMENT.sub(" ", statement or "")
+    s = _RE_STR.sub("?", s)
+    s = _RE_PARAM.sub("?", s)
+    s = _RE_NUM.sub("?", s)
+    s = _RE_IN_LIST.sub("(?+)", s)
+    s = _RE_VALUES_LIST.sub(r"\1, ...", s)
+    s = _RE_WS.sub(" ", s).strip()
+    return s
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    k = max(0, int(math.ceil(pct / 100.0 * len(ordered))) - 1)
+    return ordered[k]
+
+
+# =========================
+# Tabela de estatísticas
+# =========================
+class QueryStats:
+    """
+    Tabela limitada de estatísticas por fingerprint (thread-safe).
+
+    - sample_size: quantas durações recentes ficam guardadas por fingerprint
+      (base para o p95).
+    """
+
+    def __init__(
+        self,
+        *,
+        max_fingerprints: int = 500,
+        sample_size: int = 200,
+        slow_ms: float = 200.0,
+        explain: bool = False,
+    ):
+        self.max_fingerprints = max(1, int(max_fingerprints))
+        self.sample_size = max(1, int(sample_size))
+        self.slow_ms = float(slow_ms)
+        self.explain = bool(explain)
+
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._evicted = 0
+        self._since = datetime.utcnow()
+
+    # ---------- escrita ----------
+    def record(self, statement: str, duration_ms: float) -> Dict[str, Any]:
+        fp = fingerprint(statement)
+        now = datetime.utcnow()
+
+        with self._lock:
+            e = self._entries.get(fp)
+            if e is None:
+                e = {
+                    "fingerprint": fp,
+                    "exemplo_sql": statement,
+                    "count": 0,
+                    "total_ms": 0.0,
+                    "max_ms": 0.0,
+                    "slow_count": 0,
+                    "samples": deque(maxlen=self.sample_size),
+                    "explain": None,
+                    "explain_em": None,
+                    "ultimo_em": None,
+                }
+                self._entries[fp] = e
+                if len(self._entries) > self.max_fingerprints:
+                    self._evict_locked(keep=fp)
+
+            e["count"] += 1
+            e["total_ms"] += duration_ms
+            if duration_ms > e["max_ms"]:
+                e["max_ms"] = duration_ms
+            if duration_ms >= self.slow_ms:
+                e["slow_count"] += 1
+            samples: Deque[float] = e["samples"]
+            samples.append(duration_ms)
+            e["ultimo_em"] = now
+            return e
+
+    def _evict_locked(self, *, keep: str) -> None:
+        # sai quem menos pesa no tempo total do banco (nunca o recém-chegado)
+        victim = min(
+            (k for k in self._entries if k != keep),
+            key=lambda k: self._entries[k]["total_ms"],
+            default=None,
+        )
+        if victim is not None:
+            del self._entries[victim]
+            self._evicted += 1
+
+    def wants_explain(self, entry: Dict[str, Any], duration_ms: float) -> bool:
+        if not self.explain or duration_ms < self.slow_ms:
+            return False
+        if entry.get("explain") is not None:
+            return False
+        head = (entry.get("fingerprint") or "").lstrip("( ").upper()
+        return head.startswith("SELECT") or head.startswith("WITH")
+
+    def set_explain(self, fp: str, plan: str) -> None:
+        with self._lock:
+            e = self._entries.get(fp)
+            if e is not None:
+                e["explain"] = plan
+                e["explain_em"] = datetime.utcnow()
+
+    def reset(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._evicted = 0
+            self._since = datetime.utcnow()
+
+    # ---------- leitura ----------
+    def snapshot(
+        self,
+        *,
+        order_by: str = "total_ms",
+        limit: int = 50,
+        apenas_lentas: bool = False,
+    ) -> Dict[str, Any]:
+        with self._lock:
+            rows = []
+            for e in self._entries.values():
+                if apenas_lentas and e["slow_count"] == 0:
+                    continue
+                samples = list(e["samples"])
+                count = int(e["count"])
+                rows.append(
+                    {
+                        "fingerprint": e["fingerprint"],
+                        "exemplo_sql": e["exemplo_sql"],
+                        "count": count,
+                        "total_ms": round(e["total_ms"], 3),
+                        "mean_ms": round(e["total_ms"] / count, 3) if count else 0.0,
+                        "p95_ms": round(_percentile(samples, 95), 3),
+                        "max_ms": round(e["max_ms"], 3),
+                        "slow_count": int(e["slow_count"]),
+                        "explain": e["explain"],
+                        "explain_em": e["explain_em"].isoformat() if e["explain_em"] else None,
+                        "ultimo_em": e["ultimo_em"].isoformat() if e["ultimo_em"] else None,
+                    }
+                )
+            total_fps = len(self._entries)
+            evicted = self._evicted
+            since = self._since
+
+        rows.sort(key=lambda r: r.get(order_by) or 0, reverse=True)
+        return {
+            "desde": since.isoformat(),
+            "fingerprints": total_fps,
+            "descartados": evicted,
+            "config": {
+                "slow_ms": self.slow_ms,
+                "explain": self.explain,
+                "max_fingerprints": self.max_fingerprints,
+                "sample_size": self.sample_size,
+            },
+            "itens": rows[: max(1, int(limit))],
+        }
+
+
+# instância do processo (uma por worker do uvicorn)
+stats = QueryStats(
+    max_fingerprints=SLOW_QUERY_MAX_FINGERPRINTS,
+    slow_ms=SLOW_QUERY_MS,
+    explain=SLOW_QUERY_EXPLAIN,
+)
+
+
+# =========================
+# EXPLAIN
+# =========================
+def _explain_prefix(dialect_name: str) -> Optional[str]:
+    if dialect_name == "sqlite":
+        return "EXPLAIN QUERY PLAN "
+    if dialect_name in ("postgresql", "mysql", "mariadb"):
+        return "EXPLAIN "
+    return None
+
+
+def _capture_explain(conn, statement: str, parameters) -> Optional[str]:
+    """
+    Roda o EXPLAIN direto no cursor DBAPI (não passa pelos eventos do engine,
+    então não entra em recursão nem polui as estatísticas).
+    Fora do SQLite vai dentro de um SAVEPOINT: no Postgres um EXPLAIN que
+    falha abortaria a transação de quem rodou a query lenta.
+    """
+    prefix = _explain_prefix(conn.dialect.name)
+    if not prefix:
+        return None
+
+    raw = conn.connection.dbapi_connection
+    cur = raw.cursor()
+    savepoint = conn.dialect.name != "sqlite"
+    try:
+        if savepoint:
+            cur.execute("SAVEPOINT query_stats_explain")
+        try:
+            if parameters:
+                cur.execute(prefix + statement, parameters)
+            else:
+                cur.execute(prefix + statement)
+            linhas = []
+            for row in cur.fetchall():
+                # sqlite: (id, parent, notused, detail) | postgres: (plan_line,)
+                linhas.append(str(row[-1]) if len(row) > 1 else str(row[0]))
+        except Exception:
+            if savepoint:
+                cur.execute("ROLLBACK TO SAVEPOINT query_stats_explain")
+                cur.execute("RELEASE SAVEPOINT query_stats_explain")
+            raise
+        if savepoint:
+            cur.execute("RELEASE SAVEPOINT query_stats_explain")
+        return "\n".join(linhas)
+    finally:
+        cur.close()
+
+
+# =========================
+# Instalação no engine
+# =========================
+def install(engine: Engine, recorder: Optional[QueryStats] = None) -> QueryStats:
+    """Registra os listeners de tempo no engine. Idempotente por engine."""
+    rec = recorder or stats
+
+    if getattr(engine, "_query_stats_installed", False):
+        return rec
+    engine._query_stats_installed = True  # type: ignore[attr-defined]
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_stats_t0", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        t0s = conn.info.get("query_stats_t0")
+        if not t0s:
+            return
+        dur_ms = (time.perf_counter() - t0s.pop()) * 1000.0
+
+        entry = rec.record(statement, dur_ms)
+
+        if dur_ms >= rec.slow_ms:
+            print(f"🐢 Query lenta ({dur_ms:.1f} ms): {entry['fingerprint'][:300]}")
+
+        if not executemany and rec.wants_explain(entry, dur_ms):
+            try:
+                plan = _capture_explain(conn, statement, parameters)
+                if plan is not None:
+                    rec.set_explain(entry["fingerprint"], plan)
+            except Exception as e:
+                print("⚠️ Falha ao capturar EXPLAIN:", repr(e))
+
+    @event.listens_for(engine, "handle_error")
+    def _on_error(exception_context):
+        conn = exception_context.connection
+        if conn is not None:
+            t0s = conn.info.get("query_stats_t0")
+            if t0s:
+                t0s.pop()
+
+    return rec
+
+
+def install_if_enabled(engine: Engine) -> Optional[QueryStats]:
+    if not SLOW_QUERY_LOG:
+        return None
+    return install(engine)
@@ -0,0 +1,93 @@
+# app/core/rateio.py
+"""
+Rateio pro-rata por dia (receita por competência), vetorizado com NumPy.
+
+Cada linha i tem um período [ini_i, fim_i] (dias inteiros, inclusive) e um
+valor v_i, reconhecido por igual em cada dia: taxa r_i = v_i / (fim_i - ini_i + 1).
+O acumulado reconhecido até o início do dia t é
+
+    A_i(t) = r_i * clip(t - ini_i, 0, n_i)
+
+e o valor do mês [a, b) é a diferença A_i(b) - A_i(a). Só os pares
+(linha, mês) que o período toca são gerados (np.repeat), sem laço por
+linha nem matriz linhas x dias.
+
+Datas viram índice de dia com datetime64[D]; meses viram índice
+"ano * 12 + (mês - 1)" (ver mes_para_indice / indice_para_mes).
+
+NumPy é importado dentro das funções: este módulo entra no import das rotas
+(app.routes.vendas) e o numpy só deve carregar quando o relatório roda.
+"""
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Tuple
+
+if TYPE_CHECKING:
+    import numpy as np
+
+
+def mes_para_indice(ano: int, mes: int) -> int:
+    return int(ano) * 12 + int(mes) - 1
+
+
+def indice_para_mes(idx: int) -> str:
+    """Índice de mês -> 'AAAA-MM'."""
+    return f"{int(idx) // 12:04d}-{int(idx) % 12 + 1:02d}"
+
+
+_MES_1970 = 1970 * 12
+
+
+def _inicio_do_mes(idx_mes: np.ndarray) -> np.ndarray:
+    """Índice de mês -> índice de dia (dias desde 1970-01-01) do 1º dia do mês."""
+    import numpy as np
+
+    return (idx_mes - _MES_1970).astype("datetime64[M]").astype("datetime64[D]").astype(np.int64)
+
+
+def _mes_do_dia(d: np.ndarray) -> np.ndarray:
+    """Índice de dia -> índice de mês."""
+    import numpy as np
+
+    return d.astype("datetime64[D]").astype("datetime64[M]").astype(np.int64) + _MES_1970
+
+
+def ratear_por_mes(ini: np.ndarray, fim: np.ndarray, valores: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Distribui `valores` pelos dias de [ini, fim] e soma por mês.
+
+    Devolve (linha, mes, valor): um item por par (linha, mês tocado), com
+    `mes` no formato de mes_para_indice. Linhas com fim < ini não entram
+    (quem chama trata como não alocadas).
+    """
+    import numpy as np
+
+    ini = np.asarray(ini, dtype=np.int64)
+    fim = np.asarray(fim, dtype=np.int64)
+    valores = np.asarray(valores, dtype=np.float64)
+
+    ok = fim >= ini
+    linhas = np.nonzero(ok)[0]
+    ini, fim, valores = ini[ok], fim[ok], valores[ok]
+    if not len(linhas):
+        vazio = np.zeros(0, dtype=np.int64)
+        return vazio, vazio.copy(), np.zeros(0, dtype=np.float64)
+
+    n_dias = fim - ini + 1
+    taxa = valores / n_dias
+
+    m_ini = _mes_do_dia(ini)
+    m_fim = _mes_do_dia(fim)
+    k = m_fim - m_ini + 1  # meses tocados por linha
+
+    # pares (linha, mês): repete a linha k vezes e soma 0..k-1 ao mês inicial
+    pos = np.repeat(np.arange(len(linhas)), k)
+    passo = np.arange(len(pos)) - np.repeat(np.cumsum(k) - k, k)
+    mes = m_ini[pos] + passo
+
+    a = _inicio_do_mes(mes)
+    b = _inicio_do_mes(mes + 1)
+    ini_p, n_p, taxa_p = ini[pos], n_dias[pos], taxa[pos]
+    acumulado_b = np.clip(b - ini_p, 0, n_p)
+    acumulado_a = np.clip(a - ini_p, 0, n_p)
+    return linhas[pos], mes, taxa_p * (acumulado_b - acumulado_a)
@@ -0,0 +1,114 @@
+# app/core/ref_cache.py
+"""
+Cache de listas de referência (mudam pouco, são lidas a cada tela aberta).
+
+- Cada grupo ("produtos", "executivos", "pis_ativos") tem um contador de versão.
+  Os create/update/delete dos CRUDs correspondentes chamam bump(grupo).
+- responder(...) guarda o JSON JÁ SERIALIZADO da versão atual: repetições não
+  fazem query nem serialização.
+- ETag forte = hash do corpo (igual em todos os processos para o mesmo
+  conteúdo). If-None-Match com o mesmo ETag -> 304 sem corpo.
+- O contador é por processo: com vários workers, um worker não fica sabendo
+  dos writes dos outros. REF_CACHE_TTL_S limita esse atraso (ao expirar, a
+  lista é relida; se não mudou, o ETag é o mesmo e o cliente continua no 304).
+"""
+from __future__ import annotations
+
+import hashlib
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from fastapi import Request, Response
+
+from app.core.config import REF_CACHE_TTL_S
+from app.core.fast_json import dumps
+
+_lock = threading.Lock()
+_versoes: Dict[str, int] = {}
+_cache: Dict[Tuple[str, str], "_Entrada"] = {}
+_stats = {"hits": 0, "misses": 0, "not_modified": 0}
+
+
+@dataclass
+class _Entrada:
+    versao: int
+    etag: str
+    corpo: bytes
+    criado_em: float
+
+
+def bump(*grupos: str) -> None:
+    """Invalida os grupos (chamar depois do commit)."""
+    with _lock:
+        for g in grupos:
+            _versoes[g] = _versoes.get(g, 0) + 1
+
+
+def versao(grupo: str) -> int:
+    with _lock:
+        return _versoes.get(grupo, 0)
+
+
+def limpar() -> None:
+    with _lock:
+        _cache.clear()
+
+
+def estatisticas() -> Dict[str, Any]:
+    with _lock:
+        return {**_stats, "entradas": len(_cache), "versoes": dict(_versoes)}
+
+
+def _etag_bate(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag == "*":
+            return True
+        # If-None-Match usa comparação fraca: W/"x" casa com "x"
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        if tag == etag:
+            return True
+    return False
+
+
+def _obter(grupo: str, chave: str, build: Callable[[], Any]) -> _Entrada:
+    agora = time.monotonic()
+    with _lock:
+        v = _versoes.get(grupo, 0)
+        e = _cache.get((grupo, chave))
+        valido = (
+            e is not None
+            and e.versao == v
+            and (not REF_CACHE_TTL_S or agora - e.criado_em < REF_CACHE_TTL_S)
+        )
+        _stats["hits" if valido else "misses"] += 1
+    if valido:
+        return e  # type: ignore[return-value]
+
+    corpo = dumps(build())
+    e = _Entrada(v, '"' + hashlib.sha256(corpo).hexdigest()[:32] + '"', corpo, agora)
+    with _lock:
+        # se houve bump durante o build, não guarda (a próxima leitura refaz)
+        if _versoes.get(grupo, 0) == v:
+            _cache[(grupo, chave)] = e
+    return e
+
+
+def responder(request: Request, grupo: str, build: Callable[[], Any], *, chave: str = "") -> Response:
+    """
+    Resposta JSON da lista `build()` do grupo, com ETag / 304.
+    `build` só roda quando não há cache válido; deve devolver dados prontos
+    para JSON (dicts/listas), no formato do response_model da rota.
+    """
+    e = _obter(grupo, chave, build)
+    headers = {"ETag": e.etag, "Cache-Control": "private, no-cache"}
+    if _etag_bate(request.headers.get("if-none-match"), e.etag):
+        with _lock:
+            _stats["not_modified"] += 1
+        return Response(status_code=304, headers=headers)
+    return Response(content=e.corpo, media_type="application/json", headers=headers)
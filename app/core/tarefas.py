@@ -0,0 +1,175 @@
+# app/core/tarefas.py
+"""
+Tarefas executadas pelo worker de jobs (app/core/jobs.py).
+
+Cada uma recebe (db, payload, arquivo) — `arquivo` são os bytes enviados na
+rota — e devolve o resultado em JSON (o mesmo corpo que a rota síncrona
+devolveria). ValueError (inclui ErroPermanente) = entrada inválida, sem nova
+tentativa; qualquer outra exceção (Drive fora, timeout) tenta de novo com backoff.
+
+As rotas síncronas usam as mesmas funções (extrair_campos_pdf, importar_pdf,
+anexar_pdf_no_drive): o resultado não muda com ?assincrono=true.
+"""
+from __future__ import annotations
+
+import os
+import tempfile
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+from uuid import uuid4
+
+from sqlalchemy.orm import Session
+
+from app.core.jobs import ErroPermanente, tarefa
+
+CAMPOS_PDF = (
+    "numero_pi",
+    "tipo_pi",
+    "nome_anunciante",
+    "razao_social_anunciante",
+    "cnpj_anunciante",
+    "nome_agencia",
+    "razao_social_agencia",
+    "cnpj_agencia",
+    "nome_campanha",
+    "canal",
+    "executivo",
+    "vencimento",
+    "data_emissao",
+    "valor_bruto",
+    "valor_liquido",
+    "observacoes",
+    "mes_ref",
+)
+
+
+def _exigir_arquivo(arquivo: Optional[bytes]) -> bytes:
+    if not arquivo:
+        raise ErroPermanente("Job sem arquivo.")
+    return arquivo
+
+
+@contextmanager
+def _pdf_temporario(conteudo: bytes) -> Iterator[str]:
+    """O extrator lê de caminho: grava os bytes num temporário apagado no fim."""
+    path = os.path.join(tempfile.gettempdir(), f"{uuid4().hex}.pdf")
+    with open(path, "wb") as f:
+        f.write(conteudo)
+    try:
+        yield path
+    finally:
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+
+
+def _extrair(conteudo: bytes) -> Dict[str, Any]:
+    from app.utils.pi_pdf import extract_structured_fields_from_pdf
+
+    with _pdf_temporario(conteudo) as path:
+        try:
+            return extract_structured_fields_from_pdf(path)
+        except Exception as e:
+            # PDF corrompido/ilegível não melhora com nova tentativa
+            raise ErroPermanente(f"Não foi possível ler o PDF: {e}") from e
+
+
+# ==========================================================
+# PDF do PI
+# ==========================================================
+def extrair_campos_pdf(conteudo: bytes) -> Dict[str, Any]:
+    """Campos do PDF para pré-preencher o formulário (POST /pis/extrair-pdf)."""
+    parsed = _extrair(conteudo)
+    out = {k: parsed.get(k) for k in CAMPOS_PDF}
+    out["produtos"] = parsed.get("produtos") or []
+    return out
+
+
+def importar_pdf(db: Session, conteudo: bytes, overrides: Optional[Dict[str, Any]] = None):
+    """Extrai o PDF, aplica os campos enviados pelo usuário e cria o PI (POST /pis/importar)."""
+    from app.crud import pi_crud
+    from app.schemas.pi import PICreate
+
+    payload = {**_extrair(conteudo), **(overrides or {})}
+    try:
+        data = PICreate.model_validate(payload)
+    except Exception as e:
+        raise ValueError(f"Payload inválido: {e}") from e
+    return pi_crud.create(db, data.model_dump())
+
+
+def anexar_pdf_no_drive(
+    db: Session,
+    pi_id: int,
+    conteudo: bytes,
+    *,
+    tipo_db: str,
+    filename: Optional[str],
+    content_type: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Sobe o PDF para a pasta do Drive do tipo e registra o anexo (path gdrive://<id>)."""
+    from app.crud import pi_crud
+    from app.models import PI
+    from app.utils.drive_upload import upload_pdf_to_drive
+
+    if db.get(PI, pi_id) is None:
+        raise ValueError("PI não encontrado.")  # antes do upload: não deixa arquivo órfão no Drive
+
+    which = "pi" if (tipo_db or "").startswith("pi") else "proposta"
+    safe_name = f"{tipo_db}-{uuid4().hex}.pdf"
+    drive_file = upload_pdf_to_drive(conteudo, safe_name, which=which)
+
+    reg = pi_crud.anexos_add(
+        db,
+        pi_id,
+        tipo=tipo_db,
+        filename=filename or safe_name,
+        path=f"gdrive://{drive_file['id']}",
+        mime=drive_file.get("mimeType") or content_type,
+        size=len(conteudo),
+    )
+    return {
+        "id": reg.id,
+        "tipo": reg.tipo,
+        "filename": reg.filename,
+        "path": reg.path,
+        "mime": reg.mime,
+        "size": reg.size,
+        "uploaded_at": reg.uploaded_at,
+        "webViewLink": drive_file.get("webViewLink"),
+        "webContentLink": drive_file.get("webContentLink"),
+    }
+
+
+@tarefa("pi.extrair_pdf")
+def _job_extrair_pdf(db: Session, payload: Dict[str, Any], arquivo: Optional[bytes]):
+    return extrair_campos_pdf(_exigir_arquivo(arquivo))
+
+
+@tarefa("pi.importar_pdf")
+def _job_importar_pdf(db: Session, payload: Dict[str, Any], arquivo: Optional[bytes]):
+    pi = importar_pdf(db, _exigir_arquivo(arquivo), payload.get("overrides"))
+    return {"pi_id": pi.id, "numero_pi": pi.numero_pi}
+
+
+@tarefa("pi.anexo_drive")
+def _job_anexo_drive(db: Session, payload: Dict[str, Any], arquivo: Optional[bytes]):
+    return anexar_pdf_no_drive(
+        db,
+        int(payload["pi_id"]),
+        _exigir_arquivo(arquivo),
+        tipo_db=payload.get("tipo") or "pi_pdf",
+        filename=payload.get("filename"),
+        content_type=payload.get("content_type"),
+    )
+
+
+# ==========================================================
+# Faturamento
+# ==========================================================
+@tarefa("faturamento.gerar")
+def _job_gerar_faturamentos(db: Session, payload: Dict[str, Any], arquivo: Optional[bytes]):
+    from app.crud import faturamento_crud
+
+    return faturamento_crud.gerar_por_pi(db, int(payload["pi_id"]))
@@ -0,0 +1,274 @@
+# app/core/versionamento.py
+"""
+Versão de linha (versao + atualizado_em) de PI, Veiculação e Entrega.
+
+- Toda alteração via ORM incrementa a versão da própria linha
+  (UPDATE ... SET versao = versao + 1, atômico) e a dos "pais":
+      veiculação / produto / anexo do PI  -> PI
+      entrega                             -> PI
+      faturamento / anexo do faturamento  -> entrega + PI
+  assim o ETag do detalhe do PI muda quando qualquer filho muda.
+- GET de detalhe: 1 SELECT (versao, atualizado_em) por PK; se o cliente mandou
+  If-None-Match com o mesmo ETag, devolve 304 sem carregar mais nada.
+- PUT com If-Match: reservar_versao() faz UPDATE ... WHERE versao = esperada;
+  se outra pessoa salvou antes, ConflitoDeVersao (a rota devolve 412).
+
+Statements em lote fora do ORM (db.execute(update(...), [...])) não passam
+pelo flush: quem usa chama tocar_pis() (ex.: pi_crud._aplicar_produtos).
+"""
+from __future__ import annotations
+
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import TYPE_CHECKING, Any, Dict, Iterable, Optional, Set
+
+from sqlalchemy import event, func, inspect, or_, select, update
+from sqlalchemy.orm import Session
+
+from app.models import PI, Entrega, Faturamento, FaturamentoAnexo, PIAnexo, Produto, Veiculacao
+
+if TYPE_CHECKING:  # models importam este módulo; fastapi só nas rotas
+    from fastapi import Request
+    from fastapi.responses import Response
+
+VERSIONADOS = (PI, Veiculacao, Entrega)
+
+# filhos -> atributo com o id do PI
+_FILHOS_DO_PI = ((Veiculacao, "pi_id"), (Produto, "pi_id"), (PIAnexo, "pi_id"), (Entrega, "pi_id"))
+
+
+class ConflitoDeVersao(ValueError):
+    """If-Match não bate com a versão atual (alguém salvou antes)."""
+
+    def __init__(self, msg: str, atual: Optional[int] = None):
+        super().__init__(msg)
+        self.atual = atual
+
+
+def agora() -> datetime:
+    return datetime.utcnow()
+
+
+# =========================
+# ETag / Last-Modified
+# =========================
+def etag(prefixo: str, id_: int, versao: Optional[int]) -> str:
+    return f'W/"{prefixo}-{id_}-v{versao or 0}"'
+
+
+def _http_date(dt: datetime) -> str:
+    return format_datetime(dt.replace(tzinfo=timezone.utc, microsecond=0), usegmt=True)
+
+
+def cabecalhos(tag: str, modificado_em: Optional[datetime]) -> Dict[str, str]:
+    # no-cache: o navegador guarda, mas sempre revalida (o 304 é barato)
+    h = {"ETag": tag, "Cache-Control": "private, no-cache"}
+    if modificado_em is not None:
+        h["Last-Modified"] = _http_date(modificado_em)
+    return h
+
+
+def _sem_fraco(tag: str) -> str:
+    tag = tag.strip()
+    return tag[2:] if tag.startswith("W/") else tag
+
+
+def nao_modificado(request: Request, tag: str, modificado_em: Optional[datetime]) -> bool:
+    """If-None-Match (comparação fraca) ou, sem ele, If-Modified-Since."""
+    inm = request.headers.get("if-none-match")
+    if inm is not None:
+        if inm.strip() == "*":
+            return True
+        return _sem_fraco(tag) in {_sem_fraco(t) for t in inm.split(",")}
+
+    ims = request.headers.get("if-modified-since")
+    if ims and modificado_em is not None:
+        try:
+            desde = parsedate_to_datetime(ims)
+        except (TypeError, ValueError):
+            return False
+        if desde.tzinfo is None:
+            desde = desde.replace(tzinfo=timezone.utc)
+        return modificado_em.replace(tzinfo=timezone.utc, microsecond=0) <= desde
+    return False
+
+
+def resposta_condicional(request: Request, tag: str, modificado_em: Optional[datetime]) -> Optional[Response]:
+    """304 pronto (com os mesmos cabeçalhos) se o cliente já tem esta versão; senão None."""
+    from fastapi.responses import Response
+
+    if nao_modificado(request, tag, modificado_em):
+        return Response(status_code=304, headers=cabecalhos(tag, modificado_em))
+    return None
+
+
+def ler_versao(db: Session, modelo: Any, *criterio: Any):
+    """(id, versao, atualizado_em) — 1 lookup indexado (PK ou coluna única)."""
+    return db.query(modelo.id, modelo.versao, modelo.atualizado_em).filter(*criterio).first()
+
+
+def versao_if_match(valor: Optional[str]) -> Optional[int]:
+    """
+    If-Match -> versão esperada. Aceita o ETag devolvido pela API
+    (W/"pi-12-v7") ou só o número ("7"). Ausente / "*" -> None (sem checagem).
+    """
+    if valor is None or valor.strip() in ("", "*"):
+        return None
+    tag = _sem_fraco(valor.split(",")[0]).strip('"')
+    num = tag.rsplit("-v", 1)[-1]
+    if not num.isdigit():
+        raise ValueError("If-Match inválido: use o ETag recebido no GET.")
+    return int(num)
+
+
+# =========================
+# Concorrência otimista
+# =========================
+def reservar_versao(db: Session, obj: Any, esperada: Optional[int], rotulo: str = "Registro") -> None:
+    """
+    Compara-e-incrementa: UPDATE ... SET versao = versao + 1 WHERE id = ? AND versao = esperada.
+    Chamar logo depois de carregar o objeto e antes de alterar os campos.
+    """
+    if esperada is None:
+        return
+    cls = type(obj)
+    atual = obj.versao
+    res = db.execute(
+        update(cls)
+        .where(cls.id == obj.id, cls.versao == esperada)
+        .values(versao=cls.versao + 1, atualizado_em=agora())
+        .execution_options(synchronize_session=False)
+    )
+    if res.rowcount != 1:
+        raise ConflitoDeVersao(
+            f"Conflito de versão ({rotulo}): outra pessoa salvou antes "
+            f"(versão atual {atual}, enviada {esperada}). Recarregue e tente de novo.",
+            atual=atual,
+        )
+    db.info.setdefault("versao_reservada", set()).add((cls, obj.id))
+    db.expire(obj, ["versao", "atualizado_em"])
+
+
+def tocar_pis(db: Session, pi_ids: Iterable[int]) -> None:
+    """Incrementa a versão dos PIs (para escritas em lote que não passam pelo flush)."""
+    ids = sorted({int(i) for i in pi_ids if i})
+    if ids:
+        db.execute(update(PI.__table__).where(PI.__table__.c.id.in_(ids)).values(versao=PI.versao + 1, atualizado_em=agora()))
+        _expirar(db, PI, ids)
+
+
+def _expirar(db: Session, cls: Any, ids: Iterable[int]) -> None:
+    for i in ids:
+        obj = db.identity_map.get(db.identity_key(cls, i))
+        if obj is not None:
+            db.expire(obj, ["versao", "atualizado_em"])
+
+
+# =========================
+# Eventos do flush
+# =========================
+def _valores(obj: Any, attr: str) -> Set[int]:
+    """Valor atual + anterior do FK (mudar o pai incrementa o antigo e o novo)."""
+    hist = inspect(obj).attrs[attr].history
+    return {v for v in (*hist.added, *hist.unchanged, *hist.deleted) if v}
+
+
+@event.listens_for(Session, "before_flush")
+def _antes_do_flush(session: Session, flush_context, instances) -> None:
+    reservados = session.info.get("versao_reservada") or set()
+    proprios: Set[tuple] = set()
+    pis: Set[int] = set()
+    veics: Set[int] = set()
+    entregas: Set[int] = set()
+    fats: Set[int] = set()
+    now = agora()
+
+    alterados = [o for o in session.dirty if session.is_modified(o, include_collections=False)]
+
+    for obj in alterados:
+        if isinstance(obj, VERSIONADOS):
+            chave = (type(obj), obj.id)
+            proprios.add(chave)
+            if chave in reservados:
+                reservados.discard(chave)  # o UPDATE condicional já incrementou
+            else:
+                obj.versao = type(obj).versao + 1
+            obj.atualizado_em = now
+
+    for obj in (*session.new, *alterados, *session.deleted):
+        for cls, attr in _FILHOS_DO_PI:
+            if isinstance(obj, cls):
+                pis |= _valores(obj, attr)
+        if isinstance(obj, Entrega):
+            veics |= _valores(obj, "veiculacao_id")
+        elif isinstance(obj, Faturamento):
+            entregas |= _valores(obj, "entrega_id")
+        elif isinstance(obj, FaturamentoAnexo):
+            fats |= _valores(obj, "faturamento_id")
+
+    if pis or veics or entregas or fats:
+        session.info["versao_pais"] = (pis, veics, entregas, fats, proprios)
+
+
+@event.listens_for(Session, "after_flush")
+def _depois_do_flush(session: Session, flush_context) -> None:
+    pend = session.info.pop("versao_pais", None)
+    if not pend:
+        return
+    pis, veics, entregas, fats, proprios = pend
+    now = agora()
+    t_pi, t_ent = PI.__table__, Entrega.__table__
+
+    ents_cond = []
+    if entregas:
+        ents_cond.append(t_ent.c.id.in_(entregas))
+    if fats:
+        ents_cond.append(
+            t_ent.c.id.in_(select(Faturamento.__table__.c.entrega_id).where(Faturamento.__table__.c.id.in_(fats)))
+        )
+    ent_proprias = [i for (c, i) in proprios if c is Entrega]
+
+    pis_cond = []
+    if pis:
+        pis_cond.append(t_pi.c.id.in_(pis))
+    if veics:
+        pis_cond.append(t_pi.c.id.in_(select(Veiculacao.__table__.c.pi_id).where(Veiculacao.__table__.c.id.in_(veics))))
+    if ents_cond:
+        v = Veiculacao.__table__
+        pis_cond.append(
+            t_pi.c.id.in_(
+                select(func.coalesce(v.c.pi_id, t_ent.c.pi_id))
+                .select_from(t_ent.outerjoin(v, v.c.id == t_ent.c.veiculacao_id))
+                .where(or_(*ents_cond))
+            )
+        )
+    pi_proprios = [i for (c, i) in proprios if c is PI]
+
+    if ents_cond:
+        q = update(t_ent).where(or_(*ents_cond)).values(versao=t_ent.c.versao + 1, atualizado_em=now)
+        if ent_proprias:
+            q = q.where(t_ent.c.id.notin_(ent_proprias))
+        session.execute(q)
+    if pis_cond:
+        q = update(t_pi).where(or_(*pis_cond)).values(versao=t_pi.c.versao + 1, atualizado_em=now)
+        if pi_proprios:
+            q = q.where(t_pi.c.id.notin_(pi_proprios))
+        session.execute(q)
+
+    session.info["versao_expirar"] = True
+
+
+@event.listens_for(Session, "after_flush_postexec")
+def _expirar_pais(session: Session, flush_context) -> None:
+    # objetos PI/Entrega já carregados nesta sessão passam a reler versao/atualizado_em
+    if session.info.pop("versao_expirar", False):
+        for obj in list(session.identity_map.values()):
+            if isinstance(obj, (PI, Entrega)):
+                session.expire(obj, ["versao", "atualizado_em"])
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _limpar_reservas(session: Session, transaction) -> None:
+    if transaction.parent is None:
+        session.info.pop("versao_reservada", None)
+        session.info.pop("versao_pais", None)
@@ -0,0 +1,269 @@
+# app/core/xlsx_stream.py
+"""
+Exportação XLSX em streaming (memória constante) para as rotas /.../exportar.
+
+- A consulta roda com yield_per (cursor no servidor no Postgres): as linhas
+  chegam em lotes e nunca ficam todas na memória.
+- A planilha é escrita direto num zip "sem seek" (data descriptors): cada
+  lote de linhas vira bytes do download na hora — o navegador começa a
+  baixar antes da consulta terminar.
+- O openpyxl write_only também não guarda as células, mas só monta o zip no
+  save() (arquivo temporário inteiro antes do 1º byte); por isso o XML da
+  planilha é gerado aqui. O arquivo abre normalmente no Excel/LibreOffice/openpyxl.
+
+Tipos: número -> número; date/datetime -> data com formato dd/mm/aaaa
+(hh:mm); bool -> VERDADEIRO/FALSO; resto -> texto. NaN/inf viram célula vazia.
+"""
+from __future__ import annotations
+
+import math
+import re
+import zipfile
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Callable, Iterable, Iterator, List, Optional, Sequence
+from xml.sax.saxutils import escape
+
+from fastapi.responses import StreamingResponse
+
+MIME_XLSX = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+LOTE = 1000  # linhas por yield_per / por chunk do download
+MAX_TEXTO = 32767  # limite de caracteres por célula do Excel
+
+_ILEGAIS = re.compile(r"[\x00-\x08\x0b\x0c\x0e-\x1f]")
+_EPOCH = datetime(1899, 12, 30)
+
+# estilos (índices de cellXfs em _STYLES)
+_S_DATA, _S_DATAHORA, _S_CABECALHO = 1, 2, 3
+
+_NS = 'xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"'
+_NS_R = 'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships"'
+
+_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '<Override PartName="/xl/styles.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+    "</Types>"
+)
+_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="xl/workbook.xml"/>'
+    "</Relationships>"
+)
+_WORKBOOK_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+    'Target="worksheets/sheet1.xml"/>'
+    '<Relationship Id="rId2" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" '
+    'Target="styles.xml"/>'
+    "</Relationships>"
+)
+_STYLES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    f"<styleSheet {_NS}>"
+    '<numFmts count="2">'
+    '<numFmt numFmtId="164" formatCode="dd/mm/yyyy"/>'
+    '<numFmt numFmtId="165" formatCode="dd/mm/yyyy hh:mm"/>'
+    "</numFmts>"
+    '<fonts count="2">'
+    '<font><sz val="11"/><name val="Calibri"/></font>'
+    '<font><b/><sz val="11"/><name val="Calibri"/></font>'
+    "</fonts>"
+    '<fills count="2"><fill><patternFill patternType="none"/></fill>'
+    '<fill><patternFill patternType="gray125"/></fill></fills>'
+    '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+    '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+    '<cellXfs count="4">'
+    '<xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+    '<xf numFmtId="164" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>'
+    '<xf numFmtId="165" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>'
+    '<xf numFmtId="0" fontId="1" fillId="0" borderId="0" xfId="0" applyFont="1"/>'
+    "</cellXfs>"
+    '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+    "</styleSheet>"
+)
+
+
+def _workbook(aba: str) -> str:
+    return (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        f"<workbook {_NS} {_NS_R}>"
+        f'<sheets><sheet name="{escape(aba[:31], {chr(34): "&quot;"})}" sheetId="1" r:id="rId1"/></sheets>'
+        "</workbook>"
+    )
+
+
+def coluna_letra(i: int) -> str:
+    """0 -> A, 25 -> Z, 26 -> AA."""
+    s = ""
+    i += 1
+    while i:
+        i, r = divmod(i - 1, 26)
+        s = chr(65 + r) + s
+    return s
+
+
+def _texto(v: str) -> str:
+    v = _ILEGAIS.sub("", v)[:MAX_TEXTO]
+    esp = ' xml:space="preserve"' if v[:1].isspace() or v[-1:].isspace() else ""
+    return f'<is><t{esp}>{escape(v)}</t></is>'
+
+
+def _celula(ref: str, v: Any) -> str:
+    if v is None:
+        return ""
+    if isinstance(v, bool):
+        return f'<c r="{ref}" t="b"><v>{int(v)}</v></c>'
+    if isinstance(v, (int, Decimal)):
+        return f'<c r="{ref}"><v>{v}</v></c>'
+    if isinstance(v, float):
+        if math.isnan(v) or math.isinf(v):
+            return ""
+        return f'<c r="{ref}"><v>{v!r}</v></c>'
+    if isinstance(v, datetime):
+        serial = (v.replace(tzinfo=None) - _EPOCH).total_seconds() / 86400
+        return f'<c r="{ref}" s="{_S_DATAHORA}"><v>{serial!r}</v></c>'
+    if isinstance(v, date):
+        return f'<c r="{ref}" s="{_S_DATA}"><v>{(v - _EPOCH.date()).days}</v></c>'
+    return f'<c r="{ref}" t="inlineStr">{_texto(str(v))}</c>'
+
+
+class _Saida:
+    """Destino do zip sem seek: acumula os bytes até o próximo chunk do download."""
+
+    def __init__(self):
+        self._buf = bytearray()
+        self._pos = 0
+
+    def write(self, b) -> int:
+        self._buf += b
+        self._pos += len(b)
+        return len(b)
+
+    def tell(self) -> int:
+        return self._pos
+
+    def flush(self) -> None:
+        pass
+
+    def tirar(self) -> bytes:
+        b = bytes(self._buf)
+        self._buf.clear()
+        return b
+
+
+def gerar_xlsx(
+    cabecalho: Sequence[str],
+    linhas: Iterable[Sequence[Any]],
+    *,
+    aba: str = "Dados",
+    larguras: Optional[Sequence[float]] = None,
+    lote: int = LOTE,
+) -> Iterator[bytes]:
+    """Gera os bytes do .xlsx aos poucos (um chunk a cada `lote` linhas)."""
+    saida = _Saida()
+    zf = zipfile.ZipFile(saida, "w", compression=zipfile.ZIP_DEFLATED)
+    zf.writestr("[Content_Types].xml", _CONTENT_TYPES)
+    zf.writestr("_rels/.rels", _RELS)
+    zf.writestr("xl/workbook.xml", _workbook(aba))
+    zf.writestr("xl/_rels/workbook.xml.rels", _WORKBOOK_RELS)
+    zf.writestr("xl/styles.xml", _STYLES)
+
+    letras = [coluna_letra(i) for i in range(len(cabecalho))]
+    larguras = larguras or [max(10, min(40, len(c) + 4)) for c in cabecalho]
+
+    with zf.open("xl/worksheets/sheet1.xml", "w", force_zip64=True) as sheet:
+        sheet.write(
+            (
+                '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+                f"<worksheet {_NS} {_NS_R}>"
+                '<sheetViews><sheetView workbookViewId="0">'
+                '<pane ySplit="1" topLeftCell="A2" activePane="bottomLeft" state="frozen"/>'
+                "</sheetView></sheetViews>"
+                "<cols>"
+                + "".join(f'<col min="{i}" max="{i}" width="{w}" customWidth="1"/>' for i, w in enumerate(larguras, 1))
+                + "</cols><sheetData>"
+                + '<row r="1">'
+                + "".join(
+                    f'<c r="{l}1" t="inlineStr" s="{_S_CABECALHO}">{_texto(str(c))}</c>' for l, c in zip(letras, cabecalho)
+                )
+                + "</row>"
+            ).encode("utf-8")
+        )
+        yield saida.tirar()
+
+        n = 1
+        partes: List[str] = []
+        for linha in linhas:
+            n += 1
+            partes.append(f'<row r="{n}">')
+            partes.extend(_celula(f"{l}{n}", v) for l, v in zip(letras, linha))
+            partes.append("</row>")
+            if n % lote == 0:
+                sheet.write("".join(partes).encode("utf-8"))
+                partes.clear()
+                b = saida.tirar()
+                if b:
+                    yield b
+
+        fim = "</sheetData>"
+        if letras:
+            fim += f'<autoFilter ref="A1:{letras[-1]}{n}"/>'
+        partes.append(fim + "</worksheet>")
+        sheet.write("".join(partes).encode("utf-8"))
+
+    zf.close()
+    yield saida.tirar()
+
+
+# =========================
+# Rotas
+# =========================
+def linhas_da_consulta(stmt: Any, filtro: Optional[Callable[[Any], bool]] = None, lote: int = LOTE) -> Iterator[Any]:
+    """
+    Executa `stmt` numa sessão PRÓPRIA (a da rota pode fechar antes do fim do
+    download) com yield_per: lotes de `lote` linhas, cursor no servidor no Postgres.
+    """
+    from app.database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        res = db.execute(stmt.execution_options(yield_per=lote))
+        for linha in res:
+            if filtro is None or filtro(linha):
+                yield linha
+    finally:
+        db.close()
+
+
+def nome_arquivo(prefixo: str) -> str:
+    return f"{prefixo}_{datetime.now():%Y%m%d_%H%M}.xlsx"
+
+
+def resposta_xlsx(
+    prefixo: str,
+    stmt: Any,
+    *,
+    filtro: Optional[Callable[[Any], bool]] = None,
+    aba: str = "Dados",
+) -> StreamingResponse:
+    """StreamingResponse com o .xlsx da consulta (cabeçalho = labels das colunas do SELECT)."""
+    cabecalho = [c.key for c in stmt.selected_columns]
+    return StreamingResponse(
+        gerar_xlsx(cabecalho, linhas_da_consulta(stmt, filtro), aba=aba),
+        media_type=MIME_XLSX,
+        headers={"Content-Disposition": f'attachment; filename="{nome_arquivo(prefixo)}"'},
+    )
@@ -1,11 +1,12 @@
 # app/crud/agencia_crud.py
 from __future__ import annotations
 from sqlalchemy.orm import Session
-from sqlalchemy import or_
 from typing import Optional, List, Dict, Any
 import re
 
 from app.models import Agencia
+from app.utils import busca_clientes
+from app.core import ref_cache
 
 
 # ========== helpers ==========
@@ -46,20 +47,13 @@ def list_by_name(db: Session, nome: str) -> List[Agencia]:
     """
     Busca por nome_agencia, codinome, razão social ou grupo empresarial contendo o termo.
     """
-    termo = f"%{nome}%"
-    return (
-        db.query(Agencia)
-        .filter(
-            or_(
-                Agencia.nome_agencia.ilike(termo),
-                Agencia.codinome.ilike(termo),
-                Agencia.razao_social_agencia.ilike(termo),
-                Agencia.grupo_empresarial.ilike(termo),
-            )
-        )
-        .order_by(Agencia.nome_agencia.asc())
-        .all()
-    )
+    # ✅ sem acento e indexado (FTS5 no SQLite / pg_trgm no Postgres): app/utils/busca_clientes.py
+    ids = busca_clientes.ids_por_termo(db, "agencia", nome)
+    regs: List[Agencia] = []
+    for i in range(0, len(ids), 900):
+        regs.extend(db.query(Agencia).filter(Agencia.id.in_(ids[i:i + 900])).all())
+    regs.sort(key=lambda r: (r.nome_agencia or ""))
+    return regs
 
 
 # ========== writes ==========
@@ -107,6 +101,7 @@ def create(db: Session, dados: Dict[str, Any]) -> Agencia:
 
     db.add(novo)
     db.commit()
+    ref_cache.bump("executivos")
     db.refresh(novo)
     return novo
 
@@ -148,6 +143,7 @@ def update(db: Session, agencia_id: int, dados: Dict[str, Any]) -> Agencia:
             setattr(ag, campo, valor)
 
     db.commit()
+    ref_cache.bump("executivos")
     db.refresh(ag)
     return ag
 
@@ -161,6 +157,7 @@ def delete(db: Session, agencia_id: int) -> None:
         raise ValueError("Não é possível excluir: existem PIs vinculados à agência.")
     db.delete(ag)
     db.commit()
+    ref_cache.bump("executivos")
 
 
 def delete_by_cnpj(db: Session, cnpj: str) -> bool:
@@ -171,4 +168,5 @@ def delete_by_cnpj(db: Session, cnpj: str) -> bool:
         raise ValueError("Não é possível excluir: existem PIs vinculados à agência.")
     db.delete(ag)
     db.commit()
+    ref_cache.bump("executivos")
     return True
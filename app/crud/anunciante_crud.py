@@ -1,11 +1,12 @@
 # app/crud/anunciante_crud.py
 from __future__ import annotations
 from sqlalchemy.orm import Session
-from sqlalchemy import or_
 from typing import Optional, List, Dict, Any
 import re
 
 from app.models import Anunciante
+from app.utils import busca_clientes
+from app.core import ref_cache
 
 
 # ========== helpers ==========
@@ -51,20 +52,13 @@ def list_by_name(db: Session, nome: str) -> List[Anunciante]:
     Busca por nome_anunciante, codinome, razão social OU grupo empresarial
     contendo o termo (ilike).
     """
-    termo = f"%{nome}%"
-    return (
-        db.query(Anunciante)
-        .filter(
-            or_(
-                Anunciante.nome_anunciante.ilike(termo),
-                Anunciante.codinome.ilike(termo),
-                Anunciante.razao_social_anunciante.ilike(termo),
-                Anunciante.grupo_empresarial.ilike(termo),
-            )
-        )
-        .order_by(Anunciante.nome_anunciante.asc())
-        .all()
-    )
+    # ✅ sem acento e indexado (FTS5 no SQLite / pg_trgm no Postgres): app/utils/busca_clientes.py
+    ids = busca_clientes.ids_por_termo(db, "anunciante", nome)
+    regs: List[Anunciante] = []
+    for i in range(0, len(ids), 900):
+        regs.extend(db.query(Anunciante).filter(Anunciante.id.in_(ids[i:i + 900])).all())
+    regs.sort(key=lambda r: (r.nome_anunciante or ""))
+    return regs
 
 
 # ========== writes ==========
@@ -120,6 +114,7 @@ def create(db: Session, dados: Dict[str, Any]) -> Anunciante:
 
     db.add(novo)
     db.commit()
+    ref_cache.bump("executivos")
     db.refresh(novo)
     return novo
 
@@ -161,6 +156,7 @@ def update(db: Session, anunciante_id: int, dados: Dict[str, Any]) -> Anunciante
             setattr(an, campo, valor)
 
     db.commit()
+    ref_cache.bump("executivos")
     db.refresh(an)
     return an
 
@@ -176,6 +172,7 @@ def delete(db: Session, anunciante_id: int) -> None:
 
     db.delete(an)
     db.commit()
+    ref_cache.bump("executivos")
 
 
 def delete_by_cnpj(db: Session, cnpj: str) -> bool:
@@ -188,4 +185,5 @@ def delete_by_cnpj(db: Session, cnpj: str) -> bool:
 
     db.delete(an)
     db.commit()
+    ref_cache.bump("executivos")
     return True
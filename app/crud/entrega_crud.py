@@ -1,11 +1,13 @@
 # app/crud/entrega_crud.py
 from __future__ import annotations
 from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy import func, select
 from typing import Optional, List, Dict, Any
 from datetime import datetime, date
 
-from app.models import Entrega, Veiculacao, PI  # valida veiculacao e preenche pi_id
+from app.models import Entrega, Veiculacao, PI, Faturamento  # valida veiculacao e preenche pi_id
+from app.core.versionamento import reservar_versao
+from app.core.eventos import _pi_e_executivo, publicar_entrega
 
 # ---------- utils ----------
 def _parse_date_maybe(value: str | None) -> date | None:
@@ -48,6 +50,61 @@ def get_by_id(db: Session, entrega_id: int) -> Optional[Entrega]:
 def list_all(db: Session) -> List[Entrega]:
     return db.query(Entrega).order_by(Entrega.data_entrega.desc()).all()
 
+def _filtrar(q, pi_id: Optional[int], veiculacao_id: Optional[int]):
+    if pi_id is not None:
+        q = q.filter(Entrega.pi_id == pi_id)
+    elif veiculacao_id is not None:
+        q = q.filter(Entrega.veiculacao_id == veiculacao_id)
+    return q.order_by(Entrega.data_entrega.desc())
+
+def list_rows(
+    db: Session,
+    *,
+    pi_id: Optional[int] = None,
+    veiculacao_id: Optional[int] = None,
+) -> List[Any]:
+    """
+    Tuplas para o caminho rápido de GET /entregas (mesmos filtros/ordem das listas acima):
+    (id, pi_id, veiculacao_id, data_entrega, foi_entregue, motivo, faturamento_id, faturamento_status, versao)
+    """
+    q = (
+        db.query(
+            Entrega.id,
+            Entrega.pi_id,
+            Entrega.veiculacao_id,
+            Entrega.data_entrega,
+            Entrega.foi_entregue,
+            Entrega.motivo,
+            Faturamento.id,
+            Faturamento.status,
+            Entrega.versao,
+        )
+        .outerjoin(Faturamento, Faturamento.entrega_id == Entrega.id)
+    )
+    return _filtrar(q, pi_id, veiculacao_id).all()
+
+def export_select(*, pi_id: Optional[int] = None, veiculacao_id: Optional[int] = None):
+    """SELECT da exportação XLSX: colunas de list_rows + número/cliente/executivo do PI."""
+    q = (
+        select(
+            Entrega.id.label("id"),
+            Entrega.pi_id.label("pi_id"),
+            PI.numero_pi.label("numero_pi"),
+            PI.nome_anunciante.label("anunciante"),
+            PI.executivo.label("executivo"),
+            Entrega.veiculacao_id.label("veiculacao_id"),
+            Entrega.data_entrega.label("data_entrega"),
+            Entrega.foi_entregue.label("foi_entregue"),
+            Entrega.motivo.label("motivo"),
+            Faturamento.id.label("faturamento_id"),
+            Faturamento.status.label("faturamento_status"),
+        )
+        .select_from(Entrega)
+        .outerjoin(Faturamento, Faturamento.entrega_id == Entrega.id)
+        .outerjoin(PI, PI.id == Entrega.pi_id)
+    )
+    return _filtrar(q, pi_id, veiculacao_id)
+
 def list_by_veiculacao(db: Session, veiculacao_id: int) -> List[Entrega]:
     return (
         db.query(Entrega)
@@ -106,12 +163,14 @@ def create(db: Session, dados: Dict[str, Any]) -> Entrega:
     db.add(novo)
     db.commit()
     db.refresh(novo)
+    publicar_entrega(db, "criada", novo)
     return novo
 
-def update(db: Session, entrega_id: int, dados: Dict[str, Any]) -> Entrega:
+def update(db: Session, entrega_id: int, dados: Dict[str, Any], *, versao: Optional[int] = None) -> Entrega:
     ent = get_by_id(db, entrega_id)
     if not ent:
         raise ValueError("Entrega não encontrada.")
+    reservar_versao(db, ent, versao, "Entrega")
 
     if "veiculacao_id" in dados and dados["veiculacao_id"]:
         veic_id = int(dados["veiculacao_id"])
@@ -135,30 +194,37 @@ def update(db: Session, entrega_id: int, dados: Dict[str, Any]) -> Entrega:
 
     db.commit()
     db.refresh(ent)
+    publicar_entrega(db, "atualizada", ent)
     return ent
 
-def marcar_entregue(db: Session, entrega_id: int) -> Entrega:
+def marcar_entregue(db: Session, entrega_id: int, *, versao: Optional[int] = None) -> Entrega:
     ent = get_by_id(db, entrega_id)
     if not ent:
         raise ValueError("Entrega não encontrada.")
+    reservar_versao(db, ent, versao, "Entrega")
     ent.foi_entregue = "Sim"
     ent.motivo = ""
     db.commit()
     db.refresh(ent)
+    publicar_entrega(db, "entregue", ent)
     return ent
 
-def atualizar_motivo(db: Session, entrega_id: int, motivo: str) -> Entrega:
+def atualizar_motivo(db: Session, entrega_id: int, motivo: str, *, versao: Optional[int] = None) -> Entrega:
     ent = get_by_id(db, entrega_id)
     if not ent:
         raise ValueError("Entrega não encontrada.")
+    reservar_versao(db, ent, versao, "Entrega")
     ent.motivo = motivo or ""
     db.commit()
     db.refresh(ent)
+    publicar_entrega(db, "atualizada", ent)
     return ent
 
 def delete(db: Session, entrega_id: int) -> None:
     ent = get_by_id(db, entrega_id)
     if not ent:
         raise ValueError("Entrega não encontrada.")
+    pi = _pi_e_executivo(db, ent.id)  # depois do delete a linha não existe mais
     db.delete(ent)
     db.commit()
+    publicar_entrega(db, "removida", ent, pi=pi)
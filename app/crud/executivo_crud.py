@@ -1,7 +1,8 @@
 # app/crud/executivo_crud.py
 from __future__ import annotations
 from sqlalchemy.orm import Session
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
+from sqlalchemy import func, literal, select, union, union_all
 from app.models import Agencia, Anunciante
 from app.crud import agencia_crud, anunciante_crud
 from app.utils.cnpj import only_digits
@@ -13,46 +14,78 @@ def _tipo_norm(tipo: str) -> str:
     return "Anunciante"
 
 def listar_executivos(db: Session) -> List[str]:
-    execs_ag = db.query(Agencia.executivo).filter(Agencia.executivo.isnot(None)).distinct().all()
-    execs_an = db.query(Anunciante.executivo).filter(Anunciante.executivo.isnot(None)).distinct().all()
-    todos = {e[0] for e in (execs_ag + execs_an) if e and e[0]}
-    return sorted(todos)
+    # UNION já remove duplicados; só a coluna executivo (índice) é lida
+    u = union(
+        select(Agencia.executivo.label("executivo")).where(Agencia.executivo.isnot(None), Agencia.executivo != ""),
+        select(Anunciante.executivo.label("executivo")).where(Anunciante.executivo.isnot(None), Anunciante.executivo != ""),
+    ).subquery()
+    return [e for (e,) in db.execute(select(u.c.executivo).order_by(u.c.executivo)).all()]
 
-def buscar_por_executivo(db: Session, nome_executivo: str | None, tipo: str | None) -> List[Dict[str, Any]]:
-    out: List[Dict[str, Any]] = []
-    tipo_n = _tipo_norm(tipo) if tipo else None
+# campo -> coluna da projeção (whitelist para o ORDER BY)
+ORDENACOES = ("nome", "tipo", "executivo", "uf", "cnpj", "razao_social", "id")
 
+def _projecao(nome_executivo: str | None, tipo_n: str | None):
+    """SELECT só dos 7 campos da tela, Agência UNION ALL Anunciante."""
+    partes = []
     if tipo_n in (None, "Agência"):
-        q = db.query(Agencia)
+        q = select(
+            Agencia.id.label("id"),
+            literal("Agência").label("tipo"),
+            Agencia.nome_agencia.label("nome"),
+            Agencia.razao_social_agencia.label("razao_social"),
+            Agencia.cnpj_agencia.label("cnpj"),
+            Agencia.uf_agencia.label("uf"),
+            Agencia.executivo.label("executivo"),
+        )
         if nome_executivo:
-            q = q.filter(Agencia.executivo == nome_executivo)
-        for a in q.all():
-            out.append({
-                "id": a.id,
-                "tipo": "Agência",
-                "nome": a.nome_agencia,
-                "razao_social": a.razao_social_agencia,
-                "cnpj": a.cnpj_agencia,
-                "uf": a.uf_agencia,
-                "executivo": a.executivo,
-            })
+            q = q.where(Agencia.executivo == nome_executivo)
+        partes.append(q)
 
     if tipo_n in (None, "Anunciante"):
-        q = db.query(Anunciante)
+        q = select(
+            Anunciante.id.label("id"),
+            literal("Anunciante").label("tipo"),
+            Anunciante.nome_anunciante.label("nome"),
+            Anunciante.razao_social_anunciante.label("razao_social"),
+            Anunciante.cnpj_anunciante.label("cnpj"),
+            Anunciante.uf_cliente.label("uf"),
+            Anunciante.executivo.label("executivo"),
+        )
         if nome_executivo:
-            q = q.filter(Anunciante.executivo == nome_executivo)
-        for a in q.all():
-            out.append({
-                "id": a.id,
-                "tipo": "Anunciante",
-                "nome": a.nome_anunciante,
-                "razao_social": a.razao_social_anunciante,
-                "cnpj": a.cnpj_anunciante,
-                "uf": a.uf_cliente,
-                "executivo": a.executivo,
-            })
-
-    return out
+            q = q.where(Anunciante.executivo == nome_executivo)
+        partes.append(q)
+
+    return (union_all(*partes) if len(partes) > 1 else partes[0]).subquery()
+
+def buscar_por_executivo(
+    db: Session,
+    nome_executivo: str | None,
+    tipo: str | None,
+    *,
+    limit: Optional[int] = None,
+    offset: int = 0,
+    ordenar: str = "nome",
+    direcao: str = "asc",
+) -> List[Dict[str, Any]]:
+    tipo_n = _tipo_norm(tipo) if tipo else None
+    sub = _projecao(nome_executivo, tipo_n)
+
+    if ordenar not in ORDENACOES:
+        raise ValueError(f"ordenar deve ser um de: {', '.join(ORDENACOES)}")
+    col = sub.c[ordenar]
+    col = col.desc() if (direcao or "").lower() == "desc" else col.asc()
+
+    q = select(sub).order_by(col, sub.c.tipo, sub.c.id)
+    if offset:
+        q = q.offset(offset)
+    if limit:
+        q = q.limit(limit)
+    return [dict(r) for r in db.execute(q).mappings().all()]
+
+def contar_por_executivo(db: Session, nome_executivo: str | None, tipo: str | None) -> int:
+    tipo_n = _tipo_norm(tipo) if tipo else None
+    sub = _projecao(nome_executivo, tipo_n)
+    return int(db.execute(select(func.count()).select_from(sub)).scalar() or 0)
 
 def editar_registro(db: Session, tipo: str, item_id: int, novos: Dict[str, Any]) -> Dict[str, Any]:
     """
@@ -1,9 +1,11 @@
 from __future__ import annotations
+from sqlalchemy import select
 from sqlalchemy.orm import Session
-from typing import Optional, List
+from typing import Any, Optional, List
 from datetime import datetime
 
-from app.models import Faturamento, FaturamentoAnexo, Entrega, Veiculacao
+from app.core.eventos import publicar_faturamento
+from app.models import PI, Faturamento, FaturamentoAnexo, Entrega, Veiculacao
 
 VALID_STATUS = {"ENVIADO", "EM_FATURAMENTO", "FATURADO", "PAGO"}
 
@@ -16,17 +18,16 @@ def get_by_entrega(db: Session, entrega_id: int) -> Optional[Faturamento]:
     return db.query(Faturamento).filter(Faturamento.entrega_id == entrega_id).first()
 
 
-def list_all(
-    db: Session,
+def _filtrar(
+    q,
     status: Optional[str] = None,
     pi_id: Optional[int] = None,
     date_from: Optional[datetime] = None,
     date_to: Optional[datetime] = None,
-) -> List[Faturamento]:
+):
     # ✅ precisa passar por Entrega -> Veiculação para pegar pi_id
     q = (
-        db.query(Faturamento)
-        .join(Entrega, Entrega.id == Faturamento.entrega_id)
+        q.join(Entrega, Entrega.id == Faturamento.entrega_id)
         .join(Veiculacao, Veiculacao.id == Entrega.veiculacao_id)
     )
 
@@ -42,7 +43,85 @@ def list_all(
     if date_to is not None:
         q = q.filter(Faturamento.enviado_em <= date_to)
 
-    return q.order_by(Faturamento.enviado_em.desc()).all()
+    return q.order_by(Faturamento.enviado_em.desc())
+
+
+def list_all(
+    db: Session,
+    status: Optional[str] = None,
+    pi_id: Optional[int] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+) -> List[Faturamento]:
+    return _filtrar(db.query(Faturamento), status, pi_id, date_from, date_to).all()
+
+
+def list_rows(
+    db: Session,
+    status: Optional[str] = None,
+    pi_id: Optional[int] = None,
+) -> List[Any]:
+    """
+    Tuplas para o caminho rápido de GET /faturamentos (mesmos filtros/ordem de list_all):
+    (id, entrega_id, status, enviado_em, em_faturamento_em, faturado_em, pago_em,
+     nf_numero, observacao, pi_id)
+    """
+    q = db.query(
+        Faturamento.id,
+        Faturamento.entrega_id,
+        Faturamento.status,
+        Faturamento.enviado_em,
+        Faturamento.em_faturamento_em,
+        Faturamento.faturado_em,
+        Faturamento.pago_em,
+        Faturamento.nf_numero,
+        Faturamento.observacao,
+        Veiculacao.pi_id,
+    ).select_from(Faturamento)
+    return _filtrar(q, status, pi_id).all()
+
+
+def export_select(status: Optional[str] = None, pi_id: Optional[int] = None):
+    """SELECT da exportação XLSX (filtros/ordem de list_rows) + número/cliente/executivo do PI."""
+    q = select(
+        Faturamento.id.label("id"),
+        Faturamento.entrega_id.label("entrega_id"),
+        Veiculacao.pi_id.label("pi_id"),
+        PI.numero_pi.label("numero_pi"),
+        PI.nome_anunciante.label("anunciante"),
+        PI.executivo.label("executivo"),
+        Faturamento.status.label("status"),
+        Faturamento.enviado_em.label("enviado_em"),
+        Faturamento.em_faturamento_em.label("em_faturamento_em"),
+        Faturamento.faturado_em.label("faturado_em"),
+        Faturamento.pago_em.label("pago_em"),
+        Faturamento.nf_numero.label("nf_numero"),
+        Faturamento.observacao.label("observacao"),
+    ).select_from(Faturamento)
+    return _filtrar(q, status, pi_id).outerjoin(PI, PI.id == Veiculacao.pi_id)
+
+
+def anexos_rows(db: Session, fat_ids: List[int], chunk: int = 500) -> List[Any]:
+    """(faturamento_id, id, tipo, filename, path, mime, size, uploaded_at) em lotes de IN."""
+    out: List[Any] = []
+    ids = list(dict.fromkeys(fat_ids))
+    for i in range(0, len(ids), chunk):
+        out.extend(
+            db.query(
+                FaturamentoAnexo.faturamento_id,
+                FaturamentoAnexo.id,
+                FaturamentoAnexo.tipo,
+                FaturamentoAnexo.filename,
+                FaturamentoAnexo.path,
+                FaturamentoAnexo.mime,
+                FaturamentoAnexo.size,
+                FaturamentoAnexo.uploaded_at,
+            )
+            .filter(FaturamentoAnexo.faturamento_id.in_(ids[i:i + chunk]))
+            .order_by(FaturamentoAnexo.id)
+            .all()
+        )
+    return out
 
 
 def criar_ou_obter(db: Session, entrega_id: int) -> Faturamento:
@@ -64,9 +143,34 @@ def criar_ou_obter(db: Session, entrega_id: int) -> Faturamento:
     db.add(fat)
     db.commit()
     db.refresh(fat)
+    publicar_faturamento(db, "criado", fat)
     return fat
 
 
+def gerar_por_pi(db: Session, pi_id: int) -> dict:
+    """Garante 1 faturamento por entrega das veiculações do PI (POST /faturamentos/gerar e job)."""
+    entregas = (
+        db.query(Entrega)
+        .join(Veiculacao, Veiculacao.id == Entrega.veiculacao_id)
+        .filter(Veiculacao.pi_id == pi_id)
+        .all()
+    )
+
+    created = 0
+    for e in entregas:
+        before = get_by_entrega(db, e.id)
+        fat = criar_ou_obter(db, e.id)
+        if before is None and fat is not None:
+            created += 1
+
+    return {
+        "ok": True,
+        "pi_id": pi_id,
+        "entregas": len(entregas),
+        "novos_faturamentos": created,
+    }
+
+
 def atualizar_status(
     db: Session,
     fat_id: int,
@@ -100,6 +204,7 @@ def atualizar_status(
 
     db.commit()
     db.refresh(fat)
+    publicar_faturamento(db, "status", fat, nf_numero=fat.nf_numero)
     return fat
 
 
@@ -135,4 +240,5 @@ def adicionar_anexo(
 
     db.commit()
     db.refresh(an)
+    publicar_faturamento(db, "anexo", fat, anexo_id=an.id, tipo=an.tipo)
     return an
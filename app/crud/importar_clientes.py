@@ -0,0 +1,325 @@
+# app/crud/importar_clientes.py
+"""
+Importação em lote de agências / anunciantes (planilha XLSX ou CSV) com
+upsert por CNPJ.
+
+Fluxo (uma transação):
+  1. 1 SELECT carrega CNPJ/codinome/nome/executivo de todo o cadastro;
+  2. valida todas as linhas em memória (CNPJ com 14 dígitos, obrigatórios,
+     e-mail, UF, CNPJ/codinome repetidos) -> relatório de erros por linha;
+  3. cadastros legados com CNPJ formatado ("11.222.333/0001-81") que vão
+     ser atualizados passam a guardar só os dígitos (senão o ON CONFLICT
+     não os encontra);
+  4. INSERT ... ON CONFLICT (cnpj) DO UPDATE (executemany) em lotes de LOTE linhas;
+     célula vazia NÃO apaga o valor atual (mesma regra do update do CRUD);
+  5. PIs sem agencia_id/anunciante_id com o CNPJ de um cliente novo são vinculados.
+
+Linhas com erro ficam de fora; as válidas são gravadas. dry_run=True só valida.
+Colunas aceitas: as do model (nome_agencia, cnpj_anunciante, ...) ou os
+apelidos genéricos (nome, razao_social, cnpj, email, uf).
+"""
+from __future__ import annotations
+
+import re
+import time
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import bindparam, func, select, update
+from sqlalchemy.orm import Session
+
+from app.core import ref_cache
+from app.core.versionamento import tocar_pis
+from app.crud.agencia_crud import _normalize_url
+from app.models import PI, Agencia, Anunciante
+from app.utils.cnpj import only_digits
+from app.utils.planilha import Linha, normalizar_cabecalho
+
+LOTE = 500  # linhas por execute (o driver ainda fatia pelo limite de parâmetros)
+
+TIPOS: Dict[str, Dict[str, Any]] = {
+    "agencia": {
+        "modelo": Agencia,
+        "rotulo": "agência",
+        "nome": "nome_agencia",
+        "razao": "razao_social_agencia",
+        "cnpj": "cnpj_agencia",
+        "email": "email_agencia",
+        "uf": "uf_agencia",
+        "fk_pi": ("agencia_id", "cnpj_agencia"),
+    },
+    "anunciante": {
+        "modelo": Anunciante,
+        "rotulo": "anunciante",
+        "nome": "nome_anunciante",
+        "razao": "razao_social_anunciante",
+        "cnpj": "cnpj_anunciante",
+        "email": "email_anunciante",
+        "uf": "uf_cliente",
+        "fk_pi": ("anunciante_id", "cnpj_anunciante"),
+    },
+}
+
+_URLS = ("site", "linkedin", "instagram")
+_EMAIL = re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s]+$")
+_UF = re.compile(r"^[A-Z]{2}$")
+
+
+def _apelidos(cfg: Dict[str, Any]) -> Dict[str, str]:
+    return {
+        "nome": cfg["nome"],
+        "nome_fantasia": cfg["nome"],
+        "razao_social": cfg["razao"],
+        "cnpj": cfg["cnpj"],
+        "email": cfg["email"],
+        "e_mail": cfg["email"],
+        "uf": cfg["uf"],
+        "estado": cfg["uf"],
+    }
+
+
+def _texto(v: Any) -> Optional[str]:
+    """Célula -> texto limpo (número inteiro do Excel sem ".0"; data em dd/mm/aaaa)."""
+    if v is None:
+        return None
+    if isinstance(v, float) and v.is_integer():
+        v = int(v)
+    if isinstance(v, datetime):
+        v = v.date()
+    if isinstance(v, date):
+        return v.strftime("%d/%m/%Y")
+    s = str(v).strip()
+    return s or None
+
+
+def _cnpj_da_celula(v: Any) -> str:
+    d = only_digits(_texto(v))
+    # CNPJ digitado como número no Excel perde os zeros à esquerda
+    if isinstance(v, (int, float)) and 0 < len(d) < 14:
+        d = d.zfill(14)
+    return d
+
+
+def _insert(db: Session):
+    dialeto = db.get_bind().dialect.name
+    if dialeto == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialeto == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        raise ValueError(f"Importação em lote não suportada no banco {dialeto}.")
+    return insert
+
+
+# ==========================================================
+# Validação
+# ==========================================================
+def _carregar_cadastro(db: Session, cfg: Dict[str, Any]):
+    """digits -> {id, cnpj, nome, executivo}; codinome -> digits. Prefere a linha já só com dígitos."""
+    m = cfg["modelo"]
+    col_cnpj = getattr(m, cfg["cnpj"])
+    existentes: Dict[str, Dict[str, Any]] = {}
+    codinomes: Dict[str, str] = {}
+    for id_, cnpj, nome, executivo, codinome in db.execute(
+        select(m.id, col_cnpj, getattr(m, cfg["nome"]), m.executivo, m.codinome).where(col_cnpj.isnot(None))
+    ):
+        d = only_digits(cnpj)
+        if not d:
+            continue
+        atual = existentes.get(d)
+        if atual is None or (atual["cnpj"] != d and cnpj == d):
+            existentes[d] = {"id": id_, "cnpj": cnpj, "nome": nome, "executivo": executivo}
+        if codinome:
+            codinomes.setdefault(codinome, d)
+    return existentes, codinomes
+
+
+def validar(
+    db: Session, tipo: str, linhas: Iterable[Linha]
+) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]], Set[str], Dict[str, Dict[str, Any]]]:
+    """(registros válidos, erros por linha, colunas ignoradas, cadastro existente por CNPJ)."""
+    cfg = TIPOS[tipo]
+    colunas = [c.name for c in cfg["modelo"].__table__.c if c.name != "id"]
+    permitidas = set(colunas)
+    apelidos = _apelidos(cfg)
+    existentes, codinomes = _carregar_cadastro(db, cfg)
+    hoje = date.today().strftime("%d/%m/%Y")
+
+    validos: List[Dict[str, Any]] = []
+    erros: List[Dict[str, Any]] = []
+    ignoradas: Set[str] = set()
+    vistos: Dict[str, int] = {}
+    codinomes_arquivo: Dict[str, str] = {}
+
+    for n, bruto in linhas:
+        dados: Dict[str, Any] = {}
+        cnpj_bruto: Any = None
+        for chave, valor in bruto.items():
+            campo = apelidos.get(chave, chave)
+            if campo not in permitidas:
+                ignoradas.add(chave)
+                continue
+            if campo == cfg["cnpj"]:
+                cnpj_bruto = valor
+            else:
+                dados[campo] = _texto(valor)
+
+        problemas: List[str] = []
+        d = _cnpj_da_celula(cnpj_bruto)
+        if len(d) != 14:
+            problemas.append("CNPJ inválido (precisa de 14 dígitos).")
+        elif d in vistos:
+            problemas.append(f"CNPJ repetido na planilha (linha {vistos[d]}).")
+        else:
+            vistos[d] = n
+        atual = existentes.get(d)
+
+        # obrigatórios: numa atualização, vazio = mantém o que já está no cadastro
+        for campo, chave, msg in ((cfg["nome"], "nome", "Nome obrigatório."), ("executivo", "executivo", "Executivo obrigatório.")):
+            if not dados.get(campo):
+                if atual is not None and atual[chave]:
+                    dados[campo] = atual[chave]
+                else:
+                    problemas.append(msg)
+
+        email = dados.get(cfg["email"])
+        if email and not _EMAIL.match(email):
+            problemas.append(f"E-mail inválido: {email}.")
+        uf = dados.get(cfg["uf"])
+        if uf:
+            dados[cfg["uf"]] = uf = uf.upper()
+            if not _UF.match(uf):
+                problemas.append(f"UF inválida: {uf}.")
+        for campo in _URLS:
+            if dados.get(campo):
+                dados[campo] = _normalize_url(dados[campo])
+
+        codinome = dados.get("codinome")
+        if codinome and len(d) == 14:
+            dono = codinomes.get(codinome)
+            if dono is not None and dono != d:
+                problemas.append(f"Codinome já está em uso por outro(a) {cfg['rotulo']}.")
+            elif codinomes_arquivo.setdefault(codinome, d) != d:
+                problemas.append("Codinome repetido na planilha para outro CNPJ.")
+
+        if problemas:
+            erros.append({"linha": n, "cnpj": _texto(cnpj_bruto), "erros": problemas})
+            continue
+
+        if atual is None and not dados.get("data_cadastro"):
+            dados["data_cadastro"] = hoje
+        reg = {c: dados.get(c) for c in colunas}
+        reg[cfg["cnpj"]] = d
+        validos.append(reg)
+
+    return validos, erros, ignoradas, existentes
+
+
+# ==========================================================
+# Gravação
+# ==========================================================
+def _normalizar_legado(db: Session, cfg: Dict[str, Any], validos, existentes) -> int:
+    """Cadastro antigo com CNPJ formatado -> só dígitos (para o ON CONFLICT achar a linha)."""
+    m = cfg["modelo"]
+    col = cfg["cnpj"]
+    alvos = [
+        {"_id": existentes[r[col]]["id"], "_cnpj": r[col]}
+        for r in validos
+        if r[col] in existentes and existentes[r[col]]["cnpj"] != r[col]
+    ]
+    if alvos:
+        t = m.__table__
+        db.execute(update(t).where(t.c.id == bindparam("_id")).values({col: bindparam("_cnpj")}), alvos)
+    return len(alvos)
+
+
+def _upsert(db: Session, cfg: Dict[str, Any], validos: List[Dict[str, Any]], lote: int) -> None:
+    insert = _insert(db)
+    t = cfg["modelo"].__table__
+    col = cfg["cnpj"]
+    stmt = insert(t)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[t.c[col]],
+        # célula vazia mantém o valor atual
+        set_={c: func.coalesce(stmt.excluded[c], t.c[c]) for c in validos[0] if c != col},
+    )
+    # executemany com o mesmo statement: compila 1 vez e o driver agrupa em
+    # INSERT ... VALUES (...), (...) (insertmanyvalues do SQLAlchemy 2.0)
+    for i in range(0, len(validos), lote):
+        db.execute(stmt, validos[i:i + lote])
+
+
+def _vincular_pis(db: Session, cfg: Dict[str, Any], novos: Set[str]) -> int:
+    """PIs sem FK cujo CNPJ (só dígitos) é de um cliente recém-criado."""
+    if not novos:
+        return 0
+    m = cfg["modelo"]
+    fk, col_pi = cfg["fk_pi"]
+    col_m = getattr(m, cfg["cnpj"])
+
+    ids: Dict[str, int] = {}
+    lista = sorted(novos)
+    for i in range(0, len(lista), 900):
+        ids.update({c: id_ for id_, c in db.execute(select(m.id, col_m).where(col_m.in_(lista[i:i + 900])))})
+
+    q = select(PI.id, getattr(PI, col_pi)).where(getattr(PI, fk).is_(None), getattr(PI, col_pi).isnot(None))
+    if fk == "agencia_id":
+        q = q.where(PI.tem_agencia.is_(True))
+    alvos = [{"_pi": pi_id, "_fk": ids[d]} for pi_id, cnpj in db.execute(q) if (d := only_digits(cnpj)) in ids]
+    if alvos:
+        t = PI.__table__
+        db.execute(update(t).where(t.c.id == bindparam("_pi")).values({fk: bindparam("_fk")}), alvos)
+        tocar_pis(db, [a["_pi"] for a in alvos])
+    return len(alvos)
+
+
+def importar(
+    db: Session,
+    tipo: str,
+    linhas: Iterable[Linha],
+    *,
+    dry_run: bool = False,
+    lote: int = LOTE,
+) -> Dict[str, Any]:
+    """Valida e grava (upsert por CNPJ). Devolve o relatório com os erros por linha."""
+    if tipo not in TIPOS:
+        raise ValueError("Tipo de importação inválido. Use agencia ou anunciante.")
+    cfg = TIPOS[tipo]
+    t0 = time.perf_counter()
+
+    validos, erros, ignoradas, existentes = validar(db, tipo, linhas)
+    col = cfg["cnpj"]
+    novos = {r[col] for r in validos if r[col] not in existentes}
+
+    rel: Dict[str, Any] = {
+        "tipo": tipo,
+        "dry_run": dry_run,
+        "linhas": len(validos) + len(erros),
+        "validas": len(validos),
+        "inseridos": len(novos),
+        "atualizados": len(validos) - len(novos),
+        "com_erro": len(erros),
+        "cnpjs_normalizados": 0,
+        "pis_vinculados": 0,
+        "colunas_ignoradas": sorted(ignoradas),
+        "erros": erros,
+    }
+
+    if not dry_run and validos:
+        try:
+            rel["cnpjs_normalizados"] = _normalizar_legado(db, cfg, validos, existentes)
+            _upsert(db, cfg, validos, lote)
+            rel["pis_vinculados"] = _vincular_pis(db, cfg, novos)
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            raise ValueError(f"Falha ao gravar a importação (nada foi salvo): {e}") from e
+        ref_cache.bump("executivos")
+
+    rel["tempo_ms"] = round((time.perf_counter() - t0) * 1000, 1)
+    return rel
+
+
+def colunas_aceitas(tipo: str) -> List[str]:
+    cfg = TIPOS[tipo]
+    return sorted({normalizar_cabecalho(c.name) for c in cfg["modelo"].__table__.c if c.name != "id"} | set(_apelidos(cfg)))
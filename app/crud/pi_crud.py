@@ -3,9 +3,13 @@ from __future__ import annotations
 from datetime import date, datetime
 from typing import Any, Dict, List, Optional
 
-from sqlalchemy.orm import Session
+from sqlalchemy import delete as sa_delete, insert, select, update as sa_update
+from sqlalchemy.orm import Session, joinedload
 
-from app.models import PI
+from app.models import PI, PIAnexo, Produto, Veiculacao, Entrega, Agencia, Anunciante
+from app.core import ref_cache
+from app.core.versionamento import agora, reservar_versao, tocar_pis
+from app.utils.cnpj import only_digits
 
 
 # =========================================================
@@ -100,6 +104,37 @@ def _normalize_agencia_campos(dados: Dict[str, Any]) -> Dict[str, Any]:
     return dados
 
 
+def _id_por_cnpj(db: Session, modelo, col_cnpj, cnpj: Optional[str]) -> Optional[int]:
+    d = only_digits(cnpj)
+    if len(d) != 14:
+        return None
+    # cadastros novos guardam só dígitos; o valor cru cobre legado formatado
+    valores = {d, (cnpj or "").strip()}
+    row = db.query(modelo.id).filter(col_cnpj.in_(valores)).first()
+    return row[0] if row else None
+
+
+def _validar_clientes(db: Session, dados: Dict[str, Any]) -> None:
+    """anunciante_id/agencia_id explícitos no payload precisam existir no cadastro."""
+    for campo, modelo, erro in (
+        ("anunciante_id", Anunciante, "Anunciante não encontrado."),
+        ("agencia_id", Agencia, "Agência não encontrada."),
+    ):
+        valor = dados.get(campo)
+        if valor is not None and db.get(modelo, int(valor)) is None:
+            raise ValueError(erro)
+
+
+def _resolver_clientes(db: Session, pi: PI, dados: Dict[str, Any]) -> None:
+    """Preenche anunciante_id/agencia_id pelo CNPJ (a não ser que venham no payload)."""
+    if "anunciante_id" not in dados and ("cnpj_anunciante" in dados or pi.anunciante_id is None):
+        pi.anunciante_id = _id_por_cnpj(db, Anunciante, Anunciante.cnpj_anunciante, pi.cnpj_anunciante)
+    if "agencia_id" not in dados and ("cnpj_agencia" in dados or "tem_agencia" in dados or pi.agencia_id is None):
+        pi.agencia_id = (
+            _id_por_cnpj(db, Agencia, Agencia.cnpj_agencia, pi.cnpj_agencia) if pi.tem_agencia else None
+        )
+
+
 # =========================================================
 # Consultas
 # =========================================================
@@ -116,6 +151,113 @@ def list_all(db: Session) -> List[PI]:
     return db.query(PI).order_by(PI.id.desc()).all()
 
 
+def list_all_rows(db: Session, colunas: List[Any]) -> List[Any]:
+    """Mesma ordem de list_all, mas só as colunas pedidas (tuplas; caminho rápido de /pis)."""
+    return db.query(*colunas).select_from(PI).order_by(PI.id.desc()).all()
+
+
+def export_select(
+    *,
+    inicio: Optional[date] = None,
+    fim: Optional[date] = None,
+    executivo: Optional[str] = None,
+    diretoria: Optional[str] = None,
+    tipo_pi: Optional[str] = None,
+):
+    """SELECT da exportação XLSX (todas as colunas do PI, ordem de list_all); faixa em data_venda."""
+    q = select(*[c for c in PI.__table__.c]).order_by(PI.id.desc())
+    if inicio is not None:
+        q = q.where(PI.data_venda >= inicio)
+    if fim is not None:
+        q = q.where(PI.data_venda <= fim)
+    if executivo:
+        q = q.where(PI.executivo == executivo)
+    if diretoria:
+        q = q.where(PI.diretoria == diretoria)
+    if tipo_pi:
+        q = q.where(PI.tipo_pi == _normalize_tipo(tipo_pi))
+    return q
+
+
+def _com_relacoes(db: Session):
+    # 1 SELECT: PI + veiculações + produto + entregas (LEFT JOINs)
+    return db.query(PI).options(
+        joinedload(PI.veiculacoes).joinedload(Veiculacao.produto),
+        joinedload(PI.veiculacoes).joinedload(Veiculacao.entregas),
+    )
+
+
+def _status_entregas(total: int, concluidas: int) -> str:
+    if not total:
+        return "sem-registro"
+    if concluidas == total:
+        return "concluido"
+    if not concluidas:
+        return "pendente"
+    return "parcial"
+
+
+def _anexar_agregados(pi: PI) -> PI:
+    """
+    Preenche os campos calculados do PiDetalheOut (produtos_agg, total_pi,
+    entregas_*) a partir das relações já carregadas — sem novas queries.
+    """
+    por_produto: Dict[int, Dict[str, Any]] = {}
+    ent_total = ent_concl = 0
+
+    for v in sorted(pi.veiculacoes, key=lambda x: x.id):
+        prod = v.produto
+        grupo = por_produto.setdefault(
+            v.produto_id or 0,
+            {
+                "id": v.produto_id or 0,
+                "nome": getattr(prod, "nome", None) or "(sem produto)",
+                "descricao": getattr(prod, "descricao", None),
+                "total_produto": 0.0,
+                "veiculacoes": [],
+            },
+        )
+        valor = v.valor_liquido if v.valor_liquido is not None else v.valor_bruto
+        n_ent = len(v.entregas)
+        n_pend = sum(1 for e in v.entregas if (e.foi_entregue or "") != "Sim")
+        ent_total += n_ent
+        ent_concl += n_ent - n_pend
+
+        grupo["total_produto"] += float(valor or 0.0)
+        grupo["veiculacoes"].append(
+            {
+                "id": v.id,
+                "data_inicio": v.data_inicio or None,
+                "data_fim": v.data_fim or None,
+                "quantidade": v.quantidade,
+                "valor_bruto": v.valor_bruto,
+                "desconto": v.desconto,
+                "valor_liquido": v.valor_liquido,
+                "valor": valor,
+                "entregas_total": n_ent,
+                "entregas_pendentes": n_pend,
+            }
+        )
+
+    pi.produtos_agg = list(por_produto.values())
+    pi.total_pi = round(sum(g["total_produto"] for g in pi.produtos_agg), 2)
+    pi.entregas_total = ent_total
+    pi.entregas_concluidas = ent_concl
+    pi.entregas_pendentes = ent_total - ent_concl
+    pi.status_entregas = _status_entregas(ent_total, ent_concl)
+    return pi
+
+
+def get_with_relations_by_id(db: Session, pi_id: int) -> Optional[PI]:
+    pi = _com_relacoes(db).filter(PI.id == pi_id).first()
+    return _anexar_agregados(pi) if pi else None
+
+
+def get_with_relations_by_numero(db: Session, numero_pi: str) -> Optional[PI]:
+    pi = _com_relacoes(db).filter(PI.numero_pi == numero_pi).first()
+    return _anexar_agregados(pi) if pi else None
+
+
 def list_matriz_ativos(db: Session) -> List[PI]:
     return db.query(PI).filter(PI.tipo_pi == "Matriz").all()
 
@@ -160,7 +302,8 @@ def calcular_saldo_restante(
 # CRUD
 # =========================================================
 
-def create(db: Session, dados: Dict[str, Any]) -> PI:
+def _montar_pi(db: Session, dados: Dict[str, Any]) -> PI:
+    """Valida/normaliza e devolve o PI novo (ainda fora da sessão, sem commit)."""
     dados = _clean_empty_strings(dados)
     dados["tipo_pi"] = _normalize_tipo(dados.get("tipo_pi"))
 
@@ -225,18 +368,30 @@ def create(db: Session, dados: Dict[str, Any]) -> PI:
         data_emissao=dados.get("data_emissao"),
         observacoes=dados.get("observacoes"),
         eh_matriz=(tipo == "Matriz"),
+        anunciante_id=dados.get("anunciante_id"),
+        agencia_id=dados.get("agencia_id"),
     )
+    _validar_clientes(db, dados)
+    # id explícito ganha do CNPJ; None (não informado) cai na resolução
+    _resolver_clientes(db, pi, {k: dados[k] for k in ("anunciante_id", "agencia_id") if dados.get(k) is not None})
+    return pi
 
+
+def create(db: Session, dados: Dict[str, Any]) -> PI:
+    pi = _montar_pi(db, dados)
     db.add(pi)
     db.commit()
+    ref_cache.bump("pis_ativos")
     db.refresh(pi)
     return pi
 
 
-def update(db: Session, pi_id: int, dados: Dict[str, Any]) -> PI:
+def update(db: Session, pi_id: int, dados: Dict[str, Any], *, versao: Optional[int] = None) -> PI:
+    """versao (If-Match): só grava se o PI ainda estiver nessa versão."""
     pi = get_by_id(db, pi_id)
     if not pi:
         raise ValueError("PI não encontrado.")
+    reservar_versao(db, pi, versao, "PI")
 
     dados = _clean_empty_strings(dados)
 
@@ -259,13 +414,17 @@ def update(db: Session, pi_id: int, dados: Dict[str, Any]) -> PI:
     if "valor_liquido" in dados:
         dados["valor_liquido"] = _to_float(dados.get("valor_liquido"))
 
+    _validar_clientes(db, dados)
+
     for campo, valor in dados.items():
         if hasattr(pi, campo):
             setattr(pi, campo, valor)
 
     pi.eh_matriz = pi.tipo_pi == "Matriz"
+    _resolver_clientes(db, pi, dados)
 
     db.commit()
+    ref_cache.bump("pis_ativos")
     db.refresh(pi)
     return pi
 
@@ -277,3 +436,224 @@ def delete(db: Session, pi_id: int) -> None:
 
     db.delete(pi)
     db.commit()
+    ref_cache.bump("pis_ativos")
+
+
+# =========================================================
+# Compose / sync de produtos + veiculações (1 transação, por diff)
+# =========================================================
+
+_CAMPOS_VEIC = ("data_inicio", "data_fim", "quantidade", "valor_bruto", "desconto", "valor_liquido")
+
+
+def _data_iso(v: Any, campo: str) -> Optional[str]:
+    if v in (None, ""):
+        return None
+    d = v if isinstance(v, date) else _parse_date(str(v).strip()[:10])
+    if d is None:
+        raise ValueError(f"{campo} inválida: {v!r} (use dd/mm/aaaa ou aaaa-mm-dd).")
+    return d.isoformat()
+
+
+def _normalizar_veic(v: Dict[str, Any]) -> Dict[str, Any]:
+    from app.crud.veiculacao_crud import _calc_liquido, _norm_desconto_percent
+
+    desconto = _norm_desconto_percent(v.get("desconto"))
+    bruto = _to_float(v.get("valor_bruto"))
+    if bruto is not None:
+        liquido = _calc_liquido(bruto, desconto)
+    else:
+        # sem bruto: valor_liquido (ou "valor", do legado, que é o líquido) fica
+        # como veio e o bruto é derivado dele — o desconto não é aplicado 2x
+        liquido = _to_float(v.get("valor_liquido"))
+        if liquido is None:
+            liquido = _to_float(v.get("valor"))
+        liquido = float(liquido or 0.0)
+        bruto = round(liquido / (1.0 - desconto / 100.0), 2) if desconto < 100.0 else liquido
+    out = {
+        "data_inicio": _data_iso(v.get("data_inicio"), "data_inicio"),
+        "data_fim": _data_iso(v.get("data_fim"), "data_fim"),
+        "quantidade": int(v.get("quantidade") or 0),
+        "valor_bruto": float(bruto),
+        "desconto": desconto,
+        "valor_liquido": liquido,
+    }
+    if out["data_inicio"] and out["data_fim"] and out["data_fim"] < out["data_inicio"]:
+        raise ValueError("data_fim anterior à data_inicio.")
+    return out
+
+
+def _resolver_produtos(db: Session, produtos: List[Dict[str, Any]]) -> List[int]:
+    """
+    id do catálogo de cada item do payload (por id ou por nome).
+    Nomes que não existem no catálogo são criados num único INSERT.
+    """
+    ids_pedidos = {int(p["id"]) for p in produtos if p.get("id")}
+    nomes = {(p.get("nome") or "").strip() for p in produtos if not p.get("id")}
+    nomes.discard("")
+
+    existentes_id = set()
+    if ids_pedidos:
+        existentes_id = {i for (i,) in db.query(Produto.id).filter(Produto.id.in_(ids_pedidos)).all()}
+        faltando = ids_pedidos - existentes_id
+        if faltando:
+            raise ValueError(f"Produto(s) não encontrado(s): {sorted(faltando)}")
+
+    por_nome: Dict[str, int] = {}
+    if nomes:
+        por_nome = {n: i for i, n in db.query(Produto.id, Produto.nome).filter(Produto.nome.in_(nomes)).all()}
+        novos = [
+            {"nome": n, "descricao": next((p.get("descricao") for p in produtos if (p.get("nome") or "").strip() == n), None)}
+            for n in sorted(nomes - set(por_nome))
+        ]
+        if novos:
+            for i, n in db.execute(insert(Produto).returning(Produto.id, Produto.nome), novos).all():
+                por_nome[n] = i
+
+    out: List[int] = []
+    for p in produtos:
+        if p.get("id"):
+            out.append(int(p["id"]))
+        else:
+            nome = (p.get("nome") or "").strip()
+            if not nome:
+                raise ValueError("Produto sem id e sem nome.")
+            out.append(por_nome[nome])
+    return out
+
+
+def _aplicar_produtos(db: Session, pi_id: int, produtos: List[Dict[str, Any]]) -> Dict[str, int]:
+    """
+    Deixa as veiculações do PI iguais ao payload:
+      - veiculação com id  -> UPDATE (só se algum campo mudou)
+      - veiculação sem id  -> INSERT
+      - veiculação do PI ausente no payload -> DELETE (recusado se já tem entregas)
+    Tudo em statements em lote; quem chama faz o commit.
+    """
+    produto_ids = _resolver_produtos(db, produtos)
+
+    atuais = {
+        r.id: r
+        for r in db.query(
+            Veiculacao.id, Veiculacao.produto_id, Veiculacao.versao, *[getattr(Veiculacao, c) for c in _CAMPOS_VEIC]
+        )
+        .filter(Veiculacao.pi_id == pi_id)
+        .all()
+    }
+
+    inserts: List[Dict[str, Any]] = []
+    updates: List[Dict[str, Any]] = []
+    vistos = set()
+
+    for prod_id, p in zip(produto_ids, produtos):
+        for v in p.get("veiculacoes") or []:
+            dados = _normalizar_veic(v)
+            vid = v.get("id")
+            if vid:
+                vid = int(vid)
+                atual = atuais.get(vid)
+                if atual is None:
+                    raise ValueError(f"Veiculação {vid} não pertence a este PI.")
+                if vid in vistos:
+                    raise ValueError(f"Veiculação {vid} repetida no payload.")
+                vistos.add(vid)
+                novo = {"produto_id": prod_id, **dados}
+                if any(getattr(atual, k) != novo[k] for k in novo):
+                    # UPDATE em lote não passa pelo flush: versão incrementada aqui
+                    updates.append({"id": vid, **novo, "versao": (atual.versao or 0) + 1, "atualizado_em": agora()})
+            else:
+                inserts.append({"pi_id": pi_id, "produto_id": prod_id, **dados})
+
+    remover = [i for i in atuais if i not in vistos]
+    if remover:
+        com_entrega = (
+            db.query(Entrega.veiculacao_id)
+            .filter(Entrega.veiculacao_id.in_(remover))
+            .group_by(Entrega.veiculacao_id)
+            .all()
+        )
+        if com_entrega:
+            ids = sorted(i for (i,) in com_entrega)
+            raise ValueError(f"Veiculação(ões) {ids} já têm entregas e não podem ser removidas.")
+        db.execute(sa_delete(Veiculacao).where(Veiculacao.id.in_(remover)))
+
+    if updates:
+        db.execute(sa_update(Veiculacao), updates)  # bulk UPDATE por PK
+    if inserts:
+        db.execute(insert(Veiculacao), inserts)
+
+    return {"inseridas": len(inserts), "atualizadas": len(updates), "removidas": len(remover)}
+
+
+def compose_create(db: Session, payload: Dict[str, Any]) -> PI:
+    """Cria o PI + produtos/veiculações numa única transação."""
+    try:
+        pi = _montar_pi(db, dict(payload.get("pi") or {}))
+        db.add(pi)
+        db.flush()  # id do PI
+        _aplicar_produtos(db, pi.id, payload.get("produtos") or [])
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    ref_cache.bump("pis_ativos", "produtos")
+    return pi
+
+
+def sync_produtos(db: Session, pi_id: int, produtos: List[Dict[str, Any]], *, versao: Optional[int] = None) -> PI:
+    """Substitui produtos/veiculações do PI pelo payload (diff, uma transação)."""
+    pi = get_by_id(db, pi_id)
+    if not pi:
+        raise ValueError("PI não encontrado.")
+    try:
+        reservar_versao(db, pi, versao, "PI")
+        res = _aplicar_produtos(db, pi.id, produtos)
+        if versao is None and any(res.values()):
+            tocar_pis(db, [pi.id])  # com If-Match o UPDATE condicional já incrementou
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    ref_cache.bump("produtos")
+    return pi
+
+
+# =========================================================
+# Anexos (PDF do PI / proposta) — registro do arquivo no Drive
+# =========================================================
+
+def anexos_list(db: Session, pi_id: int) -> List[PIAnexo]:
+    """Anexos do PI, mais recente primeiro."""
+    return (
+        db.query(PIAnexo)
+        .filter(PIAnexo.pi_id == pi_id)
+        .order_by(PIAnexo.uploaded_at.desc(), PIAnexo.id.desc())
+        .all()
+    )
+
+
+def anexos_add(
+    db: Session,
+    pi_id: int,
+    *,
+    tipo: str,
+    filename: str,
+    path: str,
+    mime: Optional[str] = None,
+    size: Optional[int] = None,
+) -> PIAnexo:
+    if db.get(PI, pi_id) is None:
+        raise ValueError("PI não encontrado.")
+    reg = PIAnexo(
+        pi_id=pi_id,
+        tipo=tipo,
+        filename=filename,
+        path=path,
+        mime=mime,
+        size=size,
+        uploaded_at=datetime.utcnow(),
+    )
+    db.add(reg)
+    db.commit()
+    db.refresh(reg)
+    return reg
@@ -4,7 +4,7 @@ from __future__ import annotations
 from typing import Dict, Any
 from datetime import date, datetime
 
-from sqlalchemy.orm import Session, joinedload
+from sqlalchemy.orm import Session, joinedload, selectinload
 
 from app.models import PI, Veiculacao, Entrega, Faturamento
 from app.crud import veiculacao_crud
@@ -26,6 +26,59 @@ def _parse_date(s: str | None) -> date | None:
         return None
 
 
+def _iso(v) -> str | None:
+    return v.isoformat() if v else None
+
+
+def _entrega_out(e: Entrega) -> Dict[str, Any]:
+    """Mesmo formato do EntregaOut de /entregas (datas em texto, status normalizado)."""
+    foi = (e.foi_entregue or "pendente").strip()
+    entregue = foi.lower() in {"sim", "entregue", "ok", "1", "true"}
+    status_txt = "Entregue" if entregue else "Pendente"
+    fat = e.faturamento
+    return {
+        "id": e.id,
+        "veiculacao_id": e.veiculacao_id,
+        "pi_id": e.pi_id,
+        "data_entrega": _iso(e.data_entrega) or "",
+        "foi_entregue": foi or "pendente",
+        "motivo": e.motivo or "",
+        "status": status_txt,
+        "status_entrega": status_txt,
+        "entregue": entregue,
+        "faturamento_id": fat.id if fat else None,
+        "faturamento_status": (fat.status or "").upper() if fat else None,
+        "versao": e.versao,
+    }
+
+
+def _faturamento_out(f: Faturamento) -> Dict[str, Any]:
+    """Mesmo formato do FaturamentoOut de /faturamentos (o PI já vem no topo do pacote)."""
+    return {
+        "id": f.id,
+        "entrega_id": f.entrega_id,
+        "status": (f.status or "").upper(),
+        "enviado_em": _iso(f.enviado_em),
+        "em_faturamento_em": _iso(f.em_faturamento_em),
+        "faturado_em": _iso(f.faturado_em),
+        "pago_em": _iso(f.pago_em),
+        "nf_numero": f.nf_numero,
+        "observacao": f.observacao,
+        "anexos": [
+            {
+                "id": a.id,
+                "tipo": a.tipo,
+                "filename": a.filename,
+                "path": a.path,
+                "mime": a.mime,
+                "size": a.size,
+                "uploaded_at": _iso(a.uploaded_at),
+            }
+            for a in f.anexos or []
+        ],
+    }
+
+
 def _calc_status_veiculacao(veics: list[Veiculacao]) -> Dict[str, Any]:
     """
     Determina status geral do PI baseado nas datas das veiculações:
@@ -122,6 +175,7 @@ def obter_detalhes_por_pi_id(db: Session, pi_id: int) -> Dict[str, Any]:
         .options(
             joinedload(Entrega.veiculacao).joinedload(Veiculacao.produto),
             joinedload(Entrega.veiculacao).joinedload(Veiculacao.pi),
+            joinedload(Entrega.faturamento),
         )
         .filter(Veiculacao.pi_id == pi_id)
         .order_by(Entrega.id.desc())
@@ -134,7 +188,8 @@ def obter_detalhes_por_pi_id(db: Session, pi_id: int) -> Dict[str, Any]:
         .join(Entrega, Entrega.id == Faturamento.entrega_id)
         .join(Veiculacao, Veiculacao.id == Entrega.veiculacao_id)
         .options(
-            joinedload(Faturamento.anexos),
+            # coleção: 2º SELECT por IN (no JOIN o SQLite varria faturamentos inteiro pela ordem)
+            selectinload(Faturamento.anexos),
             joinedload(Faturamento.entrega)
             .joinedload(Entrega.veiculacao)
             .joinedload(Veiculacao.produto),
@@ -183,8 +238,8 @@ def obter_detalhes_por_pi_id(db: Session, pi_id: int) -> Dict[str, Any]:
     return {
         "pi": pi,
         "veiculacoes": veics,
-        "entregas": entregas,
-        "faturamentos": fats,
+        "entregas": [_entrega_out(e) for e in entregas],
+        "faturamentos": [_faturamento_out(f) for f in fats],
         "veiculacao": resumo_veic,
         "totais": totais,
     }
@@ -5,6 +5,7 @@ from typing import Optional, List, Dict, Any
 from sqlalchemy.orm import Session
 
 from app.models import Produto
+from app.core import ref_cache
 
 # ======================================
 # Helpers / Validações
@@ -191,6 +192,7 @@ def create(db: Session, dados: Dict[str, Any]) -> Produto:
     )
     db.add(novo)
     db.commit()
+    ref_cache.bump("produtos")
     db.refresh(novo)
     return novo
 
@@ -240,6 +242,7 @@ def update(db: Session, produto_id: int, dados: Dict[str, Any]) -> Produto:
         prod.valor_unitario = valor_unitario
 
     db.commit()
+    ref_cache.bump("produtos")
     db.refresh(prod)
     return prod
 
@@ -255,3 +258,4 @@ def delete(db: Session, produto_id: int) -> None:
 
     db.delete(prod)
     db.commit()
+    ref_cache.bump("produtos")
@@ -1,9 +1,11 @@
 from __future__ import annotations
 from typing import Optional, List, Dict, Any, Tuple
 from datetime import datetime, date
+from sqlalchemy import case, func, insert, or_, select
 from sqlalchemy.orm import Session, joinedload
 
 from app.models import Veiculacao, Produto, PI
+from app.core.versionamento import reservar_versao, tocar_pis
 
 
 # ---------- utils ----------
@@ -103,6 +105,62 @@ def list_all(db: Session) -> List[Veiculacao]:
     )
 
 
+def primeiro_nao_vazio(*cols):
+    """Equivalente SQL do _first_non_empty das rotas: 1º valor não nulo e não em branco."""
+    return case(*[(func.trim(c) != "", c) for c in cols], else_=None)
+
+
+def list_all_rows(db: Session, colunas: List[Any]) -> List[Any]:
+    """Mesma ordem de list_all, só com as colunas pedidas (produto/PI via LEFT JOIN)."""
+    return (
+        db.query(*colunas)
+        .select_from(Veiculacao)
+        .outerjoin(Produto, Produto.id == Veiculacao.produto_id)
+        .outerjoin(PI, PI.id == Veiculacao.pi_id)
+        .order_by(Veiculacao.id.desc())
+        .all()
+    )
+
+
+def export_select(
+    colunas: List[Any],
+    *,
+    canal: Optional[str] = None,
+    executivo: Optional[str] = None,
+    diretoria: Optional[str] = None,
+    uf_cliente: Optional[str] = None,
+):
+    """
+    SELECT da exportação XLSX (mesmos joins/ordem de list_all_rows + filtros da agenda).
+    A janela de datas fica com quem consome (data_inicio/data_fim são texto em
+    formatos mistos): ver em_janela().
+    """
+    q = (
+        select(*colunas)
+        .select_from(Veiculacao)
+        .outerjoin(Produto, Produto.id == Veiculacao.produto_id)
+        .outerjoin(PI, PI.id == Veiculacao.pi_id)
+        .order_by(Veiculacao.id.desc())
+    )
+    if canal:
+        q = q.where(PI.canal == canal)
+    if executivo:
+        q = q.where(PI.executivo == executivo)
+    if diretoria:
+        q = q.where(PI.diretoria == diretoria)
+    if uf_cliente:
+        q = q.where(PI.uf_cliente == uf_cliente)
+    return q
+
+
+def em_janela(inicio: Optional[date], fim: Optional[date]):
+    """Filtro por linha (data_inicio/data_fim) com a mesma regra da agenda; None = sem janela."""
+    if inicio is None and fim is None:
+        return None
+    ini, fi = inicio or date.min, fim or date.max
+    return lambda r: _overlaps(ini, fi, r.data_inicio, r.data_fim)
+
+
 def list_by_pi(db: Session, pi_id: int) -> List[Veiculacao]:
     return (
         db.query(Veiculacao)
@@ -219,10 +277,110 @@ def create(db: Session, dados: Dict[str, Any]) -> Veiculacao:
     return novo
 
 
-def update(db: Session, veic_id: int, dados: Dict[str, Any]) -> Veiculacao:
+def _resolver_chaves(db: Session, modelo, col_nome, ids: set, nomes: set) -> Tuple[Dict[int, Any], Dict[str, Any]]:
+    """1 SELECT ... WHERE id IN (...) OR <nome> IN (...): (por_id, por_nome)."""
+    if not ids and not nomes:
+        return {}, {}
+    conds = []
+    if ids:
+        conds.append(modelo.id.in_(ids))
+    if nomes:
+        conds.append(col_nome.in_(nomes))
+    objs = db.query(modelo).filter(or_(*conds)).all()
+    return {o.id: o for o in objs}, {getattr(o, col_nome.key): o for o in objs}
+
+
+def create_lote(db: Session, itens: List[Dict[str, Any]]) -> List[Tuple[Any, Produto, PI]]:
+    """
+    Cria várias veiculações (de um ou vários PIs) numa transação, tudo ou nada.
+
+    Cada item tem produto_id ou produto_nome e pi_id ou numero_pi (como no
+    POST /veiculacoes). Produtos e PIs saem de 2 SELECTs com IN; o INSERT é um
+    executemany com RETURNING. Erros de todas as linhas voltam juntos no ValueError.
+    Devolve [(linha inserida, produto, pi)] em ordem de id.
+    """
+    prod_ids = {int(it["produto_id"]) for it in itens if it.get("produto_id")}
+    prod_nomes = {it["produto_nome"] for it in itens if not it.get("produto_id") and it.get("produto_nome")}
+    pi_ids = {int(it["pi_id"]) for it in itens if it.get("pi_id")}
+    pi_nums = {it["numero_pi"] for it in itens if not it.get("pi_id") and it.get("numero_pi")}
+
+    prods_id, prods_nome = _resolver_chaves(db, Produto, Produto.nome, prod_ids, prod_nomes)
+    pis_id, pis_num = _resolver_chaves(db, PI, PI.numero_pi, pi_ids, pi_nums)
+
+    erros: List[str] = []
+    linhas: List[Dict[str, Any]] = []
+    for n, it in enumerate(itens, start=1):
+        if it.get("produto_id"):
+            prod = prods_id.get(int(it["produto_id"]))
+            if prod is None:
+                erros.append(f"linha {n}: produto {it['produto_id']} não encontrado")
+        elif it.get("produto_nome"):
+            prod = prods_nome.get(it["produto_nome"])
+            if prod is None:
+                erros.append(f"linha {n}: produto '{it['produto_nome']}' não encontrado")
+        else:
+            prod = None
+            erros.append(f"linha {n}: informe produto_id ou produto_nome")
+
+        if it.get("pi_id"):
+            pi = pis_id.get(int(it["pi_id"]))
+            if pi is None:
+                erros.append(f"linha {n}: PI {it['pi_id']} não encontrado")
+        elif it.get("numero_pi"):
+            pi = pis_num.get(it["numero_pi"])
+            if pi is None:
+                erros.append(f"linha {n}: PI '{it['numero_pi']}' não encontrado")
+        else:
+            pi = None
+            erros.append(f"linha {n}: informe pi_id ou numero_pi")
+
+        if prod is None or pi is None:
+            continue
+        # mesmas regras do create(): desconto em %, líquido sempre recalculado
+        bruto = float(it.get("valor_bruto") or 0.0)
+        desc_percent = _norm_desconto_percent(it.get("desconto"))
+        linhas.append(
+            {
+                "produto_id": prod.id,
+                "pi_id": pi.id,
+                "data_inicio": it.get("data_inicio"),
+                "data_fim": it.get("data_fim"),
+                "quantidade": int(it.get("quantidade") or 0),
+                "valor_bruto": bruto,
+                "desconto": desc_percent,
+                "valor_liquido": _calc_liquido(bruto, desc_percent),
+            }
+        )
+
+    if erros:
+        extra = f" (+{len(erros) - 20} erro(s))" if len(erros) > 20 else ""
+        raise ValueError("; ".join(erros[:20]) + extra)
+
+    try:
+        # sem sort_by_parameter_order (no SQLite ele vira 1 INSERT por linha): a
+        # ordem do RETURNING não é garantida, então produto/PI de cada linha
+        # saem do próprio produto_id/pi_id retornado
+        rows = sorted(db.execute(insert(Veiculacao).returning(*Veiculacao.__table__.c), linhas).all(), key=lambda r: r.id)
+        # INSERT em lote não passa pelo flush: versão dos PIs incrementada aqui
+        tocar_pis(db, {l["pi_id"] for l in linhas})
+        # produto/PI já carregados servem para montar a resposta: fora da sessão
+        # o commit não os expira (sem 1 SELECT por PI depois)
+        for o in {*prods_id.values(), *prods_nome.values(), *pis_id.values(), *pis_num.values()}:
+            db.expunge(o)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    prods = {p.id: p for p in (*prods_id.values(), *prods_nome.values())}
+    pis = {p.id: p for p in (*pis_id.values(), *pis_num.values())}
+    return [(r, prods[r.produto_id], pis[r.pi_id]) for r in rows]
+
+
+def update(db: Session, veic_id: int, dados: Dict[str, Any], *, versao: Optional[int] = None) -> Veiculacao:
     veic = db.get(Veiculacao, veic_id)
     if not veic:
         raise ValueError("Veiculação não encontrada.")
+    reservar_versao(db, veic, versao, "Veiculação")
 
     if "produto_id" in dados and dados["produto_id"]:
         prod = db.get(Produto, dados["produto_id"])
@@ -1,12 +1,13 @@
 from __future__ import annotations
 
+from datetime import date
 from typing import Any, Dict, List, Optional, Literal
 from math import isnan
 
-from sqlalchemy import func, and_
+from sqlalchemy import func, and_, case
 from sqlalchemy.orm import Session
 
-from app.models import PI
+from app.models import PI, Agencia, Anunciante
 
 
 FonteResumo = Literal["pi", "pi_prefer_liquido"]
@@ -43,6 +44,75 @@ def _norm(s: Optional[str]) -> Optional[str]:
     return t if t else None
 
 
+def filtros_periodo_venda(mes_i: Optional[int], ano_i: Optional[int]) -> List[Any]:
+    """
+    PI vendido (data_venda preenchida) no mês/ano pedido.
+    Com ano informado vira FAIXA de data_venda (usa os índices (x, data_venda));
+    extract(month/year) só sobra no caso "mês de qualquer ano".
+    """
+    filtros: List[Any] = [PI.data_venda.isnot(None)]
+    if ano_i is not None and not 1 <= int(ano_i) <= 9998:
+        # ano fora do que date() aceita: nada casa, mas sem estourar
+        return filtros + [func.extract("year", PI.data_venda) == int(ano_i)]
+    if ano_i is not None and mes_i is not None and 1 <= int(mes_i) <= 12:
+        ini = date(int(ano_i), int(mes_i), 1)
+        fim = date(ini.year + 1, 1, 1) if ini.month == 12 else date(ini.year, ini.month + 1, 1)
+        filtros += [PI.data_venda >= ini, PI.data_venda < fim]
+    elif ano_i is not None:
+        filtros += [PI.data_venda >= date(int(ano_i), 1, 1), PI.data_venda < date(int(ano_i) + 1, 1, 1)]
+        if mes_i is not None:  # mês inválido: mantém o filtro (não casa nada), como antes
+            filtros.append(func.extract("month", PI.data_venda) == int(mes_i))
+    elif mes_i is not None:
+        filtros.append(func.extract("month", PI.data_venda) == int(mes_i))
+    return filtros
+
+
+def agrupar_por_cliente(
+    db: Session,
+    filtros: List[Any],
+    valor_expr,
+    *,
+    tipo: Literal["anunciante", "agencia"] = "anunciante",
+    top_n: Optional[int] = None,
+) -> List[Any]:
+    """
+    Soma por cliente agrupando pelo FK inteiro (anunciante_id/agencia_id):
+    variações de grafia do nome no PI não dividem mais o total.
+    PIs ainda sem FK (CNPJ não cadastrado) caem no nome digitado.
+    Linhas: (cliente_id | None, nome | None, total, qtd_pis), maior total primeiro.
+    """
+    if tipo == "agencia":
+        id_col, nome_pi, modelo, nome_cad = PI.agencia_id, PI.nome_agencia, Agencia, Agencia.nome_agencia
+    else:
+        id_col, nome_pi, modelo, nome_cad = PI.anunciante_id, PI.nome_anunciante, Anunciante, Anunciante.nome_anunciante
+
+    sem_id = case((id_col.is_(None), nome_pi), else_=None)
+    sub = (
+        db.query(
+            id_col.label("cliente_id"),
+            sem_id.label("nome_pi"),
+            func.sum(valor_expr).label("total"),
+            func.count(PI.id).label("qtd_pis"),
+        )
+        .filter(*filtros)
+        .group_by(id_col, sem_id)
+        .subquery()
+    )
+    q = (
+        db.query(
+            sub.c.cliente_id,
+            func.coalesce(nome_cad, sub.c.nome_pi).label("nome"),
+            sub.c.total,
+            sub.c.qtd_pis,
+        )
+        .outerjoin(modelo, modelo.id == sub.c.cliente_id)
+        .order_by(sub.c.total.desc())
+    )
+    if top_n and isinstance(top_n, int) and top_n > 0:
+        q = q.limit(top_n)
+    return q.all()
+
+
 def resumo_vendas(
     db: Session,
     *,
@@ -69,17 +139,8 @@ def resumo_vendas(
     else:
         valor_expr = func.coalesce(PI.valor_liquido, PI.valor_bruto, 0.0)
 
-    filtros = []
-
-    # ✅ REGRA: PI vendido = tem data_venda preenchida
-    filtros.append(PI.data_venda.isnot(None))
-
-    # ✅ Mês/Ano agora é em cima de data_venda
-    if mes_i is not None:
-        filtros.append(func.extract("month", PI.data_venda) == int(mes_i))
-
-    if ano_i is not None:
-        filtros.append(func.extract("year", PI.data_venda) == int(ano_i))
+    # ✅ REGRA: PI vendido = tem data_venda preenchida; mês/ano em cima de data_venda
+    filtros = filtros_periodo_venda(mes_i, ano_i)
 
     if executivo:
         filtros.append(PI.executivo == executivo)
@@ -122,7 +183,10 @@ def resumo_vendas(
 
     # Agrupamentos (somente o que existe em PI)
     por_executivo = _group_sum(PI.executivo)
-    por_anunciante = _group_sum(PI.nome_anunciante)
+    por_anunciante = agrupar_por_cliente(db, filtros, valor_expr, tipo="anunciante", top_n=top_n)
+    por_agencia = agrupar_por_cliente(
+        db, filtros + [PI.tem_agencia.is_(True)], valor_expr, tipo="agencia", top_n=top_n
+    )
     por_diretoria = _group_sum(PI.diretoria)
     por_tipo = _group_sum(PI.tipo_pi)
 
@@ -138,6 +202,17 @@ def resumo_vendas(
             )
         return out
 
+    def _rows_cliente(rows, key_name: str) -> List[Dict[str, Any]]:
+        return [
+            {
+                key_name: (r.nome if r.nome is not None else "—"),
+                f"{key_name}_id": r.cliente_id,
+                "total": _safe_float(r.total),
+                "qtd_pis": int(r.qtd_pis or 0),
+            }
+            for r in rows
+        ]
+
     return {
         "filtros": {
             "mes": mes_i,
@@ -155,7 +230,8 @@ def resumo_vendas(
         },
         "agrupamentos": {
             "por_executivo": _rows(por_executivo, "executivo"),
-            "por_anunciante": _rows(por_anunciante, "anunciante"),
+            "por_anunciante": _rows_cliente(por_anunciante, "anunciante"),
+            "por_agencia": _rows_cliente(por_agencia, "agencia"),
             "por_diretoria": _rows(por_diretoria, "diretoria"),
             "por_tipo_pi": _rows(por_tipo, "tipo_pi"),
         },
@@ -223,12 +299,23 @@ def painel_vendas_para_front(
     top_anunciantes = [
         {
             "anunciante": r.get("anunciante") or "—",
+            "anunciante_id": r.get("anunciante_id"),
             "total": _safe_float(r.get("total")),
             "qtd_pis": int(r.get("qtd_pis") or 0),
         }
         for r in base["agrupamentos"]["por_anunciante"]
     ]
 
+    top_agencias: List[Dict[str, Any]] = [
+        {
+            "agencia": r.get("agencia") or "—",
+            "agencia_id": r.get("agencia_id"),
+            "total": _safe_float(r.get("total")),
+            "qtd_pis": int(r.get("qtd_pis") or 0),
+        }
+        for r in base["agrupamentos"]["por_agencia"]
+    ]
+
     top_tipos_pi = [
         {
             "tipo_pi": r.get("tipo_pi") or "—",
@@ -238,7 +325,6 @@ def painel_vendas_para_front(
         for r in base["agrupamentos"]["por_tipo_pi"]
     ]
 
-    top_agencias: List[Dict[str, Any]] = []
     top_campanhas: List[Dict[str, Any]] = []
     top_canais: List[Dict[str, Any]] = []
 
@@ -248,7 +334,12 @@ def painel_vendas_para_front(
             if (x.get("anunciante") or "").strip() and x.get("anunciante") != "—"
         ]
     )
-    qtd_agencias = 0
+    qtd_agencias = len(
+        [
+            x for x in base["agrupamentos"]["por_agencia"]
+            if (x.get("agencia") or "").strip() and x.get("agencia") != "—"
+        ]
+    )
 
     return {
         "mes": mes_i,
@@ -292,16 +383,8 @@ def listar_pis_do_executivo_para_front(
     else:
         valor_expr = func.coalesce(PI.valor_liquido, PI.valor_bruto, 0.0)
 
-    filtros = [PI.executivo == executivo]
-
     # ✅ só vendidos
-    filtros.append(PI.data_venda.isnot(None))
-
-    if mes_i is not None:
-        filtros.append(func.extract("month", PI.data_venda) == int(mes_i))
-
-    if ano_i is not None:
-        filtros.append(func.extract("year", PI.data_venda) == int(ano_i))
+    filtros = [PI.executivo == executivo] + filtros_periodo_venda(mes_i, ano_i)
 
     if tipo_pi:
         filtros.append(PI.tipo_pi == tipo_pi)
@@ -1,6 +1,12 @@
 # app/database.py
+import hashlib
 import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
 from pathlib import Path
+from typing import Optional
 
 from dotenv import load_dotenv
 
@@ -8,8 +14,8 @@ from dotenv import load_dotenv
 # Se seu .env está em C:\Users\danie\sistema_veiculacoes\.env, isso resolve.
 load_dotenv()
 
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session, sessionmaker
 
 from app.models_base import Base  # NÃO importar models aqui em cima!
 
@@ -35,16 +41,260 @@ else:
     )
     print(f"⚠️ DATABASE_URL não definido. Usando SQLite em {DB_PATH}")
 
-SessionLocal = sessionmaker(bind=engine, autocommit=False, autoflush=False)
+# ✅ estatísticas de queries (GET /admin/db/queries)
+from app.core.query_stats import install_if_enabled  # noqa: E402
 
+install_if_enabled(engine)
 
-def init_db():
+# ==========================================================
+# Réplica de leitura (opcional)
+# - DATABASE_READ_URL definido -> GET/HEAD leem da réplica (middleware no main)
+# - fora de requisição (scripts, workers, init_db) tudo vai pro primário
+# - escreveu na requisição -> o resto dela lê do primário (read-your-writes)
+# ==========================================================
+DATABASE_READ_URL = os.getenv("DATABASE_READ_URL")
+
+engine_leitura = None
+if DATABASE_READ_URL:
+    engine_leitura = create_engine(DATABASE_READ_URL, pool_pre_ping=True)
+    install_if_enabled(engine_leitura)
+    print(f"📖 Réplica de leitura: {engine_leitura.url.render_as_string(hide_password=True)}")
+
+# {"escreveu": bool} da requisição atual; dict (e não bool) porque o threadpool
+# do Starlette roda cada dependência numa CÓPIA do contexto: o objeto é o mesmo.
+_leitura_ctx: ContextVar[Optional[dict]] = ContextVar("leitura_replica", default=None)
+
+
+@contextmanager
+def leitura_na_replica():
+    """Escopo (uma requisição de leitura) em que as sessões podem ler da réplica."""
+    token = _leitura_ctx.set({"escreveu": False})
+    try:
+        yield
+    finally:
+        _leitura_ctx.reset(token)
+
+
+def _marcar_escrita(session: Session) -> None:
+    session.info["escreveu"] = True
+    ctx = _leitura_ctx.get()
+    if ctx is not None:
+        ctx["escreveu"] = True  # vale também para as outras sessões da requisição
+
+
+class SessaoRoteada(Session):
+    """
+    Session que manda SELECT para a réplica quando:
+      - há réplica configurada,
+      - estamos dentro de leitura_na_replica(),
+      - nada foi escrito nesta sessão/requisição e não está no meio de um flush.
+    Qualquer outro caso usa o bind normal (primário).
+    """
+
+    def __init__(self, *args, replica=None, **kw):
+        super().__init__(*args, **kw)
+        self.replica = replica
+
+    def usando_replica(self) -> bool:
+        if self.replica is None or self._flushing or self.info.get("escreveu"):
+            return False
+        ctx = _leitura_ctx.get()
+        return ctx is not None and not ctx["escreveu"]
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if self.usando_replica():
+            return self.replica
+        return super().get_bind(mapper, clause=clause, **kw)
+
+
+@event.listens_for(SessaoRoteada, "do_orm_execute")
+def _dml_explicito(state):
+    # db.execute(update(...)/insert(...)/delete(...)) — roda antes do get_bind
+    if state.is_insert or state.is_update or state.is_delete:
+        _marcar_escrita(state.session)
+
+
+@event.listens_for(SessaoRoteada, "after_flush")
+def _depois_do_flush(session, flush_context):
+    _marcar_escrita(session)
+
+
+SessionLocal = sessionmaker(
+    bind=engine,
+    class_=SessaoRoteada,
+    replica=engine_leitura,
+    autocommit=False,
+    autoflush=False,
+)
+
+
+# auto  -> confere a impressão digital do schema (1 SELECT) e só roda DDL se mudou
+# force -> sempre roda o DDL (sob lock)
+# off   -> não mexe no schema (deploy já aplicou)
+DB_SCHEMA_CHECK = (os.getenv("DB_SCHEMA_CHECK", "auto") or "auto").strip().lower()
+
+# chave do pg_advisory_lock do init_db (qualquer bigint fixo)
+_SCHEMA_LOCK_KEY = 734_001_001
+_schema_lock = threading.Lock()
+
+
+def _importar_models():
     # Importa models só aqui pra evitar import circular
     import app.models  # noqa: F401
     import app.models_auth  # noqa: F401
+    import app.models_email_outbox  # noqa: F401
+    import app.models_jobs  # noqa: F401
+    import app.models_cnpj_cache  # noqa: F401
+    import app.models_schema_meta  # noqa: F401
+
+
+def schema_hash() -> str:
+    """Impressão digital dos models (tabelas, colunas, tipos, índices) + DDL da busca."""
+    from app.utils.busca_clientes import DDL_VERSAO
+
+    _importar_models()
+    partes = [f"busca:{DDL_VERSAO}"]
+    for t in sorted(Base.metadata.sorted_tables, key=lambda t: t.name):
+        cols = ",".join(f"{c.name}:{c.type!r}:{int(bool(c.nullable))}" for c in t.columns)
+        idxs = ",".join(sorted(i.name or "" for i in t.indexes))
+        partes.append(f"{t.name}({cols})[{idxs}]")
+    return hashlib.sha256("|".join(partes).encode("utf-8")).hexdigest()
+
+
+def _ler_meta(eng) -> dict:
+    from sqlalchemy import text
+
+    try:
+        with eng.connect() as conn:
+            return {k: v for k, v in conn.execute(text("SELECT chave, valor FROM schema_meta")).all()}
+    except Exception:
+        return {}  # tabela ainda não existe
+
+
+def _adicionar_colunas(eng) -> None:
+    """
+    ALTER TABLE ... ADD COLUMN para colunas dos models que a tabela ainda não tem.
+    Só as que o banco aceita sem reescrever linhas: nullable ou com server_default
+    (o resto fica para o alembic).
+    """
+    from sqlalchemy import inspect, text
+    from sqlalchemy.schema import CreateColumn
+
+    insp = inspect(eng)
+    existentes = set(insp.get_table_names())
+    prep = eng.dialect.identifier_preparer
+    with eng.begin() as conn:
+        for tabela in Base.metadata.sorted_tables:
+            if tabela.name not in existentes:
+                continue
+            atuais = {c["name"] for c in insp.get_columns(tabela.name)}
+            for col in tabela.columns:
+                if col.name in atuais:
+                    continue
+                if not col.nullable and col.server_default is None:
+                    print(f"⚠️ Coluna {tabela.name}.{col.name} é NOT NULL sem server_default: aplique via alembic.")
+                    continue
+                ddl = CreateColumn(col).compile(dialect=eng.dialect)
+                conn.execute(text(f"ALTER TABLE {prep.format_table(tabela)} ADD COLUMN {ddl}"))
+                print(f"✅ Coluna adicionada: {tabela.name}.{col.name}")
+
+
+# Índices que saíram dos models: prefixo à esquerda de um composto (só custo de escrita)
+_INDICES_OBSOLETOS = (
+    "ix_agencias_executivo",  # coberto por ix_agencias_executivo_nome_id
+    "ix_anunciantes_executivo",  # coberto por ix_anunciantes_executivo_nome_id
+)
+
+
+def _aplicar_schema(alvo: str, eng) -> str:
+    from sqlalchemy import text
+
+    from app.models_schema_meta import SchemaMeta
+    from app.utils.busca_clientes import instalar_busca
 
     # Cria as tabelas que ainda não existirem
-    Base.metadata.create_all(bind=engine)
+    Base.metadata.create_all(bind=eng)
+
+    # Colunas novas em tabelas que já existiam (antes dos índices que as usam)
+    _adicionar_colunas(eng)
+
+    # Índices novos em tabelas que já existiam (create_all não mexe nelas)
+    for tabela in Base.metadata.sorted_tables:
+        for idx in tabela.indexes:
+            idx.create(bind=eng, checkfirst=True)
+    with eng.begin() as conn:
+        for nome in _INDICES_OBSOLETOS:
+            conn.execute(text(f"DROP INDEX IF EXISTS {nome}"))
+
+    # Busca sem acento (FTS5 no SQLite / pg_trgm no Postgres)
+    try:
+        busca = instalar_busca(eng, levantar=True)
+    except Exception:
+        # sem gravar a impressão digital: o próximo start tenta instalar de novo
+        # (gravar "ilike" aqui deixaria a busca indexada desligada para sempre)
+        return "ilike"
+
+    db = Session(bind=eng)
+    try:
+        db.merge(SchemaMeta(chave="schema_hash", valor=alvo))
+        db.merge(SchemaMeta(chave="busca", valor=busca))
+        db.commit()
+    finally:
+        db.close()
+    return busca
+
+
+@contextmanager
+def _lock_de_schema(eng):
+    """
+    Só um processo aplica o DDL por vez:
+    Postgres -> pg_advisory_lock (vale entre workers e máquinas);
+    outros   -> lock do processo (SQLite é local e serializa o DDL).
+    """
+    with _schema_lock:
+        if eng.dialect.name != "postgresql":
+            yield
+            return
+        from sqlalchemy import text
+
+        with eng.connect() as conn:
+            conn.execute(text("SELECT pg_advisory_lock(:k)"), {"k": _SCHEMA_LOCK_KEY})
+            conn.commit()
+            try:
+                yield
+            finally:
+                conn.execute(text("SELECT pg_advisory_unlock(:k)"), {"k": _SCHEMA_LOCK_KEY})
+                conn.commit()
+
+
+def init_db(force: bool = False, *, bind=None):
+    """
+    Garante o schema. Com o banco em dia custa 1 SELECT (nada de create_all
+    em cada worker do uvicorn); se os models mudaram, um único processo
+    aplica o DDL sob advisory lock e os demais só esperam e conferem de novo.
+    `bind`: outra engine (scripts de massa/benchmark); padrão é a do app.
+    """
+    from app.utils.busca_clientes import definir_estrategia
+
+    eng = bind if bind is not None else engine
+    if DB_SCHEMA_CHECK == "off" and not force:
+        return
+    force = force or DB_SCHEMA_CHECK == "force"
+
+    alvo = schema_hash()
+    meta = {} if force else _ler_meta(eng)
+    if meta.get("schema_hash") == alvo:
+        definir_estrategia(eng, meta.get("busca") or "ilike")
+        return
+
+    with _lock_de_schema(eng):
+        meta = {} if force else _ler_meta(eng)  # outro worker pode ter aplicado enquanto esperávamos
+        if meta.get("schema_hash") == alvo:
+            definir_estrategia(eng, meta.get("busca") or "ilike")
+            return
+        t0 = time.perf_counter()
+        busca = _aplicar_schema(alvo, eng)
+        print(f"✅ Schema aplicado em {(time.perf_counter() - t0) * 1000:.0f} ms (busca: {busca})")
 
 
 if __name__ == "__main__":
@@ -52,7 +302,9 @@ if __name__ == "__main__":
         if DB_PATH.exists():
             DB_PATH.unlink()
             print("🧨 Removido:", DB_PATH)
-        init_db()
+        init_db(force=True)
         print("✅ Banco SQLite criado em:", DB_PATH)
     else:
-        print("⚠️ DATABASE_URL está definido. Não faz sentido apagar arquivo SQLite aqui.")
+        # passo único de deploy (útil com DB_SCHEMA_CHECK=off nos workers)
+        init_db(force=True)
+        print("✅ Schema conferido em DATABASE_URL.")
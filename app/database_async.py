@@ -0,0 +1,71 @@
+# app/database_async.py
+"""
+Sessão das rotas async de leitura pesadas
+(vendas, /me, veiculações/agenda, listagem de faturamentos).
+
+- As rotas chamam `await db.run_sync(fn, ...)`: a MESMA função síncrona do
+  CRUD (db.query...) roda numa thread de trabalho com Session síncrona. Tudo
+  sai do event loop: a ida ao banco, a hidratação do ORM e a agregação em
+  Python (painel de vendas, carteira...). O loop só espera o resultado.
+- As threads vêm de um limitador próprio (DB_LEITURA_THREADS, por event loop):
+  dashboards lentos fazem fila entre si e não tomam as ~40 threads do
+  threadpool do Starlette que as rotas CRUD síncronas usam.
+- Cada run_sync devolve a conexão ao pool ao terminar (Session.close): uma
+  requisição esperando vaga no limitador não segura conexão. Os objetos
+  voltam desanexados (colunas carregadas continuam legíveis).
+- DB_LEITURA_THREADS=0 -> mesmas rotas no threadpool padrão do Starlette
+  (comportamento antigo; base de comparação do benchmark).
+- Com DATABASE_READ_URL, a Session é a SessaoRoteada do app.database: o
+  contexto da requisição segue para a thread, o roteamento é idêntico.
+"""
+from __future__ import annotations
+
+import functools
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Callable, Optional
+
+import anyio
+from anyio.lowlevel import RunVar
+
+from app.core.config import DB_LEITURA_THREADS
+
+_limitador: RunVar[anyio.CapacityLimiter] = RunVar("limitador_leitura")
+
+
+def limitador_leitura() -> Optional[anyio.CapacityLimiter]:
+    """Limitador das leituras pesadas no event loop atual (None = threadpool padrão)."""
+    if DB_LEITURA_THREADS <= 0:
+        return None
+    try:
+        return _limitador.get()
+    except LookupError:
+        lim = anyio.CapacityLimiter(DB_LEITURA_THREADS)
+        _limitador.set(lim)
+        return lim
+
+
+class SessaoLeitura:
+    """Session síncrona; cada run_sync roda numa thread de trabalho (fora do event loop)."""
+
+    def __init__(self):
+        from app.database import SessionLocal
+
+        self._db = SessionLocal()
+
+    def _chamar(self, fn: Callable[..., Any], args: tuple, kwargs: dict) -> Any:
+        try:
+            return fn(self._db, *args, **kwargs)
+        finally:
+            self._db.close()  # conexão de volta ao pool entre uma chamada e outra
+
+    async def run_sync(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        return await anyio.to_thread.run_sync(
+            functools.partial(self._chamar, fn, args, kwargs),
+            limiter=limitador_leitura(),
+        )
+
+
+@asynccontextmanager
+async def sessao_leitura() -> AsyncIterator[SessaoLeitura]:
+    """Sessão com `await db.run_sync(fn, ...)` (não segura conexão entre chamadas)."""
+    yield SessaoLeitura()
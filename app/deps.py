@@ -1,5 +1,5 @@
 # app/deps.py
-from typing import Generator
+from typing import AsyncGenerator, Generator
 from app.database import SessionLocal
 
 def get_db() -> Generator:
@@ -7,4 +7,12 @@ def get_db() -> Generator:
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+async def get_async_db() -> AsyncGenerator:
+    """Sessão das rotas async de leitura: use `await db.run_sync(fn, ...)`."""
+    from app.database_async import sessao_leitura
+
+    async with sessao_leitura() as db:
+        yield db
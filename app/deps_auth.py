@@ -2,15 +2,12 @@ from fastapi import Depends, HTTPException, Header
 from sqlalchemy.orm import Session
 import jwt
 
-from app.deps import get_db
+from app.deps import get_async_db, get_db
 from app.core.config import JWT_SECRET, JWT_ALG
 from app.crud.users import get_user_by_id
 
 
-def get_current_user(
-    db: Session = Depends(get_db),
-    authorization: str | None = Header(default=None),
-):
+def _user_id_do_header(authorization: str | None) -> int:
     if not authorization or not authorization.lower().startswith("bearer "):
         raise HTTPException(status_code=401, detail="Não autenticado.")
 
@@ -23,8 +20,27 @@ def get_current_user(
     user_id = payload.get("id")
     if not user_id:
         raise HTTPException(status_code=401, detail="Token inválido.")
+    return int(user_id)
 
-    user = get_user_by_id(db, int(user_id))
+
+def get_current_user(
+    db: Session = Depends(get_db),
+    authorization: str | None = Header(default=None),
+):
+    user = get_user_by_id(db, _user_id_do_header(authorization))
+    if not user:
+        raise HTTPException(status_code=401, detail="Usuário não encontrado.")
+
+    return user
+
+
+async def get_current_user_async(
+    db=Depends(get_async_db),
+    authorization: str | None = Header(default=None),
+):
+    """get_current_user das rotas async (mesma sessão da rota, consulta na thread de leitura)."""
+    user_id = _user_id_do_header(authorization)
+    user = await db.run_sync(get_user_by_id, user_id)
     if not user:
         raise HTTPException(status_code=401, detail="Usuário não encontrado.")
 
@@ -47,22 +63,34 @@ def require_roles(*roles: str):
     ✅ Admin sempre é permitido (override).
     """
     def _dep(user=Depends(get_current_user)):
-        role = _role_of(user)
+        return _checar_roles(user, roles)
+
+    return _dep
 
-        # ✅ admin sempre pode tudo
-        if role == "admin":
-            return user
 
-        allowed = {(r or "").lower().strip() for r in roles if (r or "").strip()}
-        if not allowed:
-            raise HTTPException(status_code=403, detail="Permissão insuficiente para esta ação.")
+def require_roles_async(*roles: str):
+    """require_roles para rotas/routers async (usa get_current_user_async)."""
+    async def _dep(user=Depends(get_current_user_async)):
+        return _checar_roles(user, roles)
+
+    return _dep
+
 
-        if role not in allowed:
-            raise HTTPException(status_code=403, detail="Permissão insuficiente para esta ação.")
+def _checar_roles(user, roles) -> object:
+    role = _role_of(user)
 
+    # ✅ admin sempre pode tudo
+    if role == "admin":
         return user
 
-    return _dep
+    allowed = {(r or "").lower().strip() for r in roles if (r or "").strip()}
+    if not allowed:
+        raise HTTPException(status_code=403, detail="Permissão insuficiente para esta ação.")
+
+    if role not in allowed:
+        raise HTTPException(status_code=403, detail="Permissão insuficiente para esta ação.")
+
+    return user
 
 
 def ensure_executivo_vinculado(user):
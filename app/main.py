@@ -7,7 +7,9 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from fastapi.staticfiles import StaticFiles
 
-from app.database import init_db
+from app.database import engine_leitura, init_db, leitura_na_replica
+from app.core.email_outbox import start_email_worker, stop_email_worker
+from app.core.jobs import start_jobs_worker, stop_jobs_worker
 from app.deps_auth import get_current_user, require_roles
 from app.core.config import (
     SEED_ADMIN_EMAIL,
@@ -19,6 +21,8 @@ from app.core.config import (
 # Routers
 from app.routes.auth import router as auth_router
 from app.routes.admin_users import router as admin_users_router
+from app.routes.admin_db import router as admin_db_router
+from app.routes.admin_drive import router as admin_drive_router
 
 from app.routes.pis import router as pis_router
 from app.routes.agencia import router as agencias_router
@@ -27,7 +31,7 @@ from app.routes.anunciantes import router as anunciantes_router
 from app.routes.executivos import router as executivos_router
 from app.routes.produtos import router as produtos_router
 from app.routes.matrizes import router as matrizes_router
-from app.routes.veiculacoes import router as veiculacoes_router
+from app.routes.veiculacoes import router as veiculacoes_router, router_leitura as veiculacoes_leitura_router
 from app.routes.vendas import router as vendas_router
 from app.routes.me import router as me_router
 
@@ -35,7 +39,13 @@ from app.routes.me import router as me_router
 from app.routes.pi_detalhes import router as pi_detalhes_router
 
 # ✅ faturamentos
-from app.routes.faturamentos import router as faturamentos_router
+from app.routes.faturamentos import router as faturamentos_router, router_leitura as faturamentos_leitura_router
+
+# ✅ eventos em tempo real (SSE)
+from app.routes.eventos import router as eventos_router
+
+# ✅ jobs em background (status / lista)
+from app.routes.jobs import router as jobs_router
 
 
 app = FastAPI(title="Sistema de Veiculações - API", version="2.0")
@@ -74,6 +84,31 @@ else:
     )
 
 
+# ==========================================================
+# Réplica de leitura (DATABASE_READ_URL)
+# - GET/HEAD (vendas, /me, listagens, detalhes...) leem da réplica
+# - se a requisição escrever algo, o resto dela volta pro primário
+# ==========================================================
+class LeituraNaReplicaMiddleware:
+    """ASGI puro: só abre o escopo leitura_na_replica() nas requisições de leitura."""
+
+    METODOS = ("GET", "HEAD")
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope.get("method") not in self.METODOS:
+            await self.app(scope, receive, send)
+            return
+        with leitura_na_replica():
+            await self.app(scope, receive, send)
+
+
+if engine_leitura is not None:
+    app.add_middleware(LeituraNaReplicaMiddleware)
+
+
 # ✅ evita “falso CORS” quando ocorre ValueError de NaN
 @app.exception_handler(ValueError)
 async def value_error_handler(request: Request, exc: ValueError):
@@ -128,6 +163,23 @@ def _startup():
         except Exception as e:
             print("⚠️ Falha no seed admin:", e)
 
+    # ✅ envio de e-mails em background (fila email_outbox)
+    start_email_worker()
+
+    # ✅ jobs em background (tabela jobs): só com JOBS_WORKER=1; padrão é o worker dedicado
+    start_jobs_worker()
+
+
+@app.on_event("shutdown")
+async def _shutdown():
+    from starlette.concurrency import run_in_threadpool
+
+    from app.core import eventos
+
+    await run_in_threadpool(stop_email_worker)  # join da thread não trava o event loop
+    await run_in_threadpool(stop_jobs_worker)
+    await run_in_threadpool(eventos.fechar)
+
 
 # ==========================================================
 # ROTAS PÚBLICAS
@@ -143,6 +195,10 @@ def healthcheck():
 # ROTAS PROTEGIDAS (AUTH) + ACL POR MÓDULO
 # ==========================================================
 auth_dep = [Depends(get_current_user)]
+# Rotas async de leitura (vendas, /me, /veiculacoes/agenda, GET /faturamentos):
+# cada rota declara require_roles_async/get_current_user_async e autentica na
+# própria sessão de leitura; esses routers entram sem auth_dep para não abrir
+# uma segunda Session só para o login.
 
 # PIs: executivo + admin
 app.include_router(
@@ -162,6 +218,7 @@ app.include_router(
     veiculacoes_router,
     dependencies=auth_dep + [Depends(require_roles("executivo", "opec", "admin"))],
 )
+app.include_router(veiculacoes_leitura_router)  # /agenda: require_roles_async na rota
 
 # Entregas: executivo + opec + admin
 app.include_router(
@@ -192,6 +249,7 @@ app.include_router(
     faturamentos_router,
     dependencies=auth_dep + [Depends(require_roles("financeiro", "opec", "admin"))],
 )
+app.include_router(faturamentos_leitura_router)  # GET /faturamentos: require_roles_async na rota
 
 # Admin (gestão de usuários): só admin
 app.include_router(
@@ -199,6 +257,18 @@ app.include_router(
     dependencies=auth_dep + [Depends(require_roles("admin"))],
 )
 
+# ✅ Diagnóstico do banco (slow-query log): só admin
+app.include_router(
+    admin_db_router,
+    dependencies=auth_dep + [Depends(require_roles("admin"))],
+)
+
+# ✅ Pool de clients do Google Drive: só admin
+app.include_router(
+    admin_drive_router,
+    dependencies=auth_dep + [Depends(require_roles("admin"))],
+)
+
 # Agências e Anunciantes: por segurança, só admin
 app.include_router(
     agencias_router,
@@ -210,17 +280,21 @@ app.include_router(
 )
 
 # ✅ Vendas: só admin (como você pediu)
+app.include_router(vendas_router)  # require_roles_async("admin") em cada rota
+
+# ✅ Eventos (SSE): a própria rota autentica (aceita ?token= por causa do
+# EventSource) e filtra por role — não usa dependência de sessão no router
+app.include_router(eventos_router)
+
+# ✅ Jobs: qualquer usuário logado vê os próprios; lista e reexecução só admin
 app.include_router(
-    vendas_router,
-    dependencies=auth_dep + [Depends(require_roles("admin"))],
+    jobs_router,
+    dependencies=auth_dep,
 )
 
 # ✅ /me: qualquer usuário logado
 # (cada endpoint dentro de /me decide o papel, ex.: /me/executivo exige executivo|admin)
-app.include_router(
-    me_router,
-    dependencies=auth_dep,
-)
+app.include_router(me_router)
 
 if __name__ == "__main__":
     import uvicorn
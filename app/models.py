@@ -11,6 +11,8 @@ from sqlalchemy import (
     and_,
     DateTime,
     UniqueConstraint,
+    Index,
+    text,
 )
 
 from app.models_base import Base
@@ -18,6 +20,10 @@ from app.models_base import Base
 
 class Agencia(Base):
     __tablename__ = "agencias"
+    __table_args__ = (
+        # carteira do executivo: filtro por executivo + keyset (nome, id)
+        Index("ix_agencias_executivo_nome_id", "executivo", "nome_agencia", "id"),
+    )
 
     id = Column(Integer, primary_key=True)
     nome_agencia = Column(String, nullable=False)
@@ -48,6 +54,10 @@ class Agencia(Base):
 
 class Anunciante(Base):
     __tablename__ = "anunciantes"
+    __table_args__ = (
+        # carteira do executivo: filtro por executivo + keyset (nome, id)
+        Index("ix_anunciantes_executivo_nome_id", "executivo", "nome_anunciante", "id"),
+    )
 
     id = Column(Integer, primary_key=True)
     nome_anunciante = Column(String, nullable=False)
@@ -83,6 +93,15 @@ class Anunciante(Base):
 
 class PI(Base):
     __tablename__ = "pis_cadastro"
+    __table_args__ = (
+        # filtros das telas de vendas/carteira: igualdade + faixa de data_venda
+        Index("ix_pis_cadastro_executivo_data_venda", "executivo", "data_venda"),
+        Index("ix_pis_cadastro_diretoria_data_venda", "diretoria", "data_venda"),
+        Index("ix_pis_cadastro_tipo_data_venda", "tipo_pi", "data_venda"),
+        # filhos de matriz (Abatimento) e de normal (CS)
+        Index("ix_pis_cadastro_matriz_tipo", "numero_pi_matriz", "tipo_pi"),
+        Index("ix_pis_cadastro_normal_tipo", "numero_pi_normal", "tipo_pi"),
+    )
 
     id = Column(Integer, primary_key=True)
     numero_pi = Column(String, nullable=False, unique=True)
@@ -134,8 +153,9 @@ class PI(Base):
 
     observacoes = Column(String)
 
-    agencia_id = Column(Integer, ForeignKey("agencias.id"))
-    anunciante_id = Column(Integer, ForeignKey("anunciantes.id"))
+    # preenchidos pelo pi_crud (via CNPJ) e pelo app/scripts/backfill_pi_clientes.py
+    agencia_id = Column(Integer, ForeignKey("agencias.id"), index=True)
+    anunciante_id = Column(Integer, ForeignKey("anunciantes.id"), index=True)
 
     agencia = relationship("Agencia", back_populates="pis")
     anunciante = relationship("Anunciante", back_populates="pis")
@@ -157,6 +177,10 @@ class PI(Base):
 
     eh_matriz = Column(Boolean, default=False, nullable=False)
 
+    # ✅ versão da linha (ETag / If-Match) — incrementada em app/core/versionamento.py
+    versao = Column(Integer, nullable=False, default=1, server_default=text("1"))
+    atualizado_em = Column(DateTime, nullable=True, default=datetime.utcnow)
+
     filhos_abatimento = relationship(
         "PI",
         primaryjoin=and_(
@@ -181,6 +205,9 @@ class PI(Base):
 
 class PIAnexo(Base):
     __tablename__ = "pi_anexos"
+    __table_args__ = (
+        Index("ix_pi_anexos_pi_id", "pi_id"),
+    )
 
     id = Column(Integer, primary_key=True)
     pi_id = Column(
@@ -229,6 +256,10 @@ class Produto(Base):
 
 class Veiculacao(Base):
     __tablename__ = "veiculacoes"
+    __table_args__ = (
+        Index("ix_veiculacoes_pi_id", "pi_id"),
+        Index("ix_veiculacoes_produto_id", "produto_id"),
+    )
 
     id = Column(Integer, primary_key=True)
 
@@ -244,6 +275,10 @@ class Veiculacao(Base):
     desconto = Column(Float, nullable=True)
     valor_liquido = Column(Float, nullable=True)
 
+    # ✅ versão da linha (ETag / If-Match) — incrementada em app/core/versionamento.py
+    versao = Column(Integer, nullable=False, default=1, server_default=text("1"))
+    atualizado_em = Column(DateTime, nullable=True, default=datetime.utcnow)
+
     produto = relationship("Produto", back_populates="veiculacoes")
     pi = relationship("PI", back_populates="veiculacoes")
     entregas = relationship(
@@ -253,6 +288,11 @@ class Veiculacao(Base):
 
 class Entrega(Base):
     __tablename__ = "entregas"
+    __table_args__ = (
+        # listas por PI / veiculação ordenadas por data_entrega
+        Index("ix_entregas_pi_id_data", "pi_id", "data_entrega"),
+        Index("ix_entregas_veiculacao_id_data", "veiculacao_id", "data_entrega"),
+    )
 
     id = Column(Integer, primary_key=True)
     data_entrega = Column(Date, nullable=False)
@@ -262,6 +302,10 @@ class Entrega(Base):
     veiculacao_id = Column(Integer, ForeignKey("veiculacoes.id"))
     pi_id = Column(Integer, ForeignKey("pis_cadastro.id"))
 
+    # ✅ versão da linha (ETag / If-Match) — incrementada em app/core/versionamento.py
+    versao = Column(Integer, nullable=False, default=1, server_default=text("1"))
+    atualizado_em = Column(DateTime, nullable=True, default=datetime.utcnow)
+
     veiculacao = relationship("Veiculacao", back_populates="entregas")
     pi = relationship("PI", back_populates="entregas")
 
@@ -277,6 +321,8 @@ class Faturamento(Base):
     __tablename__ = "faturamentos"
     __table_args__ = (
         UniqueConstraint("entrega_id", name="uq_faturamentos_entrega_id"),
+        Index("ix_faturamentos_status_enviado_em", "status", "enviado_em"),
+        Index("ix_faturamentos_enviado_em", "enviado_em"),
     )
 
     id = Column(Integer, primary_key=True)
@@ -311,6 +357,9 @@ class Faturamento(Base):
 
 class FaturamentoAnexo(Base):
     __tablename__ = "faturamento_anexos"
+    __table_args__ = (
+        Index("ix_faturamento_anexos_faturamento_id", "faturamento_id"),
+    )
 
     id = Column(Integer, primary_key=True)
     faturamento_id = Column(
@@ -348,3 +397,7 @@ class MetaVenda(Base):
 
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     updated_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+# registra os eventos de versão no flush (precisa das classes acima)
+import app.core.versionamento  # noqa: E402,F401
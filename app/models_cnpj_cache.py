@@ -0,0 +1,21 @@
+# app/models_cnpj_cache.py
+from sqlalchemy import Column, DateTime, String, Text
+from datetime import datetime
+from app.models_base import Base
+
+
+class CnpjCache(Base):
+    """
+    Cache das consultas de CNPJ na BrasilAPI (app/utils/cnpj_lookup.py).
+    Guarda também os "não encontrados" (payload NULL), com TTL menor.
+    """
+    __tablename__ = "cnpj_cache"
+
+    cnpj = Column(String(14), primary_key=True)  # só dígitos
+
+    # status: OK | NAO_ENCONTRADO
+    status = Column(String, nullable=False)
+    payload = Column(Text, nullable=True)  # JSON da BrasilAPI
+
+    consultado_em = Column(DateTime, default=datetime.utcnow, nullable=False)
+    expira_em = Column(DateTime, nullable=False, index=True)
@@ -0,0 +1,36 @@
+# app/models_email_outbox.py
+from sqlalchemy import Column, Integer, DateTime, String, Text, Index
+from datetime import datetime
+from app.models_base import Base
+
+
+class EmailOutbox(Base):
+    """
+    Fila persistente de e-mails: as rotas só enfileiram,
+    o envio é feito pelo worker de app/core/email_outbox.py.
+    """
+    __tablename__ = "email_outbox"
+
+    id = Column(Integer, primary_key=True)
+
+    to_email = Column(String, nullable=False)
+    subject = Column(String, nullable=False)
+    body = Column(Text, nullable=True)
+
+    # status: PENDENTE | ENVIANDO | ENVIADO | FALHOU
+    status = Column(String, nullable=False, default="PENDENTE")
+
+    tentativas = Column(Integer, nullable=False, default=0)
+    proximo_envio_em = Column(DateTime, default=datetime.utcnow, nullable=False)
+    ultimo_erro = Column(String, nullable=True)
+    # e-mail com prazo (ex.: link de reset de senha): depois disso não adianta enviar
+    expira_em = Column(DateTime, nullable=True)
+
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    enviado_em = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        # fila: "próximos pendentes"
+        Index("ix_email_outbox_status_proximo", "status", "proximo_envio_em"),
+    )
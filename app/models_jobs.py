@@ -0,0 +1,47 @@
+# app/models_jobs.py
+from sqlalchemy import Column, Integer, DateTime, String, Text, LargeBinary, Index
+from datetime import datetime
+from app.models_base import Base
+
+
+class Job(Base):
+    """
+    Fila persistente de tarefas pesadas (PDF, Drive, geração de faturamentos):
+    a rota só enfileira e devolve 202; quem executa é o worker de app/core/jobs.py
+    (thread no uvicorn ou processo separado: python -m app.scripts.worker_jobs).
+    """
+    __tablename__ = "jobs"
+
+    id = Column(Integer, primary_key=True)
+
+    tipo = Column(String, nullable=False)  # ex.: "pi.extrair_pdf" (ver app/core/tarefas.py)
+    payload = Column(Text, nullable=True)  # JSON
+    arquivo = Column(LargeBinary, nullable=True)  # upload da rota; apagado quando o job termina
+
+    # mesma chave = mesmo job (reenvio do formulário / retry do cliente não duplica)
+    chave_idempotencia = Column(String, nullable=True, unique=True)
+
+    # status: PENDENTE | EXECUTANDO | CONCLUIDO | FALHOU
+    status = Column(String, nullable=False, default="PENDENTE")
+
+    tentativas = Column(Integer, nullable=False, default=0)
+    max_tentativas = Column(Integer, nullable=False, default=5)
+    proxima_execucao_em = Column(DateTime, default=datetime.utcnow, nullable=False)
+    ultimo_erro = Column(String, nullable=True)
+    resultado = Column(Text, nullable=True)  # JSON
+
+    criado_por = Column(Integer, nullable=True)  # users.id
+    worker = Column(String, nullable=True)  # host:pid:thread que reservou
+    batimento_em = Column(DateTime, nullable=True)  # último "ainda rodando" do worker
+
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    iniciado_em = Column(DateTime, nullable=True)
+    concluido_em = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        # fila: "próximos pendentes"
+        Index("ix_jobs_status_proxima", "status", "proxima_execucao_em"),
+        # listagem do admin / "meus jobs"
+        Index("ix_jobs_criado_por_created", "criado_por", "created_at"),
+    )
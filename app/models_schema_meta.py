@@ -0,0 +1,17 @@
+# app/models_schema_meta.py
+from sqlalchemy import Column, DateTime, String
+from datetime import datetime
+from app.models_base import Base
+
+
+class SchemaMeta(Base):
+    """
+    Chave/valor do estado do schema (app/database.py::init_db).
+    schema_hash = impressão digital dos models já aplicada no banco;
+    busca = estratégia de busca instalada (fts5 | trgm | ilike).
+    """
+    __tablename__ = "schema_meta"
+
+    chave = Column(String(64), primary_key=True)
+    valor = Column(String, nullable=True)
+    atualizado_em = Column(DateTime, default=datetime.utcnow, nullable=False)
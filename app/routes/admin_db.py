@@ -0,0 +1,33 @@
+# app/routes/admin_db.py
+from typing import Literal
+
+from fastapi import APIRouter, Depends, Query
+
+from app.deps_auth import require_roles
+from app.core import query_stats
+
+router = APIRouter(prefix="/admin/db", tags=["admin"])
+
+
+# ==========================================================
+# Slow-query log: estatísticas por fingerprint de SQL
+# GET  /admin/db/queries?order_by=total_ms&limit=50
+# POST /admin/db/queries/reset
+# ==========================================================
+@router.get("/queries")
+def listar_queries(
+    order_by: Literal["total_ms", "p95_ms", "mean_ms", "max_ms", "count", "slow_count"] = Query("total_ms"),
+    limit: int = Query(50, ge=1, le=500),
+    apenas_lentas: bool = Query(False, description="Somente fingerprints que já passaram do limite de lentidão"),
+    _user=Depends(require_roles("admin")),
+):
+    """
+    Estatísticas do worker atual (cada processo do uvicorn tem a sua tabela).
+    """
+    return query_stats.stats.snapshot(order_by=order_by, limit=limit, apenas_lentas=apenas_lentas)
+
+
+@router.post("/queries/reset")
+def resetar_queries(_user=Depends(require_roles("admin"))):
+    query_stats.stats.reset()
+    return {"ok": True}
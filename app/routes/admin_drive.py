@@ -0,0 +1,22 @@
+# app/routes/admin_drive.py
+from fastapi import APIRouter, Depends
+
+from app.deps_auth import require_roles
+
+router = APIRouter(prefix="/admin/drive", tags=["admin"])
+
+
+# ==========================================================
+# Pool de clients do Google Drive (app/utils/drive_upload.py)
+# GET /admin/drive/pool
+# ==========================================================
+@router.get("/pool")
+def pool_drive(_user=Depends(require_roles("admin"))):
+    """
+    Clients criados/em uso/ociosos, esperas por client livre, descartes e
+    refresh de token por credencial (pi/proposta). Só do worker atual; pool
+    ainda não usado neste processo não aparece.
+    """
+    from app.utils.drive_upload import pool_stats
+
+    return pool_stats()
@@ -5,7 +5,7 @@ from sqlalchemy.orm import Session
 
 from app.deps import get_db
 from app.deps_auth import require_admin
-from app.core.email import send_email
+from app.core.email_outbox import enqueue_email
 from app.core.config import FRONTEND_BASE_URL
 
 from app.crud.users import (
@@ -123,7 +123,9 @@ def approve(
     db.commit()
     db.refresh(user)
 
-    send_email(
+    # ✅ só enfileira: o envio é feito pelo worker (app/core/email_outbox.py)
+    enqueue_email(
+        db,
         to_email=user.email,
         subject="Cadastro aprovado - Sistema de Veiculações",
         body=(
@@ -1,14 +1,16 @@
 # app/routes/agencias.py
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, File, HTTPException, status, Query, Response, UploadFile
 from fastapi.responses import JSONResponse
 from sqlalchemy.orm import Session
 from typing import List, Optional
-import requests
 
 from app.schemas.agencia import AgenciaCreate, AgenciaUpdate, AgenciaOut
-from app.crud import agencia_crud
+from app.crud import agencia_crud, importar_clientes
 from app.database import SessionLocal
-from app.utils.cnpj import only_digits, is_cnpj_like
+from app.utils.busca_clientes import buscar
+from app.utils.cnpj import only_digits
+from app.utils.planilha import ler_planilha
+from app.utils.cnpj_lookup import cnpj_lookup, CnpjLookupError, CnpjLookupOcupado
 
 router = APIRouter(prefix="/agencias", tags=["agencias"])
 
@@ -27,7 +29,7 @@ def get_db():
 def listar(
     nome: Optional[str] = Query(
         None,
-        description="Filtro (ilike) por nome_agencia, codinome, razão social ou grupo empresarial",
+        description="Filtro sem acento por nome_agencia, codinome, razão social ou grupo empresarial",
     ),
     db: Session = Depends(get_db),
 ):
@@ -35,6 +37,16 @@ def listar(
     return [AgenciaOut.model_validate(r) for r in regs]
 
 
+@router.get("/typeahead")
+def typeahead(
+    q: str = Query(..., min_length=1, description="Termo digitado (sem acento, por prefixo de palavra)"),
+    limit: int = Query(10, ge=1, le=50),
+    db: Session = Depends(get_db),
+):
+    """Sugestões ranqueadas para autocomplete (só os campos de exibição)."""
+    return buscar(db, "agencia", q, limite=limit)
+
+
 @router.get("/codinome/{codinome}", response_model=AgenciaOut)
 def obter_por_codinome(codinome: str, db: Session = Depends(get_db)):
     reg = agencia_crud.get_by_codename(db, codinome)
@@ -70,6 +82,20 @@ def criar(body: AgenciaCreate, db: Session = Depends(get_db)):
         raise HTTPException(status_code=422, detail=str(e))
 
 
+@router.post("/importar")
+def importar_planilha(
+    arquivo: UploadFile = File(..., description="XLSX ou CSV com cabeçalho (CNPJ, nome, executivo, ...)"),
+    dry_run: bool = Query(False, description="só valida, não grava"),
+    db: Session = Depends(get_db),
+):
+    """Importação em lote de agências: upsert por CNPJ + relatório de erros por linha."""
+    try:
+        linhas = ler_planilha(arquivo.file.read(), arquivo.filename)
+        return importar_clientes.importar(db, "agencia", linhas, dry_run=dry_run)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+
 @router.put("/{agencia_id:int}", response_model=AgenciaOut)
 def atualizar(agencia_id: int, body: AgenciaUpdate, db: Session = Depends(get_db)):
     try:
@@ -105,18 +131,22 @@ def deletar_por_cnpj(cnpj: str, db: Session = Depends(get_db)):
 # -------- Consulta BrasilAPI --------
 
 @router.get("/cnpj/{cnpj}/consulta")
-def consultar_cnpj_brasilapi(cnpj: str):
-    cnpj_limpo = only_digits(cnpj)
-    if not is_cnpj_like(cnpj_limpo):
-        raise HTTPException(status_code=400, detail="CNPJ inválido.")
-    url = f"https://brasilapi.com.br/api/cnpj/v1/{cnpj_limpo}"
+async def consultar_cnpj_brasilapi(cnpj: str, response: Response):
+    # ✅ cache no banco + singleflight (app/utils/cnpj_lookup.py); async para não prender threads
     try:
-        r = requests.get(url, timeout=10)
-        if r.status_code == 200:
-            return r.json()
-        elif r.status_code == 404:
-            raise HTTPException(status_code=404, detail="CNPJ não encontrado na BrasilAPI.")
-        else:
-            raise HTTPException(status_code=502, detail=f"BrasilAPI respondeu {r.status_code}.")
-    except requests.RequestException as e:
-        raise HTTPException(status_code=502, detail=f"Erro ao consultar BrasilAPI: {e}")
+        res = await cnpj_lookup.consultar_async(cnpj)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="CNPJ inválido.")
+    except CnpjLookupOcupado as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except CnpjLookupError as e:
+        raise HTTPException(status_code=502, detail=str(e))
+
+    response.headers["X-Cache"] = res.origem
+    if not res.encontrado:
+        raise HTTPException(
+            status_code=404,
+            detail="CNPJ não encontrado na BrasilAPI.",
+            headers={"X-Cache": res.origem},
+        )
+    return res.dados
@@ -16,7 +16,7 @@ from app.core.config import (
     RESET_TOKEN_EXPIRES_MINUTES,
 )
 from app.core.security import create_access_token, verify_password
-from app.core.email import send_email
+from app.core.email_outbox import enqueue_email
 from app.crud.users import (
     get_user_by_email,
     create_user_pending,
@@ -148,9 +148,12 @@ def forgot_password(data: ForgotIn, db: Session = Depends(get_db)):
 
     token = uuid4().hex
     set_reset_token(db, user, token, minutes=RESET_TOKEN_EXPIRES_MINUTES)
+    expira_em = getattr(user, "reset_token_expires_at", None)
 
     link = f"{FRONTEND_BASE_URL}/reset-password?token={token}"
-    send_email(
+    # ✅ só enfileira: o envio é feito pelo worker (app/core/email_outbox.py)
+    enqueue_email(
+        db,
         to_email=user.email,
         subject="Redefinição de senha - Sistema de Veiculações",
         body=(
@@ -159,6 +162,7 @@ def forgot_password(data: ForgotIn, db: Session = Depends(get_db)):
             f"{link}\n\n"
             "Se você não solicitou, ignore este e-mail."
         ),
+        expira_em=expira_em,  # token vencido: não adianta mais enviar
     )
 
     return {
@@ -1,5 +1,5 @@
 # app/routes/entregas.py
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, Header, HTTPException, status, Query, Request, Response
 from fastapi.responses import JSONResponse
 from sqlalchemy.orm import Session
 from typing import List, Optional
@@ -7,10 +7,15 @@ from app.schemas.entrega import EntregaCreate, EntregaUpdate, EntregaOut
 from app.crud import entrega_crud
 from app.crud import faturamento_crud
 from app.database import SessionLocal
+from app.core import xlsx_stream
+from app.core.fast_json import FastJSONResponse, RowSerializer
+from app.core.versionamento import ConflitoDeVersao, cabecalhos, etag, resposta_condicional, versao_if_match
 
 from app.deps_auth import require_roles
 
-router = APIRouter(prefix="/entregas", tags=["entregas"])
+router = APIRouter(prefix="/entregas", tags=["entregas"], default_response_class=FastJSONResponse)
+
+ENTREGA_ROWS = RowSerializer(EntregaOut)
 
 
 def get_db():
@@ -44,9 +49,32 @@ def _serialize_entrega(r) -> EntregaOut:
         motivo=r.motivo or "",
         faturamento_id=fat_id,
         faturamento_status=fat_status,
+        versao=r.versao,
     )
 
 
+def _serialize_entrega_row(row) -> dict:
+    """Mesmo resultado de _serialize_entrega, a partir da tupla de entrega_crud.list_rows."""
+    eid, pi_id, veiculacao_id, data_entrega, foi_entregue, motivo, fat_id, fat_status, versao = row
+    foi = (foi_entregue or "pendente").strip()
+    entregue_bool = foi.lower() in {"sim", "entregue", "ok", "1", "true"}
+    status_txt = "Entregue" if entregue_bool else "Pendente"
+    return {
+        "id": eid,
+        "veiculacao_id": veiculacao_id,
+        "pi_id": pi_id,
+        "data_entrega": data_entrega.isoformat() if data_entrega else "",
+        "foi_entregue": foi or "pendente",
+        "motivo": motivo or "",
+        "status": status_txt,
+        "status_entrega": status_txt,
+        "entregue": entregue_bool,
+        "faturamento_id": fat_id,
+        "faturamento_status": (fat_status or "").upper() if fat_id else None,
+        "versao": versao,
+    }
+
+
 # ---- listas ----
 @router.get("", response_model=List[EntregaOut])
 def listar_todas(
@@ -54,13 +82,17 @@ def listar_todas(
     pi_id: Optional[int] = Query(default=None),
     veiculacao_id: Optional[int] = Query(default=None),
 ):
-    if pi_id is not None:
-        regs = entrega_crud.list_by_pi(db, pi_id)
-    elif veiculacao_id is not None:
-        regs = entrega_crud.list_by_veiculacao(db, veiculacao_id)
-    else:
-        regs = entrega_crud.list_all(db)
-    return [_serialize_entrega(r) for r in regs]
+    rows = entrega_crud.list_rows(db, pi_id=pi_id, veiculacao_id=veiculacao_id)
+    return ENTREGA_ROWS.response_itens([_serialize_entrega_row(r) for r in rows])
+
+
+@router.get("/exportar")
+def exportar_xlsx(
+    pi_id: Optional[int] = Query(default=None),
+    veiculacao_id: Optional[int] = Query(default=None),
+):
+    stmt = entrega_crud.export_select(pi_id=pi_id, veiculacao_id=veiculacao_id)
+    return xlsx_stream.resposta_xlsx("entregas", stmt, aba="Entregas")
 
 
 @router.get("/veiculacao/{veiculacao_id:int}", response_model=List[EntregaOut])
@@ -75,6 +107,32 @@ def por_pi(pi_id: int, db: Session = Depends(get_db)):
     return [_serialize_entrega(r) for r in regs]
 
 
+@router.get("/{entrega_id:int}", response_model=EntregaOut)
+def obter(entrega_id: int, request: Request, response: Response, db: Session = Depends(get_db)):
+    ent = entrega_crud.get_by_id(db, entrega_id)
+    if not ent:
+        raise HTTPException(status_code=404, detail="Entrega não encontrada.")
+    # versão da entrega sobe também quando o faturamento dela muda
+    tag = etag("entrega", ent.id, ent.versao)
+    nao_mudou = resposta_condicional(request, tag, ent.atualizado_em)
+    if nao_mudou:
+        return nao_mudou
+    response.headers.update(cabecalhos(tag, ent.atualizado_em))
+    return _serialize_entrega(ent)
+
+
+def _salvar(response: Response, if_match: Optional[str], fn, *args) -> EntregaOut:
+    """Roda a alteração com If-Match (versao=) e devolve a entrega com o novo ETag."""
+    try:
+        ent = fn(*args, versao=versao_if_match(if_match))
+    except ConflitoDeVersao as e:
+        raise HTTPException(status_code=412, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    response.headers.update(cabecalhos(etag("entrega", ent.id, ent.versao), ent.atualizado_em))
+    return _serialize_entrega(ent)
+
+
 # ---- CRUD ----
 @router.post("", response_model=EntregaOut, status_code=status.HTTP_201_CREATED)
 def criar(body: EntregaCreate, db: Session = Depends(get_db)):
@@ -86,30 +144,35 @@ def criar(body: EntregaCreate, db: Session = Depends(get_db)):
 
 
 @router.put("/{entrega_id:int}", response_model=EntregaOut)
-def atualizar(entrega_id: int, body: EntregaUpdate, db: Session = Depends(get_db)):
-    try:
-        upd = entrega_crud.update(db, entrega_id, body.dict(exclude_unset=True))
-        return _serialize_entrega(upd)
-    except ValueError as e:
-        raise HTTPException(status_code=422, detail=str(e))
+def atualizar(
+    entrega_id: int,
+    body: EntregaUpdate,
+    response: Response,
+    if_match: Optional[str] = Header(default=None),
+    db: Session = Depends(get_db),
+):
+    return _salvar(response, if_match, entrega_crud.update, db, entrega_id, body.dict(exclude_unset=True))
 
 
 @router.put("/{entrega_id:int}/entregue", response_model=EntregaOut)
-def marcar_como_entregue(entrega_id: int, db: Session = Depends(get_db)):
-    try:
-        ent = entrega_crud.marcar_entregue(db, entrega_id)
-        return _serialize_entrega(ent)
-    except ValueError as e:
-        raise HTTPException(status_code=422, detail=str(e))
+def marcar_como_entregue(
+    entrega_id: int,
+    response: Response,
+    if_match: Optional[str] = Header(default=None),
+    db: Session = Depends(get_db),
+):
+    return _salvar(response, if_match, entrega_crud.marcar_entregue, db, entrega_id)
 
 
 @router.put("/{entrega_id:int}/motivo", response_model=EntregaOut)
-def atualizar_motivo(entrega_id: int, motivo: str, db: Session = Depends(get_db)):
-    try:
-        ent = entrega_crud.atualizar_motivo(db, entrega_id, motivo)
-        return _serialize_entrega(ent)
-    except ValueError as e:
-        raise HTTPException(status_code=422, detail=str(e))
+def atualizar_motivo(
+    entrega_id: int,
+    motivo: str,
+    response: Response,
+    if_match: Optional[str] = Header(default=None),
+    db: Session = Depends(get_db),
+):
+    return _salvar(response, if_match, entrega_crud.atualizar_motivo, db, entrega_id, motivo)
 
 
 @router.delete("/{entrega_id:int}")
@@ -0,0 +1,146 @@
+# app/routes/eventos.py
+"""
+GET /eventos/stream — Server-Sent Events com mudanças de faturamento e entrega.
+
+- Autenticação: Authorization: Bearer <token> ou ?token=<token>
+  (o EventSource do navegador não manda cabeçalhos). A sessão do banco é
+  aberta só para carregar o usuário: a conexão SSE fica aberta sem prender
+  conexão do pool nem thread do threadpool.
+- Filtro por role (mesmo ACL dos routers):
+    admin      -> tudo
+    financeiro -> faturamento.*
+    opec       -> faturamento.* e entrega.*
+    executivo  -> entrega.* dos PIs da própria carteira
+  ?tipos=faturamento,entrega.entregue restringe mais (prefixo do tipo).
+- Reconexão: o navegador reenvia Last-Event-ID e recebe o que perdeu (se
+  ainda estiver no buffer do worker); senão recebe "reset" e recarrega a tela.
+- Heartbeat (": ping") a cada EVENTOS_HEARTBEAT_S mantém proxies/LB com a conexão viva.
+
+Atrás de nginx: `proxy_buffering off` (ou o cabeçalho X-Accel-Buffering: no, já enviado).
+No shutdown, conexões SSE abertas seguram o uvicorn até --timeout-graceful-shutdown.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
+
+from fastapi import APIRouter, Header, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+
+from app.core import eventos
+from app.core.config import EVENTOS_HEARTBEAT_S
+from app.deps_auth import _role_of, _user_id_do_header
+
+router = APIRouter(prefix="/eventos", tags=["eventos"])
+
+# role -> prefixos de tipo permitidos
+TIPOS_POR_ROLE: Dict[str, Tuple[str, ...]] = {
+    "admin": ("faturamento.", "entrega."),
+    "financeiro": ("faturamento.",),
+    "opec": ("faturamento.", "entrega."),
+    "executivo": ("entrega.",),
+}
+
+
+def _carregar_usuario(user_id: int):
+    from app.crud.users import get_user_by_id
+    from app.database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        user = get_user_by_id(db, user_id)
+        if user is not None:
+            db.expunge(user)
+        return user
+    finally:
+        db.close()
+
+
+class FiltroEventos:
+    def __init__(self, role: str, executivo: Optional[str], tipos: Optional[str]):
+        self.prefixos = TIPOS_POR_ROLE.get(role, ())
+        self.executivo = executivo if role == "executivo" else None
+        pedidos = [t.strip() for t in (tipos or "").split(",") if t.strip()]
+        self.pedidos = tuple(t if "." in t else t + "." for t in pedidos)
+
+    def aceita(self, ev: Dict[str, Any]) -> bool:
+        tipo = ev.get("tipo", "")
+        if tipo == eventos.RESET:
+            return True
+        if not tipo.startswith(self.prefixos):
+            return False
+        if self.pedidos and not tipo.startswith(self.pedidos):
+            return False
+        if self.executivo is not None:
+            return (ev.get("executivo") or "").strip() == self.executivo
+        return True
+
+
+def _formatar(ev: Dict[str, Any]) -> str:
+    dados = json.dumps(ev.get("dados") or {}, ensure_ascii=False, separators=(",", ":"), default=str)
+    return f"id: {ev['id']}\nevent: {ev['tipo']}\ndata: {dados}\n\n"
+
+
+def _ultimo_id(valor: Optional[str]) -> Optional[int]:
+    try:
+        return int(valor) if valor else None
+    except ValueError:
+        return None
+
+
+async def _stream(request: Request, filtro: FiltroEventos, ultimo_id: Optional[int]) -> AsyncIterator[str]:
+    try:
+        assinatura, pendentes = await eventos.assinar(ultimo_id)
+    except eventos.ConexoesEsgotadas:
+        yield f"event: {eventos.RESET}\ndata: {{\"motivo\":\"limite de conexões\"}}\nretry: 30000\n\n"
+        return
+    try:
+        yield "retry: 5000\n: conectado\n\n"
+        for ev in pendentes:
+            if filtro.aceita(ev):
+                yield _formatar(ev)
+        while True:
+            try:
+                ev = await asyncio.wait_for(assinatura.fila.get(), timeout=EVENTOS_HEARTBEAT_S)
+            except asyncio.TimeoutError:
+                if await request.is_disconnected():
+                    break
+                yield ": ping\n\n"
+                continue
+            if filtro.aceita(ev):
+                yield _formatar(ev)
+    finally:
+        eventos.broadcaster.sair(assinatura)
+
+
+@router.get("/stream")
+async def stream(
+    request: Request,
+    token: Optional[str] = Query(default=None, description="JWT (alternativa ao Authorization para EventSource)"),
+    tipos: Optional[str] = Query(default=None, description="ex.: faturamento,entrega.entregue"),
+    authorization: Optional[str] = Header(default=None),
+    last_event_id: Optional[str] = Header(default=None),
+):
+    user_id = _user_id_do_header(authorization or (f"Bearer {token}" if token else None))
+    user = await run_in_threadpool(_carregar_usuario, user_id)
+    if not user:
+        raise HTTPException(status_code=401, detail="Usuário não encontrado.")
+
+    role = _role_of(user)
+    if role not in TIPOS_POR_ROLE:
+        raise HTTPException(status_code=403, detail="Permissão insuficiente para esta ação.")
+    executivo = (getattr(user, "executivo_nome", None) or "").strip()
+    if role == "executivo" and not executivo:
+        raise HTTPException(
+            status_code=403,
+            detail="Usuário não vinculado a executivo. Solicite ao administrador o vínculo do seu perfil.",
+        )
+
+    filtro = FiltroEventos(role, executivo, tipos)
+    return StreamingResponse(
+        _stream(request, filtro, _ultimo_id(last_event_id)),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -1,11 +1,12 @@
 # app/routes/executivos.py
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from sqlalchemy.orm import Session
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Literal
 
 from app.database import SessionLocal
 from app.schemas.executivo import RegistroExecutivoOut, EditarRegistroIn
 from app.crud import executivo_crud
+from app.core import ref_cache
 from app.deps_auth import require_roles
 
 router = APIRouter(prefix="/executivos", tags=["executivos"])
@@ -22,22 +23,33 @@ def get_db():
 # ✅ Leitura: admin + executivo
 @router.get("", response_model=List[str])
 def listar_nomes(
+    request: Request,
     db: Session = Depends(get_db),
     _user=Depends(require_roles("executivo", "admin")),
 ):
-    """Lista nomes distintos de executivos em Agências e Anunciantes."""
-    return executivo_crud.listar_executivos(db)
+    """Lista nomes distintos de executivos em Agências e Anunciantes (cache + ETag)."""
+    return ref_cache.responder(request, "executivos", lambda: executivo_crud.listar_executivos(db))
 
 
 # ✅ Busca detalhada: admin + executivo (somente leitura no front)
 @router.get("/busca", response_model=List[RegistroExecutivoOut])
 def buscar(
+    response: Response,
     executivo: Optional[str] = Query(None, description="Nome exato do executivo"),
     tipo: Optional[str] = Query(None, description="Agência/Agencia ou Anunciante"),
+    limit: Optional[int] = Query(None, ge=1, le=1000, description="Sem limit = lista completa"),
+    offset: int = Query(0, ge=0),
+    ordenar: Literal["nome", "tipo", "executivo", "uf", "cnpj", "razao_social", "id"] = Query("nome"),
+    direcao: Literal["asc", "desc"] = Query("asc"),
     db: Session = Depends(get_db),
     _user=Depends(require_roles("executivo", "admin")),
 ):
-    regs = executivo_crud.buscar_por_executivo(db, executivo, tipo)
+    regs = executivo_crud.buscar_por_executivo(
+        db, executivo, tipo, limit=limit, offset=offset, ordenar=ordenar, direcao=direcao
+    )
+    # paginado: total no header (o corpo continua sendo a lista)
+    if limit is not None:
+        response.headers["X-Total-Count"] = str(executivo_crud.contar_por_executivo(db, executivo, tipo))
     return [RegistroExecutivoOut(**r) for r in regs]
 
 
@@ -1,14 +1,24 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query, UploadFile, File, Form
+from fastapi import APIRouter, Depends, HTTPException, Header, status, Query, UploadFile, File, Form
+from sqlalchemy import String, cast
 from sqlalchemy.orm import Session
 from typing import List, Optional, Dict, Any
 from datetime import datetime
 
+from app.core import jobs, xlsx_stream
+from app.core.fast_json import FastJSONResponse, RowSerializer
 from app.database import SessionLocal
-from app.schemas.faturamento import FaturamentoOut, FaturamentoStatusUpdate
+from app.schemas.faturamento import FaturamentoOut, FaturamentoStatusUpdate, PIResumoOut
 from app.crud import faturamento_crud
-from app.deps_auth import require_roles
+from app.deps import get_async_db
+from app.deps_auth import require_roles, require_roles_async
 
-router = APIRouter(prefix="/faturamentos", tags=["faturamentos"])
+router = APIRouter(prefix="/faturamentos", tags=["faturamentos"], default_response_class=FastJSONResponse)
+# rotas async de leitura pesada: auth própria (require_roles_async), sem o auth_dep síncrono do router
+router_leitura = APIRouter(prefix="/faturamentos", tags=["faturamentos"], default_response_class=FastJSONResponse)
+
+# ✅ caminho rápido (orjson + linhas SQL) da listagem
+FAT_ROWS = RowSerializer(FaturamentoOut)
+PI_RESUMO_ROWS = RowSerializer(PIResumoOut)
 
 
 def get_db():
@@ -78,67 +88,102 @@ def _serialize_fat(f, pi=None):
     }
 
 
-@router.get("", response_model=List[FaturamentoOut])
-def listar(
-    db: Session = Depends(get_db),
+@router_leitura.get("", response_model=List[FaturamentoOut])
+async def listar(
+    db=Depends(get_async_db),
+    status_: Optional[str] = Query(default=None, alias="status"),
+    pi_id: Optional[int] = Query(default=None),
+    _user=Depends(require_roles_async("admin", "financeiro", "opec")),
+):
+    # ✅ listagem pesada: thread de leitura (fora do event loop e do threadpool)
+    itens = await db.run_sync(_listar_itens, status_.upper() if status_ else None, pi_id)
+    return FAT_ROWS.response_itens(itens)
+
+
+@router.get("/exportar")
+def exportar_xlsx(
     status_: Optional[str] = Query(default=None, alias="status"),
     pi_id: Optional[int] = Query(default=None),
     _user=Depends(require_roles("admin", "financeiro", "opec")),
 ):
-    regs = faturamento_crud.list_all(
+    stmt = faturamento_crud.export_select(status_.upper() if status_ else None, pi_id)
+    return xlsx_stream.resposta_xlsx("faturamentos", stmt, aba="Faturamentos")
+
+
+def _listar_itens(db: Session, status: Optional[str], pi_id: Optional[int]) -> List[Dict[str, Any]]:
+    rows = faturamento_crud.list_rows(
         db,
-        status=status_.upper() if status_ else None,
+        status=status,
         pi_id=pi_id,
     )
 
-    entrega_ids = [r.entrega_id for r in regs if getattr(r, "entrega_id", None)]
-    pi_by_entrega: Dict[int, Any] = {}
+    # PI resumido de cada faturamento: um SELECT por lote de ids (em vez de ORM completo)
+    pi_by_id: Dict[int, Dict[str, Any]] = {}
+    pi_ids = list({r[-1] for r in rows if r[-1] is not None})
+    if pi_ids:
+        from app.models import PI
 
-    if entrega_ids:
-        from app.models import Entrega, Veiculacao, PI
-
-        rows = (
-            db.query(Entrega.id.label("entrega_id"), PI)
-            .join(Veiculacao, Veiculacao.id == Entrega.veiculacao_id)
-            .join(PI, PI.id == Veiculacao.pi_id)
-            .filter(Entrega.id.in_(entrega_ids))
-            .all()
+        colunas = PI_RESUMO_ROWS.colunas(
+            PI,
+            vencimento=cast(PI.vencimento, String),
+            data_emissao=cast(PI.data_emissao, String),
+        )
+        for i in range(0, len(pi_ids), 500):
+            lote = db.query(*colunas).filter(PI.id.in_(pi_ids[i:i + 500])).all()
+            for d in PI_RESUMO_ROWS.to_dicts(lote):
+                pi_by_id[d["id"]] = d
+
+    anexos_by_fat: Dict[int, List[Dict[str, Any]]] = {}
+    for fat_id, a_id, tipo, filename, path, mime, size, uploaded_at in faturamento_crud.anexos_rows(
+        db, [r[0] for r in rows]
+    ):
+        anexos_by_fat.setdefault(fat_id, []).append(
+            {
+                "id": a_id,
+                "tipo": tipo,
+                "filename": filename,
+                "path": path,
+                "mime": mime,
+                "size": size,
+                "uploaded_at": _iso(uploaded_at),
+            }
         )
 
-        for entrega_id_row, pi_obj in rows:
-            pi_by_entrega[int(entrega_id_row)] = pi_obj
-
-    return [_serialize_fat(x, pi=pi_by_entrega.get(x.entrega_id)) for x in regs]
+    return [
+        {
+            "id": fat_id,
+            "entrega_id": entrega_id,
+            "status": (st or "").upper(),
+            "enviado_em": _iso(enviado_em),
+            "em_faturamento_em": _iso(em_fat),
+            "faturado_em": _iso(faturado_em),
+            "pago_em": _iso(pago_em),
+            "nf_numero": nf_numero,
+            "observacao": observacao,
+            "pi": pi_by_id.get(row_pi_id),
+            "anexos": anexos_by_fat.get(fat_id, []),
+        }
+        for (
+            fat_id, entrega_id, st, enviado_em, em_fat, faturado_em, pago_em, nf_numero, observacao, row_pi_id
+        ) in rows
+    ]
 
 
 @router.post("/gerar", response_model=dict)
 def gerar_por_pi(
     pi_id: int = Query(...),
+    assincrono: bool = Query(False, description="true -> 202 + job (acompanhe em GET /jobs/{id})"),
+    idempotency_key: Optional[str] = Header(default=None),
     db: Session = Depends(get_db),
-    _user=Depends(require_roles("admin", "financeiro", "opec")),
+    user=Depends(require_roles("admin", "financeiro", "opec")),
 ):
-    from app.models import Entrega, Veiculacao
-
-    entregas = (
-        db.query(Entrega)
-        .join(Veiculacao, Veiculacao.id == Entrega.veiculacao_id)
-        .filter(Veiculacao.pi_id == pi_id)
-        .all()
-    )
-
-    created = 0
-    for e in entregas:
-        before = faturamento_crud.get_by_entrega(db, e.id)
-        fat = faturamento_crud.criar_ou_obter(db, e.id)
-        if before is None and fat is not None:
-            created += 1
-
-    return {
-        "ok": True,
-        "pi_id": pi_id,
-        "entregas": len(entregas),
-        "novos_faturamentos": created,
-    }
+    if assincrono:
+        job = jobs.enfileirar(
+            db, "faturamento.gerar", {"pi_id": pi_id},
+            chave=jobs.chave_da_requisicao(idempotency_key, user.id), criado_por=user.id,
+        )
+        return jobs.resposta_aceita(job)
+    return faturamento_crud.gerar_por_pi(db, pi_id)
 
 
 @router.put("/{fat_id}/status", response_model=FaturamentoOut)
@@ -0,0 +1,72 @@
+# app/routes/jobs.py
+"""
+Acompanhamento dos jobs em background (app/core/jobs.py).
+
+GET  /jobs/{id}              -> status + resultado (dono do job ou admin)
+GET  /jobs                   -> lista (admin), filtros status/tipo
+POST /jobs/{id}/reexecutar   -> FALHOU -> PENDENTE (admin)
+
+Rotas que aceitam ?assincrono=true devolvem 202 com {"job_id", "url"};
+o cliente consulta GET /jobs/{id} até status CONCLUIDO (resultado) ou FALHOU (ultimo_erro).
+"""
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.core import jobs
+from app.deps import get_db
+from app.deps_auth import _role_of, get_current_user, require_roles
+from app.models_jobs import Job
+
+router = APIRouter(prefix="/jobs", tags=["jobs"])
+
+
+@router.get("")
+def listar_jobs(
+    status: Optional[str] = Query(None, description="PENDENTE | EXECUTANDO | CONCLUIDO | FALHOU"),
+    tipo: Optional[str] = Query(None, description="ex.: pi.extrair_pdf"),
+    limit: int = Query(50, ge=1, le=500),
+    offset: int = Query(0, ge=0),
+    db: Session = Depends(get_db),
+    _user=Depends(require_roles("admin")),
+):
+    q = db.query(Job)
+    if status:
+        st = status.strip().upper()
+        if st not in jobs.STATUS:
+            raise HTTPException(status_code=422, detail=f"Status inválido. Use: {', '.join(jobs.STATUS)}.")
+        q = q.filter(Job.status == st)
+    if tipo:
+        q = q.filter(Job.tipo == tipo.strip())
+
+    # contagem por status (painel) sem o filtro de status
+    contagem = dict(db.query(Job.status, func.count(Job.id)).group_by(Job.status).all())
+    itens = q.order_by(Job.id.desc()).offset(offset).limit(limit).all()
+    return {
+        "total": q.count(),
+        "por_status": {s: int(contagem.get(s, 0)) for s in jobs.STATUS},
+        "tipos": jobs.tipos_registrados(),
+        "items": [jobs.para_dict(j, com_resultado=False) for j in itens],
+    }
+
+
+@router.get("/{job_id}")
+def obter_job(job_id: int, db: Session = Depends(get_db), user=Depends(get_current_user)):
+    job = db.get(Job, job_id)
+    # job de outro usuário: 404 (não revela que o id existe)
+    if job is None or (_role_of(user) != "admin" and job.criado_por != user.id):
+        raise HTTPException(status_code=404, detail="Job não encontrado.")
+    return jobs.para_dict(job)
+
+
+@router.post("/{job_id}/reexecutar")
+def reexecutar_job(job_id: int, db: Session = Depends(get_db), _user=Depends(require_roles("admin"))):
+    try:
+        job = jobs.reenfileirar(db, job_id)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job não encontrado.")
+    return jobs.para_dict(job, com_resultado=False)
@@ -1,12 +1,19 @@
 # app/routes/me.py
+import base64
+import json
+
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
-from sqlalchemy import func, desc
+from sqlalchemy import func, desc, tuple_
 
-from app.deps import get_db
-from app.deps_auth import get_current_user, require_roles
+from app.deps import get_async_db
+from app.deps_auth import get_current_user_async, require_roles_async
 from app.models import PI, Agencia, Anunciante
+from app.crud.vendas_crud import agrupar_por_cliente, filtros_periodo_venda
 
+# ✅ rotas async: as consultas (síncronas, db.query) e a agregação rodam via
+# db.run_sync numa thread de leitura (fora do event loop e do threadpool)
+# todas as rotas autenticam por conta própria (get_current_user_async/require_roles_async)
 router = APIRouter(prefix="/me", tags=["Me"])
 
 
@@ -29,7 +36,7 @@ def _safe_str(v) -> str:
 
 
 @router.get("")
-def me_basic(user=Depends(get_current_user)):
+async def me_basic(user=Depends(get_current_user_async)):
     """Retorna dados básicos do usuário logado."""
     return {
         "id": user.id,
@@ -40,13 +47,7 @@ def me_basic(user=Depends(get_current_user)):
     }
 
 
-@router.get("/executivo")
-def me_executivo(
-    db: Session = Depends(get_db),
-    user=Depends(require_roles("executivo", "admin")),
-):
-    exec_nome = _get_exec_nome_from_user(user)
-
+def _contar_carteira(db: Session, exec_nome: str) -> tuple[int, int]:
     # carteira (contagem de agencias e anunciantes vinculados ao executivo)
     agencias = (
         db.query(func.count(Agencia.id))
@@ -61,35 +62,41 @@ def me_executivo(
         or 0
     )
 
+    return int(agencias), int(anunciantes)
+
+
+@router.get("/executivo")
+async def me_executivo(
+    db=Depends(get_async_db),
+    user=Depends(require_roles_async("executivo", "admin")),
+):
+    exec_nome = _get_exec_nome_from_user(user)
+    agencias, anunciantes = await db.run_sync(_contar_carteira, exec_nome)
+
     return {
         "executivo": exec_nome,
-        "carteira": {"agencias": int(agencias), "anunciantes": int(anunciantes)},
+        "carteira": {"agencias": agencias, "anunciantes": anunciantes},
         "email": user.email,
         "ativo": True,
     }
 
 
 @router.get("/carteira")
-def me_carteira(
+async def me_carteira(
     mes: int = Query(..., ge=1, le=12),
     ano: int = Query(..., ge=2000, le=2100),
     top_n: int = Query(10, ge=1, le=50),
-    db: Session = Depends(get_db),
-    user=Depends(require_roles("executivo", "admin")),
+    db=Depends(get_async_db),
+    user=Depends(require_roles_async("executivo", "admin")),
 ):
     exec_nome = _get_exec_nome_from_user(user)
+    return await db.run_sync(_carteira_resumo, exec_nome, mes, ano, top_n)
 
-    # Base: PIs do executivo
-    q_base = db.query(PI).filter(PI.executivo == exec_nome)
-
-    # Seu PI.mes_venda é string: filtra por "1".."12"
-    q_base = q_base.filter(PI.mes_venda == str(mes))
-
-    # Ano: usa data_emissao (Date)
-    q_base = q_base.filter(PI.data_emissao.isnot(None))
 
-    # ✅ PostgreSQL: extrai ano (evita strftime do SQLite)
-    q_base = q_base.filter(func.extract("year", PI.data_emissao) == ano)
+def _carteira_resumo(db: Session, exec_nome: str, mes: int, ano: int, top_n: int):
+    # Base: PIs vendidos do executivo no mês (mesma regra do vendas_crud: data_venda)
+    filtros = [PI.executivo == exec_nome] + filtros_periodo_venda(mes, ano)
+    q_base = db.query(PI).filter(*filtros)
 
     total_pis = q_base.count()
     soma_bruto = (
@@ -101,27 +108,17 @@ def me_carteira(
         or 0.0
     )
 
-    top_anunciantes = (
-        q_base.with_entities(
-            PI.nome_anunciante.label("label"),
-            func.coalesce(func.sum(PI.valor_liquido), 0.0).label("valor"),
-        )
-        .group_by(PI.nome_anunciante)
-        .order_by(desc("valor"))
-        .limit(top_n)
-        .all()
-    )
-
-    top_agencias = (
-        q_base.with_entities(
-            PI.nome_agencia.label("label"),
-            func.coalesce(func.sum(PI.valor_liquido), 0.0).label("valor"),
-        )
-        .group_by(PI.nome_agencia)
-        .order_by(desc("valor"))
-        .limit(top_n)
-        .all()
-    )
+    # ✅ ranking por FK (anunciante_id/agencia_id), não pelo nome digitado
+    valor = func.coalesce(PI.valor_liquido, 0.0)
+    top_anunciantes = [
+        (r.nome, r.total)
+        for r in agrupar_por_cliente(db, filtros, valor, tipo="anunciante", top_n=top_n)
+    ]
+    # venda direta (sem agência) não é um "balde" do ranking de agências
+    top_agencias = [
+        (r.nome, r.total)
+        for r in agrupar_por_cliente(db, filtros + [PI.tem_agencia.is_(True)], valor, tipo="agencia", top_n=top_n)
+    ]
 
     pis = q_base.order_by(desc(PI.data_emissao)).limit(200).all()
 
@@ -163,113 +160,134 @@ def me_carteira(
 # ✅ NOVO: Carteira completa do executivo (listas + busca + paginação)
 # ==========================================================
 
-@router.get("/carteira/agencias")
-def me_carteira_agencias(
-    q: str | None = Query(default=None),
-    limit: int = Query(50, ge=1, le=200),
-    offset: int = Query(0, ge=0),
-    db: Session = Depends(get_db),
-    user=Depends(require_roles("executivo", "admin")),
+def _encode_cursor(nome: str, item_id: int) -> str:
+    raw = json.dumps([nome, item_id], ensure_ascii=False).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> tuple[str, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        nome, item_id = json.loads(raw.decode("utf-8"))
+        return str(nome), int(item_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Cursor inválido.")
+
+
+def _carteira_pagina(
+    db: Session,
+    *,
+    exec_nome: str,
+    exec_col,
+    id_col,
+    nome_col,
+    cnpj_col,
+    uf_col,
+    q: str | None,
+    limit: int,
+    offset: int,
+    cursor: str | None,
+    com_total: bool,
 ):
-    exec_nome = _get_exec_nome_from_user(user)
+    """
+    Página da carteira ordenada por (nome, id).
+    - Nome vazio/NULL sai no WHERE (antes da paginação), então as páginas vêm cheias.
+    - Com `cursor` (keyset): WHERE (nome, id) > (último nome, último id) — página
+      profunda custa o mesmo que a primeira (índice executivo, nome, id).
+    - `offset` continua aceito por compatibilidade (ignorado quando há cursor).
+    """
+    filtros = [exec_col == exec_nome, nome_col.isnot(None), func.trim(nome_col) != ""]
+
+    # Busca (case-insensitive) por nome — pg_trgm em lower(nome) no Postgres
+    if q and q.strip():
+        termo = q.strip().lower().replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        filtros.append(func.lower(nome_col).like(f"%{termo}%", escape="\\"))
 
-    base = db.query(Agencia).filter(Agencia.executivo == exec_nome)
+    total = None
+    if com_total:
+        total = int(db.query(func.count(id_col)).filter(*filtros).scalar() or 0)
 
-    # Busca (case-insensitive) por nome
-    if q and q.strip():
-        qq = f"%{q.strip().lower()}%"
-        if hasattr(Agencia, "nome_agencia"):
-            base = base.filter(func.lower(Agencia.nome_agencia).like(qq))
-        elif hasattr(Agencia, "nome"):
-            base = base.filter(func.lower(Agencia.nome).like(qq))
-
-    total = int(base.count() or 0)
-
-    # Ordenação segura (nome > id)
-    if hasattr(Agencia, "nome_agencia"):
-        order_col = Agencia.nome_agencia
-    elif hasattr(Agencia, "nome"):
-        order_col = Agencia.nome
-    else:
-        order_col = Agencia.id
-
-    rows = base.order_by(order_col).offset(offset).limit(limit).all()
-
-    items = []
-    for a in rows:
-        items.append(
-            {
-                "id": _pick(a, "id"),
-                "nome": _safe_str(_pick(a, "nome_agencia", _pick(a, "nome", ""))),
-                "cnpj": _pick(a, "cnpj_agencia", _pick(a, "cnpj", None)),
-                "uf": _pick(a, "uf_agencia", _pick(a, "uf", None)),
-                "executivo": _pick(a, "executivo", exec_nome),
-            }
-        )
+    base = db.query(id_col, nome_col, cnpj_col, uf_col, exec_col).filter(*filtros).order_by(nome_col, id_col)
+    if cursor:
+        ult_nome, ult_id = _decode_cursor(cursor)
+        base = base.filter(tuple_(nome_col, id_col) > tuple_(ult_nome, ult_id))
+    elif offset:
+        base = base.offset(offset)
 
-    # Remove entradas vazias (nome vazio)
-    items = [i for i in items if _safe_str(i.get("nome"))]
+    # 1 a mais para saber se existe próxima página
+    rows = base.limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
 
     return {
         "executivo": exec_nome,
         "total": total,
         "limit": limit,
-        "offset": offset,
-        "items": items,
+        "offset": 0 if cursor else offset,
+        "has_more": has_more,
+        "next_cursor": _encode_cursor(rows[-1][1], rows[-1][0]) if has_more and rows else None,
+        "items": [
+            {
+                "id": r[0],
+                "nome": _safe_str(r[1]),
+                "cnpj": r[2],
+                "uf": r[3],
+                "executivo": r[4] or exec_nome,
+            }
+            for r in rows
+        ],
     }
 
 
-@router.get("/carteira/anunciantes")
-def me_carteira_anunciantes(
+@router.get("/carteira/agencias")
+async def me_carteira_agencias(
     q: str | None = Query(default=None),
     limit: int = Query(50, ge=1, le=200),
     offset: int = Query(0, ge=0),
-    db: Session = Depends(get_db),
-    user=Depends(require_roles("executivo", "admin")),
+    cursor: str | None = Query(default=None, description="next_cursor da página anterior (keyset)"),
+    com_total: bool = Query(True, description="false = não conta o total (mais barato)"),
+    db=Depends(get_async_db),
+    user=Depends(require_roles_async("executivo", "admin")),
 ):
     exec_nome = _get_exec_nome_from_user(user)
+    return await db.run_sync(
+        _carteira_pagina,
+        exec_nome=exec_nome,
+        exec_col=Agencia.executivo,
+        id_col=Agencia.id,
+        nome_col=Agencia.nome_agencia,
+        cnpj_col=Agencia.cnpj_agencia,
+        uf_col=Agencia.uf_agencia,
+        q=q,
+        limit=limit,
+        offset=offset,
+        cursor=cursor,
+        com_total=com_total,
+    )
 
-    base = db.query(Anunciante).filter(Anunciante.executivo == exec_nome)
-
-    # Busca (case-insensitive) por nome
-    if q and q.strip():
-        qq = f"%{q.strip().lower()}%"
-        if hasattr(Anunciante, "nome_anunciante"):
-            base = base.filter(func.lower(Anunciante.nome_anunciante).like(qq))
-        elif hasattr(Anunciante, "nome"):
-            base = base.filter(func.lower(Anunciante.nome).like(qq))
-
-    total = int(base.count() or 0)
-
-    # Ordenação segura (nome > id)
-    if hasattr(Anunciante, "nome_anunciante"):
-        order_col = Anunciante.nome_anunciante
-    elif hasattr(Anunciante, "nome"):
-        order_col = Anunciante.nome
-    else:
-        order_col = Anunciante.id
-
-    rows = base.order_by(order_col).offset(offset).limit(limit).all()
-
-    items = []
-    for x in rows:
-        items.append(
-            {
-                "id": _pick(x, "id"),
-                "nome": _safe_str(_pick(x, "nome_anunciante", _pick(x, "nome", ""))),
-                "cnpj": _pick(x, "cnpj_anunciante", _pick(x, "cnpj", None)),
-                "uf": _pick(x, "uf_cliente", _pick(x, "uf", None)),
-                "executivo": _pick(x, "executivo", exec_nome),
-            }
-        )
-
-    # Remove entradas vazias (nome vazio)
-    items = [i for i in items if _safe_str(i.get("nome"))]
 
-    return {
-        "executivo": exec_nome,
-        "total": total,
-        "limit": limit,
-        "offset": offset,
-        "items": items,
-    }
+@router.get("/carteira/anunciantes")
+async def me_carteira_anunciantes(
+    q: str | None = Query(default=None),
+    limit: int = Query(50, ge=1, le=200),
+    offset: int = Query(0, ge=0),
+    cursor: str | None = Query(default=None, description="next_cursor da página anterior (keyset)"),
+    com_total: bool = Query(True, description="false = não conta o total (mais barato)"),
+    db=Depends(get_async_db),
+    user=Depends(require_roles_async("executivo", "admin")),
+):
+    exec_nome = _get_exec_nome_from_user(user)
+    return await db.run_sync(
+        _carteira_pagina,
+        exec_nome=exec_nome,
+        exec_col=Anunciante.executivo,
+        id_col=Anunciante.id,
+        nome_col=Anunciante.nome_anunciante,
+        cnpj_col=Anunciante.cnpj_anunciante,
+        uf_col=Anunciante.uf_cliente,
+        q=q,
+        limit=limit,
+        offset=offset,
+        cursor=cursor,
+        com_total=com_total,
+    )
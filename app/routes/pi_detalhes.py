@@ -1,13 +1,15 @@
 # app/routes/pi_detalhes.py
 from __future__ import annotations
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from sqlalchemy.orm import Session
 
 from app.deps import get_db
 from app.deps_auth import get_current_user
 
+from app.core.versionamento import cabecalhos, etag, ler_versao, resposta_condicional
 from app.crud.pi_detalhes_crud import obter_detalhes_por_pi_id
+from app.models import PI
 from app.schemas.pi_detalhes import PIDetalhesOut
 
 router = APIRouter(tags=["PIs"])
@@ -16,11 +18,24 @@ router = APIRouter(tags=["PIs"])
 @router.get("/pis/{pi_id}/detalhes", response_model=PIDetalhesOut)
 def detalhes_pi(
     pi_id: int,
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
     _user=Depends(get_current_user),
 ):
+    # ✅ versão do PI muda com qualquer veiculação/entrega/faturamento dele:
+    # cliente com o ETag atual recebe 304 depois de 1 lookup por PK
+    ver = ler_versao(db, PI, PI.id == pi_id)
+    if not ver:
+        raise HTTPException(status_code=404, detail="PI não encontrado.")
+    tag = etag("pi-detalhes", ver.id, ver.versao)
+    nao_mudou = resposta_condicional(request, tag, ver.atualizado_em)
+    if nao_mudou:
+        return nao_mudou
+
     try:
         payload = obter_detalhes_por_pi_id(db, pi_id)
+        response.headers.update(cabecalhos(tag, ver.atualizado_em))
         return payload
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
@@ -3,15 +3,14 @@ from __future__ import annotations
 import io
 import json
 import os
-import shutil
-import tempfile
+from datetime import date
 from pathlib import Path
 from typing import List, Optional, Dict, Any, Literal
-from uuid import uuid4
 
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form, Query
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form, Header, Query, Request, Response
 from fastapi.responses import JSONResponse, FileResponse, RedirectResponse, StreamingResponse
 from pydantic import BaseModel
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 
 from app.schemas.pi import (
@@ -26,15 +25,28 @@ from app.schemas.pi import (
     VeiculacaoAgendaOut,
 )
 from app.crud import pi_crud
+from app.core.fast_json import FastJSONResponse, RowSerializer
+from app.core import jobs, ref_cache, tarefas, xlsx_stream
+from app.core.versionamento import (
+    ConflitoDeVersao,
+    cabecalhos,
+    etag,
+    ler_versao,
+    resposta_condicional,
+    versao_if_match,
+)
 from app.database import SessionLocal
-from app.utils.pi_pdf import extract_structured_fields_from_pdf
+from app.deps_auth import get_current_user
+from app.models import PI
 from app.utils.drive_upload import (
-    upload_pdf_to_drive,
     get_drive_file_meta,
     download_drive_file_bytes,
 )
 
-router = APIRouter(prefix="/pis", tags=["pis"])
+router = APIRouter(prefix="/pis", tags=["pis"], default_response_class=FastJSONResponse)
+
+# ✅ caminho rápido (orjson + linhas SQL) da listagem completa
+PI_ROWS = RowSerializer(PIOut)
 
 # -------- uploads base dir (usado para temporários/extrator e fallback local) --------
 UPLOAD_ROOT = Path(os.getenv("PI_UPLOAD_DIR", "uploads")) / "pis"
@@ -49,21 +61,6 @@ def get_db():
     finally:
         db.close()
 
-def _save_upload_to_temp(upload: UploadFile, expected_ext: str = ".pdf") -> Path:
-    suffix = expected_ext if expected_ext.startswith(".") else f".{expected_ext}"
-    tmp_dir = Path(tempfile.gettempdir())
-    tmp_path = tmp_dir / f"{uuid4().hex}{suffix}"
-
-    with open(tmp_path, "wb") as f:
-        shutil.copyfileobj(upload.file, f)
-
-    try:
-        upload.file.seek(0)
-    except Exception:
-        pass
-
-    return tmp_path
-
 # --------------------- helpers desta rota ---------------------
 
 def _best_valor(v) -> Optional[float]:
@@ -123,9 +120,6 @@ def _tipo_norm_to_db(tipo_query: str) -> str:
         raise HTTPException(status_code=400, detail="Parâmetro 'tipo' deve ser 'pi' ou 'proposta'.")
     return tipo_bd
 
-def _which_from_tipo_db(tipo_db: str) -> Literal["pi", "proposta"]:
-    return "pi" if (tipo_db or "").startswith("pi") else "proposta"
-
 def _get_latest_anexo(db: Session, pi_id: int, tipo_query: str):
     tipo_bd = _tipo_norm_to_db(tipo_query)
     anexos = pi_crud.anexos_list(db, pi_id)  # ordenado por uploaded_at desc
@@ -137,28 +131,36 @@ def _get_latest_anexo(db: Session, pi_id: int, tipo_query: str):
 # --------------------- endpoints ---------------------
 
 @router.get("/matriz/ativos", response_model=List[PISimpleOut])
-def listar_matriz_ativos(db: Session = Depends(get_db)):
-    regs = pi_crud.list_matriz_ativos(db)
-    return [
-        PISimpleOut(
-            numero_pi=r.numero_pi,
-            nome_anunciante=getattr(r, "nome_anunciante", None),
-            nome_campanha=r.nome_campanha
-        )
-        for r in regs
-    ]
+def listar_matriz_ativos(request: Request, db: Session = Depends(get_db)):
+    return ref_cache.responder(
+        request,
+        "pis_ativos",
+        lambda: [
+            PISimpleOut(
+                numero_pi=r.numero_pi,
+                nome_anunciante=getattr(r, "nome_anunciante", None),
+                nome_campanha=r.nome_campanha
+            ).model_dump(mode="json")
+            for r in pi_crud.list_matriz_ativos(db)
+        ],
+        chave="matriz",
+    )
 
 @router.get("/normal/ativos", response_model=List[PISimpleOut])
-def listar_normal_ativos(db: Session = Depends(get_db)):
-    regs = pi_crud.list_normal_ativos(db)
-    return [
-        PISimpleOut(
-            numero_pi=r.numero_pi,
-            nome_anunciante=getattr(r, "nome_anunciante", None),
-            nome_campanha=r.nome_campanha
-        )
-        for r in regs
-    ]
+def listar_normal_ativos(request: Request, db: Session = Depends(get_db)):
+    return ref_cache.responder(
+        request,
+        "pis_ativos",
+        lambda: [
+            PISimpleOut(
+                numero_pi=r.numero_pi,
+                nome_anunciante=getattr(r, "nome_anunciante", None),
+                nome_campanha=r.nome_campanha
+            ).model_dump(mode="json")
+            for r in pi_crud.list_normal_ativos(db)
+        ],
+        chave="normal",
+    )
 
 @router.get("/{numero_pi}/saldo")
 def saldo_matriz(numero_pi: str, db: Session = Depends(get_db)):
@@ -167,13 +169,31 @@ def saldo_matriz(numero_pi: str, db: Session = Depends(get_db)):
 
 @router.get("", response_model=List[PIOut])
 def listar_todos(db: Session = Depends(get_db)):
-    return pi_crud.list_all(db)
+    colunas = PI_ROWS.colunas(PI, tem_agencia=func.coalesce(PI.tem_agencia, False))
+    return PI_ROWS.response(pi_crud.list_all_rows(db, colunas))
+
+@router.get("/exportar")
+def exportar_xlsx(
+    inicio: Optional[date] = Query(None, description="data_venda a partir de (YYYY-MM-DD)"),
+    fim: Optional[date] = Query(None, description="data_venda até (YYYY-MM-DD)"),
+    executivo: Optional[str] = None,
+    diretoria: Optional[str] = None,
+    tipo_pi: Optional[str] = None,
+):
+    # streaming: as linhas saem do banco em lotes direto para o download
+    stmt = pi_crud.export_select(inicio=inicio, fim=fim, executivo=executivo, diretoria=diretoria, tipo_pi=tipo_pi)
+    return xlsx_stream.resposta_xlsx("pis", stmt, aba="PIs")
 
 @router.get("/{pi_id:int}", response_model=PIOut)
-def obter_por_id(pi_id: int, db: Session = Depends(get_db)):
-    reg = pi_crud.get_by_id(db, pi_id)
+def obter_por_id(pi_id: int, request: Request, response: Response, db: Session = Depends(get_db)):
+    reg = pi_crud.get_by_id(db, pi_id)  # a linha já é 1 lookup por PK: o ETag sai dela
     if not reg:
         raise HTTPException(status_code=404, detail="PI não encontrado.")
+    tag = etag("pi", reg.id, reg.versao)
+    nao_mudou = resposta_condicional(request, tag, reg.atualizado_em)
+    if nao_mudou:
+        return nao_mudou
+    response.headers.update(cabecalhos(tag, reg.atualizado_em))
     return reg
 
 @router.get("/numero/{numero_pi}", response_model=PIOut)
@@ -192,12 +212,22 @@ def criar_pi(body: PICreate, db: Session = Depends(get_db)):
         raise HTTPException(status_code=422, detail=str(e))
 
 @router.put("/{pi_id:int}", response_model=PIOut)
-def atualizar_pi(pi_id: int, body: PIUpdate, db: Session = Depends(get_db)):
+def atualizar_pi(
+    pi_id: int,
+    body: PIUpdate,
+    response: Response,
+    if_match: Optional[str] = Header(default=None),
+    db: Session = Depends(get_db),
+):
+    # If-Match (ETag do GET): só grava se ninguém salvou o PI nesse meio-tempo
     try:
-        upd = pi_crud.update(db, pi_id, body.model_dump(exclude_unset=True))
-        return upd
+        upd = pi_crud.update(db, pi_id, body.model_dump(exclude_unset=True), versao=versao_if_match(if_match))
+    except ConflitoDeVersao as e:
+        raise HTTPException(status_code=412, detail=str(e))
     except ValueError as e:
         raise HTTPException(status_code=422, detail=str(e))
+    response.headers.update(cabecalhos(etag("pi", upd.id, upd.versao), upd.atualizado_em))
+    return upd
 
 @router.delete("/{pi_id:int}")
 def deletar_pi(pi_id: int, db: Session = Depends(get_db)):
@@ -209,19 +239,32 @@ def deletar_pi(pi_id: int, db: Session = Depends(get_db)):
 
 # ---------- detalhe ----------
 
-@router.get("/{pi_id:int}/detalhe", response_model=PiDetalheOut)
-def obter_detalhe_por_id(pi_id: int, db: Session = Depends(get_db)):
-    reg = pi_crud.get_with_relations_by_id(db, pi_id)
+def _detalhe_condicional(db: Session, request: Request, response: Response, criterio, carregar):
+    # PI já em cache no cliente: 1 lookup indexado (versão) e 304, sem montar o detalhe
+    ver = ler_versao(db, PI, criterio)
+    if not ver:
+        raise HTTPException(status_code=404, detail="PI não encontrado.")
+    tag = etag("pi-detalhe", ver.id, ver.versao)
+    nao_mudou = resposta_condicional(request, tag, ver.atualizado_em)
+    if nao_mudou:
+        return nao_mudou
+    reg = carregar()
     if not reg:
         raise HTTPException(status_code=404, detail="PI não encontrado.")
+    response.headers.update(cabecalhos(tag, ver.atualizado_em))
     return _to_detalhe(reg)
 
+@router.get("/{pi_id:int}/detalhe", response_model=PiDetalheOut)
+def obter_detalhe_por_id(pi_id: int, request: Request, response: Response, db: Session = Depends(get_db)):
+    return _detalhe_condicional(
+        db, request, response, PI.id == pi_id, lambda: pi_crud.get_with_relations_by_id(db, pi_id)
+    )
+
 @router.get("/numero/{numero_pi}/detalhe", response_model=PiDetalheOut)
-def obter_detalhe_por_numero(numero_pi: str, db: Session = Depends(get_db)):
-    reg = pi_crud.get_with_relations_by_numero(db, numero_pi)
-    if not reg:
-        raise HTTPException(status_code=404, detail="PI não encontrado.")
-    return _to_detalhe(reg)
+def obter_detalhe_por_numero(numero_pi: str, request: Request, response: Response, db: Session = Depends(get_db)):
+    return _detalhe_condicional(
+        db, request, response, PI.numero_pi == numero_pi, lambda: pi_crud.get_with_relations_by_numero(db, numero_pi)
+    )
 
 # ---------- compose & sync ----------
 
@@ -244,86 +287,80 @@ class ProdutosSyncIn(BaseModel):
     produtos: List[ProdutoIn] = []
 
 @router.put("/{pi_id:int}/produtos/sync", response_model=PiDetalheOut)
-def sync_produtos(pi_id: int, body: ProdutosSyncIn, db: Session = Depends(get_db)):
+def sync_produtos(
+    pi_id: int,
+    body: ProdutosSyncIn,
+    response: Response,
+    if_match: Optional[str] = Header(default=None),
+    db: Session = Depends(get_db),
+):
     try:
         payload_produtos = _map_produtos_para_crud(body.produtos)
-        pi = pi_crud.sync_produtos(db, pi_id, payload_produtos)
+        pi = pi_crud.sync_produtos(db, pi_id, payload_produtos, versao=versao_if_match(if_match))
         full = pi_crud.get_with_relations_by_id(db, pi.id)
-        return _to_detalhe(full)
+    except ConflitoDeVersao as e:
+        raise HTTPException(status_code=412, detail=str(e))
     except ValueError as e:
         raise HTTPException(status_code=422, detail=str(e))
+    response.headers.update(cabecalhos(etag("pi-detalhe", full.id, full.versao), full.atualizado_em))
+    return _to_detalhe(full)
 
 # ---------- importação / extração de PDF ----------
 
+def _ler_pdf(upload: UploadFile) -> bytes:
+    if not (upload.filename or "").lower().endswith(".pdf"):
+        raise HTTPException(status_code=400, detail="Envie um arquivo PDF.")
+    return upload.file.read()
+
 @router.post("/extrair-pdf")
-async def extrair_pdf_para_preenchimento(
+def extrair_pdf_para_preenchimento(
     arquivo_pdf: UploadFile = File(..., description="PDF do PI"),
+    assincrono: bool = Query(False, description="true -> 202 + job (acompanhe em GET /jobs/{id})"),
+    idempotency_key: Optional[str] = Header(default=None),
+    db: Session = Depends(get_db),
+    user=Depends(get_current_user),
 ):
-    if not (arquivo_pdf.filename or "").lower().endswith(".pdf"):
-        raise HTTPException(status_code=400, detail="Envie um arquivo PDF.")
-
-    tmp_path = _save_upload_to_temp(arquivo_pdf, ".pdf")
+    conteudo = _ler_pdf(arquivo_pdf)
+    if assincrono:
+        job = jobs.enfileirar(
+            db, "pi.extrair_pdf", {"filename": arquivo_pdf.filename}, arquivo=conteudo,
+            chave=jobs.chave_da_requisicao(idempotency_key, user.id), criado_por=user.id,
+        )
+        return jobs.resposta_aceita(job)
     try:
-        parsed = extract_structured_fields_from_pdf(str(tmp_path))
-        return {
-            "numero_pi": parsed.get("numero_pi"),
-            "tipo_pi": parsed.get("tipo_pi"),
-            "nome_anunciante": parsed.get("nome_anunciante"),
-            "razao_social_anunciante": parsed.get("razao_social_anunciante"),
-            "cnpj_anunciante": parsed.get("cnpj_anunciante"),
-            "nome_agencia": parsed.get("nome_agencia"),
-            "razao_social_agencia": parsed.get("razao_social_agencia"),
-            "cnpj_agencia": parsed.get("cnpj_agencia"),
-            "nome_campanha": parsed.get("nome_campanha"),
-            "canal": parsed.get("canal"),
-            "executivo": parsed.get("executivo"),
-            "vencimento": parsed.get("vencimento"),
-            "data_emissao": parsed.get("data_emissao"),
-            "valor_bruto": parsed.get("valor_bruto"),
-            "valor_liquido": parsed.get("valor_liquido"),
-            "observacoes": parsed.get("observacoes"),
-            "mes_ref": parsed.get("mes_ref"),
-            "produtos": parsed.get("produtos") or [],
-        }
-    finally:
-        try:
-            tmp_path.unlink(missing_ok=True)
-        except Exception:
-            pass
+        return tarefas.extrair_campos_pdf(conteudo)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
 
 @router.post("/importar", response_model=PIOut, status_code=status.HTTP_201_CREATED)
-async def importar_pi(
+def importar_pi(
     arquivo_pdf: UploadFile = File(..., description="PDF do PI"),
     pi_json: Optional[str] = Form(None, description="JSON opcional com campos de PICreate para sobrescrever"),
+    assincrono: bool = Query(False, description="true -> 202 + job (resultado: pi_id)"),
+    idempotency_key: Optional[str] = Header(default=None),
     db: Session = Depends(get_db),
+    user=Depends(get_current_user),
 ):
-    if not (arquivo_pdf.filename or "").lower().endswith(".pdf"):
-        raise HTTPException(status_code=400, detail="Envie um arquivo PDF.")
-
-    tmp_path = _save_upload_to_temp(arquivo_pdf, ".pdf")
-    try:
-        parsed = extract_structured_fields_from_pdf(str(tmp_path))
-
-        overrides: Dict[str, Any] = {}
-        if pi_json:
-            try:
-                overrides = json.loads(pi_json) or {}
-            except Exception as e:
-                raise HTTPException(status_code=400, detail=f"pi_json inválido: {e}")
-
-        payload = {**parsed, **overrides}
+    conteudo = _ler_pdf(arquivo_pdf)
 
+    overrides: Dict[str, Any] = {}
+    if pi_json:
         try:
-            data = PICreate.model_validate(payload)
+            overrides = json.loads(pi_json) or {}
         except Exception as e:
-            raise HTTPException(status_code=422, detail=f"Payload inválido: {e}")
+            raise HTTPException(status_code=400, detail=f"pi_json inválido: {e}")
 
-        return pi_crud.create(db, data.model_dump())
-    finally:
-        try:
-            tmp_path.unlink(missing_ok=True)
-        except Exception:
-            pass
+    if assincrono:
+        job = jobs.enfileirar(
+            db, "pi.importar_pdf", {"filename": arquivo_pdf.filename, "overrides": overrides}, arquivo=conteudo,
+            chave=jobs.chave_da_requisicao(idempotency_key, user.id), criado_por=user.id,
+        )
+        return jobs.resposta_aceita(job)
+
+    try:
+        return tarefas.importar_pdf(db, conteudo, overrides)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
 
 # ---------- lista de veiculações ----------
 
@@ -351,11 +388,14 @@ def listar_arquivos(pi_id: int, db: Session = Depends(get_db)):
     ]
 
 @router.post("/{pi_id:int}/arquivos")
-async def subir_arquivos(
+def subir_arquivos(
     pi_id: int,
     arquivo_pi: UploadFile | None = File(None, description="PDF do PI"),
     proposta: UploadFile | None = File(None, description="PDF da Proposta"),
+    assincrono: bool = Query(False, description="true -> 202 + 1 job por arquivo (upload no Drive em background)"),
+    idempotency_key: Optional[str] = Header(default=None),
     db: Session = Depends(get_db),
+    user=Depends(get_current_user),
 ):
     """
     Envia anexos para o Google Drive usando a credencial/pasta correspondente:
@@ -366,46 +406,44 @@ async def subir_arquivos(
     if arquivo_pi is None and proposta is None:
         raise HTTPException(status_code=400, detail="Envie ao menos um arquivo (arquivo_pi ou proposta).")
 
-    saved: List[Dict[str, Any]] = []
-
-    async def _save_one(up: UploadFile, tipo_db: str):
+    envios = []
+    for up, tipo_db in ((arquivo_pi, "pi_pdf"), (proposta, "proposta_pdf")):
+        if up is None:
+            continue
         if not (up.filename or "").lower().endswith(".pdf"):
             raise HTTPException(status_code=400, detail=f"O arquivo '{up.filename}' precisa ser PDF.")
-
-        which = _which_from_tipo_db(tipo_db)  # "pi" | "proposta"
-        content = await up.read()
-        safe_name = f"{tipo_db}-{uuid4().hex}.pdf"
-
-        drive_file = upload_pdf_to_drive(content, safe_name, which=which)
-
-        reg = pi_crud.anexos_add(
-            db,
-            pi_id,
-            tipo=tipo_db,
-            filename=up.filename or safe_name,
-            path=f"gdrive://{drive_file['id']}",
-            mime=drive_file.get("mimeType") or up.content_type,
-            size=len(content),
-        )
-
-        saved.append(
-            {
-                "id": reg.id,
-                "tipo": reg.tipo,
-                "filename": reg.filename,
-                "path": reg.path,
-                "mime": reg.mime,
-                "size": reg.size,
-                "uploaded_at": reg.uploaded_at,
-                "webViewLink": drive_file.get("webViewLink"),
-                "webContentLink": drive_file.get("webContentLink"),
-            }
+        envios.append((up, tipo_db, up.file.read()))
+
+    if assincrono:
+        if pi_crud.get_by_id(db, pi_id) is None:
+            raise HTTPException(status_code=404, detail="PI não encontrado.")
+        chave = jobs.chave_da_requisicao(idempotency_key, user.id)
+        criados = [
+            jobs.enfileirar(
+                db,
+                "pi.anexo_drive",
+                {"pi_id": pi_id, "tipo": tipo_db, "filename": up.filename, "content_type": up.content_type},
+                arquivo=conteudo,
+                chave=f"{chave}:{tipo_db}" if chave else None,
+                criado_por=user.id,
+            )
+            for up, tipo_db, conteudo in envios
+        ]
+        return JSONResponse(
+            status_code=status.HTTP_202_ACCEPTED,
+            content={"jobs": [{"job_id": j.id, "tipo": j.tipo, "status": j.status, "url": f"/jobs/{j.id}"} for j in criados]},
         )
 
-    if arquivo_pi is not None:
-        await _save_one(arquivo_pi, "pi_pdf")
-    if proposta is not None:
-        await _save_one(proposta, "proposta_pdf")
+    saved: List[Dict[str, Any]] = []
+    for up, tipo_db, conteudo in envios:
+        try:
+            saved.append(
+                tarefas.anexar_pdf_no_drive(
+                    db, pi_id, conteudo, tipo_db=tipo_db, filename=up.filename, content_type=up.content_type
+                )
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=404, detail=str(e))
 
     return {"uploaded": saved}
 
@@ -428,7 +466,7 @@ def listar_anexos_alias(pi_id: int, db: Session = Depends(get_db)):
     ]
 
 @router.post("/{pi_id:int}/anexos")
-async def subir_anexos_alias(
+def subir_anexos_alias(
     pi_id: int,
     arquivo: UploadFile | None = File(None, description="PDF"),
     tipo: Optional[str] = Form(default="pi_pdf"),
@@ -452,44 +490,17 @@ async def subir_anexos_alias(
     else:
         raise HTTPException(status_code=400, detail="tipo deve ser 'pi'|'pi_pdf' ou 'proposta'|'proposta_pdf'.")
 
-    async def _save(up: UploadFile):
+    for up in ([arquivo] if arquivo is not None else []) + list(files or []):
         if not (up.filename or "").lower().endswith(".pdf"):
             raise HTTPException(status_code=400, detail=f"O arquivo '{up.filename}' precisa ser PDF.")
-
-        which = _which_from_tipo_db(tipo_db)  # "pi" | "proposta"
-        content = await up.read()
-        safe_name = f"{tipo_db}-{uuid4().hex}.pdf"
-
-        drive_file = upload_pdf_to_drive(content, safe_name, which=which)
-
-        reg = pi_crud.anexos_add(
-            db,
-            pi_id,
-            tipo=tipo_db,
-            filename=up.filename or safe_name,
-            path=f"gdrive://{drive_file['id']}",
-            mime=drive_file.get("mimeType") or up.content_type,
-            size=len(content),
-        )
-        uploads.append(
-            {
-                "id": reg.id,
-                "tipo": reg.tipo,
-                "filename": reg.filename,
-                "path": reg.path,
-                "mime": reg.mime,
-                "size": reg.size,
-                "uploaded_at": reg.uploaded_at,
-                "webViewLink": drive_file.get("webViewLink"),
-                "webContentLink": drive_file.get("webContentLink"),
-            }
-        )
-
-    if arquivo is not None:
-        await _save(arquivo)
-    if files:
-        for up in files:
-            await _save(up)
+        try:
+            uploads.append(
+                tarefas.anexar_pdf_no_drive(
+                    db, pi_id, up.file.read(), tipo_db=tipo_db, filename=up.filename, content_type=up.content_type
+                )
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=404, detail=str(e))
 
     return {"uploaded": uploads}
 
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request
 from sqlalchemy.orm import Session
 from typing import List, Optional
 import math
@@ -6,6 +6,7 @@ import math
 from app.database import SessionLocal
 from app.schemas.produto import ProdutoCreate, ProdutoUpdate, ProdutoOut
 from app.crud import produto_crud
+from app.core import ref_cache
 from app.deps_auth import require_roles
 
 router = APIRouter(prefix="/produtos", tags=["produtos"])
@@ -40,17 +41,25 @@ def _sanitize_produto(p):
 # =========================
 @router.get("", response_model=List[ProdutoOut])
 def listar_produtos(
+    request: Request,
     termo: Optional[str] = Query(None, description="Filtro por nome (ilike)"),
     db: Session = Depends(get_db),
     _user=Depends(require_roles("executivo", "opec", "admin")),
 ):
     if termo:
         rows = produto_crud.list_by_name(db, termo)
-    else:
-        rows = produto_crud.list_all(db)
-
-    # ✅ sanitiza NaN -> None
-    return [_sanitize_produto(p) for p in rows]
+        # ✅ sanitiza NaN -> None
+        return [_sanitize_produto(p) for p in rows]
+
+    # ✅ lista completa: cache por versão + ETag (invalidado no create/update/delete)
+    return ref_cache.responder(
+        request,
+        "produtos",
+        lambda: [
+            ProdutoOut.model_validate(_sanitize_produto(p)).model_dump(mode="json")
+            for p in produto_crud.list_all(db)
+        ],
+    )
 
 
 @router.get("/{produto_id:int}", response_model=ProdutoOut)
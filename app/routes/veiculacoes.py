@@ -1,20 +1,32 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, Header, HTTPException, status, Query, Request, Response
+from sqlalchemy import func, null
 from sqlalchemy.orm import Session, joinedload
 from datetime import date, datetime
 from typing import List, Optional, Dict, Any
 
+from app.core import xlsx_stream
+from app.core.fast_json import FastJSONResponse, RowSerializer, fast_response
+from app.core.versionamento import ConflitoDeVersao, cabecalhos, etag, resposta_condicional, versao_if_match
 from app.database import SessionLocal
+from app.deps import get_async_db
+from app.deps_auth import require_roles_async
 from app.schemas.veiculacao import (
     VeiculacaoCreate,
     VeiculacaoUpdate,
     VeiculacaoOut,
     VeiculacaoAgendaOut,
     VeiculacaoCreateIn,
+    VeiculacaoLoteIn,
 )
 from app.crud import veiculacao_crud
 from app.models import Veiculacao, Produto, PI
 
-router = APIRouter(prefix="/veiculacoes", tags=["veiculacoes"])
+router = APIRouter(prefix="/veiculacoes", tags=["veiculacoes"], default_response_class=FastJSONResponse)
+# rotas async de leitura pesada: auth própria (require_roles_async), sem o auth_dep síncrono do router
+router_leitura = APIRouter(prefix="/veiculacoes", tags=["veiculacoes"], default_response_class=FastJSONResponse)
+
+# ✅ caminho rápido (orjson + linhas SQL) da listagem completa
+VEIC_ROWS = RowSerializer(VeiculacaoOut)
 
 
 def get_db():
@@ -71,9 +83,10 @@ def _today_between(s: Optional[str], f: Optional[str]) -> bool:
     return True
 
 
-def _to_out(v: Veiculacao) -> VeiculacaoOut:
-    prod = getattr(v, "produto", None)
-    pi = getattr(v, "pi", None)
+def _to_out(v: Veiculacao, prod: Optional[Produto] = None, pi: Optional[PI] = None) -> VeiculacaoOut:
+    # prod/pi explícitos: linha do RETURNING (sem relationships) em /lote
+    prod = prod if prod is not None else getattr(v, "produto", None)
+    pi = pi if pi is not None else getattr(v, "pi", None)
 
     # ✅ canal vem do PI (veiculação não tem canal/formato)
     effective_canal = getattr(pi, "canal", None)
@@ -113,6 +126,7 @@ def _to_out(v: Veiculacao) -> VeiculacaoOut:
         "diretoria": getattr(pi, "diretoria", None),
         "uf_cliente": uf_cliente,
         "em_veiculacao": _today_between(v.data_inicio, v.data_fim),
+        "versao": v.versao,
     }
     return VeiculacaoOut(**data)
 
@@ -120,8 +134,45 @@ def _to_out(v: Veiculacao) -> VeiculacaoOut:
 # ---------- CRUD ----------
 @router.get("", response_model=List[VeiculacaoOut])
 def listar_todas(db: Session = Depends(get_db)):
-    rows = veiculacao_crud.list_all(db)
-    return [_to_out(r) for r in rows]
+    itens = VEIC_ROWS.to_dicts(veiculacao_crud.list_all_rows(db, _colunas_listagem()))
+    for it in itens:
+        it["em_veiculacao"] = _today_between(it["data_inicio"], it["data_fim"])
+    return fast_response(itens)
+
+
+def _colunas_listagem():
+    # mesmos campos resolvidos de _to_out, direto no SELECT
+    return VEIC_ROWS.colunas(
+        Veiculacao,
+        valor=func.coalesce(Veiculacao.valor_liquido, Veiculacao.valor_bruto),
+        produto_nome=Produto.nome,
+        numero_pi=PI.numero_pi,
+        cliente=veiculacao_crud.primeiro_nao_vazio(PI.nome_anunciante, PI.razao_social_anunciante),
+        campanha=veiculacao_crud.primeiro_nao_vazio(PI.nome_campanha),
+        canal=PI.canal,
+        executivo=PI.executivo,
+        diretoria=PI.diretoria,
+        uf_cliente=veiculacao_crud.primeiro_nao_vazio(PI.uf_cliente),
+        em_veiculacao=null(),
+    )
+
+
+@router.get("/exportar")
+def exportar_xlsx(
+    inicio: Optional[str] = Query(None, description="YYYY-MM-DD ou dd/mm/aaaa (mesma janela da agenda)"),
+    fim: Optional[str] = Query(None, description="YYYY-MM-DD ou dd/mm/aaaa"),
+    canal: Optional[str] = None,
+    executivo: Optional[str] = None,
+    diretoria: Optional[str] = None,
+    uf_cliente: Optional[str] = None,
+):
+    # mesmas colunas resolvidas da listagem (sem em_veiculacao, que depende do dia)
+    colunas = [c for c in _colunas_listagem() if c.key != "em_veiculacao"]
+    stmt = veiculacao_crud.export_select(
+        colunas, canal=canal, executivo=executivo, diretoria=diretoria, uf_cliente=uf_cliente
+    )
+    filtro = veiculacao_crud.em_janela(_parse_date(inicio), _parse_date(fim))
+    return xlsx_stream.resposta_xlsx("veiculacoes", stmt, filtro=filtro, aba="Veiculações")
 
 
 @router.get("/por-pi/{pi_id:int}", response_model=List[VeiculacaoOut])
@@ -137,10 +188,15 @@ def listar_por_produto(produto_id: int, db: Session = Depends(get_db)):
 
 
 @router.get("/{veic_id:int}", response_model=VeiculacaoOut)
-def obter(veic_id: int, db: Session = Depends(get_db)):
+def obter(veic_id: int, request: Request, response: Response, db: Session = Depends(get_db)):
     v = veiculacao_crud.get_by_id(db, veic_id)
     if not v:
         raise HTTPException(status_code=404, detail="Veiculação não encontrada.")
+    tag = etag("veiculacao", v.id, v.versao)
+    nao_mudou = resposta_condicional(request, tag, v.atualizado_em)
+    if nao_mudou:
+        return nao_mudou
+    response.headers.update(cabecalhos(tag, v.atualizado_em))
     return _to_out(v)
 
 
@@ -190,19 +246,42 @@ def criar(body: VeiculacaoCreateIn, db: Session = Depends(get_db)):
         raise HTTPException(status_code=422, detail=str(e))
 
 
+@router.post("/lote", response_model=List[VeiculacaoOut], status_code=status.HTTP_201_CREATED)
+def criar_lote(body: VeiculacaoLoteIn, db: Session = Depends(get_db)):
+    """
+    Várias veiculações (um ou vários PIs) numa requisição, tudo ou nada.
+    Cada item aceita os mesmos campos do POST /veiculacoes; qualquer linha
+    inválida -> 422 com os erros de todas as linhas.
+    """
+    try:
+        criadas = veiculacao_crud.create_lote(db, [it.model_dump() for it in body.veiculacoes])
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    return [_to_out(v, prod, pi) for v, prod, pi in criadas]
+
+
 @router.put("/{veic_id:int}", response_model=VeiculacaoOut)
-def atualizar(veic_id: int, body: VeiculacaoUpdate, db: Session = Depends(get_db)):
+def atualizar(
+    veic_id: int,
+    body: VeiculacaoUpdate,
+    response: Response,
+    if_match: Optional[str] = Header(default=None),
+    db: Session = Depends(get_db),
+):
     try:
-        v = veiculacao_crud.update(db, veic_id, body.model_dump(exclude_unset=True))
+        v = veiculacao_crud.update(db, veic_id, body.model_dump(exclude_unset=True), versao=versao_if_match(if_match))
         v = (
             db.query(Veiculacao)
             .options(joinedload(Veiculacao.produto), joinedload(Veiculacao.pi))
             .filter(Veiculacao.id == v.id)
             .first()
         )
-        return _to_out(v)
+    except ConflitoDeVersao as e:
+        raise HTTPException(status_code=412, detail=str(e))
     except ValueError as e:
         raise HTTPException(status_code=422, detail=str(e))
+    response.headers.update(cabecalhos(etag("veiculacao", v.id, v.versao), v.atualizado_em))
+    return _to_out(v)
 
 
 @router.delete("/{veic_id:int}")
@@ -214,22 +293,24 @@ def deletar(veic_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=422, detail=str(e))
 
 
-@router.get("/agenda", response_model=List[VeiculacaoAgendaOut])
-def listar_agenda(
+@router_leitura.get("/agenda", response_model=List[VeiculacaoAgendaOut])
+async def listar_agenda(
     inicio: Optional[str] = Query(None, description="YYYY-MM-DD ou dd/mm/aaaa; default: hoje"),
     fim: Optional[str] = Query(None, description="YYYY-MM-DD ou dd/mm/aaaa; default: hoje"),
     canal: Optional[str] = None,
     executivo: Optional[str] = None,
     diretoria: Optional[str] = None,
     uf_cliente: Optional[str] = None,
-    db: Session = Depends(get_db),
+    db=Depends(get_async_db),
+    _user=Depends(require_roles_async("executivo", "opec", "admin")),
 ):
     today = date.today()
     di = _parse_date(inicio) or today
     df = _parse_date(fim) or today
 
-    rows = veiculacao_crud.list_agenda(
-        db,
+    # ✅ agenda varre a janela inteira: thread de leitura (fora do event loop e do threadpool)
+    rows = await db.run_sync(
+        veiculacao_crud.list_agenda,
         di,
         df,
         canal=canal,
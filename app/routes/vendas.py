@@ -1,24 +1,29 @@
 # app/routes/vendas.py
 from __future__ import annotations
 
-from typing import Optional, Literal
+from datetime import date
+from typing import List, Optional, Literal
 
-from fastapi import APIRouter, Depends, Query
-from sqlalchemy.orm import Session
+import re
 
-from app.deps import get_db
-from app.deps_auth import require_roles
-from app.crud import vendas_crud
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+
+from app.deps import get_async_db
+from app.deps_auth import require_roles_async
+from app.crud import competencia_crud, vendas_crud
 
 # ✅ NOVO: consolidado por setor (Privado / Gov. Estadual / Gov. Federal / Gestão Executiva)
 from app.crud.vendas_consolidado_crud import obter_consolidado
 from app.schemas.vendas_consolidado import VendasConsolidadoOut
 
+# ✅ leitura pesada: rotas async, run_sync nas funções do vendas_crud numa thread de
+# leitura; dashboard lento não trava o event loop nem ocupa thread do threadpool
+# todas as rotas autenticam por conta própria (require_roles_async)
 router = APIRouter(prefix="/vendas", tags=["vendas"])
 
 
 @router.get("/resumo")
-def get_resumo(
+async def get_resumo(
     mes: Optional[str] = Query(None),
     ano: Optional[str] = Query(None),
     executivo: Optional[str] = Query(None),
@@ -27,11 +32,11 @@ def get_resumo(
     anunciante: Optional[str] = Query(None),
     fonte: Literal["pi", "pi_prefer_liquido"] = Query("pi_prefer_liquido"),
     top_n: int = Query(10, ge=1, le=50),
-    db: Session = Depends(get_db),
-    _user=Depends(require_roles("admin")),
+    db=Depends(get_async_db),
+    _user=Depends(require_roles_async("admin")),
 ):
-    return vendas_crud.painel_vendas_para_front(
-        db,
+    return await db.run_sync(
+        vendas_crud.painel_vendas_para_front,
         mes=mes,
         ano=ano,
         executivo=executivo,
@@ -44,17 +49,17 @@ def get_resumo(
 
 
 @router.get("/executivo/pis")
-def get_pis_executivo(
+async def get_pis_executivo(
     executivo: str = Query(...),
     mes: Optional[str] = Query(None),
     ano: Optional[str] = Query(None),
     tipo_pi: Optional[str] = Query(None),
     fonte: Literal["pi", "pi_prefer_liquido"] = Query("pi_prefer_liquido"),
-    db: Session = Depends(get_db),
-    _user=Depends(require_roles("admin")),
+    db=Depends(get_async_db),
+    _user=Depends(require_roles_async("admin")),
 ):
-    return vendas_crud.listar_pis_do_executivo_para_front(
-        db,
+    return await db.run_sync(
+        vendas_crud.listar_pis_do_executivo_para_front,
         executivo=executivo,
         mes=mes,
         ano=ano,
@@ -69,11 +74,68 @@ def get_pis_executivo(
 # (opcional) &executivo=Fulano
 # ==========================================================
 @router.get("/consolidado", response_model=VendasConsolidadoOut)
-def get_consolidado_setores(
+async def get_consolidado_setores(
     mes: int = Query(..., ge=1, le=12),
     ano: int = Query(..., ge=2000, le=2100),
     executivo: Optional[str] = Query(None),
-    db: Session = Depends(get_db),
-    _user=Depends(require_roles("admin")),
+    db=Depends(get_async_db),
+    _user=Depends(require_roles_async("admin")),
 ):
-    return obter_consolidado(db, mes=mes, ano=ano, executivo=executivo)
+    return await db.run_sync(obter_consolidado, mes=mes, ano=ano, executivo=executivo)
+
+
+_PARAMS_COMPETENCIA = {"inicio", "fim", "agrupar_por", "produto", "executivo", "diretoria"}
+_RE_ANO_MES = re.compile(r"(\d{4})-(\d{1,2})")
+
+
+def _ano_mes(s: Optional[str], padrao: tuple) -> tuple:
+    if s is None:
+        return padrao
+    m = _RE_ANO_MES.fullmatch(s.strip())
+    ano, mes = (int(m.group(1)), int(m.group(2))) if m else (0, 0)
+    if not (2000 <= ano <= 2100 and 1 <= mes <= 12):
+        raise HTTPException(status_code=422, detail=f"Mês inválido: {s!r} (use AAAA-MM).")
+    return ano, mes
+
+
+# ==========================================================
+# ✅ Receita por COMPETÊNCIA (rateio pro-rata por dia de veiculação)
+# GET /vendas/competencia?inicio=2026-01&fim=2026-12
+# (opcional) &agrupar_por=produto&agrupar_por=executivo &executivo=Fulano
+# ==========================================================
+@router.get("/competencia")
+async def get_competencia(
+    request: Request,
+    inicio: Optional[str] = Query(None, description="AAAA-MM; padrão: janeiro do ano atual"),
+    fim: Optional[str] = Query(None, description="AAAA-MM (inclusive); padrão: dezembro do ano atual"),
+    agrupar_por: List[Literal["produto", "executivo", "diretoria"]] = Query(
+        ["produto", "executivo", "diretoria"]
+    ),
+    produto: Optional[str] = Query(None),
+    executivo: Optional[str] = Query(None),
+    diretoria: Optional[str] = Query(None),
+    db=Depends(get_async_db),
+    _user=Depends(require_roles_async("admin")),
+):
+    # parâmetro com nome errado (ex.: ?ano=2025) não cai calado no ano atual
+    desconhecidos = sorted(set(request.query_params) - _PARAMS_COMPETENCIA)
+    if desconhecidos:
+        raise HTTPException(status_code=422, detail=f"Parâmetro(s) desconhecido(s): {', '.join(desconhecidos)}.")
+    ano = date.today().year
+    ini = _ano_mes(inicio, (ano, 1))
+    fi = _ano_mes(fim, (ano, 12))
+
+    # recálculo (leitura crua + NumPy) na thread de leitura; aqui só o recorte
+    m = await db.run_sync(competencia_crud.materializacao)
+    try:
+        return competencia_crud.fatiar(
+            m,
+            inicio=ini,
+            fim=fi,
+            agrupar_por=agrupar_por,
+            produto=produto,
+            executivo=executivo,
+            diretoria=diretoria,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
@@ -37,5 +37,8 @@ class EntregaOut(BaseModel):
     faturamento_id: Optional[int] = None
     faturamento_status: Optional[str] = None  # ENVIADO/EM_FATURAMENTO/FATURADO/PAGO
 
+    # ✅ versão da linha (ETag / If-Match)
+    versao: Optional[int] = None
+
     class Config:
         from_attributes = True
@@ -37,6 +37,10 @@ class PIBase(BaseModel):
     cnpj_agencia: Optional[str] = None
     uf_agencia: Optional[str] = None
 
+    # FKs do cadastro: se vierem, valem; senão o CRUD resolve pelo CNPJ
+    anunciante_id: Optional[int] = None
+    agencia_id: Optional[int] = None
+
     # ✅ NOVO: agência e comissão
     tem_agencia: bool = False
     comissao_agencia_percentual: Optional[float] = None
@@ -144,6 +148,9 @@ class PIOut(BaseModel):
     observacoes: Optional[str] = None
     eh_matriz: Optional[bool] = None
 
+    # ✅ versão da linha (mesmo número do ETag; mande em If-Match no PUT)
+    versao: Optional[int] = None
+
     class Config:
         from_attributes = True
 
@@ -250,6 +257,8 @@ class PiDetalheOut(BaseModel):
     entregas_pendentes: int = 0
     entregas_concluidas: int = 0
 
+    versao: Optional[int] = None
+
     class Config:
         from_attributes = True
 
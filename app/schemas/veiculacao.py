@@ -1,4 +1,4 @@
-from typing import Optional, Any
+from typing import Optional, Any, List
 from pydantic import BaseModel, Field, field_validator
 
 
@@ -103,6 +103,9 @@ class VeiculacaoOut(BaseModel):
     valor: Optional[float] = None
     em_veiculacao: Optional[bool] = None
 
+    # ✅ versão da linha (ETag / If-Match)
+    versao: Optional[int] = None
+
     class Config:
         from_attributes = True
 
@@ -169,3 +172,11 @@ class VeiculacaoCreateIn(BaseModel):
     @classmethod
     def _v_int2(cls, v):
         return _to_optional_int(v)
+
+
+# usado em POST /veiculacoes/lote (plano de mídia inteiro numa requisição)
+VEIC_LOTE_MAX = 5000
+
+
+class VeiculacaoLoteIn(BaseModel):
+    veiculacoes: List[VeiculacaoCreateIn] = Field(..., min_length=1, max_length=VEIC_LOTE_MAX)
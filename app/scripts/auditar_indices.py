@@ -0,0 +1,309 @@
+# app/scripts/auditar_indices.py
+# -*- coding: utf-8 -*-
+"""
+Auditoria de índices: garante que as consultas quentes dos CRUDs não fazem
+varredura completa (full scan) nas tabelas grandes.
+
+Para cada checagem:
+  1. chama a função REAL do CRUD (vendas_crud.resumo_vendas, entrega_crud.list_by_pi...)
+     capturando os SELECTs que ela emite (before_cursor_execute);
+  2. roda o plano de cada SELECT:
+       SQLite   -> EXPLAIN QUERY PLAN  (falha em "SCAN <tabela>")
+       Postgres -> EXPLAIN (FORMAT JSON) com enable_seqscan=off
+                   (falha em "Seq Scan" = não existe índice utilizável);
+  3. reprova se alguma tabela vigiada aparecer varrida.
+
+Como as consultas são capturadas das funções do CRUD, se alguém mudar um
+filtro e ele deixar de bater num índice, a auditoria acusa.
+
+Por padrão cria um SQLite temporário com o schema dos models e massa
+sintética (gerar_massa) e roda ANALYZE. Com --database-url audita um banco
+existente (ex.: depois de `alembic upgrade head`), sem gerar massa.
+
+Como rodar (com venv ativo):
+    python -m app.scripts.auditar_indices
+    python -m app.scripts.auditar_indices --pis 20000 -v
+    python -m app.scripts.auditar_indices --database-url postgresql://... --sem-massa
+
+Sai com código 1 se alguma checagem reprovar (dá para usar no CI).
+A mesma auditoria roda no pytest: tests/test_auditar_indices.py.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import re
+import sys
+import tempfile
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Sequence, Tuple
+
+from sqlalchemy import event, func
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from app.models import PI, Entrega, Faturamento, Veiculacao
+
+
+# ==========================================================
+# Checagens (consulta quente -> tabelas que não podem ser varridas)
+# ==========================================================
+@dataclass
+class Checagem:
+    nome: str
+    rodar: Callable[[Session, Dict[str, Any]], Any]
+    tabelas: Tuple[str, ...]
+
+
+def _checagens() -> List[Checagem]:
+    from app.crud import entrega_crud, faturamento_crud, pi_crud, pi_detalhes_crud, vendas_crud, veiculacao_crud
+
+    PIS, VEI, ENT, FAT = "pis_cadastro", "veiculacoes", "entregas", "faturamentos"
+    return [
+        # ---- PIs ----
+        Checagem("pis: matriz ativos (tipo_pi)", lambda db, a: pi_crud.list_matriz_ativos(db), (PIS,)),
+        Checagem("pis: normal ativos (tipo_pi)", lambda db, a: pi_crud.list_normal_ativos(db), (PIS,)),
+        Checagem(
+            "pis: saldo da matriz (numero_pi_matriz)",
+            lambda db, a: pi_crud.calcular_saldo_restante(db, a["numero_matriz"]),
+            (PIS,),
+        ),
+        Checagem(
+            "pis: filhos CS (numero_pi_normal)",
+            lambda db, a: pi_crud.get_by_numero(db, a["numero_normal"]).filhos_cs,
+            (PIS,),
+        ),
+        Checagem(
+            "pis: detalhe com relações",
+            lambda db, a: pi_crud.get_with_relations_by_id(db, a["pi_id"]),
+            (PIS, VEI, ENT),
+        ),
+        Checagem("pis: anexos do PI (pi_id)", lambda db, a: db.get(PI, a["pi_id"]).anexos, ("pi_anexos",)),
+        Checagem(
+            "pis: tela de detalhes (veiculações/entregas/faturamentos)",
+            lambda db, a: pi_detalhes_crud.obter_detalhes_por_pi_id(db, a["pi_id"]),
+            (PIS, VEI, ENT, FAT, "faturamento_anexos"),
+        ),
+        # ---- vendas ----
+        Checagem(
+            "vendas: resumo por executivo no mês",
+            lambda db, a: vendas_crud.resumo_vendas(db, mes=a["mes"], ano=a["ano"], executivo=a["executivo"]),
+            (PIS,),
+        ),
+        Checagem(
+            "vendas: resumo por diretoria no mês",
+            lambda db, a: vendas_crud.resumo_vendas(db, mes=a["mes"], ano=a["ano"], diretoria=a["diretoria"]),
+            (PIS,),
+        ),
+        Checagem(
+            "vendas: resumo por tipo no mês",
+            lambda db, a: vendas_crud.resumo_vendas(db, mes=a["mes"], ano=a["ano"], tipo_pi="Normal"),
+            (PIS,),
+        ),
+        Checagem(
+            "vendas: PIs do executivo no ano",
+            lambda db, a: vendas_crud.listar_pis_do_executivo_para_front(db, executivo=a["executivo"], ano=a["ano"]),
+            (PIS,),
+        ),
+        # ---- veiculações / entregas ----
+        Checagem("veiculações: por PI", lambda db, a: veiculacao_crud.list_by_pi(db, a["pi_id"]), (VEI,)),
+        Checagem("veiculações: por produto", lambda db, a: veiculacao_crud.list_by_produto(db, a["produto_id"]), (VEI,)),
+        Checagem("entregas: por PI", lambda db, a: entrega_crud.list_by_pi(db, a["pi_id"]), (ENT,)),
+        Checagem(
+            "entregas: por veiculação",
+            lambda db, a: entrega_crud.list_by_veiculacao(db, a["veiculacao_id"]),
+            (ENT,),
+        ),
+        Checagem("entregas: linhas por PI", lambda db, a: entrega_crud.list_rows(db, pi_id=a["pi_id"]), (ENT, FAT)),
+        # ---- faturamentos ----
+        Checagem(
+            "faturamentos: por status",
+            lambda db, a: faturamento_crud.list_all(db, status="FATURADO"),
+            (FAT, ENT, VEI),
+        ),
+        Checagem("faturamentos: por PI", lambda db, a: faturamento_crud.list_all(db, pi_id=a["pi_id"]), (FAT, ENT, VEI)),
+        Checagem(
+            "faturamentos: por período de envio",
+            lambda db, a: faturamento_crud.list_all(db, date_from=a["enviado_de"], date_to=a["enviado_ate"]),
+            (FAT, ENT, VEI),
+        ),
+    ]
+
+
+def _amostra(db: Session) -> Dict[str, Any]:
+    """Valores reais da base para parametrizar as checagens (sempre o caso mais populoso)."""
+    pi_id, produto_id, veic_id = (
+        db.query(Veiculacao.pi_id, Veiculacao.produto_id, Veiculacao.id)
+        .join(Entrega, Entrega.veiculacao_id == Veiculacao.id)
+        .order_by(Veiculacao.id)
+        .first()
+    ) or (None, None, None)
+    vendido = db.query(PI.executivo, PI.diretoria, PI.data_venda).filter(PI.data_venda.isnot(None)).first()
+    matriz = db.query(PI.numero_pi).filter(PI.tipo_pi == "Matriz").first()
+    normal = db.query(PI.numero_pi).filter(PI.tipo_pi == "Normal").first()
+    ult_envio = db.query(func.max(Faturamento.enviado_em)).scalar()
+
+    faltando = [
+        n for n, v in (("veiculação com entrega", pi_id), ("PI vendido", vendido), ("matriz", matriz), ("normal", normal))
+        if v is None
+    ]
+    if faltando:
+        raise SystemExit(f"❌ Base sem dados para auditar ({', '.join(faltando)}). Gere massa antes.")
+
+    ult_envio = ult_envio or datetime.utcnow()
+    return {
+        "pi_id": pi_id,
+        "produto_id": produto_id,
+        "veiculacao_id": veic_id,
+        "executivo": vendido.executivo,
+        "diretoria": vendido.diretoria,
+        "mes": str(vendido.data_venda.month),
+        "ano": str(vendido.data_venda.year),
+        "numero_matriz": matriz.numero_pi,
+        "numero_normal": normal.numero_pi,
+        "enviado_de": ult_envio - timedelta(days=7),
+        "enviado_ate": ult_envio,
+    }
+
+
+# ==========================================================
+# Captura + plano
+# ==========================================================
+def _capturar(engine: Engine, db: Session, fn: Callable[[], Any]) -> List[Tuple[str, Any]]:
+    stmts: List[Tuple[str, Any]] = []
+
+    def _ouvir(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith(("SELECT", "WITH")):
+            stmts.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", _ouvir)
+    try:
+        db.expire_all()  # força os lazy loads a irem ao banco
+        fn()
+    finally:
+        event.remove(engine, "before_cursor_execute", _ouvir)
+    return stmts
+
+
+# "SCAN x" = varredura; "SEARCH x USING AUTOMATIC ..." = índice temporário criado a cada consulta
+_SCAN_SQLITE = re.compile(r"^(?:SCAN (?:TABLE )?(\w+)|SEARCH (\w+) USING AUTOMATIC)")
+
+
+def _tabela_base(nome: str) -> str:
+    # aliases do joinedload: veiculacoes_1 -> veiculacoes
+    return re.sub(r"_\d+$", "", nome)
+
+
+def _varreduras_sqlite(conn, sql: str, params: Any) -> List[Tuple[str, str]]:
+    out = []
+    for row in conn.exec_driver_sql("EXPLAIN QUERY PLAN " + sql, params).all():
+        detalhe = str(row[-1])
+        m = _SCAN_SQLITE.match(detalhe)
+        if m:
+            out.append((_tabela_base(m.group(1) or m.group(2)), detalhe))
+    return out
+
+
+def _varreduras_postgres(conn, sql: str, params: Any) -> List[Tuple[str, str]]:
+    conn.exec_driver_sql("SET LOCAL enable_seqscan = off")
+    plano = conn.exec_driver_sql("EXPLAIN (FORMAT JSON) " + sql, params).scalar()
+    if isinstance(plano, str):
+        import json
+
+        plano = json.loads(plano)
+
+    out: List[Tuple[str, str]] = []
+
+    def _andar(no: Dict[str, Any]) -> None:
+        if no.get("Node Type") == "Seq Scan":
+            rel = no.get("Relation Name", "?")
+            out.append((rel, f"Seq Scan on {rel}" + (f" (filtro: {no['Filter']})" if no.get("Filter") else "")))
+        for filho in no.get("Plans", []) or []:
+            _andar(filho)
+
+    _andar(plano[0]["Plan"])
+    return out
+
+
+def auditar(engine: Engine, *, verbose: bool = False, log=print) -> List[str]:
+    """Roda todas as checagens. Retorna a lista de falhas (vazia = ok)."""
+    varrer = _varreduras_postgres if engine.dialect.name == "postgresql" else _varreduras_sqlite
+    falhas: List[str] = []
+
+    db = Session(bind=engine)
+    try:
+        amostra = _amostra(db)
+        for ch in _checagens():
+            stmts = _capturar(engine, db, lambda: ch.rodar(db, amostra))
+            db.rollback()
+
+            problemas: List[str] = []
+            with engine.connect() as conn:
+                for sql, params in stmts:
+                    with conn.begin():
+                        for tabela, detalhe in varrer(conn, sql, params):
+                            if tabela in ch.tabelas:
+                                problemas.append(f"{detalhe}\n        SQL: {' '.join(sql.split())[:300]}")
+
+            if problemas:
+                falhas.append(ch.nome)
+                log(f"❌ {ch.nome} ({len(stmts)} SELECTs)")
+                for p in problemas:
+                    log(f"      {p}")
+            else:
+                log(f"✅ {ch.nome} ({len(stmts)} SELECTs)")
+            if verbose:
+                for sql, _ in stmts:
+                    log(f"      · {' '.join(sql.split())[:200]}")
+    finally:
+        db.close()
+    return falhas
+
+
+# ==========================================================
+# CLI
+# ==========================================================
+def _parse_args(argv: Sequence[str] | None = None) -> argparse.Namespace:
+    p = argparse.ArgumentParser(prog="python -m app.scripts.auditar_indices")
+    p.add_argument("--database-url", default=None, help="padrão: SQLite temporário com massa sintética")
+    p.add_argument("--sem-massa", action="store_true", help="não gera massa (audita os dados que já existem)")
+    p.add_argument("--pis", type=int, default=5000, help="tamanho da massa sintética")
+    p.add_argument("--seed", type=int, default=42)
+    p.add_argument("-v", "--verbose", action="store_true", help="lista os SELECTs de cada checagem")
+    return p.parse_args(argv)
+
+
+def main(argv: Sequence[str] | None = None) -> None:
+    a = _parse_args(argv)
+
+    from app.scripts.gerar_massa import MassaConfig, gerar_massa, make_engine
+
+    import app.models  # noqa: F401
+    import app.models_auth  # noqa: F401
+
+    # nunca cai no DATABASE_URL do .env: sem --database-url é sempre um SQLite descartável
+    url = a.database_url or "sqlite:///" + os.path.join(tempfile.mkdtemp(prefix="auditar_indices_"), "audit.db")
+    engine = make_engine(url)
+    print(f"🔎 Auditando índices em {engine.url.render_as_string(hide_password=True)}")
+
+    if not a.database_url:
+        from app.database import init_db
+
+        init_db(force=True, bind=engine)  # schema igual ao do app (sem massa, o gerar_massa não roda)
+    if not a.sem_massa and not a.database_url:
+        gerar_massa(engine, MassaConfig(seed=a.seed, pis=a.pis, agencias=500, anunciantes=2000), log=lambda _m: None)
+
+    # estatísticas atualizadas: o planner escolhe como em produção
+    with engine.begin() as conn:
+        conn.exec_driver_sql("ANALYZE")
+
+    falhas = auditar(engine, verbose=a.verbose)
+    if falhas:
+        print(f"\n❌ {len(falhas)} consulta(s) com varredura completa. Crie/ajuste o índice (models + migração alembic).")
+        sys.exit(1)
+    print("\n✅ Nenhuma varredura completa nas consultas quentes.")
+
+
+if __name__ == "__main__":
+    main()
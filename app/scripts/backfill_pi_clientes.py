@@ -0,0 +1,118 @@
+# app/scripts/backfill_pi_clientes.py
+# -*- coding: utf-8 -*-
+"""
+Backfill de pis_cadastro.anunciante_id / agencia_id a partir do CNPJ.
+
+- CNPJ normalizado (só dígitos) dos dois lados: "12.345.678/0001-90" no PI
+  casa com "12345678000190" no cadastro.
+- agencia_id só é preenchido quando tem_agencia = true.
+- Atualiza em lotes (UPDATE por PK em executemany), um commit por lote.
+- Por padrão só preenche as colunas que estão NULL (FK já gravado não é
+  tocado); --todos recalcula também os preenchidos.
+- Nunca grava NULL por cima de um FK: CNPJ sem cadastro mantém o que existe.
+- Idempotente: pode rodar de novo a qualquer momento.
+
+Daqui em diante o pi_crud.create/update já preenche os FKs sozinho.
+
+Como rodar (com venv ativo):
+    python -m app.scripts.backfill_pi_clientes --dry-run
+    python -m app.scripts.backfill_pi_clientes
+    python -m app.scripts.backfill_pi_clientes --todos --lote 2000
+"""
+from __future__ import annotations
+
+import argparse
+import time
+from typing import Dict, List
+
+from sqlalchemy import or_, update
+from sqlalchemy.orm import Session
+
+from app.models import PI, Agencia, Anunciante
+from app.utils.cnpj import only_digits
+
+
+def _mapa_cnpj(db: Session, col_id, col_cnpj) -> Dict[str, int]:
+    out: Dict[str, int] = {}
+    for i, cnpj in db.query(col_id, col_cnpj).filter(col_cnpj.isnot(None)).all():
+        d = only_digits(cnpj)
+        if len(d) == 14:
+            out.setdefault(d, i)
+    return out
+
+
+def backfill(db: Session, *, todos: bool = False, lote: int = 1000, dry_run: bool = False, log=print) -> Dict[str, int]:
+    t0 = time.perf_counter()
+    anunciantes = _mapa_cnpj(db, Anunciante.id, Anunciante.cnpj_anunciante)
+    agencias = _mapa_cnpj(db, Agencia.id, Agencia.cnpj_agencia)
+
+    q = db.query(
+        PI.id, PI.cnpj_anunciante, PI.cnpj_agencia, PI.tem_agencia, PI.anunciante_id, PI.agencia_id
+    ).order_by(PI.id)
+    if not todos:
+        q = q.filter(or_(PI.anunciante_id.is_(None), PI.agencia_id.is_(None)))
+
+    res = {"lidos": 0, "atualizados": 0, "anunciante_ok": 0, "anunciante_sem_cadastro": 0, "agencia_ok": 0, "agencia_sem_cadastro": 0}
+    pendentes: List[Dict[str, int]] = []
+
+    def _avaliar(r) -> None:
+        res["lidos"] += 1
+        an_id = anunciantes.get(only_digits(r.cnpj_anunciante))
+        ag_id = agencias.get(only_digits(r.cnpj_agencia)) if r.tem_agencia else None
+
+        res["anunciante_ok" if an_id else "anunciante_sem_cadastro"] += 1
+        if r.tem_agencia:
+            res["agencia_ok" if ag_id else "agencia_sem_cadastro"] += 1
+
+        mudou: Dict[str, int] = {}
+        for col, novo, atual in (("anunciante_id", an_id, r.anunciante_id), ("agencia_id", ag_id, r.agencia_id)):
+            if novo is None or novo == atual:
+                continue
+            if atual is None or todos:
+                mudou[col] = novo
+        if mudou:
+            pendentes.append({"id": r.id, **mudou})
+
+    def _gravar() -> None:
+        if pendentes and not dry_run:
+            db.execute(update(PI), pendentes)  # bulk UPDATE por PK (só as colunas que mudam)
+            db.commit()
+        res["atualizados"] += len(pendentes)
+        pendentes.clear()
+
+    # keyset por id: cada lote é uma query curta, sem cursor aberto atravessando o commit
+    ultimo = 0
+    while True:
+        linhas = q.filter(PI.id > ultimo).limit(lote).all()
+        if not linhas:
+            break
+        ultimo = linhas[-1].id
+        for r in linhas:
+            _avaliar(r)
+        _gravar()
+
+    log(
+        f"{'🔎 (dry-run) ' if dry_run else '✅ '}Backfill de clientes em {time.perf_counter() - t0:.1f}s: {res}"
+    )
+    return res
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(prog="python -m app.scripts.backfill_pi_clientes")
+    p.add_argument("--todos", action="store_true", help="recalcula também PIs que já têm FK")
+    p.add_argument("--lote", type=int, default=1000)
+    p.add_argument("--dry-run", action="store_true", help="só conta, não grava")
+    a = p.parse_args()
+
+    from app.database import SessionLocal, init_db
+
+    init_db()  # garante os índices novos
+    db = SessionLocal()
+    try:
+        backfill(db, todos=a.todos, lote=a.lote, dry_run=a.dry_run)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
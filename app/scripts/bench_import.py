@@ -0,0 +1,128 @@
+# app/scripts/bench_import.py
+# -*- coding: utf-8 -*-
+"""
+Benchmark de cold start da API (o que cada worker novo do uvicorn paga).
+
+Cada repetição roda um Python NOVO (subprocess) que:
+  1. importa app.main            -> "import_ms"
+  2. roda o startup (init_db)    -> "startup_ms"
+e, com -X importtime, lista os módulos que mais pesam no import.
+
+Por padrão usa um SQLite temporário (o primeiro processo aplica o schema;
+os seguintes medem o caminho normal: schema já em dia).
+
+Como rodar (com venv ativo):
+    python -m app.scripts.bench_import
+    python -m app.scripts.bench_import --repeticoes 10 --top 15
+    python -m app.scripts.bench_import --salvar cold_start.json
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from collections import defaultdict
+from typing import Dict, List
+
+_FILHO = r"""
+import json, time
+t0 = time.perf_counter()
+import app.main
+t1 = time.perf_counter()
+from app.database import init_db
+init_db()
+t2 = time.perf_counter()
+print("__BENCH__" + json.dumps({"import_ms": (t1 - t0) * 1000, "startup_ms": (t2 - t1) * 1000}))
+"""
+
+
+def _rodar(env: Dict[str, str], importtime: bool) -> tuple:
+    cmd = [sys.executable] + (["-X", "importtime"] if importtime else []) + ["-c", _FILHO]
+    r = subprocess.run(cmd, env=env, capture_output=True, text=True)
+    linha = next((l for l in r.stdout.splitlines() if l.startswith("__BENCH__")), None)
+    if r.returncode != 0 or linha is None:
+        raise SystemExit(f"❌ Processo filho falhou:\n{r.stderr[-2000:]}")
+    return json.loads(linha[len("__BENCH__"):]), r.stderr
+
+
+def _pesos_importtime(stderr: str) -> Dict[str, float]:
+    """self time (ms) agregado por pacote raiz ("googleapiclient", "sqlalchemy", "app.routes.pis"...)."""
+    pesos: Dict[str, float] = defaultdict(float)
+    for l in stderr.splitlines():
+        if not l.startswith("import time:") or "|" not in l:
+            continue
+        partes = l[len("import time:"):].split("|")
+        try:
+            self_us = int(partes[0].strip())
+        except ValueError:
+            continue  # cabeçalho
+        mod = partes[2].strip()
+        # módulos do app ficam por módulo; terceiros agregados pelo pacote
+        chave = mod if mod.startswith("app.") else mod.split(".")[0]
+        pesos[chave] += self_us / 1000.0
+    return pesos
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(prog="python -m app.scripts.bench_import")
+    p.add_argument("--repeticoes", type=int, default=5)
+    p.add_argument("--top", type=int, default=12, help="quantos módulos listar no ranking do import")
+    p.add_argument("--database-url", default=None, help="padrão: SQLite temporário")
+    p.add_argument("--salvar", default=None, help="grava o resultado em JSON")
+    a = p.parse_args()
+
+    tmpdir = tempfile.mkdtemp(prefix="bench_import_")
+    env = dict(os.environ)
+    env["DATABASE_URL"] = a.database_url or f"sqlite:///{os.path.join(tmpdir, 'bench.db')}"
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [os.getcwd(), env.get("PYTHONPATH")]))
+    env["EMAIL_OUTBOX_WORKER"] = "0"
+    env["PI_UPLOAD_DIR"] = os.path.join(tmpdir, "uploads")
+
+    # 1º processo: schema novo (DDL). Não entra na mediana.
+    primeiro, _ = _rodar(env, importtime=False)
+    print(f"🧱 1º start (aplica schema): import {primeiro['import_ms']:.0f} ms | startup {primeiro['startup_ms']:.0f} ms")
+
+    imports: List[float] = []
+    startups: List[float] = []
+    pesos_total: Dict[str, float] = defaultdict(float)
+    for i in range(a.repeticoes):
+        r, _ = _rodar(env, importtime=False)
+        imports.append(r["import_ms"])
+        startups.append(r["startup_ms"])
+
+    # -X importtime distorce o tempo total: roda à parte só para o ranking
+    _, stderr = _rodar(env, importtime=True)
+    for k, v in _pesos_importtime(stderr).items():
+        pesos_total[k] += v
+
+    res = {
+        "repeticoes": a.repeticoes,
+        "import_ms_mediana": round(statistics.median(imports), 1),
+        "startup_ms_mediana": round(statistics.median(startups), 1),
+        "cold_start_ms_mediana": round(statistics.median([x + y for x, y in zip(imports, startups)]), 1),
+        "primeiro_start": {k: round(v, 1) for k, v in primeiro.items()},
+        "top_import_ms": [
+            {"modulo": k, "self_ms": round(v, 1)}
+            for k, v in sorted(pesos_total.items(), key=lambda kv: kv[1], reverse=True)[: a.top]
+        ],
+    }
+
+    print(f"\n⏱️  import app.main: {res['import_ms_mediana']} ms (mediana de {a.repeticoes})")
+    print(f"⏱️  startup (init_db): {res['startup_ms_mediana']} ms")
+    print(f"⏱️  cold start total: {res['cold_start_ms_mediana']} ms\n")
+    print("Módulos mais pesados no import (self time):")
+    for item in res["top_import_ms"]:
+        print(f"  {item['self_ms']:>8.1f} ms  {item['modulo']}")
+
+    if a.salvar:
+        with open(a.salvar, "w", encoding="utf-8") as f:
+            json.dump(res, f, ensure_ascii=False, indent=2)
+        print(f"\n💾 Resultado salvo em {a.salvar}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+# app/scripts/bench_json.py
+# -*- coding: utf-8 -*-
+"""
+Benchmark de serialização das listagens grandes (/pis e /veiculacoes, 10k linhas).
+
+Compara:
+  padrão  -> ORM completo, schema montado na rota, revalidação contra o
+             response_model (TypeAdapter validate + dump json, como o FastAPI faz)
+             e json.dumps do Starlette
+  rápido  -> SELECT só das colunas do schema + dict(zip) + orjson
+             (app.core.fast_json)
+
+Usa um SQLite temporário com massa sintética (app.scripts.gerar_massa).
+
+Como rodar (com venv ativo):
+    python -m app.scripts.bench_json
+    python -m app.scripts.bench_json --linhas 10000 --repeticoes 5
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+from typing import Callable, Dict, List
+
+from pydantic import TypeAdapter
+from sqlalchemy import create_engine, func, null
+from sqlalchemy.orm import sessionmaker
+
+from app.core.fast_json import RowSerializer, dumps
+from app.scripts.gerar_massa import MassaConfig, gerar_massa
+
+
+def _starlette_dumps(content) -> bytes:
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+
+
+def _medir(fn: Callable[[], bytes], repeticoes: int) -> Dict[str, float]:
+    tempos: List[float] = []
+    tamanho = 0
+    for _ in range(repeticoes):
+        t0 = time.perf_counter()
+        tamanho = len(fn())
+        tempos.append((time.perf_counter() - t0) * 1000.0)
+    return {"mediana_ms": round(statistics.median(tempos), 2), "min_ms": round(min(tempos), 2), "bytes": tamanho}
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(prog="python -m app.scripts.bench_json")
+    p.add_argument("--linhas", type=int, default=10_000, help="linhas por resposta")
+    p.add_argument("--repeticoes", type=int, default=5)
+    a = p.parse_args()
+
+    from app.models import PI, Produto, Veiculacao
+    from app.schemas.pi import PIOut
+    from app.schemas.veiculacao import VeiculacaoOut
+    from app.crud import veiculacao_crud
+    from app.routes.veiculacoes import _to_out, _today_between
+
+    tmp = os.path.join(tempfile.mkdtemp(prefix="bench_json_"), "bench.db")
+    engine = create_engine(f"sqlite:///{tmp}")
+    # ~1 veiculação por PI => as duas tabelas com ~--linhas
+    gerar_massa(
+        engine,
+        MassaConfig(pis=a.linhas, agencias=200, anunciantes=1000, veic_por_pi=1.0,
+                    pct_entrega=0, pct_anexo_pi=0),
+        log=lambda _m: None,
+    )
+    db = sessionmaker(bind=engine)()
+
+    ta_pi = TypeAdapter(List[PIOut])
+    ta_veic = TypeAdapter(List[VeiculacaoOut])
+    pi_rows = RowSerializer(PIOut)
+    veic_rows = RowSerializer(VeiculacaoOut)
+
+    # ---------- /pis ----------
+    def pis_padrao() -> bytes:
+        objs = db.query(PI).order_by(PI.id.desc()).limit(a.linhas).all()
+        validado = ta_pi.validate_python(objs, from_attributes=True)
+        return _starlette_dumps(ta_pi.dump_python(validado, mode="json"))
+
+    def pis_rapido() -> bytes:
+        cols = pi_rows.colunas(PI, tem_agencia=func.coalesce(PI.tem_agencia, False))
+        linhas = db.query(*cols).order_by(PI.id.desc()).limit(a.linhas).all()
+        return dumps(pi_rows.to_dicts(linhas))
+
+    # ---------- /veiculacoes ----------
+    def veic_padrao() -> bytes:
+        objs = veiculacao_crud.list_all(db)[: a.linhas]
+        validado = ta_veic.validate_python([_to_out(v) for v in objs], from_attributes=True)
+        return _starlette_dumps(ta_veic.dump_python(validado, mode="json"))
+
+    def veic_rapido() -> bytes:
+        cols = veic_rows.colunas(
+            Veiculacao,
+            valor=func.coalesce(Veiculacao.valor_liquido, Veiculacao.valor_bruto),
+            produto_nome=Produto.nome,
+            numero_pi=PI.numero_pi,
+            cliente=veiculacao_crud.primeiro_nao_vazio(PI.nome_anunciante, PI.razao_social_anunciante),
+            campanha=veiculacao_crud.primeiro_nao_vazio(PI.nome_campanha),
+            canal=PI.canal,
+            executivo=PI.executivo,
+            diretoria=PI.diretoria,
+            uf_cliente=veiculacao_crud.primeiro_nao_vazio(PI.uf_cliente),
+            em_veiculacao=null(),
+        )
+        itens = veic_rows.to_dicts(veiculacao_crud.list_all_rows(db, cols)[: a.linhas])
+        for it in itens:
+            it["em_veiculacao"] = _today_between(it["data_inicio"], it["data_fim"])
+        return dumps(itens)
+
+    # ---------- só serialização (dados já carregados) ----------
+    objs_pi = db.query(PI).order_by(PI.id.desc()).limit(a.linhas).all()
+    cols_pi = pi_rows.colunas(PI, tem_agencia=func.coalesce(PI.tem_agencia, False))
+    tuplas_pi = db.query(*cols_pi).order_by(PI.id.desc()).limit(a.linhas).all()
+
+    def ser_padrao() -> bytes:
+        validado = ta_pi.validate_python(objs_pi, from_attributes=True)
+        return _starlette_dumps(ta_pi.dump_python(validado, mode="json"))
+
+    def ser_rapido() -> bytes:
+        return dumps(pi_rows.to_dicts(tuplas_pi))
+
+    resultado = {}
+    for nome, padrao, rapido in (
+        ("/pis (consulta + serialização)", pis_padrao, pis_rapido),
+        ("/veiculacoes (consulta + serialização)", veic_padrao, veic_rapido),
+        ("/pis (só serialização)", ser_padrao, ser_rapido),
+    ):
+        rp = _medir(padrao, a.repeticoes)
+        rr = _medir(rapido, a.repeticoes)
+        resultado[nome] = {
+            "padrao": rp,
+            "rapido": rr,
+            "reducao_pct": round((1 - rr["mediana_ms"] / rp["mediana_ms"]) * 100, 1) if rp["mediana_ms"] else 0.0,
+        }
+
+    db.close()
+    engine.dispose()
+    print(json.dumps({"linhas": a.linhas, "repeticoes": a.repeticoes, "resultados": resultado},
+                     ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,650 @@
+# app/scripts/gerar_massa.py
+# -*- coding: utf-8 -*-
+"""
+Gerador de massa sintética para testes de carga e benchmarks.
+
+Preenche (SQLite ou Postgres) com:
+  agências, anunciantes, produtos, PIs de todos os tipos
+  (Matriz + Abatimentos, Normal + CS, Veiculação), veiculações com janelas
+  de datas, entregas, faturamentos e anexos (PI e faturamento).
+
+- Reprodutível: mesma --seed => mesmos dados.
+- Inserção em lote (executemany por tabela, em blocos de --batch linhas),
+  com IDs atribuídos aqui (continua a partir do MAX(id) de cada tabela).
+- agencia_id/anunciante_id dos PIs são preenchidos, exceto numa fração
+  (--pct-sem-fk) que fica NULL como os PIs legados: exercita tanto as
+  consultas por FK quanto o backfill (app/scripts/backfill_pi_clientes.py).
+
+Como rodar (com venv ativo):
+    python -m app.scripts.gerar_massa --pis 50000 --seed 42
+    python -m app.scripts.gerar_massa --database-url sqlite:///massa.db --recriar --pis 200000
+
+Perfis de distribuição podem ser ajustados pelas flags (ver --help), ex.:
+    --mix-tipo "Normal=50,Matriz=10,Abatimento=20,CS=15,Veiculação=5"
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import time
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from sqlalchemy import create_engine, func, select, text
+from sqlalchemy.engine import Engine
+
+from app.models_base import Base
+
+# ==========================================================
+# Configuração
+# ==========================================================
+UFS = ["DF", "SP", "RJ", "MG", "GO", "BA", "PR", "RS", "PE", "CE", "AM", "PA", "SC", "ES"]
+DIRETORIAS = ["Governo Federal", "Governo Estadual", "Gestão Executiva", "Privado"]
+CANAIS = ["PORTAL", "RÁDIO", "DOOH", "PAINEL", "SOCIAL"]
+CATEGORIAS = ["PORTAL", "RÁDIO", "DOOH", "PAINEL", "SOCIAL", "EVENTO"]
+MODALIDADES = ["DIA", "SPOT", "CPM", "PACOTE"]
+SEGMENTOS = ["Varejo", "Saúde", "Educação", "Governo", "Financeiro", "Imobiliário", "Automotivo", "Tecnologia"]
+PALAVRAS = [
+    "Alfa", "Brasil", "Central", "Delta", "Nova", "Prime", "Planalto", "Cerrado", "Capital", "Horizonte",
+    "Norte", "Sul", "Leste", "Oeste", "Global", "Vida", "Mais", "Real", "União", "Aliança", "Ponto", "Rede",
+]
+SUFIXOS_AG = ["Comunicação", "Propaganda", "Publicidade", "Digital", "Mídia"]
+SUFIXOS_AN = ["Ltda", "S.A.", "Comércio", "Serviços", "Indústria", "Saúde", "Educação"]
+STATUS_ENTREGA = ["Sim", "Não", "pendente"]
+STATUS_FAT = ["ENVIADO", "EM_FATURAMENTO", "FATURADO", "PAGO"]
+
+
+def _parse_mix(s: str) -> Dict[str, float]:
+    out: Dict[str, float] = {}
+    for part in (s or "").split(","):
+        part = part.strip()
+        if not part:
+            continue
+        k, _, v = part.partition("=")
+        out[k.strip()] = float(v or 0)
+    return out
+
+
+@dataclass
+class MassaConfig:
+    seed: int = 42
+
+    agencias: int = 2_000
+    anunciantes: int = 10_000
+    produtos: int = 300
+    executivos: int = 25
+    pis: int = 50_000
+
+    # % por tipo de PI (normalizado internamente)
+    mix_tipo: Dict[str, float] = field(
+        default_factory=lambda: {"Normal": 50, "Matriz": 10, "Abatimento": 22, "CS": 13, "Veiculação": 5}
+    )
+
+    # expoente Zipf da popularidade de anunciantes/agências/executivos (0 = uniforme)
+    skew: float = 1.1
+
+    # período das vendas/emissões
+    inicio: date = date(2024, 1, 1)
+    fim: date = date(2025, 12, 31)
+
+    # valores (lognormal em R$)
+    valor_mu: float = 10.0
+    valor_sigma: float = 1.1
+
+    pct_com_agencia: float = 0.6
+    pct_sem_venda: float = 0.08
+    pct_sem_fk: float = 0.1  # PIs "legados": só nome/CNPJ, FKs NULL
+
+    # veiculações por PI (média; sorteio uniforme em 0..2*média)
+    veic_por_pi: float = 4.0
+    veic_max_dias: int = 60
+
+    pct_entrega: float = 0.7
+    pct_faturamento: float = 0.6
+    pct_anexo_pi: float = 0.5
+    pct_anexo_fat: float = 0.5
+
+    batch: int = 5_000
+
+
+# ==========================================================
+# Helpers
+# ==========================================================
+def _zipf_cum_weights(n: int, s: float) -> List[float]:
+    acc = 0.0
+    cum: List[float] = []
+    for rank in range(1, n + 1):
+        acc += 1.0 / (rank ** s) if s > 0 else 1.0
+        cum.append(acc)
+    return cum
+
+
+def _cnpj(rng: random.Random, used: set) -> str:
+    while True:
+        # raiz (8) + filial 0001 + DV (2) — DV aleatório, só precisa ter 14 dígitos
+        c = f"{rng.randrange(10**8):08d}0001{rng.randrange(100):02d}"
+        if c not in used:
+            used.add(c)
+            return c
+
+
+def _nome(rng: random.Random, sufixos: Sequence[str], i: int) -> str:
+    return f"{rng.choice(PALAVRAS)} {rng.choice(PALAVRAS)} {rng.choice(sufixos)} {i}"
+
+
+def _rand_date(rng: random.Random, ini: date, fim: date) -> date:
+    span = max(0, (fim - ini).days)
+    return ini + timedelta(days=rng.randint(0, span))
+
+
+def _existing_cnpjs(engine: Engine, *cols) -> set:
+    """CNPJs já gravados (são únicos): a massa nunca colide com eles, mesmo rodando de novo com a mesma seed."""
+    used: set = set()
+    with engine.connect() as conn:
+        for col in cols:
+            used.update(v for (v,) in conn.execute(select(col).where(col.is_not(None))))
+    return used
+
+
+def _next_id(engine: Engine, table) -> int:
+    with engine.connect() as conn:
+        return int(conn.execute(select(func.coalesce(func.max(table.c.id), 0))).scalar() or 0) + 1
+
+
+def _chunks(it: Iterable[Dict[str, Any]], size: int) -> Iterator[List[Dict[str, Any]]]:
+    buf: List[Dict[str, Any]] = []
+    for row in it:
+        buf.append(row)
+        if len(buf) >= size:
+            yield buf
+            buf = []
+    if buf:
+        yield buf
+
+
+def _bulk_insert(engine: Engine, table, rows: Iterable[Dict[str, Any]], batch: int) -> int:
+    total = 0
+    stmt = table.insert()
+    for chunk in _chunks(rows, batch):
+        with engine.begin() as conn:
+            conn.execute(stmt, chunk)
+        total += len(chunk)
+    return total
+
+
+def _fix_sequences(engine: Engine, tables: Sequence[Any]) -> None:
+    """IDs foram atribuídos aqui: no Postgres, realinha as sequences ao MAX(id)."""
+    if engine.dialect.name != "postgresql":
+        return
+    with engine.begin() as conn:
+        for t in tables:
+            conn.execute(
+                text(
+                    f"SELECT setval(pg_get_serial_sequence('{t.name}', 'id'), "
+                    f"(SELECT COALESCE(MAX(id), 1) FROM {t.name}))"
+                )
+            )
+
+
+# ==========================================================
+# Geração
+# ==========================================================
+def gerar_massa(engine: Engine, cfg: MassaConfig, *, log: Callable[[str], None] = print) -> Dict[str, int]:
+    """
+    Gera e insere a massa. Retorna contagem de linhas inseridas por tabela.
+    """
+    import app.models  # noqa: F401  (registra tabelas)
+    import app.models_auth  # noqa: F401
+    from app.models import (
+        Agencia, Anunciante, Produto, PI, PIAnexo, Veiculacao, Entrega, Faturamento, FaturamentoAnexo,
+    )
+
+    from app.database import init_db
+
+    # mesmo schema que o app cria: índices, schema_meta e a busca (FTS5/pg_trgm)
+    init_db(force=True, bind=engine)
+
+    rng = random.Random(cfg.seed)
+    counts: Dict[str, int] = {}
+    t_ini = time.perf_counter()
+
+    def _step(nome: str, table, rows: Iterable[Dict[str, Any]]):
+        t0 = time.perf_counter()
+        n = _bulk_insert(engine, table, rows, cfg.batch)
+        counts[nome] = counts.get(nome, 0) + n
+        log(f"  • {nome}: {n} linhas em {time.perf_counter() - t0:.1f}s")
+
+    executivos = [f"Executivo {i:02d}" for i in range(1, cfg.executivos + 1)]
+    cum_exec = _zipf_cum_weights(len(executivos), cfg.skew / 2)
+
+    # ---------------- agências ----------------
+    ag_t = Agencia.__table__
+    ag_id0 = _next_id(engine, ag_t)
+    cnpjs = _existing_cnpjs(engine, ag_t.c.cnpj_agencia, Anunciante.__table__.c.cnpj_anunciante)
+    agencias: List[Tuple[int, str, str, str]] = []  # (id, nome, cnpj, uf)
+
+    def _rows_agencias():
+        for i in range(cfg.agencias):
+            aid = ag_id0 + i
+            nome = _nome(rng, SUFIXOS_AG, aid)
+            cnpj = _cnpj(rng, cnpjs)
+            uf = rng.choice(UFS)
+            agencias.append((aid, nome, cnpj, uf))
+            yield {
+                "id": aid,
+                "nome_agencia": nome,
+                "razao_social_agencia": f"{nome} Ltda",
+                "cnpj_agencia": cnpj,
+                "uf_agencia": uf,
+                "executivo": rng.choices(executivos, cum_weights=cum_exec)[0],
+                "email_agencia": f"contato{aid}@agencia.example",
+                "data_cadastro": _rand_date(rng, cfg.inicio, cfg.fim).strftime("%d/%m/%Y"),
+                "grupo_empresarial": f"Grupo {rng.choice(PALAVRAS)}",
+                "codinome": f"AG{aid}",
+                "segmento": rng.choice(SEGMENTOS),
+            }
+
+    log("🏗️  Gerando massa sintética...")
+    _step("agencias", ag_t, _rows_agencias())
+
+    # ---------------- anunciantes ----------------
+    an_t = Anunciante.__table__
+    an_id0 = _next_id(engine, an_t)
+    anunciantes: List[Tuple[int, str, str, str, str]] = []  # (id, nome, razao, cnpj, uf)
+
+    def _rows_anunciantes():
+        for i in range(cfg.anunciantes):
+            aid = an_id0 + i
+            nome = _nome(rng, SUFIXOS_AN, aid)
+            cnpj = _cnpj(rng, cnpjs)
+            uf = rng.choice(UFS)
+            anunciantes.append((aid, nome, f"{nome} LTDA", cnpj, uf))
+            yield {
+                "id": aid,
+                "nome_anunciante": nome,
+                "razao_social_anunciante": f"{nome} LTDA",
+                "cnpj_anunciante": cnpj,
+                "uf_cliente": uf,
+                "executivo": rng.choices(executivos, cum_weights=cum_exec)[0],
+                "email_anunciante": f"contato{aid}@anunciante.example",
+                "data_cadastro": _rand_date(rng, cfg.inicio, cfg.fim).strftime("%d/%m/%Y"),
+                "municipio": "Brasília" if uf == "DF" else None,
+                "grupo_empresarial": f"Grupo {rng.choice(PALAVRAS)}",
+                "codinome": f"AN{aid}",
+                "segmento": rng.choice(SEGMENTOS),
+            }
+
+    _step("anunciantes", an_t, _rows_anunciantes())
+
+    # ---------------- produtos ----------------
+    pr_t = Produto.__table__
+    pr_id0 = _next_id(engine, pr_t)
+    produto_ids: List[int] = []
+
+    def _rows_produtos():
+        for i in range(cfg.produtos):
+            pid = pr_id0 + i
+            cat = rng.choice(CATEGORIAS)
+            mod = rng.choice(MODALIDADES)
+            produto_ids.append(pid)
+            yield {
+                "id": pid,
+                "nome": f"Massa {cat} #{pid}",
+                "categoria": cat,
+                "modalidade_preco": mod,
+                "base_segundos": 30 if mod == "SPOT" else None,
+                "unidade_rotulo": "por dia" if mod == "DIA" else None,
+                "valor_unitario": round(rng.uniform(50, 50_000), 2),
+            }
+
+    _step("produtos", pr_t, _rows_produtos())
+
+    # ---------------- PIs ----------------
+    pi_t = PI.__table__
+    pi_id0 = _next_id(engine, pi_t)
+    prefixo = f"M{cfg.seed}-"
+
+    mix = {k: v for k, v in cfg.mix_tipo.items() if v > 0} or {"Normal": 1.0}
+    tipos = list(mix.keys())
+    pesos = [mix[t] for t in tipos]
+    tipo_por_pi = rng.choices(tipos, weights=pesos, k=cfg.pis)
+    # pais primeiro: Abatimento/CS precisam de uma Matriz/Normal já sorteada
+    ordem = {"Matriz": 0, "Normal": 0, "Veiculação": 1, "Abatimento": 2, "CS": 2}
+    tipo_por_pi.sort(key=lambda t: ordem.get(t, 1))
+
+    cum_an = _zipf_cum_weights(max(1, len(anunciantes)), cfg.skew)
+    cum_ag = _zipf_cum_weights(max(1, len(agencias)), cfg.skew)
+
+    # Matrizes que ainda têm saldo (todas, não só as últimas): remoção por
+    # troca com a última posição quando o saldo acaba, O(1) por Abatimento
+    matrizes: List[List[Any]] = []  # [numero, saldo]
+    normais: List[str] = []
+    pis_info: List[Tuple[int, Optional[date], date]] = []  # (id, data_venda, data_emissao)
+
+    def _rows_pis():
+        for i, tipo in enumerate(tipo_por_pi):
+            pid = pi_id0 + i
+            numero = f"{prefixo}{pid:07d}"
+            an = rng.choices(anunciantes, cum_weights=cum_an)[0] if anunciantes else None
+            ag = None
+            if agencias and rng.random() < cfg.pct_com_agencia:
+                ag = rng.choices(agencias, cum_weights=cum_ag)[0]
+
+            emissao = _rand_date(rng, cfg.inicio, cfg.fim)
+            venda = None if rng.random() < cfg.pct_sem_venda else emissao + timedelta(days=rng.randint(0, 10))
+            bruto = round(rng.lognormvariate(cfg.valor_mu, cfg.valor_sigma), 2)
+
+            numero_matriz = None
+            numero_normal = None
+            if tipo == "Abatimento":
+                if matrizes:
+                    k = rng.randrange(len(matrizes))
+                    m = matrizes[k]
+                    bruto = round(min(bruto, m[1] * rng.uniform(0.05, 0.5)), 2)
+                    m[1] -= bruto
+                    numero_matriz = m[0]
+                    if m[1] <= 1.0:
+                        matrizes[k] = matrizes[-1]
+                        matrizes.pop()
+                else:
+                    tipo = "Normal"
+            elif tipo == "CS":
+                if normais:
+                    numero_normal = rng.choice(normais[-200:])
+                else:
+                    tipo = "Normal"
+
+            if tipo == "Matriz":
+                bruto = round(bruto * 5, 2)
+                matrizes.append([numero, bruto])
+            elif tipo == "Normal":
+                normais.append(numero)
+
+            comissao_pct = 20.0 if ag else None
+            com_fk = rng.random() >= cfg.pct_sem_fk
+            liquido = round(bruto * (0.8 if ag else 1.0), 2)
+            pis_info.append((pid, venda, emissao))
+
+            yield {
+                "id": pid,
+                "numero_pi": numero,
+                "numero_pi_matriz": numero_matriz,
+                "numero_pi_normal": numero_normal,
+                "tipo_pi": tipo,
+                "nome_anunciante": an[1] if an else None,
+                "razao_social_anunciante": an[2] if an else None,
+                "cnpj_anunciante": an[3] if an else None,
+                "uf_cliente": an[4] if an else None,
+                "nome_agencia": ag[1] if ag else None,
+                "razao_social_agencia": f"{ag[1]} Ltda" if ag else None,
+                "cnpj_agencia": ag[2] if ag else None,
+                "uf_agencia": ag[3] if ag else None,
+                "tem_agencia": bool(ag),
+                "anunciante_id": an[0] if an and com_fk else None,
+                "agencia_id": ag[0] if ag and com_fk else None,
+                "comissao_agencia_percentual": comissao_pct,
+                "comissao_agencia_valor": round(bruto * 0.2, 2) if ag else None,
+                "executivo": rng.choices(executivos, cum_weights=cum_exec)[0],
+                "diretoria": rng.choice(DIRETORIAS),
+                "nome_campanha": f"Campanha {rng.choice(PALAVRAS)} {pid}",
+                "data_venda": venda,
+                "canal": rng.choice(CANAIS),
+                "perfil": rng.choice(["Privado", "Público"]),
+                "subperfil": rng.choice(SEGMENTOS),
+                "valor_bruto": bruto,
+                "valor_liquido": liquido,
+                "vencimento": emissao + timedelta(days=30),
+                "data_emissao": emissao,
+                "observacoes": None,
+                "eh_matriz": tipo == "Matriz",
+            }
+
+    _step("pis", pi_t, _rows_pis())
+
+    # ---------------- anexos de PI ----------------
+    pa_t = PIAnexo.__table__
+    pa_id0 = _next_id(engine, pa_t)
+
+    def _rows_pi_anexos():
+        aid = pa_id0
+        for pid, _venda, emissao in pis_info:
+            if rng.random() >= cfg.pct_anexo_pi:
+                continue
+            for tipo in ("pi_pdf", "proposta_pdf") if rng.random() < 0.5 else ("pi_pdf",):
+                yield {
+                    "id": aid,
+                    "pi_id": pid,
+                    "tipo": tipo,
+                    "filename": f"{tipo}-{pid}.pdf",
+                    "path": f"gdrive://massa-{pid}-{tipo}",
+                    "mime": "application/pdf",
+                    "size": rng.randint(40_000, 4_000_000),
+                    "uploaded_at": datetime.combine(emissao, datetime.min.time()),
+                }
+                aid += 1
+
+    _step("pi_anexos", pa_t, _rows_pi_anexos())
+
+    # ---------------- veiculações ----------------
+    ve_t = Veiculacao.__table__
+    ve_id0 = _next_id(engine, ve_t)
+    veics: List[Tuple[int, int, date, date]] = []  # (id, pi_id, inicio, fim)
+    max_veic = max(0, int(round(cfg.veic_por_pi * 2)))
+
+    def _rows_veiculacoes():
+        vid = ve_id0
+        for pid, venda, emissao in pis_info:
+            base = venda or emissao
+            for _ in range(rng.randint(0, max_veic) if max_veic else 0):
+                ini = base + timedelta(days=rng.randint(0, 45))
+                fim = ini + timedelta(days=rng.randint(0, max(0, cfg.veic_max_dias)))
+                bruto = round(rng.lognormvariate(cfg.valor_mu - 1.2, cfg.valor_sigma), 2)
+                desconto = rng.choice([0.0, 0.0, 5.0, 10.0, 15.0, 20.0])
+                veics.append((vid, pid, ini, fim))
+                yield {
+                    "id": vid,
+                    "produto_id": rng.choice(produto_ids) if produto_ids else None,
+                    "pi_id": pid,
+                    "data_inicio": ini.isoformat(),
+                    "data_fim": fim.isoformat(),
+                    "quantidade": rng.randint(1, 30),
+                    "valor_bruto": bruto,
+                    "desconto": desconto,
+                    "valor_liquido": round(bruto * (1.0 - desconto / 100.0), 2),
+                }
+                vid += 1
+
+    _step("veiculacoes", ve_t, _rows_veiculacoes())
+
+    # ---------------- entregas ----------------
+    en_t = Entrega.__table__
+    en_id0 = _next_id(engine, en_t)
+    entregas_ok: List[Tuple[int, date]] = []
+
+    def _rows_entregas():
+        eid = en_id0
+        for vid, pid, ini, fim in veics:
+            if rng.random() >= cfg.pct_entrega:
+                continue
+            dt = _rand_date(rng, ini, fim)
+            st = rng.choices(STATUS_ENTREGA, weights=[70, 10, 20])[0]
+            if st == "Sim":
+                entregas_ok.append((eid, dt))
+            yield {
+                "id": eid,
+                "data_entrega": dt,
+                "foi_entregue": st,
+                "motivo": "" if st != "Não" else "Material não recebido",
+                "veiculacao_id": vid,
+                "pi_id": pid,
+            }
+            eid += 1
+
+    _step("entregas", en_t, _rows_entregas())
+
+    # ---------------- faturamentos ----------------
+    fa_t = Faturamento.__table__
+    fa_id0 = _next_id(engine, fa_t)
+    fats: List[Tuple[int, str, datetime]] = []
+
+    def _rows_faturamentos():
+        fid = fa_id0
+        for eid, dt in entregas_ok:
+            if rng.random() >= cfg.pct_faturamento:
+                continue
+            st = rng.choices(STATUS_FAT, weights=[25, 20, 30, 25])[0]
+            enviado = datetime.combine(dt, datetime.min.time()) + timedelta(hours=rng.randint(1, 72))
+            em_fat = enviado + timedelta(days=rng.randint(1, 5)) if st != "ENVIADO" else None
+            faturado = em_fat + timedelta(days=rng.randint(1, 10)) if st in ("FATURADO", "PAGO") else None
+            pago = faturado + timedelta(days=rng.randint(5, 40)) if st == "PAGO" else None
+            fats.append((fid, st, enviado))
+            yield {
+                "id": fid,
+                "entrega_id": eid,
+                "status": st,
+                "enviado_em": enviado,
+                "em_faturamento_em": em_fat,
+                "faturado_em": faturado,
+                "pago_em": pago,
+                "nf_numero": f"NF{fid:08d}" if faturado else None,
+                "observacao": None,
+                "created_at": enviado,
+                "updated_at": pago or faturado or em_fat or enviado,
+            }
+            fid += 1
+
+    _step("faturamentos", fa_t, _rows_faturamentos())
+
+    # ---------------- anexos de faturamento ----------------
+    fx_t = FaturamentoAnexo.__table__
+    fx_id0 = _next_id(engine, fx_t)
+
+    def _rows_fat_anexos():
+        xid = fx_id0
+        for fid, st, enviado in fats:
+            if rng.random() >= cfg.pct_anexo_fat:
+                continue
+            tipos = ["OPEC"]
+            if st in ("FATURADO", "PAGO"):
+                tipos.append("NF")
+            if st == "PAGO":
+                tipos.append("COMPROVANTE_PAGAMENTO")
+            for t in tipos:
+                yield {
+                    "id": xid,
+                    "faturamento_id": fid,
+                    "tipo": t,
+                    "filename": f"{t.lower()}-{fid}.pdf",
+                    "path": f"uploads/faturamento/{fid}/{t.lower()}.pdf",
+                    "mime": "application/pdf",
+                    "size": rng.randint(20_000, 900_000),
+                    "uploaded_at": enviado,
+                }
+                xid += 1
+
+    _step("faturamento_anexos", fx_t, _rows_fat_anexos())
+
+    _fix_sequences(engine, [ag_t, an_t, pr_t, pi_t, pa_t, ve_t, en_t, fa_t, fx_t])
+
+    total = sum(counts.values())
+    log(f"✅ Massa gerada: {total} linhas em {time.perf_counter() - t_ini:.1f}s (seed={cfg.seed})")
+    return counts
+
+
+# ==========================================================
+# CLI
+# ==========================================================
+def _parse_args(argv: Optional[Sequence[str]] = None) -> Tuple[MassaConfig, argparse.Namespace]:
+    d = MassaConfig()
+    p = argparse.ArgumentParser(
+        prog="python -m app.scripts.gerar_massa",
+        description="Gera massa sintética (agências, anunciantes, PIs, veiculações, entregas, faturamentos).",
+    )
+    p.add_argument("--database-url", default=None, help="default: o mesmo banco da API (DATABASE_URL ou SQLite local)")
+    p.add_argument("--recriar", action="store_true", help="DROP + CREATE de todas as tabelas antes de gerar (destrutivo!)")
+    p.add_argument("--seed", type=int, default=d.seed)
+    p.add_argument("--agencias", type=int, default=d.agencias)
+    p.add_argument("--anunciantes", type=int, default=d.anunciantes)
+    p.add_argument("--produtos", type=int, default=d.produtos)
+    p.add_argument("--executivos", type=int, default=d.executivos)
+    p.add_argument("--pis", type=int, default=d.pis)
+    p.add_argument(
+        "--mix-tipo",
+        default=",".join(f"{k}={v:g}" for k, v in d.mix_tipo.items()),
+        help="peso por tipo_pi, ex.: Normal=50,Matriz=10,Abatimento=22,CS=13,Veiculação=5",
+    )
+    p.add_argument("--skew", type=float, default=d.skew, help="expoente Zipf de concentração por cliente (0 = uniforme)")
+    p.add_argument("--inicio", default=d.inicio.isoformat(), help="YYYY-MM-DD")
+    p.add_argument("--fim", default=d.fim.isoformat(), help="YYYY-MM-DD")
+    p.add_argument("--valor-mu", type=float, default=d.valor_mu)
+    p.add_argument("--valor-sigma", type=float, default=d.valor_sigma)
+    p.add_argument("--pct-com-agencia", type=float, default=d.pct_com_agencia)
+    p.add_argument("--pct-sem-venda", type=float, default=d.pct_sem_venda)
+    p.add_argument("--pct-sem-fk", type=float, default=d.pct_sem_fk, help="fração de PIs sem agencia_id/anunciante_id (legado)")
+    p.add_argument("--veic-por-pi", type=float, default=d.veic_por_pi)
+    p.add_argument("--veic-max-dias", type=int, default=d.veic_max_dias)
+    p.add_argument("--pct-entrega", type=float, default=d.pct_entrega)
+    p.add_argument("--pct-faturamento", type=float, default=d.pct_faturamento)
+    p.add_argument("--pct-anexo-pi", type=float, default=d.pct_anexo_pi)
+    p.add_argument("--pct-anexo-fat", type=float, default=d.pct_anexo_fat)
+    p.add_argument("--batch", type=int, default=d.batch)
+    a = p.parse_args(argv)
+
+    cfg = MassaConfig(
+        seed=a.seed,
+        agencias=a.agencias,
+        anunciantes=a.anunciantes,
+        produtos=a.produtos,
+        executivos=max(1, a.executivos),
+        pis=a.pis,
+        mix_tipo=_parse_mix(a.mix_tipo),
+        skew=a.skew,
+        inicio=date.fromisoformat(a.inicio),
+        fim=date.fromisoformat(a.fim),
+        valor_mu=a.valor_mu,
+        valor_sigma=a.valor_sigma,
+        pct_com_agencia=a.pct_com_agencia,
+        pct_sem_venda=a.pct_sem_venda,
+        pct_sem_fk=a.pct_sem_fk,
+        veic_por_pi=a.veic_por_pi,
+        veic_max_dias=a.veic_max_dias,
+        pct_entrega=a.pct_entrega,
+        pct_faturamento=a.pct_faturamento,
+        pct_anexo_pi=a.pct_anexo_pi,
+        pct_anexo_fat=a.pct_anexo_fat,
+        batch=max(1, a.batch),
+    )
+    return cfg, a
+
+
+def make_engine(database_url: Optional[str]) -> Engine:
+    if not database_url:
+        from app.database import engine
+
+        return engine
+    if database_url.startswith("sqlite"):
+        return create_engine(database_url, connect_args={"check_same_thread": False})
+    return create_engine(database_url, pool_pre_ping=True)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    cfg, args = _parse_args(argv)
+    engine = make_engine(args.database_url)
+
+    if args.recriar:
+        import app.models  # noqa: F401
+        import app.models_auth  # noqa: F401
+
+        from app.utils.busca_clientes import remover_busca
+
+        print(f"🧨 Recriando tabelas em {engine.url.render_as_string(hide_password=True)}")
+        remover_busca(engine)
+        Base.metadata.drop_all(bind=engine)
+        # o schema (com a busca) é recriado pelo init_db dentro do gerar_massa
+
+    gerar_massa(engine, cfg)
+
+
+if __name__ == "__main__":
+    main()
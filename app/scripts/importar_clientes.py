@@ -0,0 +1,85 @@
+# app/scripts/importar_clientes.py
+# -*- coding: utf-8 -*-
+"""
+Importa agências ou anunciantes de uma planilha (XLSX ou CSV) — mesma rotina
+de POST /agencias/importar e /anunciantes/importar (upsert por CNPJ).
+
+Como rodar (com venv ativo):
+    python -m app.scripts.importar_clientes agencias clientes.xlsx --dry-run
+    python -m app.scripts.importar_clientes anunciantes anunciantes.csv --erros erros.csv
+
+Colunas aceitas: --colunas lista (ex.: cnpj, nome, razao_social, executivo, uf, email, codinome...).
+"""
+from __future__ import annotations
+
+import argparse
+import csv
+from typing import Optional, Sequence
+
+TIPOS = {"agencias": "agencia", "agencia": "agencia", "anunciantes": "anunciante", "anunciante": "anunciante"}
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    p = argparse.ArgumentParser(prog="python -m app.scripts.importar_clientes")
+    p.add_argument("tipo", choices=sorted(TIPOS))
+    p.add_argument("arquivo", nargs="?", help="XLSX ou CSV com cabeçalho")
+    p.add_argument("--dry-run", action="store_true", help="só valida, não grava")
+    p.add_argument("--erros", default=None, help="grava o relatório de erros em CSV (linha;cnpj;erros)")
+    p.add_argument("--colunas", action="store_true", help="lista as colunas aceitas e sai")
+    a = p.parse_args(argv)
+
+    from app.crud import importar_clientes
+
+    tipo = TIPOS[a.tipo]
+    if a.colunas:
+        print(", ".join(importar_clientes.colunas_aceitas(tipo)))
+        return 0
+    if not a.arquivo:
+        p.error("informe o arquivo")
+
+    from app.database import SessionLocal, init_db
+    from app.utils.planilha import ler_planilha
+
+    init_db()
+    with open(a.arquivo, "rb") as f:
+        conteudo = f.read()
+
+    db = SessionLocal()
+    try:
+        rel = importar_clientes.importar(db, tipo, ler_planilha(conteudo, a.arquivo), dry_run=a.dry_run)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return 1
+    finally:
+        db.close()
+
+    acao = "validadas (dry-run)" if a.dry_run else "gravadas"
+    print(
+        f"✅ {rel['validas']}/{rel['linhas']} linhas {acao} em {rel['tempo_ms']:.0f} ms: "
+        f"{rel['inseridos']} novos, {rel['atualizados']} atualizados"
+    )
+    if rel["cnpjs_normalizados"]:
+        print(f"🔧 {rel['cnpjs_normalizados']} CNPJ(s) legado(s) passaram a guardar só dígitos")
+    if rel["pis_vinculados"]:
+        print(f"🔗 {rel['pis_vinculados']} PI(s) vinculados aos novos cadastros")
+    if rel["colunas_ignoradas"]:
+        print(f"ℹ️ Colunas ignoradas: {', '.join(rel['colunas_ignoradas'])}")
+
+    if rel["erros"]:
+        print(f"⚠️ {rel['com_erro']} linha(s) com erro:")
+        for e in rel["erros"][:20]:
+            print(f"   linha {e['linha']} ({e['cnpj'] or 'sem CNPJ'}): {' '.join(e['erros'])}")
+        if rel["com_erro"] > 20:
+            print("   ...")
+        if a.erros:
+            with open(a.erros, "w", encoding="utf-8-sig", newline="") as f:
+                w = csv.writer(f, delimiter=";")
+                w.writerow(["linha", "cnpj", "erros"])
+                for e in rel["erros"]:
+                    w.writerow([e["linha"], e["cnpj"] or "", " ".join(e["erros"])])
+            print(f"💾 Relatório de erros salvo em {a.erros}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,179 @@
+# app/scripts/smtp_local.py
+# -*- coding: utf-8 -*-
+"""
+SMTP "de mentira" para desenvolvimento/testes da fila de e-mails.
+
+- Aceita EHLO/HELO, MAIL, RCPT, DATA, RSET, NOOP, QUIT (sem TLS/AUTH).
+- Guarda as mensagens em memória (SMTPLocal.mensagens) e imprime no console.
+- Simula problemas: --atraso (servidor lento), --falhar-a-cada N (451 temporário
+  a cada N mensagens) e --recusar (domínio cujo RCPT recebe 550).
+
+Como rodar (com venv ativo):
+    python -m app.scripts.smtp_local --porta 1025
+    # e na API: SMTP_HOST=127.0.0.1 SMTP_PORT=1025 SMTP_TLS=0
+
+Uso em teste (ver tests/test_email_outbox.py):
+    srv = SMTPLocal(porta=0).start()
+    ...  # SMTP_PORT = srv.porta
+    srv.stop(); srv.mensagens
+"""
+from __future__ import annotations
+
+import argparse
+import socketserver
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    timeout = 60
+
+    def _send(self, linha: str) -> None:
+        self.wfile.write((linha + "\r\n").encode("utf-8"))
+        self.wfile.flush()
+
+    def handle(self) -> None:
+        srv: "SMTPLocal" = self.server.smtp  # type: ignore[attr-defined]
+        self._send("220 smtp-local pronto")
+        remetente: Optional[str] = None
+        destinatarios: List[str] = []
+
+        while True:
+            raw = self.rfile.readline()
+            if not raw:
+                return
+            linha = raw.decode("utf-8", "replace").rstrip("\r\n")
+            cmd = linha[:4].upper()
+
+            if srv.atraso:
+                time.sleep(srv.atraso)
+
+            if cmd in ("EHLO", "HELO"):
+                self._send("250 smtp-local")
+            elif cmd == "MAIL":
+                remetente = linha.split(":", 1)[-1].strip().strip("<>")
+                destinatarios = []
+                self._send("250 OK")
+            elif cmd == "RCPT":
+                rcpt = linha.split(":", 1)[-1].strip().strip("<>")
+                if srv.recusar and rcpt.lower().endswith(srv.recusar.lower()):
+                    self._send("550 destinatário recusado")
+                else:
+                    destinatarios.append(rcpt)
+                    self._send("250 OK")
+            elif cmd == "DATA":
+                self._send("354 termine com <CRLF>.<CRLF>")
+                partes: List[str] = []
+                while True:
+                    d = self.rfile.readline()
+                    if not d or d in (b".\r\n", b".\n"):
+                        break
+                    partes.append(d.decode("utf-8", "replace"))
+                if srv._deve_falhar():
+                    self._send("451 falha temporária (simulada)")
+                else:
+                    srv._guardar({"de": remetente, "para": list(destinatarios), "dados": "".join(partes)})
+                    self._send("250 OK: na caixa")
+                remetente, destinatarios = None, []
+            elif cmd == "RSET":
+                remetente, destinatarios = None, []
+                self._send("250 OK")
+            elif cmd == "NOOP":
+                self._send("250 OK")
+            elif cmd == "QUIT":
+                self._send("221 tchau")
+                return
+            else:
+                self._send("502 comando não suportado")
+
+
+class _Server(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+
+class SMTPLocal:
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        porta: int = 1025,
+        *,
+        atraso: float = 0.0,
+        falhar_a_cada: int = 0,
+        recusar: Optional[str] = None,
+        verbose: bool = False,
+    ):
+        self.host = host
+        self.porta = porta
+        self.atraso = float(atraso)
+        self.falhar_a_cada = int(falhar_a_cada)
+        self.recusar = recusar
+        self.verbose = verbose
+
+        self.mensagens: List[Dict[str, Any]] = []
+        self.conexoes = 0
+        self._n_data = 0
+        self._lock = threading.Lock()
+        self._server: Optional[_Server] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def _deve_falhar(self) -> bool:
+        with self._lock:
+            self._n_data += 1
+            return bool(self.falhar_a_cada) and self._n_data % self.falhar_a_cada == 0
+
+    def _guardar(self, msg: Dict[str, Any]) -> None:
+        with self._lock:
+            self.mensagens.append(msg)
+        if self.verbose:
+            assunto = next(
+                (l[9:].strip() for l in msg["dados"].splitlines() if l.lower().startswith("subject: ")), ""
+            )
+            print(f"📨 {msg['de']} -> {', '.join(msg['para'])}: {assunto}")
+
+    def start(self) -> "SMTPLocal":
+        self._server = _Server((self.host, self.porta), _Handler)
+        self._server.smtp = self  # type: ignore[attr-defined]
+        orig = self._server.process_request
+
+        def _contar(request, client_address):
+            with self._lock:
+                self.conexoes += 1
+            return orig(request, client_address)
+
+        self._server.process_request = _contar  # type: ignore[assignment]
+        self.porta = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, name="smtp-local", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(prog="python -m app.scripts.smtp_local")
+    p.add_argument("--host", default="127.0.0.1")
+    p.add_argument("--porta", type=int, default=1025)
+    p.add_argument("--atraso", type=float, default=0.0, help="segundos de espera por comando (servidor lento)")
+    p.add_argument("--falhar-a-cada", type=int, default=0, help="responde 451 a cada N mensagens")
+    p.add_argument("--recusar", default=None, help="sufixo de e-mail cujo RCPT recebe 550 (ex.: @bloqueado.com)")
+    a = p.parse_args()
+
+    srv = SMTPLocal(
+        a.host, a.porta, atraso=a.atraso, falhar_a_cada=a.falhar_a_cada, recusar=a.recusar, verbose=True
+    ).start()
+    print(f"📮 SMTP local em {a.host}:{srv.porta} (Ctrl+C para sair)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        srv.stop()
+
+
+if __name__ == "__main__":
+    main()
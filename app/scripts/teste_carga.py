@@ -0,0 +1,347 @@
+# app/scripts/teste_carga.py
+# -*- coding: utf-8 -*-
+"""
+Teste de carga HTTP (asyncio + httpx) com percentis por endpoint.
+
+- Sobe a API com uvicorn num banco descartável (default: sqlite:///carga.db),
+  gerando a massa sintética (app.scripts.gerar_massa) se o banco estiver vazio.
+- Cria um usuário por role (admin, executivo, opec, financeiro) e emite os
+  JWTs com core.security.create_access_token.
+- Dispara um mix ponderado de rotas "quentes" com N clientes concorrentes.
+- Relatório em JSON: p50/p95/p99, média, throughput e taxa de erro por rota.
+- Compara com um baseline salvo e aponta regressões (p95 acima da tolerância
+  ou aumento da taxa de erro).
+
+NUNCA aponte --database-url para o banco de produção: usuários de teste são
+criados nele e a massa é inserida se não houver PIs.
+
+Como rodar (com venv ativo):
+    python -m app.scripts.teste_carga --duracao 30 --concorrencia 32
+    python -m app.scripts.teste_carga --salvar-baseline carga_baseline.json
+    python -m app.scripts.teste_carga --baseline carga_baseline.json --falhar-se-regressao
+
+Mix: "rota@role=peso" separados por vírgula, ex.:
+    --mix "/pis@executivo=3,/faturamentos@financeiro=2,/vendas/resumo?ano=2025@admin=1"
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+try:
+    import httpx
+except ImportError:  # pragma: no cover
+    httpx = None
+
+# rota -> role padrão (respeitando a ACL do app/main.py)
+MIX_PADRAO = (
+    "/me/carteira?mes=6&ano=2025@executivo=2,"
+    "/vendas/resumo?ano=2025@admin=2,"
+    "/veiculacoes/agenda?inicio=2025-03-01&fim=2025-03-31@opec=2,"
+    "/pis@executivo=1,"
+    "/faturamentos@financeiro=1"
+)
+ROLES = ("admin", "executivo", "opec", "financeiro")
+EXECUTIVO_CARGA = "Executivo 01"  # nome gerado pela massa sintética
+
+
+# ==========================================================
+# Mix / estatística
+# ==========================================================
+def parse_mix(s: str) -> List[Tuple[str, str, float]]:
+    """'/pis@executivo=3,...' -> [(path, role, peso)]"""
+    out: List[Tuple[str, str, float]] = []
+    for part in (s or "").split(","):
+        part = part.strip()
+        if not part:
+            continue
+        alvo, _, peso = part.rpartition("=")
+        if not alvo:
+            alvo, peso = peso, "1"
+        path, _, role = alvo.partition("@")
+        out.append((path.strip(), (role or "admin").strip().lower(), float(peso or 1)))
+    if not out:
+        raise ValueError("Mix de rotas vazio.")
+    return out
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    k = max(0, int(math.ceil(pct / 100.0 * len(values))) - 1)
+    return values[k]
+
+
+def resumir(amostras: List[Tuple[str, int, float]], duracao_s: float) -> Dict[str, Any]:
+    """amostras: (rota, status, latência_ms). status 0 = erro de rede/timeout."""
+    por_rota: Dict[str, List[Tuple[int, float]]] = {}
+    for rota, st, ms in amostras:
+        por_rota.setdefault(rota, []).append((st, ms))
+
+    def _bloco(itens: List[Tuple[int, float]]) -> Dict[str, Any]:
+        lat = sorted(ms for _, ms in itens)
+        erros = sum(1 for st, _ in itens if st == 0 or st >= 400)
+        n = len(itens)
+        status: Dict[str, int] = {}
+        for st, _ in itens:
+            status[str(st)] = status.get(str(st), 0) + 1
+        return {
+            "requisicoes": n,
+            "erros": erros,
+            "taxa_erro": round(erros / n, 4) if n else 0.0,
+            "rps": round(n / duracao_s, 2) if duracao_s > 0 else 0.0,
+            "p50_ms": round(_percentile(lat, 50), 2),
+            "p95_ms": round(_percentile(lat, 95), 2),
+            "p99_ms": round(_percentile(lat, 99), 2),
+            "media_ms": round(sum(lat) / n, 2) if n else 0.0,
+            "max_ms": round(lat[-1], 2) if lat else 0.0,
+            "status": status,
+        }
+
+    return {
+        "duracao_s": round(duracao_s, 2),
+        "total": _bloco([(st, ms) for _, st, ms in amostras]),
+        "rotas": {rota: _bloco(itens) for rota, itens in sorted(por_rota.items())},
+    }
+
+
+def comparar(atual: Dict[str, Any], baseline: Dict[str, Any], tolerancia: float) -> List[Dict[str, Any]]:
+    """Lista de regressões (vazia = ok)."""
+    regs: List[Dict[str, Any]] = []
+    base_rotas = (baseline.get("rotas") or {})
+    for rota, cur in (atual.get("rotas") or {}).items():
+        base = base_rotas.get(rota)
+        if not base:
+            continue
+        b95, c95 = float(base.get("p95_ms") or 0), float(cur.get("p95_ms") or 0)
+        if b95 > 0 and c95 > b95 * (1.0 + tolerancia):
+            regs.append({"rota": rota, "metrica": "p95_ms", "baseline": b95, "atual": c95,
+                         "variacao_pct": round((c95 / b95 - 1.0) * 100, 1)})
+        be, ce = float(base.get("taxa_erro") or 0), float(cur.get("taxa_erro") or 0)
+        if ce > be + 0.01:
+            regs.append({"rota": rota, "metrica": "taxa_erro", "baseline": be, "atual": ce})
+    return regs
+
+
+# ==========================================================
+# Preparação (banco, usuários, servidor)
+# ==========================================================
+def preparar_banco(database_url: str, pis: int, seed: int) -> Dict[str, str]:
+    """Garante massa + usuários de carga; devolve {role: token}."""
+    os.environ["DATABASE_URL"] = database_url  # antes de importar app.database
+
+    from app.database import SessionLocal, engine, init_db
+    from app.models import PI
+    from app.models_auth import User
+    from app.crud.users import create_user
+    from app.core.config import JWT_SECRET, JWT_ALG
+    from app.core.security import create_access_token
+
+    init_db()
+    db = SessionLocal()
+    try:
+        if db.query(PI.id).first() is None:
+            from app.scripts.gerar_massa import MassaConfig, gerar_massa
+
+            gerar_massa(engine, MassaConfig(pis=pis, seed=seed))
+
+        tokens: Dict[str, str] = {}
+        for role in ROLES:
+            email = f"carga-{role}@carga.local"
+            u = db.query(User).filter(User.email == email).first()
+            if not u:
+                u = create_user(db, email, os.urandom(12).hex(), role=role, nome=f"Carga {role}", is_approved=True)
+            if role == "executivo" and u.executivo_nome != EXECUTIVO_CARGA:
+                u.executivo_nome = EXECUTIVO_CARGA
+                db.commit()
+            tokens[role] = create_access_token({"id": u.id}, JWT_SECRET, JWT_ALG, 120)
+        return tokens
+    finally:
+        db.close()
+
+
+def _porta_livre() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def subir_uvicorn(database_url: str, porta: int, workers: int) -> subprocess.Popen:
+    from app.core.config import JWT_SECRET, JWT_ALG
+
+    env = dict(os.environ)
+    env.update({"DATABASE_URL": database_url, "JWT_SECRET": JWT_SECRET, "JWT_ALG": JWT_ALG})
+    cmd = [
+        sys.executable, "-m", "uvicorn", "app.main:app",
+        "--host", "127.0.0.1", "--port", str(porta),
+        "--workers", str(workers), "--log-level", "warning", "--no-access-log",
+    ]
+    return subprocess.Popen(cmd, env=env)
+
+
+async def _esperar_saude(base_url: str, timeout_s: float = 60.0) -> None:
+    deadline = time.monotonic() + timeout_s
+    async with httpx.AsyncClient(base_url=base_url, timeout=2.0) as c:
+        while time.monotonic() < deadline:
+            try:
+                if (await c.get("/")).status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(0.3)
+    raise RuntimeError(f"API não respondeu em {timeout_s:.0f}s ({base_url}).")
+
+
+# ==========================================================
+# Carga
+# ==========================================================
+async def disparar(
+    base_url: str,
+    mix: List[Tuple[str, str, float]],
+    tokens: Dict[str, str],
+    *,
+    concorrencia: int,
+    duracao_s: float,
+    aquecimento_s: float,
+    timeout_s: float,
+    seed: int,
+) -> Tuple[List[Tuple[str, int, float]], float]:
+    pesos = [p for _, _, p in mix]
+    limits = httpx.Limits(max_connections=concorrencia, max_keepalive_connections=concorrencia)
+    amostras: List[Tuple[str, int, float]] = []
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=timeout_s, limits=limits) as client:
+
+        async def _worker(wid: int, ate: float, coletar: bool):
+            rng = random.Random(seed * 1000 + wid)
+            while time.perf_counter() < ate:
+                path, role, _ = rng.choices(mix, weights=pesos)[0]
+                headers = {"Authorization": f"Bearer {tokens.get(role, '')}"}
+                t0 = time.perf_counter()
+                try:
+                    r = await client.get(path, headers=headers)
+                    await r.aread()
+                    st = r.status_code
+                except httpx.HTTPError:
+                    st = 0
+                if coletar:
+                    amostras.append((path, st, (time.perf_counter() - t0) * 1000.0))
+
+        if aquecimento_s > 0:
+            ate = time.perf_counter() + aquecimento_s
+            await asyncio.gather(*(_worker(i, ate, False) for i in range(concorrencia)))
+
+        t_ini = time.perf_counter()
+        ate = t_ini + duracao_s
+        await asyncio.gather(*(_worker(i, ate, True) for i in range(concorrencia)))
+        return amostras, time.perf_counter() - t_ini
+
+
+# ==========================================================
+# CLI
+# ==========================================================
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    p = argparse.ArgumentParser(prog="python -m app.scripts.teste_carga", description=__doc__.split("\n")[1])
+    p.add_argument("--database-url", default="sqlite:///carga.db", help="banco descartável (default: sqlite:///carga.db)")
+    p.add_argument("--url", default=None, help="usa uma API já no ar (não sobe uvicorn); tokens saem do --database-url")
+    p.add_argument("--workers", type=int, default=1, help="workers do uvicorn")
+    p.add_argument("--pis", type=int, default=20_000, help="tamanho da massa (se o banco estiver vazio)")
+    p.add_argument("--seed", type=int, default=42)
+    p.add_argument("--mix", default=MIX_PADRAO)
+    p.add_argument("--concorrencia", type=int, default=16)
+    p.add_argument("--duracao", type=float, default=20.0, help="segundos de medição")
+    p.add_argument("--aquecimento", type=float, default=3.0, help="segundos de warm-up (não medidos)")
+    p.add_argument("--timeout", type=float, default=30.0)
+    p.add_argument("--saida", default=None, help="grava o relatório JSON neste arquivo (default: stdout)")
+    p.add_argument("--baseline", default=None, help="relatório JSON anterior para comparação")
+    p.add_argument("--salvar-baseline", default=None, help="grava o relatório atual como baseline")
+    p.add_argument("--tolerancia", type=float, default=0.15, help="folga de p95 antes de acusar regressão (0.15 = 15%%)")
+    p.add_argument("--falhar-se-regressao", action="store_true", help="exit code 1 se houver regressão")
+    a = p.parse_args(argv)
+    if a.baseline and not os.path.exists(a.baseline):
+        # sem isto um caminho errado virava "✅ Sem regressões" e passava no CI
+        p.error(f"--baseline não encontrado: {a.baseline}")
+
+    if httpx is None:
+        print("❌ httpx não instalado: pip install httpx")
+        return 2
+
+    mix = parse_mix(a.mix)
+    tokens = preparar_banco(a.database_url, a.pis, a.seed)
+
+    proc: Optional[subprocess.Popen] = None
+    base_url = a.url
+    if not base_url:
+        porta = _porta_livre()
+        base_url = f"http://127.0.0.1:{porta}"
+        proc = subir_uvicorn(a.database_url, porta, max(1, a.workers))
+
+    try:
+        asyncio.run(_esperar_saude(base_url))
+        print(f"🚀 Carga: {a.concorrencia} clientes por {a.duracao:.0f}s em {base_url}")
+        amostras, dur = asyncio.run(
+            disparar(
+                base_url, mix, tokens,
+                concorrencia=max(1, a.concorrencia),
+                duracao_s=a.duracao,
+                aquecimento_s=a.aquecimento,
+                timeout_s=a.timeout,
+                seed=a.seed,
+            )
+        )
+    finally:
+        if proc is not None:
+            proc.terminate()
+            try:
+                proc.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+
+    rel = resumir(amostras, dur)
+    rel["config"] = {
+        "concorrencia": a.concorrencia,
+        "workers": a.workers,
+        "mix": a.mix,
+        "database": a.database_url.split("://", 1)[0],
+    }
+
+    regs: List[Dict[str, Any]] = []
+    if a.baseline:
+        with open(a.baseline, "r", encoding="utf-8") as f:
+            regs = comparar(rel, json.load(f), a.tolerancia)
+        rel["regressoes"] = regs
+
+    texto = json.dumps(rel, ensure_ascii=False, indent=2)
+    if a.saida:
+        with open(a.saida, "w", encoding="utf-8") as f:
+            f.write(texto)
+        print(f"📄 Relatório salvo em {a.saida}")
+    else:
+        print(texto)
+
+    if a.salvar_baseline:
+        with open(a.salvar_baseline, "w", encoding="utf-8") as f:
+            f.write(texto)
+        print(f"📌 Baseline salvo em {a.salvar_baseline}")
+
+    if regs:
+        for r in regs:
+            print(f"⚠️ Regressão em {r['rota']}: {r['metrica']} {r['baseline']} -> {r['atual']}")
+        if a.falhar_se_regressao:
+            return 1
+    elif a.baseline:
+        print("✅ Sem regressões em relação ao baseline.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,200 @@
+# app/scripts/verificar_eventos.py
+# -*- coding: utf-8 -*-
+"""
+Confere o feed SSE (GET /eventos/stream) ponta a ponta.
+
+Sobe a API com uvicorn (2 workers por padrão) e EVENTOS_BACKEND=arquivo, para
+que o evento gerado num worker chegue às conexões abertas no outro:
+  1. abre um stream por role (admin, opec, financeiro e executivo via ?token=);
+  2. faz as escritas pela API: cria entrega na carteira do executivo e fora dela,
+     marca entregue, envia para faturamento, muda o status, remove uma entrega;
+  3. confere o que cada role recebeu (filtro por role / carteira, sem o campo
+     interno "executivo");
+  4. reconecta com Last-Event-ID e confere o replay (ou "reset", se caiu num
+     worker que ainda não tinha o buffer).
+
+Como rodar (com venv ativo):
+    python -m app.scripts.verificar_eventos
+    python -m app.scripts.verificar_eventos --workers 1 -v
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import tempfile
+from typing import Any, Dict, List, Optional, Sequence
+
+from app.scripts import teste_carga as tc
+
+ESPERADO = {
+    "admin": ["entrega.criada", "entrega.criada", "entrega.entregue", "faturamento.criado", "faturamento.status", "entrega.removida"],
+    "opec": ["entrega.criada", "entrega.criada", "entrega.entregue", "faturamento.criado", "faturamento.status", "entrega.removida"],
+    "financeiro": ["faturamento.criado", "faturamento.status"],
+    "executivo": ["entrega.criada", "entrega.entregue"],  # só a entrega da própria carteira
+}
+
+
+async def _ler_sse(resp, destino: List[Dict[str, Any]], conectado: asyncio.Event) -> None:
+    campos: Dict[str, str] = {}
+    async for linha in resp.aiter_lines():
+        if linha.startswith(": conectado"):
+            conectado.set()
+        elif linha == "":
+            if "event" in campos:
+                destino.append({"id": campos.get("id"), "tipo": campos["event"], "dados": json.loads(campos.get("data") or "{}")})
+            campos = {}
+        elif not linha.startswith(":") and ":" in linha:
+            k, v = linha.split(":", 1)
+            campos[k] = v.lstrip(" ")
+
+
+async def _abrir(cli, url: str, headers: Dict[str, str], destino: List[Dict[str, Any]]) -> asyncio.Task:
+    conectado = asyncio.Event()
+
+    async def _rodar():
+        async with cli.stream("GET", url, headers=headers) as resp:
+            if resp.status_code != 200:
+                raise AssertionError(f"{url}: HTTP {resp.status_code}")
+            await _ler_sse(resp, destino, conectado)
+
+    task = asyncio.create_task(_rodar())
+    espera = asyncio.create_task(conectado.wait())
+    await asyncio.wait({task, espera}, timeout=15, return_when=asyncio.FIRST_COMPLETED)
+    if task.done():
+        task.result()  # propaga o erro
+    if not conectado.is_set():
+        raise AssertionError(f"{url}: stream não conectou")
+    return task
+
+
+async def _verificar(base_url: str, tokens: Dict[str, str], veic_carteira: int, veic_outra: int, verbose: bool) -> List[str]:
+    falhas: List[str] = []
+
+    def h(role: str) -> Dict[str, str]:
+        return {"Authorization": f"Bearer {tokens[role]}"}
+
+    recebidos: Dict[str, List[Dict[str, Any]]] = {r: [] for r in ESPERADO}
+    async with tc.httpx.AsyncClient(base_url=base_url, timeout=tc.httpx.Timeout(30.0, read=None)) as cli:
+        r = await cli.get("/eventos/stream")
+        if r.status_code != 401:
+            falhas.append(f"sem token: esperado 401, veio {r.status_code}")
+
+        tasks = []
+        for role in ("admin", "opec", "financeiro"):
+            tasks.append(await _abrir(cli, "/eventos/stream", h(role), recebidos[role]))
+        tasks.append(await _abrir(cli, f"/eventos/stream?token={tokens['executivo']}", {}, recebidos["executivo"]))
+
+        async def chamar(metodo: str, url: str, **kw) -> Any:
+            resp = await cli.request(metodo, url, headers=h("admin"), **kw)
+            if resp.status_code >= 400:
+                raise AssertionError(f"{metodo} {url}: HTTP {resp.status_code} {resp.text[:200]}")
+            return resp.json()
+
+        a = await chamar("POST", "/entregas", json={"veiculacao_id": veic_carteira, "data_entrega": "2025-06-10"})
+        b = await chamar("POST", "/entregas", json={"veiculacao_id": veic_outra, "data_entrega": "2025-06-11"})
+        await chamar("PUT", f"/entregas/{a['id']}/entregue")
+        fat = await chamar("POST", f"/entregas/{a['id']}/enviar-faturamento")
+        await chamar("PUT", f"/faturamentos/{fat['faturamento_id']}/status", json={"status": "FATURADO", "nf_numero": "123"})
+        await chamar("DELETE", f"/entregas/{b['id']}")
+
+        await asyncio.sleep(2.0)  # tail do arquivo (0.2s) + entrega nas filas
+        for t in tasks:
+            t.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+        for role, esperado in ESPERADO.items():
+            tipos = [ev["tipo"] for ev in recebidos[role]]
+            ok = tipos == esperado
+            vazou = [ev for ev in recebidos[role] if "executivo" in ev["dados"]]
+            if vazou:
+                ok = False
+            if not ok:
+                falhas.append(f"{role}: {tipos}")
+            print(f"{'✅' if ok else '❌'} {role}: {len(tipos)} evento(s) {tipos if verbose or not ok else ''}")
+
+        ex = recebidos["executivo"]
+        if ex and any(ev["dados"].get("entrega_id") != a["id"] for ev in ex):
+            falhas.append("executivo recebeu entrega fora da carteira")
+
+        # replay: perdeu tudo depois do 1º evento
+        admin = recebidos["admin"]
+        if admin:
+            replay: List[Dict[str, Any]] = []
+            t = await _abrir(cli, "/eventos/stream", {**h("admin"), "Last-Event-ID": admin[0]["id"]}, replay)
+            await asyncio.sleep(1.0)
+            t.cancel()
+            await asyncio.gather(t, return_exceptions=True)
+            tipos = [ev["tipo"] for ev in replay]
+            if tipos == [ev["tipo"] for ev in admin[1:]]:
+                print(f"✅ replay por Last-Event-ID: {len(tipos)} evento(s)")
+            elif tipos[:1] == ["reset"]:
+                print("✅ replay por Last-Event-ID: reset (worker sem o buffer — o front recarrega)")
+            else:
+                falhas.append(f"replay: {tipos}")
+                print(f"❌ replay por Last-Event-ID: {tipos}")
+    return falhas
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    p = argparse.ArgumentParser(prog="python -m app.scripts.verificar_eventos")
+    p.add_argument("--pis", type=int, default=200, help="tamanho da massa")
+    p.add_argument("--seed", type=int, default=42)
+    p.add_argument("--workers", type=int, default=2)
+    p.add_argument("-v", "--verbose", action="store_true")
+    a = p.parse_args(argv)
+
+    if tc.httpx is None:
+        print("❌ httpx não instalado: pip install httpx")
+        return 2
+
+    tmp = tempfile.mkdtemp(prefix="eventos_")
+    database_url = f"sqlite:///{os.path.join(tmp, 'eventos.db')}"
+    os.environ.update(
+        {
+            "EVENTOS_BACKEND": "arquivo",
+            "EVENTOS_ARQUIVO": os.path.join(tmp, "eventos.jsonl"),
+            "EVENTOS_HEARTBEAT_S": "1",
+            "EMAIL_OUTBOX_WORKER": "0",
+        }
+    )
+    tokens = tc.preparar_banco(database_url, a.pis, a.seed)
+
+    from app.database import SessionLocal, engine
+    from app.models import PI, Veiculacao
+
+    db = SessionLocal()
+    try:
+        base = db.query(Veiculacao.id).join(PI, PI.id == Veiculacao.pi_id)
+        veic_carteira = base.filter(PI.executivo == tc.EXECUTIVO_CARGA).order_by(Veiculacao.id).first()[0]
+        veic_outra = base.filter(PI.executivo != tc.EXECUTIVO_CARGA).order_by(Veiculacao.id).first()[0]
+    finally:
+        db.close()
+    engine.dispose()
+
+    porta = tc._porta_livre()
+    base_url = f"http://127.0.0.1:{porta}"
+    proc = tc.subir_uvicorn(database_url, porta, a.workers)
+    try:
+        asyncio.run(tc._esperar_saude(base_url))
+        print(f"🚀 API com {a.workers} worker(s), backend arquivo")
+        falhas = asyncio.run(_verificar(base_url, tokens, veic_carteira, veic_outra, a.verbose))
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(timeout=15)
+        except Exception:  # noqa: BLE001
+            proc.kill()
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    if falhas:
+        print(f"\n❌ {len(falhas)} checagem(ns) falharam: {falhas}")
+        return 1
+    print("\n✅ Feed de eventos OK")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
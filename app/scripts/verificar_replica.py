@@ -0,0 +1,220 @@
+# app/scripts/verificar_replica.py
+# -*- coding: utf-8 -*-
+"""
+Confere o roteamento primário x réplica (DATABASE_READ_URL) com dois
+arquivos SQLite locais fazendo o papel de primário e réplica.
+
+- monta a massa no primário e copia o arquivo para a réplica;
+- marca o PI 1 na réplica (nome_campanha) para saber de onde veio a leitura;
+- conta, por arquivo, os statements que cada requisição executou.
+
+Checagens:
+  GET (sync e async)        -> só réplica
+  POST                      -> só primário
+  escrita na mesma "requisição" -> leituras seguintes (inclusive de outra
+                               sessão) voltam pro primário: read-your-writes
+  fora de requisição        -> primário (scripts, workers)
+
+Como rodar (com venv ativo):
+    python -m app.scripts.verificar_replica
+    python -m app.scripts.verificar_replica --pis 500 -v
+
+No pytest: tests/test_verificar_replica.py (roda este módulo em subprocesso).
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import shutil
+import sqlite3
+import tempfile
+from collections import Counter
+from typing import Callable, List, Optional, Sequence, Tuple
+
+MARCA_REPLICA = "lido-da-replica"
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    p = argparse.ArgumentParser(prog="python -m app.scripts.verificar_replica")
+    p.add_argument("--pis", type=int, default=300, help="tamanho da massa")
+    p.add_argument("--seed", type=int, default=42)
+    p.add_argument("-v", "--verbose", action="store_true")
+    a = p.parse_args(argv)
+
+    tmp = tempfile.mkdtemp(prefix="replica_")
+    arq_primario = os.path.join(tmp, "primario.db")
+    arq_replica = os.path.join(tmp, "replica.db")
+
+    # antes de importar app.database (engines nascem no import)
+    os.environ["DATABASE_READ_URL"] = f"sqlite:///{arq_replica}"
+    os.environ["EMAIL_OUTBOX_WORKER"] = "0"
+    os.environ.setdefault("JOBS_WORKER", "0")
+
+    from app.scripts import teste_carga as tc
+
+    tokens = tc.preparar_banco(f"sqlite:///{arq_primario}", a.pis, a.seed)
+
+    from sqlalchemy import event, select, update
+    from sqlalchemy.engine import Engine
+
+    from app import database
+    from app.models import PI
+
+    database.engine.dispose()
+    shutil.copyfile(arq_primario, arq_replica)
+    with sqlite3.connect(arq_replica) as c:
+        c.execute("UPDATE pis_cadastro SET nome_campanha = ? WHERE id = 1", (MARCA_REPLICA,))
+    database.engine_leitura.dispose()
+
+    contagem: Counter = Counter()
+
+    @event.listens_for(Engine, "before_cursor_execute")
+    def _contar(conn, cursor, statement, params, context, executemany):  # noqa: ARG001
+        contagem[os.path.basename(conn.engine.url.database or "")] += 1
+
+    def _onde() -> Tuple[int, int]:
+        r = (contagem["primario.db"], contagem["replica.db"])
+        contagem.clear()
+        return r
+
+    falhas: List[str] = []
+
+    def checar(nome: str, fn: Callable[[], object], *, primario: bool, replica: bool) -> None:
+        contagem.clear()
+        try:
+            extra = fn()
+        except Exception as e:  # noqa: BLE001
+            falhas.append(f"{nome}: {e!r}")
+            print(f"❌ {nome}: {e!r}")
+            return
+        n_p, n_r = _onde()
+        ok = (n_p > 0) == primario and (n_r > 0) == replica
+        if not ok:
+            falhas.append(nome)
+        det = f" ({extra})" if extra is not None and a.verbose else ""
+        print(f"{'✅' if ok else '❌'} {nome}: primário={n_p} réplica={n_r}{det}")
+
+    from fastapi.testclient import TestClient
+
+    from app.main import app
+
+    def h(role: str):
+        return {"Authorization": f"Bearer {tokens[role]}"}
+
+    with TestClient(app) as cli:
+
+        def get(url: str, role: str = "admin", esperado: Optional[str] = None):
+            def _fn():
+                r = cli.get(url, headers=h(role))
+                if r.status_code != 200:
+                    raise AssertionError(f"HTTP {r.status_code}: {r.text[:200]}")
+                if esperado is not None and esperado not in r.text:
+                    raise AssertionError(f"resposta sem {esperado!r}")
+                return r.status_code
+
+            return _fn
+
+        checar("GET /pis/1 (sync, lê a marca da réplica)", get("/pis/1", esperado=MARCA_REPLICA), primario=False, replica=True)
+        checar("GET /pis (listagem)", get("/pis"), primario=False, replica=True)
+        checar("GET /agencias", get("/agencias"), primario=False, replica=True)
+        checar("GET /vendas/resumo (async)", get("/vendas/resumo?ano=2025"), primario=False, replica=True)
+        checar("GET /me/carteira (async)", get("/me/carteira?mes=6&ano=2025", role="executivo"), primario=False, replica=True)
+        checar(
+            "GET /faturamentos (async)",
+            get("/faturamentos?status=PAGO", role="financeiro"),
+            primario=False,
+            replica=True,
+        )
+
+        def _post():
+            r = cli.post(
+                "/agencias",
+                headers=h("admin"),
+                json={"nome_agencia": "Agência Réplica", "cnpj_agencia": "11.222.333/0001-81", "executivo": "Executivo 01"},
+            )
+            if r.status_code not in (200, 201):
+                raise AssertionError(f"HTTP {r.status_code}: {r.text[:200]}")
+            return r.status_code
+
+        checar("POST /agencias", _post, primario=True, replica=False)
+
+    # read-your-writes dentro de uma "requisição" (sem rota GET que escreva)
+    def _sessao_escreve_e_le():
+        with database.leitura_na_replica():
+            db = database.SessionLocal()
+            outra = database.SessionLocal()
+            try:
+                if db.get(PI, 1).nome_campanha != MARCA_REPLICA:
+                    raise AssertionError("primeira leitura não veio da réplica")
+                pi = db.get(PI, 2)
+                n_p, n_r = _onde()
+                if n_p or not n_r:
+                    raise AssertionError(f"antes da escrita: primário={n_p} réplica={n_r}")
+
+                pi.observacoes = "escrita no primário"
+                db.flush()
+                db.expire_all()
+                if db.get(PI, 1).nome_campanha == MARCA_REPLICA:
+                    raise AssertionError("depois da escrita a sessão ainda lê da réplica")
+                if outra.get(PI, 1).nome_campanha == MARCA_REPLICA:
+                    raise AssertionError("outra sessão da requisição ainda lê da réplica")
+                db.rollback()
+            finally:
+                db.close()
+                outra.close()
+            return "escrita -> primário para as duas sessões"
+
+    checar("read-your-writes (sessão + outra sessão)", _sessao_escreve_e_le, primario=True, replica=False)
+
+    def _update_em_massa():
+        with database.leitura_na_replica():
+            db = database.SessionLocal()
+            try:
+                db.execute(update(PI).where(PI.id == 3).values(observacoes="x"))
+                nome = db.execute(select(PI.nome_campanha).where(PI.id == 1)).scalar()
+                db.rollback()
+                if nome == MARCA_REPLICA:
+                    raise AssertionError("UPDATE explícito não desviou a leitura para o primário")
+            finally:
+                db.close()
+
+    checar("read-your-writes (db.execute(update(...)))", _update_em_massa, primario=True, replica=False)
+
+    def _fora_de_requisicao():
+        db = database.SessionLocal()
+        try:
+            if db.get(PI, 1).nome_campanha == MARCA_REPLICA:
+                raise AssertionError("fora de requisição leu da réplica")
+        finally:
+            db.close()
+
+    checar("fora de requisição (scripts/workers)", _fora_de_requisicao, primario=True, replica=False)
+
+    def _async():
+        from app.database_async import sessao_leitura
+
+        async def _ler():
+            with database.leitura_na_replica():
+                async with sessao_leitura() as db:
+                    return await db.run_sync(lambda s: s.get(PI, 1).nome_campanha)
+
+        nome = asyncio.run(_ler())
+        if nome != MARCA_REPLICA:
+            raise AssertionError(f"sessao_leitura leu {nome!r}")
+
+    checar("rotas async (sessao_leitura, thread de trabalho)", _async, primario=False, replica=True)
+
+    database.engine.dispose()
+    database.engine_leitura.dispose()
+    shutil.rmtree(tmp, ignore_errors=True)
+
+    if falhas:
+        print(f"\n❌ {len(falhas)} checagem(ns) falharam: {falhas}")
+        return 1
+    print("\n✅ Roteamento primário/réplica OK")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
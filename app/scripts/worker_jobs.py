@@ -0,0 +1,74 @@
+# app/scripts/worker_jobs.py
+# -*- coding: utf-8 -*-
+"""
+Processo dedicado para os jobs em background (tabela jobs).
+
+Rode quantos quiser, em quantas máquinas quiser (todas apontando para o mesmo
+DATABASE_URL): cada job é reservado por UPDATE condicional, nunca roda em dois
+workers ao mesmo tempo. A API só enfileira (JOBS_WORKER=0, o padrão); sem
+este processo rodando, os jobs ficam PENDENTE.
+
+Como rodar (com venv ativo):
+    python -m app.scripts.worker_jobs --threads 4
+    python -m app.scripts.worker_jobs --tipos pi.anexo_drive,pi.extrair_pdf
+    python -m app.scripts.worker_jobs --drenar      # executa o que está na fila e sai
+"""
+from __future__ import annotations
+
+import argparse
+import signal
+from typing import Optional, Sequence
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    from app.core.config import JOBS_THREADS
+
+    p = argparse.ArgumentParser(prog="python -m app.scripts.worker_jobs")
+    p.add_argument("--threads", type=int, default=JOBS_THREADS, help=f"jobs simultâneos neste processo (padrão {JOBS_THREADS})")
+    p.add_argument("--tipos", default="", help="só estes tipos, separados por vírgula (padrão: todos)")
+    p.add_argument("--drenar", action="store_true", help="processa a fila até esvaziar e sai")
+    a = p.parse_args(argv)
+
+    from app.core import jobs
+    from app.database import SessionLocal, init_db
+
+    init_db()
+    tipos = [t.strip() for t in a.tipos.split(",") if t.strip()] or None
+    desconhecidos = sorted(set(tipos or []) - set(jobs.tipos_registrados()))
+    if desconhecidos:
+        p.error(f"tipos desconhecidos: {', '.join(desconhecidos)} (disponíveis: {', '.join(jobs.tipos_registrados())})")
+
+    if a.drenar:
+        total = {"concluidos": 0, "reagendados": 0, "falhos": 0}
+        while True:
+            db = SessionLocal()
+            try:
+                res = jobs.processar_lote(db, limite=10, tipos=tipos)
+            finally:
+                db.close()
+            if not sum(res.values()):
+                break
+            for k, v in res.items():
+                total[k] += v
+        print(f"✅ Fila drenada: {total}")
+        return 0
+
+    worker = jobs.Worker(threads=a.threads, tipos=tipos)
+
+    def _parar(signum, _frame):
+        print(f"🛑 Sinal {signum}: terminando os jobs em andamento...")
+        worker.pedir_parada()
+
+    signal.signal(signal.SIGTERM, _parar)
+    signal.signal(signal.SIGINT, _parar)
+
+    worker.iniciar()
+    print(f"🚀 Worker de jobs: {worker.threads} thread(s), tipos: {', '.join(tipos or ['todos'])}")
+    worker.aguardar()
+    worker.parar()
+    print("👋 Worker de jobs encerrado.")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
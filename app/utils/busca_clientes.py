@@ -0,0 +1,321 @@
+# app/utils/busca_clientes.py
+"""
+Busca de agências/anunciantes sem acento e com índice, por backend.
+
+Campos pesquisados (os mesmos do antigo list_by_name):
+  nome, codinome, razão social e grupo empresarial.
+
+SQLite   -> tabelas FTS5 "sombra" (agencias_fts / anunciantes_fts, external
+            content) com tokenizer unicode61 remove_diacritics, mantidas por
+            TRIGGERS (pegam também inserts em lote fora do ORM).
+            Busca por prefixo de palavra: "agenc bras" acha "Agência Brasil".
+            Se o FTS não enche o limite, completa com trecho no meio da
+            palavra ("rasil" -> "Brasil") via busca_norm() registrada na
+            conexão (sem índice; tabelas de clientes são pequenas).
+Postgres -> pg_trgm + unaccent: índice GIN (gin_trgm_ops) sobre a chave
+            normalizada busca_norm(coalesce(nome,'') || ' ' || ...): só
+            funções IMMUTABLE (concat_ws é STABLE e não pode ir no índice).
+            Cada índice em sua própria transação: um que falhe não desfaz
+            a função, as extensões nem os demais.
+            Busca por trecho (ILIKE) com ranking por similaridade.
+Outros / sem permissão para extensões -> ILIKE antigo (sem índice); no
+            SQLite com busca_norm(), nos demais sem tirar acento do termo.
+
+instalar_busca(engine) é idempotente e roda no init_db() quando o schema muda
+(DDL_VERSAO entra na impressão digital do schema). Se a instalação falha, o
+init_db não grava a impressão digital e tenta de novo no próximo start.
+"""
+from __future__ import annotations
+
+import re
+import unicodedata
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+# tipo -> (tabela, id, [colunas pesquisadas], coluna de cnpj)
+ALVOS: Dict[str, Dict[str, Any]] = {
+    "agencia": {
+        "tabela": "agencias",
+        "fts": "agencias_fts",
+        "colunas": ["nome_agencia", "codinome", "razao_social_agencia", "grupo_empresarial"],
+        "cnpj": "cnpj_agencia",
+    },
+    "anunciante": {
+        "tabela": "anunciantes",
+        "fts": "anunciantes_fts",
+        "colunas": ["nome_anunciante", "codinome", "razao_social_anunciante", "grupo_empresarial"],
+        "cnpj": "cnpj_anunciante",
+    },
+}
+
+# mude ao alterar o DDL abaixo: força o init_db a reinstalar
+DDL_VERSAO = "3"
+
+# estratégia ativa por engine (url) — decidida no instalar_busca
+_estrategia: Dict[str, str] = {}
+
+
+# ==========================================================
+# Normalização do termo
+# ==========================================================
+def normalizar(texto: Optional[str]) -> str:
+    """'  Agência  São-Paulo ' -> 'agencia sao-paulo'"""
+    if not texto:
+        return ""
+    t = unicodedata.normalize("NFKD", texto)
+    t = "".join(ch for ch in t if not unicodedata.combining(ch))
+    return re.sub(r"\s+", " ", t).strip().lower()
+
+
+def _tokens(termo: str, *, sem_acento: bool = True) -> List[str]:
+    base = normalizar(termo) if sem_acento else re.sub(r"\s+", " ", termo or "").strip().lower()
+    return [t for t in re.split(r"[^\w]+", base) if t]
+
+
+def _busca_norm(*textos: Optional[str]) -> str:
+    return normalizar(" ".join(t for t in textos if t))
+
+
+def _registrar_norm_sqlite(db: Session) -> None:
+    """busca_norm(col1, col2, ...) no SQLite (o Postgres tem a sua, criada no _instalar_postgres)."""
+    dbapi = db.connection().connection.dbapi_connection
+    dbapi.create_function("busca_norm", -1, _busca_norm, deterministic=True)
+
+
+# ==========================================================
+# Instalação (DDL por backend)
+# ==========================================================
+def _instalar_sqlite(conn) -> None:
+    for alvo in ALVOS.values():
+        tab, fts, cols = alvo["tabela"], alvo["fts"], alvo["colunas"]
+        existe = conn.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type='table' AND name=:n"), {"n": fts}
+        ).first()
+
+        conn.execute(text(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5("
+            f"{', '.join(cols)}, content='{tab}', content_rowid='id', "
+            f"tokenize='unicode61 remove_diacritics 2')"
+        ))
+
+        novos = ", ".join(f"new.{c}" for c in cols)
+        velhos = ", ".join(f"old.{c}" for c in cols)
+        lista = ", ".join(cols)
+        conn.execute(text(
+            f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {tab} BEGIN "
+            f"INSERT INTO {fts}(rowid, {lista}) VALUES (new.id, {novos}); END"
+        ))
+        conn.execute(text(
+            f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {tab} BEGIN "
+            f"INSERT INTO {fts}({fts}, rowid, {lista}) VALUES ('delete', old.id, {velhos}); END"
+        ))
+        conn.execute(text(
+            f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE ON {tab} BEGIN "
+            f"INSERT INTO {fts}({fts}, rowid, {lista}) VALUES ('delete', old.id, {velhos}); "
+            f"INSERT INTO {fts}(rowid, {lista}) VALUES (new.id, {novos}); END"
+        ))
+
+        if not existe:
+            # primeira vez: indexa o que já está na tabela
+            conn.execute(text(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')"))
+
+
+def _expr_pg(cols: List[str], alias: str = "") -> str:
+    # || e coalesce são IMMUTABLE (concat_ws não): a expressão pode ir no índice
+    pref = f"{alias}." if alias else ""
+    return "busca_norm(" + " || ' ' || ".join(f"coalesce({pref}{c}, '')" for c in cols) + ")"
+
+
+def _indices_postgres() -> List[Tuple[str, str]]:
+    out = []
+    for alvo in ALVOS.values():
+        tab, cols = alvo["tabela"], alvo["colunas"]
+        out.append((
+            f"ix_{tab}_busca_trgm",
+            f"CREATE INDEX IF NOT EXISTS ix_{tab}_busca_trgm ON {tab} USING gin (({_expr_pg(cols)}) gin_trgm_ops)",
+        ))
+        # /me/carteira/*: lower(nome) LIKE '%q%'
+        out.append((
+            f"ix_{tab}_nome_lower_trgm",
+            f"CREATE INDEX IF NOT EXISTS ix_{tab}_nome_lower_trgm ON {tab} USING gin (lower({cols[0]}) gin_trgm_ops)",
+        ))
+    return out
+
+
+def _instalar_postgres(engine: Engine) -> None:
+    with engine.begin() as conn:
+        conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+        conn.execute(text("CREATE EXTENSION IF NOT EXISTS unaccent"))
+        # unaccent() não é IMMUTABLE: wrapper para poder indexar a expressão
+        conn.execute(text(
+            "CREATE OR REPLACE FUNCTION busca_norm(t text) RETURNS text "
+            "LANGUAGE sql IMMUTABLE PARALLEL SAFE AS "
+            "$$ SELECT lower(public.unaccent('public.unaccent'::regdictionary, coalesce(t, ''))) $$"
+        ))
+
+    erros = []
+    for nome, ddl in _indices_postgres():
+        try:
+            with engine.begin() as conn:
+                conn.execute(text(ddl))
+        except Exception as e:
+            print(f"⚠️ Índice {nome} não criado:", repr(e))
+            erros.append(nome)
+    if erros:
+        raise RuntimeError(f"Índices de busca não criados: {', '.join(erros)}")
+
+
+def instalar_busca(engine: Engine, *, levantar: bool = False) -> str:
+    """
+    Cria a estrutura de busca do backend. Retorna a estratégia ativa (fts5|trgm|ilike).
+    Falhou: usa ILIKE nesta execução; com levantar=True a exceção sobe (o
+    init_db usa isso para não marcar o schema como aplicado).
+    """
+    nome = engine.dialect.name
+    estrategia = "ilike"
+    try:
+        if nome == "sqlite":
+            with engine.begin() as conn:
+                _instalar_sqlite(conn)
+            estrategia = "fts5"
+        elif nome == "postgresql":
+            _instalar_postgres(engine)
+            estrategia = "trgm"
+    except Exception as e:
+        print("⚠️ Busca indexada indisponível (usando ILIKE):", repr(e))
+        _estrategia[str(engine.url)] = "ilike"
+        if levantar:
+            raise
+        estrategia = "ilike"
+
+    _estrategia[str(engine.url)] = estrategia
+    return estrategia
+
+
+def remover_busca(engine: Engine) -> None:
+    """Apaga as tabelas FTS5 sombra (antes de um drop_all; os triggers caem junto com as tabelas)."""
+    if engine.dialect.name != "sqlite":
+        return  # Postgres: os índices caem junto com as tabelas
+    with engine.begin() as conn:
+        for alvo in ALVOS.values():
+            conn.execute(text(f"DROP TABLE IF EXISTS {alvo['fts']}"))
+    _estrategia.pop(str(engine.url), None)
+
+
+def definir_estrategia(engine: Engine, estrategia: str) -> None:
+    """Registra a estratégia já instalada (init_db com schema em dia: sem DDL)."""
+    _estrategia[str(engine.url)] = estrategia
+
+
+def estrategia_de(db: Session) -> str:
+    bind = db.get_bind()
+    key = str(bind.url)
+    if key not in _estrategia:
+        instalar_busca(bind)
+    return _estrategia[key]
+
+
+# ==========================================================
+# Consulta
+# ==========================================================
+def buscar(
+    db: Session,
+    tipo: str,
+    termo: str,
+    *,
+    limite: Optional[int] = 10,
+) -> List[Dict[str, Any]]:
+    """
+    Resultados ranqueados (melhor primeiro):
+    [{"id", "nome", "codinome", "razao_social", "grupo_empresarial", "cnpj"}]
+    """
+    alvo = ALVOS[tipo]
+    tab, cols, cnpj = alvo["tabela"], alvo["colunas"], alvo["cnpj"]
+    toks = _tokens(termo)
+    if not toks:
+        return []
+
+    estrategia = estrategia_de(db)
+    sel = ", ".join(f"t.{c}" for c in cols)
+    lim = " LIMIT :lim" if limite else ""
+    params: Dict[str, Any] = {"lim": int(limite)} if limite else {}
+
+    if estrategia == "fts5":
+        achados = _buscar_fts5(db, alvo, toks, sel, lim, params)
+        if limite and len(achados) >= limite:
+            return [_linha(r) for r in achados]
+        # trecho no meio da palavra: o FTS só casa prefixo
+        vistos = {r[0] for r in achados}
+        sql = f"SELECT t.id, {sel}, t.{cnpj} FROM {tab} t WHERE {_where_norm_sqlite(db, cols, toks, params)} ORDER BY t.{cols[0]}"
+        resto = [r for r in db.execute(text(sql), params).all() if r[0] not in vistos]
+        linhas = achados + resto
+        return [_linha(r) for r in (linhas[:limite] if limite else linhas)]
+
+    if estrategia == "trgm":
+
+        expr = _expr_pg(cols, "t")
+        conds = []
+        for i, t in enumerate(toks):
+            params[f"p{i}"] = f"%{t}%"
+            conds.append(f"{expr} LIKE :p{i}")
+        params["termo"] = " ".join(toks)
+        params["prefixo"] = f"{toks[0]}%"
+        sql = (
+            f"SELECT t.id, {sel}, t.{cnpj} FROM {tab} t "
+            f"WHERE {' AND '.join(conds)} "
+            f"ORDER BY (busca_norm(t.{cols[0]}) LIKE :prefixo) DESC, "
+            f"similarity({expr}, :termo) DESC, t.{cols[0]}{lim}"
+        )
+    elif db.get_bind().dialect.name == "sqlite":
+        sql = f"SELECT t.id, {sel}, t.{cnpj} FROM {tab} t WHERE {_where_norm_sqlite(db, cols, toks, params)} ORDER BY t.{cols[0]}{lim}"
+    else:
+        # coluna só passa por lower(): o termo também mantém os acentos
+        conds = []
+        for i, t in enumerate(_tokens(termo, sem_acento=False)):
+            params[f"p{i}"] = f"%{t}%"
+            conds.append("(" + " OR ".join(f"lower(t.{c}) LIKE :p{i}" for c in cols) + ")")
+        sql = f"SELECT t.id, {sel}, t.{cnpj} FROM {tab} t WHERE {' AND '.join(conds)} ORDER BY t.{cols[0]}{lim}"
+
+    return [_linha(r) for r in db.execute(text(sql), params).all()]
+
+
+def _where_norm_sqlite(db: Session, cols: List[str], toks: List[str], params: Dict[str, Any]) -> str:
+    """Cada palavra como trecho da chave normalizada (nome + codinome + razão + grupo)."""
+    _registrar_norm_sqlite(db)
+    conds = []
+    for i, t in enumerate(toks):
+        params[f"p{i}"] = f"%{t}%"
+        conds.append(f"busca_norm({', '.join('t.' + c for c in cols)}) LIKE :p{i}")
+    return " AND ".join(conds)
+
+
+def _buscar_fts5(db: Session, alvo: Dict[str, Any], toks: List[str], sel: str, lim: str, params: Dict[str, Any]) -> list:
+    tab, fts, cols, cnpj = alvo["tabela"], alvo["fts"], alvo["colunas"], alvo["cnpj"]
+    # cada palavra vira prefixo; aspas evitam que o termo seja lido como operador FTS
+    q = {**params, "q": " ".join('"' + t.replace('"', "") + '"*' for t in toks)}
+    sql = (
+        f"SELECT t.id, {sel}, t.{cnpj} FROM {fts} "
+        f"JOIN {tab} t ON t.id = {fts}.rowid "
+        f"WHERE {fts} MATCH :q "
+        f"ORDER BY bm25({fts}, 10.0, 6.0, 3.0, 1.0), t.{cols[0]}{lim}"
+    )
+    return db.execute(text(sql), q).all()
+
+
+def _linha(r) -> Dict[str, Any]:
+    return {
+        "id": r[0],
+        "nome": r[1],
+        "codinome": r[2],
+        "razao_social": r[3],
+        "grupo_empresarial": r[4],
+        "cnpj": r[5],
+    }
+
+
+def ids_por_termo(db: Session, tipo: str, termo: str) -> List[int]:
+    """Todos os ids que casam com o termo (sem limite), para o list_by_name."""
+    return [r["id"] for r in buscar(db, tipo, termo, limite=None)]
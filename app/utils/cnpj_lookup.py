@@ -0,0 +1,280 @@
+# app/utils/cnpj_lookup.py
+"""
+Consulta de CNPJ (BrasilAPI) com cache persistente e coalescência de requisições.
+
+- Cache no banco (tabela cnpj_cache) com TTL; "não encontrado" também é
+  guardado (TTL menor), para não martelar a API a cada tecla digitada.
+- Uma única requests.Session (pool de conexões keep-alive) por processo.
+- Singleflight: consultas simultâneas ao mesmo CNPJ esperam a MESMA chamada.
+- As chamadas externas rodam num pool próprio e pequeno
+  (CNPJ_LOOKUP_MAX_SIMULTANEAS): se a BrasilAPI ficar lenta, só esse pool
+  enche — as rotas async não prendem threads do uvicorn e, com o pool cheio,
+  novas consultas recebem CnpjLookupOcupado (503) na hora.
+- Se a API falhar e existir cache vencido, ele é devolvido (origem "cache_vencido").
+
+Provider plugável (CNPJ_LOOKUP_PROVIDER):
+  brasilapi -> HTTP real
+  local     -> LocalCnpjProvider (arquivo JSON ou dict em memória), para testes/dev
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Optional
+
+from app.core.config import (
+    CNPJ_LOOKUP_PROVIDER,
+    CNPJ_LOOKUP_LOCAL_FILE,
+    BRASILAPI_CNPJ_URL,
+    BRASILAPI_TIMEOUT_S,
+    CNPJ_CACHE_TTL_HORAS,
+    CNPJ_CACHE_TTL_NEGATIVO_HORAS,
+    CNPJ_LOOKUP_MAX_SIMULTANEAS,
+)
+from app.utils.cnpj import only_digits, is_cnpj_like
+
+
+class CnpjLookupError(Exception):
+    """Falha ao consultar o provedor (timeout, 5xx, rede)."""
+
+
+class CnpjLookupOcupado(CnpjLookupError):
+    """Todas as vagas de consulta externa estão ocupadas (provedor lento)."""
+
+
+@dataclass
+class ResultadoCnpj:
+    cnpj: str
+    encontrado: bool
+    dados: Optional[Dict[str, Any]]
+    origem: str  # cache | api | cache_vencido
+
+
+# ==========================================================
+# Providers
+# ==========================================================
+class BrasilApiProvider:
+    """buscar(cnpj) -> dict | None (None = não encontrado). Levanta CnpjLookupError."""
+
+    def __init__(self, url: str = BRASILAPI_CNPJ_URL, timeout: float = BRASILAPI_TIMEOUT_S, pool: int = 8):
+        # requests só é carregado quando a primeira consulta real acontece
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        self.url = url
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update({"Accept": "application/json"})
+
+    def buscar(self, cnpj: str) -> Optional[Dict[str, Any]]:
+        import requests
+
+        try:
+            r = self.session.get(self.url.format(cnpj=cnpj), timeout=(3.05, self.timeout))
+        except requests.RequestException as e:
+            raise CnpjLookupError(f"Erro ao consultar BrasilAPI: {e}") from e
+        if r.status_code == 200:
+            return r.json()
+        if r.status_code == 404:
+            return None
+        raise CnpjLookupError(f"BrasilAPI respondeu {r.status_code}.")
+
+
+class LocalCnpjProvider:
+    """
+    Stand-in local: responde a partir de um dict (ou arquivo JSON {cnpj: payload}).
+    CNPJ fora do dict = não encontrado. `atraso` simula API lenta; `chamadas` conta acessos.
+    """
+
+    def __init__(self, dados: Optional[Dict[str, Dict[str, Any]]] = None, *, arquivo: str = "", atraso: float = 0.0):
+        self.dados: Dict[str, Dict[str, Any]] = {only_digits(k): v for k, v in (dados or {}).items()}
+        if arquivo:
+            with open(arquivo, "r", encoding="utf-8") as f:
+                self.dados.update({only_digits(k): v for k, v in json.load(f).items()})
+        self.atraso = float(atraso)
+        self.chamadas = 0
+        self._lock = threading.Lock()
+
+    def buscar(self, cnpj: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            self.chamadas += 1
+        if self.atraso:
+            time.sleep(self.atraso)
+        return self.dados.get(cnpj)
+
+
+def _provider_padrao():
+    if (CNPJ_LOOKUP_PROVIDER or "").strip().lower() == "local":
+        return LocalCnpjProvider(arquivo=CNPJ_LOOKUP_LOCAL_FILE)
+    return BrasilApiProvider()
+
+
+# ==========================================================
+# Serviço
+# ==========================================================
+class CnpjLookupService:
+    def __init__(
+        self,
+        provider=None,
+        session_factory: Optional[Callable[[], Any]] = None,
+        *,
+        ttl: timedelta = timedelta(hours=CNPJ_CACHE_TTL_HORAS),
+        ttl_negativo: timedelta = timedelta(hours=CNPJ_CACHE_TTL_NEGATIVO_HORAS),
+        max_simultaneas: int = CNPJ_LOOKUP_MAX_SIMULTANEAS,
+        espera_s: float = BRASILAPI_TIMEOUT_S + 5,
+    ):
+        self._provider = provider
+        self._session_factory = session_factory
+        self.ttl = ttl
+        self.ttl_negativo = ttl_negativo
+        self.max_simultaneas = max(1, int(max_simultaneas))
+        self.espera_s = espera_s
+
+        self._lock = threading.Lock()
+        self._em_voo: Dict[str, Future] = {}
+        self._executor = ThreadPoolExecutor(max_workers=self.max_simultaneas, thread_name_prefix="cnpj-lookup")
+
+    # ---------- dependências (lazy) ----------
+    @property
+    def provider(self):
+        if self._provider is None:
+            self._provider = _provider_padrao()
+        return self._provider
+
+    def _db(self):
+        if self._session_factory is None:
+            from app.database import SessionLocal
+
+            self._session_factory = SessionLocal
+        return self._session_factory()
+
+    # ---------- cache ----------
+    def ler_cache(self, cnpj: str) -> Optional[tuple]:
+        """(ResultadoCnpj, vencido: bool) ou None."""
+        from app.models_cnpj_cache import CnpjCache
+
+        db = self._db()
+        try:
+            reg = db.get(CnpjCache, cnpj)
+            if reg is None:
+                return None
+            dados = json.loads(reg.payload) if reg.payload else None
+            res = ResultadoCnpj(cnpj=cnpj, encontrado=reg.status == "OK", dados=dados, origem="cache")
+            return res, reg.expira_em <= datetime.utcnow()
+        finally:
+            db.close()
+
+    def _gravar_cache(self, cnpj: str, dados: Optional[Dict[str, Any]]) -> None:
+        from app.models_cnpj_cache import CnpjCache
+
+        now = datetime.utcnow()
+        db = self._db()
+        try:
+            db.merge(
+                CnpjCache(
+                    cnpj=cnpj,
+                    status="OK" if dados is not None else "NAO_ENCONTRADO",
+                    payload=json.dumps(dados, ensure_ascii=False) if dados is not None else None,
+                    consultado_em=now,
+                    expira_em=now + (self.ttl if dados is not None else self.ttl_negativo),
+                )
+            )
+            db.commit()
+        except Exception as e:
+            # corrida com outro processo gravando o mesmo CNPJ: o cache é só otimização
+            db.rollback()
+            print("⚠️ Falha ao gravar cache de CNPJ:", repr(e))
+        finally:
+            db.close()
+
+    def invalidar(self, cnpj: str) -> None:
+        from app.models_cnpj_cache import CnpjCache
+
+        db = self._db()
+        try:
+            db.query(CnpjCache).filter(CnpjCache.cnpj == only_digits(cnpj)).delete(synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+
+    # ---------- consulta externa (singleflight) ----------
+    def _buscar_e_gravar(self, cnpj: str) -> ResultadoCnpj:
+        dados = self.provider.buscar(cnpj)
+        self._gravar_cache(cnpj, dados)
+        return ResultadoCnpj(cnpj=cnpj, encontrado=dados is not None, dados=dados, origem="api")
+
+    def _future(self, cnpj: str) -> Future:
+        with self._lock:
+            fut = self._em_voo.get(cnpj)
+            if fut is not None:
+                return fut
+            if len(self._em_voo) >= self.max_simultaneas:
+                raise CnpjLookupOcupado("Consulta de CNPJ indisponível no momento (BrasilAPI lenta). Tente novamente.")
+            fut = self._executor.submit(self._buscar_e_gravar, cnpj)
+            self._em_voo[cnpj] = fut
+
+        def _sair(_f, cnpj=cnpj):
+            with self._lock:
+                if self._em_voo.get(cnpj) is _f:
+                    del self._em_voo[cnpj]
+
+        fut.add_done_callback(_sair)
+        return fut
+
+    @staticmethod
+    def _normalizar(cnpj: str) -> str:
+        c = only_digits(cnpj)
+        if not is_cnpj_like(c):
+            raise ValueError("CNPJ inválido.")
+        return c
+
+    # ---------- API pública ----------
+    def consultar(self, cnpj: str) -> ResultadoCnpj:
+        """Versão síncrona (desktop/scripts)."""
+        c = self._normalizar(cnpj)
+        cache = self.ler_cache(c)
+        if cache and not cache[1]:
+            return cache[0]
+        try:
+            return self._future(c).result(timeout=self.espera_s)
+        except FutureTimeout:
+            return self._fallback(cache, CnpjLookupError("Tempo esgotado consultando a BrasilAPI."))
+        except CnpjLookupError as e:
+            return self._fallback(cache, e)
+
+    async def consultar_async(self, cnpj: str) -> ResultadoCnpj:
+        """Versão das rotas: não ocupa thread do servidor enquanto espera a API."""
+        from starlette.concurrency import run_in_threadpool
+
+        c = self._normalizar(cnpj)
+        cache = await run_in_threadpool(self.ler_cache, c)
+        if cache and not cache[1]:
+            return cache[0]
+        try:
+            fut = self._future(c)
+            return await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(fut)), timeout=self.espera_s)
+        except asyncio.TimeoutError:
+            return self._fallback(cache, CnpjLookupError("Tempo esgotado consultando a BrasilAPI."))
+        except CnpjLookupError as e:
+            return self._fallback(cache, e)
+
+    @staticmethod
+    def _fallback(cache: Optional[tuple], erro: CnpjLookupError) -> ResultadoCnpj:
+        if cache is not None:
+            res = cache[0]
+            res.origem = "cache_vencido"
+            return res
+        raise erro
+
+
+# instância do processo
+cnpj_lookup = CnpjLookupService()
@@ -1,12 +1,13 @@
 import io
 import os
-from functools import lru_cache
-from typing import Optional, Literal
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Literal
 
-from google.oauth2.service_account import Credentials
-from googleapiclient.discovery import build
-from googleapiclient.http import MediaIoBaseUpload, MediaIoBaseDownload
-from googleapiclient.errors import HttpError
+# ⚠️ google-api-python-client / google-auth são importados só na primeira
+# chamada (custam ~80 ms no import do app.main e só servem para anexos).
 
 # Escopo amplo para upload/leitura/baixa (pode reduzir se quiser)
 SCOPES = ["https://www.googleapis.com/auth/drive"]
@@ -30,13 +31,200 @@ def _cred_path(env_key: str) -> str:
     return path
 
 
-@lru_cache(maxsize=2)
-def _drive_service(which: Literal["pi", "proposta"] = "pi"):
-    """Cria (com cache) um client do Drive para a credencial escolhida."""
+# ==========================================================
+# Pool de clients do Drive (1 por thread em uso, reaproveitados)
+# ==========================================================
+# O service do googleapiclient usa um httplib2.Http, que NÃO é thread-safe:
+# um único service compartilhado pelo threadpool das rotas/jobs mistura
+# respostas ou serializa tudo na mesma conexão. Aqui cada empréstimo pega um
+# client exclusivo (service + AuthorizedHttp + Http com keep-alive); ao
+# devolver, a conexão TLS continua aberta para o próximo uso.
+# A credencial (token OAuth) é compartilhada e renovada ANTES de expirar,
+# sob lock, por quem pega o client: nenhuma requisição paga o refresh nem
+# dispara vários refresh ao mesmo tempo.
+DRIVE_POOL_MAX = int(os.getenv("DRIVE_POOL_MAX", "8"))  # clients por credencial
+DRIVE_POOL_ESPERA_S = float(os.getenv("DRIVE_POOL_ESPERA_S", "30"))  # pool cheio: espera por um client livre
+DRIVE_HTTP_TIMEOUT_S = float(os.getenv("DRIVE_HTTP_TIMEOUT_S", "60"))
+DRIVE_TOKEN_MARGEM_S = float(os.getenv("DRIVE_TOKEN_MARGEM_S", "300"))  # renova o token faltando isso para expirar
+
+
+class PoolDrive:
+    def __init__(self, which: str, fabrica_credencial, *, maximo: int = DRIVE_POOL_MAX, fabrica_client=None):
+        self.which = which
+        self.maximo = max(1, int(maximo))
+        self._fabrica_credencial = fabrica_credencial
+        self._fabrica_client = fabrica_client or self._novo_client
+        self._creds = None
+        self._lock_token = threading.Lock()
+        self._cond = threading.Condition()
+        self._ociosos: List[Any] = []  # LIFO: o último devolvido tem a conexão mais "quente"
+        self._criados = 0
+        self._stats = {
+            "emprestimos": 0,
+            "reusos": 0,
+            "esperas": 0,
+            "espera_ms_total": 0.0,
+            "descartados": 0,
+            "refreshes": 0,
+            "falhas_refresh": 0,
+        }
+        self._em_uso = 0
+        self._ultimo_refresh: Optional[datetime] = None
+
+    # ---------- credencial ----------
+    def _credencial(self):
+        if self._creds is None:
+            with self._lock_token:
+                if self._creds is None:
+                    self._creds = self._fabrica_credencial()
+        return self._creds
+
+    def _precisa_renovar(self, creds) -> bool:
+        if not getattr(creds, "token", None) or getattr(creds, "expiry", None) is None:
+            return True
+        return creds.expiry - datetime.utcnow() < timedelta(seconds=DRIVE_TOKEN_MARGEM_S)
+
+    def garantir_token(self) -> None:
+        creds = self._credencial()
+        if not self._precisa_renovar(creds):
+            return
+        with self._lock_token:
+            if not self._precisa_renovar(creds):
+                return  # outra thread renovou enquanto esperávamos
+            from google.auth.transport.requests import Request
+
+            try:
+                creds.refresh(Request())
+            except Exception:
+                self._stats["falhas_refresh"] += 1
+                raise
+            self._stats["refreshes"] += 1
+            self._ultimo_refresh = datetime.utcnow()
+
+    # ---------- clients ----------
+    def _novo_client(self):
+        import httplib2
+        from google_auth_httplib2 import AuthorizedHttp
+        from googleapiclient.discovery import build
+
+        http = AuthorizedHttp(self._credencial(), http=httplib2.Http(timeout=DRIVE_HTTP_TIMEOUT_S))
+        # discovery embutido na lib (static_discovery): nenhum GET extra por client
+        return build("drive", "v3", http=http, cache_discovery=False, static_discovery=True)
+
+    def _pegar(self):
+        inicio = time.perf_counter()
+        esperou = False
+        with self._cond:
+            while True:
+                if self._ociosos:
+                    svc = self._ociosos.pop()
+                    self._stats["reusos"] += 1
+                    break
+                if self._criados < self.maximo:
+                    self._criados += 1
+                    svc = None
+                    break
+                esperou = True
+                restante = DRIVE_POOL_ESPERA_S - (time.perf_counter() - inicio)
+                if restante <= 0 or not self._cond.wait(restante):
+                    if not self._ociosos and self._criados >= self.maximo:
+                        raise RuntimeError(
+                            f"Pool do Drive ({self.which}) esgotado: {self.maximo} clients em uso há {DRIVE_POOL_ESPERA_S:.0f}s."
+                        )
+            self._em_uso += 1
+            self._stats["emprestimos"] += 1
+            if esperou:
+                self._stats["esperas"] += 1
+                self._stats["espera_ms_total"] += (time.perf_counter() - inicio) * 1000
+        if svc is None:
+            try:
+                svc = self._fabrica_client()
+            except Exception:
+                with self._cond:
+                    self._criados -= 1
+                    self._em_uso -= 1
+                    self._cond.notify()
+                raise
+        return svc
+
+    def _devolver(self, svc, descartar: bool) -> None:
+        with self._cond:
+            self._em_uso -= 1
+            if descartar:
+                self._criados -= 1
+                self._stats["descartados"] += 1
+            else:
+                self._ociosos.append(svc)
+            self._cond.notify()
+
+    @contextmanager
+    def cliente(self):
+        """Empresta um service exclusivo desta thread até o fim do `with`."""
+        self.garantir_token()
+        svc = self._pegar()
+        descartar = False
+        try:
+            yield svc
+        except Exception as e:
+            # erro HTTP do Drive (404, 403...) não estraga a conexão; o resto
+            # (timeout, socket, TLS) pode ter deixado o Http num estado ruim
+            descartar = type(e).__name__ != "HttpError"
+            raise
+        finally:
+            self._devolver(svc, descartar)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            st = dict(self._stats)
+            st.update(criados=self._criados, em_uso=self._em_uso, ociosos=len(self._ociosos), maximo=self.maximo)
+        st["espera_ms_media"] = round(st["espera_ms_total"] / st["esperas"], 1) if st["esperas"] else 0.0
+        st["espera_ms_total"] = round(st["espera_ms_total"], 1)
+        creds = self._creds
+        expiry = getattr(creds, "expiry", None) if creds is not None else None
+        st["token_expira_em"] = expiry.isoformat() + "Z" if expiry else None
+        st["ultimo_refresh"] = self._ultimo_refresh.isoformat() + "Z" if self._ultimo_refresh else None
+        return st
+
+
+_pools: Dict[str, PoolDrive] = {}
+_pools_lock = threading.Lock()
+
+
+def _credencial_service_account(which: Literal["pi", "proposta"]):
+    from google.oauth2.service_account import Credentials
+
     key = ENV_JSON_PI if which == "pi" else ENV_JSON_PROP
-    cred_path = _cred_path(key)
-    creds = Credentials.from_service_account_file(cred_path, scopes=SCOPES)
-    return build("drive", "v3", credentials=creds)
+    return Credentials.from_service_account_file(_cred_path(key), scopes=SCOPES)
+
+
+def _pool(which: Literal["pi", "proposta"]) -> PoolDrive:
+    pool = _pools.get(which)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(which)
+            if pool is None:
+                pool = _pools[which] = PoolDrive(which, lambda: _credencial_service_account(which))
+    return pool
+
+
+def _cliente(which: Literal["pi", "proposta"] = "pi"):
+    """with _cliente("pi") as service: ... — service exclusivo enquanto durar o bloco."""
+    return _pool(which).cliente()
+
+
+def pool_stats() -> Dict[str, Any]:
+    """Estatísticas dos pools já criados (GET /admin/drive/pool)."""
+    with _pools_lock:
+        pools = dict(_pools)
+    return {
+        "config": {
+            "max_por_credencial": DRIVE_POOL_MAX,
+            "espera_max_s": DRIVE_POOL_ESPERA_S,
+            "http_timeout_s": DRIVE_HTTP_TIMEOUT_S,
+            "token_margem_s": DRIVE_TOKEN_MARGEM_S,
+        },
+        "pools": {which: p.stats() for which, p in pools.items()},
+    }
 
 
 def _folder_id(which: Literal["pi", "proposta"]) -> str:
@@ -60,49 +248,52 @@ def upload_pdf_to_drive(
     """
     if not filename.lower().endswith(".pdf"):
         raise ValueError("Arquivo precisa terminar com .pdf")
-    service = _drive_service(which)
+    from googleapiclient.http import MediaIoBaseUpload
+
     media = MediaIoBaseUpload(io.BytesIO(pdf_bytes), mimetype="application/pdf", resumable=False)
     metadata = {
         "name": filename,
         "mimeType": "application/pdf",
         "parents": [folder_id or _folder_id(which)],
     }
-    file = (
-        service.files()
-        .create(
-            body=metadata,
-            media_body=media,
-            fields="id, name, mimeType, size, webViewLink, webContentLink",
-            supportsAllDrives=True,
+    with _cliente(which) as service:
+        file = (
+            service.files()
+            .create(
+                body=metadata,
+                media_body=media,
+                fields="id, name, mimeType, size, webViewLink, webContentLink",
+                supportsAllDrives=True,
+            )
+            .execute()
         )
-        .execute()
-    )
     return file
 
 
-def _services_try_order():
-    """Ordem de tentativa ao ler um arquivo sem saber em qual credencial foi criado."""
-    # 1º tenta com PI; 2º tenta com PROPOSTAS
-    yield _drive_service("pi")
-    yield _drive_service("proposta")
+# Ordem de tentativa ao ler um arquivo sem saber em qual credencial foi criado:
+# 1º tenta com PI; 2º tenta com PROPOSTAS
+_ORDEM_LEITURA = ("pi", "proposta")
 
 
-def get_drive_file_meta(file_id: str) -> dict: 
+def get_drive_file_meta(file_id: str) -> dict:
     """
     Lê metadados (id, name, mimeType, size, webViewLink, webContentLink) tentando com ambas as credenciais.
     """
+    from googleapiclient.errors import HttpError
+
     last_err: Optional[Exception] = None
-    for svc in _services_try_order():
+    for which in _ORDEM_LEITURA:
         try:
-            return (
-                svc.files()
-                .get(
-                    fileId=file_id,
-                    fields="id, name, mimeType, size, webViewLink, webContentLink",
-                    supportsAllDrives=True,
+            with _cliente(which) as svc:
+                return (
+                    svc.files()
+                    .get(
+                        fileId=file_id,
+                        fields="id, name, mimeType, size, webViewLink, webContentLink",
+                        supportsAllDrives=True,
+                    )
+                    .execute()
                 )
-                .execute()
-            )
         except HttpError as e:
             last_err = e
             continue
@@ -115,20 +306,24 @@ def download_drive_file_bytes(file_id: str):
     """
     Faz download do arquivo (bytes, nome, mimeType), tentando com ambas as credenciais.
     """
+    from googleapiclient.errors import HttpError
+    from googleapiclient.http import MediaIoBaseDownload
+
     last_err: Optional[Exception] = None
-    for svc in _services_try_order():
+    for which in _ORDEM_LEITURA:
         try:
-            meta = (
-                svc.files()
-                .get(fileId=file_id, fields="name, mimeType", supportsAllDrives=True)
-                .execute()
-            )
-            req = svc.files().get_media(fileId=file_id, supportsAllDrives=True)
-            buf = io.BytesIO()
-            downloader = MediaIoBaseDownload(buf, req)
-            done = False
-            while not done:
-                _, done = downloader.next_chunk()
+            with _cliente(which) as svc:
+                meta = (
+                    svc.files()
+                    .get(fileId=file_id, fields="name, mimeType", supportsAllDrives=True)
+                    .execute()
+                )
+                req = svc.files().get_media(fileId=file_id, supportsAllDrives=True)
+                buf = io.BytesIO()
+                downloader = MediaIoBaseDownload(buf, req)
+                done = False
+                while not done:
+                    _, done = downloader.next_chunk()
             data = buf.getvalue()
             return data, meta.get("name") or f"{file_id}.pdf", meta.get("mimeType") or "application/pdf"
         except HttpError as e:
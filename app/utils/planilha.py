@@ -0,0 +1,83 @@
+# app/utils/planilha.py
+"""
+Leitura de planilhas de importação (XLSX ou CSV) como linhas de dicionário.
+
+- Cabeçalho na 1ª linha; nomes normalizados (sem acento, minúsculo,
+  espaços/hífens -> "_"): "Razão Social" -> "razao_social".
+- XLSX com openpyxl read_only (linha a linha, sem carregar a planilha toda).
+- CSV: separador detectado (";" do Excel pt-BR, "," ou tab), UTF-8 com ou
+  sem BOM; se não decodificar, cai para latin-1.
+- Devolve (numero_da_linha, {coluna: valor}) — o número é o da planilha
+  (cabeçalho = 1), para o relatório de erros apontar a linha certa.
+"""
+from __future__ import annotations
+
+import csv
+import io
+import re
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from app.utils.busca_clientes import normalizar
+
+Linha = Tuple[int, Dict[str, Any]]
+
+
+def normalizar_cabecalho(nome: Any) -> str:
+    return re.sub(r"[\s\-/.]+", "_", normalizar(str(nome or ""))).strip("_")
+
+
+def _linhas(cabecalho: List[Any], corpo: Iterator[Tuple[int, List[Any]]]) -> Iterator[Linha]:
+    nomes = [normalizar_cabecalho(c) for c in cabecalho]
+    for n, valores in corpo:
+        if not any(v not in (None, "") and str(v).strip() for v in valores):
+            continue  # linha em branco
+        yield n, {k: v for k, v in zip(nomes, valores) if k}
+
+
+def ler_xlsx(conteudo: bytes) -> Iterator[Linha]:
+    from openpyxl import load_workbook
+
+    try:
+        wb = load_workbook(io.BytesIO(conteudo), read_only=True, data_only=True)
+    except Exception as e:  # zip corrompido / não é xlsx
+        raise ValueError(f"Planilha XLSX inválida: {e}") from e
+    try:
+        rows = wb.active.iter_rows(values_only=True)
+        cabecalho = next(rows, None)
+        if not cabecalho:
+            return
+        yield from _linhas(list(cabecalho), ((i, list(r)) for i, r in enumerate(rows, start=2)))
+    finally:
+        wb.close()
+
+
+def _decodificar(conteudo: bytes) -> str:
+    try:
+        return conteudo.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        return conteudo.decode("latin-1")
+
+
+def ler_csv(conteudo: bytes) -> Iterator[Linha]:
+    texto = _decodificar(conteudo)
+    amostra = texto[:4096]
+    try:
+        dialeto = csv.Sniffer().sniff(amostra, delimiters=";,\t")
+    except csv.Error:
+        sep = ";" if amostra.count(";") > amostra.count(",") else ","
+        dialeto = type("_Dialeto", (csv.excel,), {"delimiter": sep})
+    leitor = csv.reader(io.StringIO(texto), dialeto)
+    cabecalho = next(leitor, None)
+    if not cabecalho:
+        return
+    yield from _linhas(cabecalho, ((i, r) for i, r in enumerate(leitor, start=2)))
+
+
+def ler_planilha(conteudo: bytes, nome_arquivo: Optional[str] = None) -> Iterator[Linha]:
+    """XLSX pelo conteúdo (zip) ou pela extensão; o resto é tratado como CSV."""
+    nome = (nome_arquivo or "").lower()
+    if conteudo[:2] == b"PK" or nome.endswith((".xlsx", ".xlsm")):
+        return ler_xlsx(conteudo)
+    if nome.endswith(".xls"):
+        raise ValueError("Formato .xls não suportado: salve como .xlsx ou .csv.")
+    return ler_csv(conteudo)
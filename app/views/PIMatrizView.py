@@ -1,7 +1,10 @@
 import customtkinter as ctk
 from tkinter import messagebox, filedialog
-from controllers.pi_matriz_controller import listar_pis_matriz, listar_abatimentos, calcular_saldo_matriz
+from controllers.pi_matriz_controller import (
+    listar_pis_matriz, listar_abatimentos, calcular_saldo_matriz, listar_pis_matriz_com_saldo
+)
 from openpyxl import Workbook
+from app.views.carregamento import CarregadorEmSegundoPlano, RenderizadorEmLotes
 
 class PIMatrizView(ctk.CTkFrame):
     def __init__(self, master=None):
@@ -43,99 +46,111 @@ class PIMatrizView(ctk.CTkFrame):
         self.scroll_frame.pack(padx=20, pady=15, fill="both", expand=True)
 
         self.matriz_frames = []
+        self.dados = None  # [(pi, saldo, abatimentos)] da última carga
+        self._carregador = CarregadorEmSegundoPlano(self)
+        self._render = None
         self.atualizar_lista()
 
-    def atualizar_lista(self):
+    def _limpar(self):
+        if self._render is not None:
+            self._render.cancelar()
         for frame in self.matriz_frames:
             frame.destroy()
         self.matriz_frames.clear()
 
-        pis_matriz = listar_pis_matriz()
-        if not pis_matriz:
-            msg = ctk.CTkLabel(
-                self.scroll_frame,
-                text="⚠️ Nenhum PI MATRIZ encontrado.",
-                font=ctk.CTkFont(size=16),
-                text_color="white"
-            )
-            msg.pack(pady=10)
-            self.matriz_frames.append(msg)
+    def _mensagem(self, texto):
+        msg = ctk.CTkLabel(self.scroll_frame, text=texto, font=ctk.CTkFont(size=16), text_color="white")
+        msg.pack(pady=10)
+        self.matriz_frames.append(msg)
+
+    def atualizar_lista(self):
+        """Matrizes, saldos e abatimentos em 2 consultas, fora da thread do Tk."""
+        self._limpar()
+        self._mensagem("⏳ Carregando PIs MATRIZ...")
+        self._carregador.carregar(listar_pis_matriz_com_saldo, self._ao_carregar)
+
+    def _ao_carregar(self, dados):
+        self.dados = dados
+        self._limpar()
+        if not dados:
+            self._mensagem("⚠️ Nenhum PI MATRIZ encontrado.")
             return
 
-        for pi in pis_matriz:
-            frame_pi = ctk.CTkFrame(self.scroll_frame, fg_color="#333333", corner_radius=10)
-            frame_pi.pack(fill="x", pady=10, padx=10)
+        self._render = RenderizadorEmLotes(self.scroll_frame, dados, lambda _i, item: self._desenhar_matriz(*item))
 
-            header_text = (
-                f"🔴 PI MATRIZ: {pi.numero_pi} | Campanha: {pi.nome_campanha or '---'} | "
-                f"Anunciante: {pi.nome_anunciante or '---'} | "
-                f"Valor Bruto: R$ {pi.valor_bruto or 0:.2f} | "
-                f"Valor Líquido: R$ {pi.valor_liquido or 0:.2f} | "
-                f"Saldo: R$ {calcular_saldo_matriz(pi.numero_pi):.2f}"
-            )
+    def _desenhar_matriz(self, pi, saldo, filhos):
+        frame_pi = ctk.CTkFrame(self.scroll_frame, fg_color="#333333", corner_radius=10)
+        frame_pi.pack(fill="x", pady=10, padx=10)
 
-            toggle_button = ctk.CTkButton(
-                frame_pi,
-                text=header_text,
-                font=ctk.CTkFont(size=14),
-                fg_color="#444",
-                hover_color="#b30000",
-                anchor="w",
-                text_color="white"
-            )
-            toggle_button.pack(fill="x")
+        header_text = (
+            f"🔴 PI MATRIZ: {pi.numero_pi} | Campanha: {pi.nome_campanha or '---'} | "
+            f"Anunciante: {pi.nome_anunciante or '---'} | "
+            f"Valor Bruto: R$ {pi.valor_bruto or 0:.2f} | "
+            f"Valor Líquido: R$ {pi.valor_liquido or 0:.2f} | "
+            f"Saldo: R$ {saldo:.2f}"
+        )
 
-            detalhes_frame = ctk.CTkFrame(frame_pi, fg_color="#252525")
-            detalhes_frame.pack(fill="x", pady=5, padx=10)
-            detalhes_frame.pack_forget()
+        toggle_button = ctk.CTkButton(
+            frame_pi,
+            text=header_text,
+            font=ctk.CTkFont(size=14),
+            fg_color="#444",
+            hover_color="#b30000",
+            anchor="w",
+            text_color="white"
+        )
+        toggle_button.pack(fill="x")
 
-            def toggle_detalhes(f=detalhes_frame):
-                if f.winfo_ismapped():
-                    f.pack_forget()
-                else:
-                    f.pack(fill="x", pady=5, padx=10)
+        detalhes_frame = ctk.CTkFrame(frame_pi, fg_color="#252525")
+        detalhes_frame.pack(fill="x", pady=5, padx=10)
+        detalhes_frame.pack_forget()
 
-            toggle_button.configure(command=toggle_detalhes)
+        def toggle_detalhes(f=detalhes_frame):
+            if f.winfo_ismapped():
+                f.pack_forget()
+            else:
+                f.pack(fill="x", pady=5, padx=10)
 
-            filhos = listar_abatimentos(pi.numero_pi)
-            if not filhos:
-                label_vazio = ctk.CTkLabel(
+        toggle_button.configure(command=toggle_detalhes)
+
+        if not filhos:
+            label_vazio = ctk.CTkLabel(
+                detalhes_frame,
+                text="🔕 Nenhum abatimento vinculado.",
+                text_color="gray",
+                font=ctk.CTkFont(size=13)
+            )
+            label_vazio.pack(anchor="w", padx=10, pady=5)
+        else:
+            for filho in filhos:
+                numero_pi = filho.numero_pi
+                anunciante = filho.nome_anunciante or '---'
+                campanha = filho.nome_campanha or '---'
+                emissao = filho.data_emissao.strftime('%d/%m/%Y') if filho.data_emissao else '---'
+                dia = filho.dia_venda.zfill(2) if filho.dia_venda else '--'
+                mes = filho.mes_venda.zfill(2) if filho.mes_venda else '--'
+                venda = f"{dia}/{mes}"
+                valor_liquido = f"R$ {filho.valor_liquido or 0:.2f}"
+
+                texto = (
+                    f"🔹 Campanha: {campanha} | "
+                    f"PI Abatimento: {numero_pi} | "
+                    f"Anunciante: {anunciante} | "
+                    f"Emissão: {emissao} | "
+                    f"Venda: {venda} | "
+                    f"Valor Líquido: {valor_liquido}"
+                )
+
+                pi_label = ctk.CTkLabel(
                     detalhes_frame,
-                    text="🔕 Nenhum abatimento vinculado.",
-                    text_color="gray",
-                    font=ctk.CTkFont(size=13)
+                    text=texto,
+                    font=ctk.CTkFont(size=13),
+                    text_color="white",
+                    anchor="w"
                 )
-                label_vazio.pack(anchor="w", padx=10, pady=5)
-            else:
-                for filho in filhos:
-                    numero_pi = filho.numero_pi
-                    anunciante = filho.nome_anunciante or '---'
-                    campanha = filho.nome_campanha or '---'
-                    emissao = filho.data_emissao.strftime('%d/%m/%Y') if filho.data_emissao else '---'
-                    dia = filho.dia_venda.zfill(2) if filho.dia_venda else '--'
-                    mes = filho.mes_venda.zfill(2) if filho.mes_venda else '--'
-                    venda = f"{dia}/{mes}"
-                    valor_liquido = f"R$ {filho.valor_liquido or 0:.2f}"
-
-                    texto = (
-                        f"🔹 Campanha: {campanha} | "
-                        f"PI Abatimento: {numero_pi} | "
-                        f"Anunciante: {anunciante} | "
-                        f"Emissão: {emissao} | "
-                        f"Venda: {venda} | "
-                        f"Valor Líquido: {valor_liquido}"
-                    )
-
-                    pi_label = ctk.CTkLabel(
-                        detalhes_frame,
-                        text=texto,
-                        font=ctk.CTkFont(size=13),
-                        text_color="white",
-                        anchor="w"
-                    )
-                    pi_label.pack(anchor="w", padx=10, pady=2)
-
-            self.matriz_frames.append(frame_pi)
+                pi_label.pack(anchor="w", padx=10, pady=2)
+
+        self.matriz_frames.append(frame_pi)
 
     def exportar_excel(self):
         numero_pi = self.entry_export.get().strip()
@@ -143,14 +158,17 @@ class PIMatrizView(ctk.CTkFrame):
             messagebox.showwarning("Aviso", "Digite o número do PI MATRIZ para exportar.")
             return
 
-        pis_matriz = listar_pis_matriz()
-        pi = next((p for p in pis_matriz if str(p.numero_pi) == numero_pi), None)
-
-        if not pi:
-            messagebox.showerror("Erro", f"PI MATRIZ {numero_pi} não encontrado.")
-            return
-
-        filhos = listar_abatimentos(pi.numero_pi)
+        # usa a lista já carregada na tela; sem ela, consulta o banco
+        item = next((d for d in (self.dados or []) if str(d[0].numero_pi) == numero_pi), None)
+        if item is not None:
+            pi, saldo, filhos = item
+        else:
+            pi = next((p for p in listar_pis_matriz() if str(p.numero_pi) == numero_pi), None)
+            if not pi:
+                messagebox.showerror("Erro", f"PI MATRIZ {numero_pi} não encontrado.")
+                return
+            saldo = calcular_saldo_matriz(pi.numero_pi)
+            filhos = listar_abatimentos(pi.numero_pi)
 
         path = filedialog.asksaveasfilename(
             defaultextension=".xlsx",
@@ -174,7 +192,7 @@ class PIMatrizView(ctk.CTkFrame):
             pi.nome_anunciante,
             pi.valor_bruto,
             pi.valor_liquido,
-            calcular_saldo_matriz(pi.numero_pi)
+            saldo
         ])
 
         # Espaço antes do próximo bloco
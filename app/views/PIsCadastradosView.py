@@ -5,6 +5,47 @@ from tkinter import filedialog, messagebox
 import tkinter as tk  # necessário para Canvas e Scrollbar
 from datetime import datetime
 
+from app.views.carregamento import CarregadorEmSegundoPlano, Debounce, RenderizadorEmLotes, indexar, intersecao
+
+DEBOUNCE_BUSCA_MS = 250
+
+
+class CachePIs:
+    """
+    PIs carregados uma vez + índices por filtro (tipo, diretoria, executivo) e
+    texto de busca já em minúsculas: cada tecla filtra em memória, sem banco.
+    """
+
+    def __init__(self, pis):
+        self.pis = list(pis)
+        self.textos = [
+            "\x00".join((
+                str(pi.numero_pi).lower(),
+                (pi.nome_anunciante or "").lower(),
+                (pi.nome_agencia or "").lower(),
+                (pi.cnpj_agencia or "").lower(),
+            ))
+            for pi in self.pis
+        ]
+        self.por_tipo = indexar(self.pis, lambda pi: pi.tipo_pi)
+        self.por_diretoria = indexar(self.pis, lambda pi: pi.diretoria)
+        self.por_executivo = indexar(self.pis, lambda pi: pi.executivo)
+
+    @staticmethod
+    def _grupo(indice, valor):
+        return None if valor == "Todos" else indice.get(valor, [])
+
+    def filtrar(self, termo="", tipo_pi="Todos", diretoria="Todos", executivo="Todos"):
+        termo = (termo or "").lower()
+        posicoes = intersecao(len(self.pis), [
+            self._grupo(self.por_tipo, tipo_pi),
+            self._grupo(self.por_diretoria, diretoria),
+            self._grupo(self.por_executivo, executivo),
+        ])
+        if termo:
+            posicoes = [i for i in posicoes if termo in self.textos[i]]
+        return [self.pis[i] for i in posicoes]
+
 
 class PIsCadastradosView(ctk.CTkFrame):
     def __init__(self, master=None):
@@ -22,11 +63,13 @@ class PIsCadastradosView(ctk.CTkFrame):
         self.entrada_busca = ctk.CTkEntry(filtros_frame, placeholder_text="Buscar por PI, cliente, agência ou CNPJ", width=350)
         self.entrada_busca.grid(row=0, column=0, padx=(0, 10))
 
-        self.combo_tipo = ctk.CTkComboBox(filtros_frame, values=["Todos", "Matriz", "CS", "Normal"])
+        self.combo_tipo = ctk.CTkComboBox(filtros_frame, values=["Todos", "Matriz", "CS", "Normal"],
+                                          command=lambda _v: self.buscar_pis())
         self.combo_tipo.set("Todos")
         self.combo_tipo.grid(row=0, column=1, padx=5)
 
-        self.combo_diretoria = ctk.CTkComboBox(filtros_frame, values=["Todos", "Governo Federal", "Governo Estadual", "Rafael Augusto"])
+        self.combo_diretoria = ctk.CTkComboBox(filtros_frame, values=["Todos", "Governo Federal", "Governo Estadual", "Rafael Augusto"],
+                                               command=lambda _v: self.buscar_pis())
         self.combo_diretoria.set("Todos")
         self.combo_diretoria.grid(row=0, column=2, padx=5)
 
@@ -34,13 +77,20 @@ class PIsCadastradosView(ctk.CTkFrame):
             "Todos", "Rafale e Francio", "Rafael Rodrigo", "Rodrigo da Silva", "Juliana Madazio", "Flavio de Paula",
             "Lorena Fernandes", "Henri Marques", "Caio Bruno", "Flavia Cabral", "Paula Caroline",
             "Leila Santos", "Jessica Ribeiro", "Paula Campos"
-        ])
+        ], command=lambda _v: self.buscar_pis())
         self.combo_executivo.set("Todos")
         self.combo_executivo.grid(row=0, column=3, padx=5)
 
         botao_buscar = ctk.CTkButton(filtros_frame, text="🔍 Buscar", command=self.buscar_pis)
         botao_buscar.grid(row=0, column=4, padx=(10, 0))
 
+        # busca por tecla: filtra o cache quando o usuário para de digitar
+        self._busca_adiada = Debounce(self, DEBOUNCE_BUSCA_MS, self.buscar_pis)
+        self.entrada_busca.bind("<KeyRelease>", self._busca_adiada)
+
+        self.label_status = ctk.CTkLabel(self, text="", font=ctk.CTkFont(size=13), text_color="gray")
+        self.label_status.pack()
+
         # Botões principais
         ctk.CTkButton(self, text="🔄 Atualizar Lista", command=self.atualizar_lista).pack(pady=5)
         ctk.CTkButton(self, text="📤 Exportar XLS", command=self.exportar_para_excel).pack(pady=5)
@@ -83,85 +133,95 @@ class PIsCadastradosView(ctk.CTkFrame):
 
         self.linhas_pi = []
         self.lista_exibida = []
+        self.cache = None
+        self._carregador = CarregadorEmSegundoPlano(self)
+        self._render = None
         self.atualizar_lista()
 
     def atualizar_lista(self):
-        self.lista_exibida = listar_pis()
-        self.mostrar_pis(self.lista_exibida)
+        """Recarrega do banco em segundo plano; a janela continua respondendo."""
+        self.label_status.configure(text="⏳ Carregando PIs...")
+        self._carregador.carregar(listar_pis, self._ao_carregar, self._falha_ao_carregar)
 
-    def buscar_pis(self):
-        termo = self.entrada_busca.get().lower()
-        tipo_pi = self.combo_tipo.get()
-        diretoria = self.combo_diretoria.get()
-        executivo = self.combo_executivo.get()
-
-        resultados = []
-        for pi in listar_pis():
-            if (
-                (termo in str(pi.numero_pi).lower()
-                 or termo in (pi.nome_anunciante or "").lower()
-                 or termo in (pi.nome_agencia or "").lower()
-                 or termo in (pi.cnpj_agencia or "").lower())
-                and (tipo_pi == "Todos" or pi.tipo_pi == tipo_pi)
-                and (diretoria == "Todos" or pi.diretoria == diretoria)
-                and (executivo == "Todos" or pi.executivo == executivo)
-            ):
-                resultados.append(pi)
+    def _ao_carregar(self, pis):
+        self.cache = CachePIs(pis)
+        self.buscar_pis()
+
+    def _falha_ao_carregar(self, erro):
+        self.label_status.configure(text="")
+        messagebox.showerror("Erro", f"Não foi possível carregar os PIs:\n{erro}")
 
+    def buscar_pis(self):
+        """Filtra o cache (sem ir ao banco); antes da 1ª carga, não há o que filtrar."""
+        self._busca_adiada.cancelar()
+        if self.cache is None:
+            return
+        resultados = self.cache.filtrar(
+            self.entrada_busca.get(),
+            self.combo_tipo.get(),
+            self.combo_diretoria.get(),
+            self.combo_executivo.get(),
+        )
         self.lista_exibida = resultados
+        self.label_status.configure(text=f"{len(resultados)} de {len(self.cache.pis)} PIs")
         self.mostrar_pis(resultados)
 
     def mostrar_pis(self, lista_pis):
-        # Limpa linhas anteriores
+        # Interrompe um desenho anterior ainda em andamento e limpa as linhas
+        if self._render is not None:
+            self._render.cancelar()
         for linha in self.linhas_pi:
             for widget in linha:
                 widget.destroy()
         self.linhas_pi.clear()
 
-        for i, pi in enumerate(lista_pis, start=1):
-            linha_widgets = []
-            valores = [
-                pi.id,
-                pi.numero_pi,
-                pi.tipo_pi,
-                pi.numero_pi_matriz if pi.tipo_pi == "CS" else "",
-                pi.nome_anunciante,
-                pi.nome_agencia or "",
-                pi.data_emissao.strftime("%d/%m/%Y") if pi.data_emissao else "",
-                f"{pi.valor_bruto:.2f}".replace('.', ',') if pi.valor_bruto else "0,00",
-                f"{pi.valor_liquido:.2f}".replace('.', ',') if pi.valor_liquido else "0,00",
-                pi.uf_cliente or "",
-                pi.canal or "",
-                pi.nome_campanha or "",
-                pi.diretoria or "",
-                pi.executivo or "",
-                f"{pi.dia_venda}/{pi.mes_venda}" if pi.dia_venda and pi.mes_venda else ""
-            ]
-
-            # células de dados
-            for j, valor in enumerate(valores):
-                cell = ctk.CTkLabel(self.tabela_scroll, text=str(valor), anchor="w", padx=8)
-                cell.grid(row=i, column=j * 2, sticky="nsew", pady=4, padx=(4, 2))
-                linha_widgets.append(cell)
-
-                # separadores
-                separator = ctk.CTkFrame(self.tabela_scroll, width=2, height=30, fg_color="#333")
-                separator.grid(row=i, column=j * 2 + 1, sticky="ns", padx=0)
-                linha_widgets.append(separator)
-
-            # botão Editar (última coluna)
-            btn = ctk.CTkButton(self.tabela_scroll, text="✏️ Editar", width=90,
-                                command=lambda p=pi: self.abrir_modal_edicao(p))
-            btn.grid(row=i, column=len(valores) * 2, sticky="nsew", pady=4, padx=(4, 2))
-            linha_widgets.append(btn)
-
-            # separador após o botão
-            if True:
-                separator = ctk.CTkFrame(self.tabela_scroll, width=2, height=30, fg_color="#333")
-                separator.grid(row=i, column=len(valores) * 2 + 1, sticky="ns", padx=0)
-                linha_widgets.append(separator)
-
-            self.linhas_pi.append(linha_widgets)
+        self._render = RenderizadorEmLotes(self.tabela_scroll, lista_pis, self._desenhar_linha)
+
+    def _desenhar_linha(self, indice, pi):
+        i = indice + 1
+        linha_widgets = []
+        valores = [
+            pi.id,
+            pi.numero_pi,
+            pi.tipo_pi,
+            pi.numero_pi_matriz if pi.tipo_pi == "CS" else "",
+            pi.nome_anunciante,
+            pi.nome_agencia or "",
+            pi.data_emissao.strftime("%d/%m/%Y") if pi.data_emissao else "",
+            f"{pi.valor_bruto:.2f}".replace('.', ',') if pi.valor_bruto else "0,00",
+            f"{pi.valor_liquido:.2f}".replace('.', ',') if pi.valor_liquido else "0,00",
+            pi.uf_cliente or "",
+            pi.canal or "",
+            pi.nome_campanha or "",
+            pi.diretoria or "",
+            pi.executivo or "",
+            f"{pi.dia_venda}/{pi.mes_venda}" if pi.dia_venda and pi.mes_venda else ""
+        ]
+
+        # células de dados
+        for j, valor in enumerate(valores):
+            cell = ctk.CTkLabel(self.tabela_scroll, text=str(valor), anchor="w", padx=8)
+            cell.grid(row=i, column=j * 2, sticky="nsew", pady=4, padx=(4, 2))
+            linha_widgets.append(cell)
+
+            # separadores
+            separator = ctk.CTkFrame(self.tabela_scroll, width=2, height=30, fg_color="#333")
+            separator.grid(row=i, column=j * 2 + 1, sticky="ns", padx=0)
+            linha_widgets.append(separator)
+
+        # botão Editar (última coluna)
+        btn = ctk.CTkButton(self.tabela_scroll, text="✏️ Editar", width=90,
+                            command=lambda p=pi: self.abrir_modal_edicao(p))
+        btn.grid(row=i, column=len(valores) * 2, sticky="nsew", pady=4, padx=(4, 2))
+        linha_widgets.append(btn)
+
+        # separador após o botão
+        if True:
+            separator = ctk.CTkFrame(self.tabela_scroll, width=2, height=30, fg_color="#333")
+            separator.grid(row=i, column=len(valores) * 2 + 1, sticky="ns", padx=0)
+            linha_widgets.append(separator)
+
+        self.linhas_pi.append(linha_widgets)
 
     def abrir_modal_edicao(self, pi):
         """Abre janela modal para editar campos do PI."""
@@ -0,0 +1,179 @@
+# app/views/carregamento.py
+"""
+Carregamento em segundo plano para as telas do desktop (customtkinter).
+
+O Tk só pode ser mexido pela thread principal: a consulta (controller) roda
+numa thread daemon e devolve o resultado por uma fila; a tela consulta a fila
+com `after()` e só então atualiza os widgets. Assim a janela não congela
+enquanto o banco (Postgres remoto) responde.
+
+- CarregadorEmSegundoPlano: 1 carga por vez por tela; uma carga nova torna a
+  anterior obsoleta (o resultado velho é descartado) e a tela destruída no
+  meio do caminho não recebe callback.
+- Debounce: adia a ação até o usuário parar de digitar.
+- RenderizadorEmLotes: monta linhas de tabela aos poucos (N por tick do Tk),
+  para listas grandes não travarem a janela durante o desenho.
+"""
+from __future__ import annotations
+
+import queue
+import threading
+import traceback
+from typing import Any, Callable, Iterable, List, Optional, Sequence
+
+INTERVALO_MS = 50  # polling da fila de resultados
+LOTE_RENDER = 40  # linhas desenhadas por tick
+
+
+def _viva(widget) -> bool:
+    try:
+        return bool(widget.winfo_exists())
+    except Exception:  # interpretador Tk já destruído
+        return False
+
+
+class CarregadorEmSegundoPlano:
+    def __init__(self, widget, intervalo_ms: int = INTERVALO_MS):
+        self.widget = widget
+        self.intervalo_ms = intervalo_ms
+        self._fila: "queue.Queue[tuple]" = queue.Queue()
+        self._geracao = 0
+        self._agendado: Optional[str] = None
+        self._callbacks: tuple = (None, None)
+
+    @property
+    def carregando(self) -> bool:
+        return self._agendado is not None
+
+    def carregar(
+        self,
+        funcao: Callable[[], Any],
+        ao_concluir: Callable[[Any], None],
+        ao_falhar: Optional[Callable[[Exception], None]] = None,
+    ) -> None:
+        """Roda `funcao` fora da thread do Tk; `ao_concluir(resultado)` roda na thread do Tk."""
+        self._geracao += 1
+        geracao = self._geracao
+
+        def trabalho():
+            try:
+                self._fila.put((geracao, True, funcao()))
+            except Exception as e:
+                traceback.print_exc()
+                self._fila.put((geracao, False, e))
+
+        threading.Thread(target=trabalho, name="carga-desktop", daemon=True).start()
+        self._callbacks = (ao_concluir, ao_falhar)
+        if self._agendado is None:
+            self._agendado = self.widget.after(self.intervalo_ms, self._verificar)
+
+    def _verificar(self) -> None:
+        self._agendado = None
+        if not _viva(self.widget):
+            return
+        try:
+            while True:
+                geracao, ok, valor = self._fila.get_nowait()
+                if geracao != self._geracao:
+                    continue  # carga substituída por outra mais nova
+                ao_concluir, ao_falhar = self._callbacks
+                if ok:
+                    ao_concluir(valor)
+                elif ao_falhar is not None:
+                    ao_falhar(valor)
+                return
+        except queue.Empty:
+            pass
+        self._agendado = self.widget.after(self.intervalo_ms, self._verificar)
+
+
+class Debounce:
+    """debounce(...) reagenda a ação; ela só roda `atraso_ms` depois da última chamada."""
+
+    def __init__(self, widget, atraso_ms: int, acao: Callable[[], None]):
+        self.widget = widget
+        self.atraso_ms = atraso_ms
+        self.acao = acao
+        self._agendado: Optional[str] = None
+
+    def __call__(self, *_evento) -> None:
+        self.cancelar()
+        self._agendado = self.widget.after(self.atraso_ms, self._disparar)
+
+    def cancelar(self) -> None:
+        if self._agendado is not None:
+            try:
+                self.widget.after_cancel(self._agendado)
+            except Exception:
+                pass
+            self._agendado = None
+
+    def _disparar(self) -> None:
+        self._agendado = None
+        if _viva(self.widget):
+            self.acao()
+
+
+class RenderizadorEmLotes:
+    """
+    Chama `desenhar(indice, item)` para cada item, LOTE_RENDER por tick do Tk.
+    Criar outro renderizador (ou chamar cancelar()) interrompe o anterior.
+    """
+
+    def __init__(
+        self,
+        widget,
+        itens: Iterable[Any],
+        desenhar: Callable[[int, Any], None],
+        ao_terminar: Optional[Callable[[], None]] = None,
+        lote: int = LOTE_RENDER,
+    ):
+        self.widget = widget
+        self._itens: Sequence[Any] = list(itens)
+        self._desenhar = desenhar
+        self._ao_terminar = ao_terminar
+        self._lote = lote
+        self._pos = 0
+        self._agendado: Optional[str] = self.widget.after(0, self._passo)
+
+    def cancelar(self) -> None:
+        if self._agendado is not None:
+            try:
+                self.widget.after_cancel(self._agendado)
+            except Exception:
+                pass
+            self._agendado = None
+
+    def _passo(self) -> None:
+        self._agendado = None
+        if not _viva(self.widget):
+            return
+        fim = min(self._pos + self._lote, len(self._itens))
+        for i in range(self._pos, fim):
+            self._desenhar(i, self._itens[i])
+        self._pos = fim
+        if self._pos < len(self._itens):
+            self._agendado = self.widget.after(1, self._passo)
+        elif self._ao_terminar is not None:
+            self._ao_terminar()
+
+
+def indexar(itens: Sequence[Any], chave: Callable[[Any], Any]) -> dict:
+    """valor -> lista de posições em `itens` (índice pronto para um filtro de combo)."""
+    idx: dict = {}
+    for i, item in enumerate(itens):
+        idx.setdefault(chave(item), []).append(i)
+    return idx
+
+
+def intersecao(total: int, grupos: List[Optional[List[int]]]) -> List[int]:
+    """Posições presentes em todos os grupos (None = filtro "Todos"), na ordem original."""
+    ativos = [g for g in grupos if g is not None]
+    if not ativos:
+        return list(range(total))
+    ativos.sort(key=len)
+    base = ativos[0]
+    if len(ativos) == 1:
+        return list(base)
+    resto = [set(g) for g in ativos[1:]]
+    return [i for i in base if all(i in s for s in resto)]
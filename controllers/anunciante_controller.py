@@ -1,6 +1,6 @@
 from app.models import Anunciante
 from app.database import SessionLocal
-import requests
+from app.utils.cnpj_lookup import cnpj_lookup
 
 def criar_anunciante(nome, razao_social, cnpj, uf, executivo, email, data_cadastro):
     db = SessionLocal()
@@ -60,13 +60,9 @@ def excluir_anunciante_por_cnpj(cnpj):
 
 def buscar_cnpj_na_web(cnpj):
     try:
-        cnpj_limpo = ''.join(filter(str.isdigit, cnpj))
-        url = f"https://brasilapi.com.br/api/cnpj/v1/{cnpj_limpo}"
-        response = requests.get(url, timeout=10)
-        if response.status_code == 200:
-            return response.json()
-        else:
-            return None
+        # mesmo cache/singleflight da API (app/utils/cnpj_lookup.py)
+        res = cnpj_lookup.consultar(cnpj)
+        return res.dados if res.encontrado else None
     except Exception as e:
         print(f"[ERRO] buscar_cnpj_na_web: {e}")
         return None
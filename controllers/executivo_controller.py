@@ -1,53 +1,31 @@
 from app.models import Agencia, Anunciante
 from app.database import SessionLocal
+from app.crud import executivo_crud
 
 def listar_executivos():
     session = SessionLocal()
     try:
-        # Busca executivos distintos das duas tabelas
-        executivos_agencias = session.query(Agencia.executivo).filter(Agencia.executivo.isnot(None)).distinct().all()
-        executivos_anunciantes = session.query(Anunciante.executivo).filter(Anunciante.executivo.isnot(None)).distinct().all()
-        
-        # Junta e remove duplicatas
-        todos = {e[0] for e in executivos_agencias + executivos_anunciantes if e[0]}
-        return sorted(todos)
+        return executivo_crud.listar_executivos(session)
     finally:
         session.close()
 
 def buscar_por_executivo(nome_executivo, tipo):
+    if tipo not in ("Agência", "Anunciante"):
+        return []
     session = SessionLocal()
-    resultados = []
-
     try:
-        if tipo == "Agência":
-            query = session.query(Agencia)
-            if nome_executivo:
-                query = query.filter(Agencia.executivo == nome_executivo)
-            agencias = query.all()
-            for a in agencias:
-                resultados.append({
-                    "ID": a.id,
-                    "Nome": a.nome_agencia,
-                    "Razão Social": a.razao_social_agencia,
-                    "CNPJ": a.cnpj_agencia,
-                    "UF": a.uf_agencia,
-                    "Executivo": a.executivo
-                })
-        elif tipo == "Anunciante":
-            query = session.query(Anunciante)
-            if nome_executivo:
-                query = query.filter(Anunciante.executivo == nome_executivo)
-            anunciantes = query.all()
-            for a in anunciantes:
-                resultados.append({
-                    "ID": a.id,
-                    "Nome": a.nome_anunciante,
-                    "Razão Social": a.razao_social_anunciante,
-                    "CNPJ": a.cnpj_anunciante,
-                    "UF": a.uf_cliente,
-                    "Executivo": a.executivo
-                })
-        return resultados
+        # projeção (só os campos da tela), sem carregar as tabelas inteiras
+        return [
+            {
+                "ID": r["id"],
+                "Nome": r["nome"],
+                "Razão Social": r["razao_social"],
+                "CNPJ": r["cnpj"],
+                "UF": r["uf"],
+                "Executivo": r["executivo"],
+            }
+            for r in executivo_crud.buscar_por_executivo(session, nome_executivo, tipo)
+        ]
     finally:
         session.close()
 
@@ -44,6 +44,38 @@ def listar_abatimentos(numero_pi_matriz: str):
     finally:
         session.close()
 
+# -------------------------------------------------------------------
+# Matrizes + abatimentos + saldo em 2 consultas (tela PIs Matriz)
+# -------------------------------------------------------------------
+def listar_pis_matriz_com_saldo():
+    """
+    [(pi_matriz, saldo, [abatimentos])] — mesmo resultado de chamar
+    calcular_saldo_matriz/listar_abatimentos por matriz, sem 3 consultas por PI.
+    """
+    session = SessionLocal()
+    try:
+        matrizes = session.query(PI).filter(PI.tipo_pi == "Matriz").order_by(PI.numero_pi.asc()).all()
+        filhos_por_matriz = {}
+        for filho in (
+            session.query(PI)
+            .filter(PI.tipo_pi == "Abatimento", PI.numero_pi_matriz.isnot(None))
+            .order_by(PI.numero_pi.asc())
+            .all()
+        ):
+            filhos_por_matriz.setdefault(filho.numero_pi_matriz, []).append(filho)
+
+        resultado = []
+        for pi in matrizes:
+            filhos = filhos_por_matriz.get(pi.numero_pi, [])
+            saldo = (pi.valor_bruto or 0) - sum(f.valor_bruto or 0 for f in filhos)
+            resultado.append((pi, saldo, filhos))
+        return resultado
+    except Exception as e:
+        print(f"❌ Erro ao listar PIs Matriz: {e}")
+        return []
+    finally:
+        session.close()
+
 # -------------------------------------------------------------------
 # Calcular o valor total já abatido
 # -------------------------------------------------------------------
@@ -0,0 +1,31 @@
+# tests/conftest.py
+"""
+Configuração comum dos testes.
+
+- Nunca usa o DATABASE_URL do .env: aponta para um SQLite descartável ANTES
+  de qualquer import de app.database (as engines nascem no import).
+- Workers de background (e-mail, jobs) desligados.
+
+Como rodar (com venv ativo, na raiz do projeto):
+    python -m pytest -q
+"""
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+RAIZ = Path(__file__).resolve().parent.parent
+if str(RAIZ) not in sys.path:
+    sys.path.insert(0, str(RAIZ))
+
+_TMP = tempfile.mkdtemp(prefix="testes_")
+os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(_TMP, "testes.db")
+os.environ.pop("DATABASE_READ_URL", None)
+os.environ["EMAIL_OUTBOX_WORKER"] = "0"
+os.environ["JOBS_WORKER"] = "0"
+
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        "markers", "postgres: precisa de um Postgres real (TEST_POSTGRES_URL); pulado sem ele"
+    )
@@ -0,0 +1,25 @@
+# tests/test_auditar_indices.py
+"""
+Consultas quentes dos CRUDs não podem varrer tabelas grandes
+(mesma auditoria de `python -m app.scripts.auditar_indices`, no SQLite).
+"""
+import pytest
+
+from app.scripts.auditar_indices import auditar
+from app.scripts.gerar_massa import MassaConfig, gerar_massa, make_engine
+
+
+@pytest.fixture(scope="module")
+def engine(tmp_path_factory):
+    eng = make_engine(f"sqlite:///{tmp_path_factory.mktemp('auditar') / 'audit.db'}")
+    gerar_massa(eng, MassaConfig(seed=42, pis=2000, agencias=200, anunciantes=800), log=lambda _m: None)
+    with eng.begin() as conn:
+        conn.exec_driver_sql("ANALYZE")
+    yield eng
+    eng.dispose()
+
+
+def test_consultas_quentes_usam_indice(engine):
+    linhas = []
+    falhas = auditar(engine, log=linhas.append)
+    assert falhas == [], "\n".join(linhas)
@@ -0,0 +1,49 @@
+# tests/test_busca_clientes.py
+"""Busca de agências sem acento (app/utils/busca_clientes.py) no SQLite."""
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+import app.models  # noqa: F401
+from app.models import Agencia
+from app.models_base import Base
+from app.utils import busca_clientes
+
+
+@pytest.fixture(params=["fts5", "ilike"])
+def db(request, tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'busca.db'}")
+    Base.metadata.create_all(bind=engine, tables=[Agencia.__table__])
+    busca_clientes.instalar_busca(engine)
+    busca_clientes.definir_estrategia(engine, request.param)
+    s = Session(bind=engine)
+    for i, nome in enumerate(["Agência Brasil Sul", "Publicidade São Paulo", "Alfa Comunicação"]):
+        s.add(Agencia(nome_agencia=nome, cnpj_agencia=f"00.000.000/000{i}-00", executivo="Executivo 01"))
+    s.commit()
+    yield s
+    s.close()
+    engine.dispose()
+
+
+def _nomes(db, termo):
+    return [r["nome"] for r in busca_clientes.buscar(db, "agencia", termo)]
+
+
+@pytest.mark.parametrize(
+    "termo, esperado",
+    [
+        ("agenc bras", ["Agência Brasil Sul"]),  # prefixo de palavra
+        ("AGÊNCIA", ["Agência Brasil Sul"]),  # caixa e acento no termo
+        ("rasil", ["Agência Brasil Sul"]),  # trecho no meio da palavra
+        ("sao", ["Publicidade São Paulo"]),  # acento só na coluna
+        ("unicaç", ["Alfa Comunicação"]),
+        ("inexistente", []),
+    ],
+)
+def test_busca_sem_acento_e_por_trecho(db, termo, esperado):
+    assert _nomes(db, termo) == esperado
+
+
+def test_limite_respeitado_com_complemento(db):
+    assert len(busca_clientes.buscar(db, "agencia", "a", limite=2)) == 2
+    assert len(busca_clientes.ids_por_termo(db, "agencia", "a")) == 3
@@ -0,0 +1,108 @@
+# tests/test_email_outbox.py
+"""Fila de e-mails (app/core/email_outbox.py) contra o SMTP fake de app/scripts/smtp_local.py."""
+import smtplib
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from app.core import email_outbox
+from app.models_base import Base
+from app.models_email_outbox import EmailOutbox
+from app.scripts.smtp_local import SMTPLocal
+
+
+@pytest.fixture
+def db(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'outbox.db'}")
+    Base.metadata.create_all(bind=engine, tables=[EmailOutbox.__table__])
+    s = Session(bind=engine)
+    yield s
+    s.close()
+    engine.dispose()
+
+
+@pytest.fixture
+def smtp_configurado(monkeypatch):
+    monkeypatch.setattr(email_outbox, "_smtp_is_configured", lambda: True)
+
+
+def _servidor(**kw):
+    srv = SMTPLocal(porta=0, **kw).start()
+    return srv, (lambda: smtplib.SMTP(srv.host, srv.porta, timeout=5))
+
+
+def test_lote_sai_numa_unica_conexao(db, smtp_configurado):
+    srv, conectar = _servidor()
+    try:
+        for i in range(5):
+            email_outbox.enqueue_email(db, f"u{i}@metropoles.com", f"Assunto {i}", "corpo")
+        res = email_outbox.processar_lote(db, conectar=conectar)
+    finally:
+        srv.stop()
+
+    assert res == {"enviados": 5, "reagendados": 0, "falhos": 0}
+    assert srv.conexoes == 1
+    assert sorted(m["para"][0] for m in srv.mensagens) == [f"u{i}@metropoles.com" for i in range(5)]
+    assert {i.status for i in db.query(EmailOutbox)} == {"ENVIADO"}
+
+
+def test_falha_temporaria_reagenda_e_recusa_falha(db, smtp_configurado):
+    srv, conectar = _servidor(falhar_a_cada=2, recusar="@bloqueado.com")
+    try:
+        a = email_outbox.enqueue_email(db, "a@metropoles.com", "A", "x")
+        b = email_outbox.enqueue_email(db, "b@metropoles.com", "B", "x")  # 2ª DATA: 451
+        c = email_outbox.enqueue_email(db, "c@bloqueado.com", "C", "x")  # RCPT: 550
+        res = email_outbox.processar_lote(db, conectar=conectar)
+    finally:
+        srv.stop()
+
+    assert res == {"enviados": 1, "reagendados": 1, "falhos": 1}
+    db.expire_all()
+    assert db.get(EmailOutbox, a.id).status == "ENVIADO"
+    reag = db.get(EmailOutbox, b.id)
+    assert reag.status == "PENDENTE" and reag.tentativas == 1 and reag.proximo_envio_em > datetime.utcnow()
+    assert db.get(EmailOutbox, c.id).status == "FALHOU"
+
+
+def test_expirado_nao_e_enviado(db, smtp_configurado):
+    srv, conectar = _servidor()
+    try:
+        item = email_outbox.enqueue_email(
+            db, "a@metropoles.com", "Reset", "x", expira_em=datetime.utcnow() - timedelta(seconds=1)
+        )
+        res = email_outbox.processar_lote(db, conectar=conectar)
+    finally:
+        srv.stop()
+
+    assert res["enviados"] == 0 and srv.mensagens == []
+    db.expire_all()
+    item = db.get(EmailOutbox, item.id)
+    assert (item.status, item.ultimo_erro) == ("FALHOU", "expirado")
+
+
+def test_retentativa_nao_passa_do_prazo(db, smtp_configurado):
+    srv, conectar = _servidor(falhar_a_cada=1)
+    try:
+        # backoff da 1ª falha (EMAIL_OUTBOX_BACKOFF_S) cai depois do prazo
+        prazo = datetime.utcnow() + timedelta(seconds=email_outbox.EMAIL_OUTBOX_BACKOFF_S / 2)
+        item = email_outbox.enqueue_email(db, "a@metropoles.com", "Reset", "x", expira_em=prazo)
+        res = email_outbox.processar_lote(db, conectar=conectar)
+    finally:
+        srv.stop()
+
+    assert res == {"enviados": 0, "reagendados": 0, "falhos": 1}
+    db.expire_all()
+    assert db.get(EmailOutbox, item.id).status == "FALHOU"
+
+
+def test_sem_smtp_grava_falhou(db, monkeypatch):
+    monkeypatch.setattr(email_outbox, "_smtp_is_configured", lambda: False)
+    item = email_outbox.enqueue_email(db, "a@metropoles.com", "Reset", "x")
+    assert (item.status, item.ultimo_erro) == ("FALHOU", email_outbox.SEM_SMTP)
+    assert email_outbox.processar_lote(db, conectar=lambda: pytest.fail("não deveria conectar")) == {
+        "enviados": 0,
+        "reagendados": 0,
+        "falhos": 0,
+    }
@@ -0,0 +1,126 @@
+# tests/test_jobs.py
+"""Fila de jobs (app/core/jobs.py): idempotência por tipo, reserva expirada, batimento e desfecho condicional."""
+import threading
+import time
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from app.core import jobs
+from app.models_base import Base
+from app.models_jobs import Job
+
+_liberar = threading.Event()
+
+
+@jobs.tarefa("teste.eco")
+def _eco(db, payload, arquivo):
+    return payload
+
+
+@jobs.tarefa("teste.outro")
+def _outro(db, payload, arquivo):
+    return payload
+
+
+@jobs.tarefa("teste.lento")
+def _lento(db, payload, arquivo):
+    _liberar.wait(5)
+    return "ok"
+
+
+@jobs.tarefa("teste.reassumido")
+def _reassumido(db, payload, arquivo):
+    # a reserva expirou no meio da execução e outro worker pegou o job
+    db.query(Job).filter(Job.tipo == "teste.reassumido").update({"worker": "outro"}, synchronize_session=False)
+    db.commit()
+    if payload.get("falhar"):
+        raise RuntimeError("falhou depois de perder a reserva")
+    return "atrasado"
+
+
+@pytest.fixture
+def db(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'jobs.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine, tables=[Job.__table__])
+    s = Session(bind=engine)
+    yield s
+    s.close()
+    engine.dispose()
+
+
+def _abandonar(db, job, *, tentativas=0):
+    """Simula worker que morreu: EXECUTANDO com o último batimento bem antigo."""
+    velho = datetime.utcnow() - timedelta(seconds=jobs.JOBS_RESERVA_EXPIRA_S + 60)
+    job.status, job.tentativas, job.batimento_em, job.updated_at = "EXECUTANDO", tentativas, velho, velho
+    db.commit()
+
+
+def test_chave_de_idempotencia_por_tipo(db):
+    a = jobs.enfileirar(db, "teste.eco", {"x": 1}, chave="1:abc")
+    assert jobs.enfileirar(db, "teste.eco", {"x": 2}, chave="1:abc").id == a.id
+    b = jobs.enfileirar(db, "teste.outro", {"x": 3}, chave="1:abc")
+    assert b.id != a.id and b.tipo == "teste.outro"
+
+
+def test_reserva_expirada_conta_tentativa(db):
+    job = jobs.enfileirar(db, "teste.eco", {"x": 1})
+    _abandonar(db, job)
+
+    jobs._reservar(db, limite=0)  # só a recuperação
+    db.expire_all()
+    job = db.get(Job, job.id)
+    assert (job.status, job.tentativas, job.ultimo_erro) == ("PENDENTE", 1, jobs.RESERVA_PERDIDA)
+
+    assert jobs.processar_lote(db) == {"concluidos": 1, "reagendados": 0, "falhos": 0}
+
+
+def test_reserva_expirada_esgota_tentativas(db):
+    job = jobs.enfileirar(db, "teste.eco", {"x": 1}, max_tentativas=3)
+    _abandonar(db, job, tentativas=2)
+
+    assert jobs.processar_lote(db) == {"concluidos": 0, "reagendados": 0, "falhos": 0}
+    db.expire_all()
+    job = db.get(Job, job.id)
+    assert (job.status, job.tentativas) == ("FALHOU", 3)
+    assert job.concluido_em is not None
+
+
+def test_batimento_mantem_job_reservado(db, monkeypatch):
+    job = jobs.enfileirar(db, "teste.lento", {})
+    monkeypatch.setattr(jobs, "JOBS_BATIMENTO_S", 0.05)
+    _liberar.clear()
+
+    engine = db.get_bind()
+    t = threading.Thread(target=lambda: jobs.processar_lote(Session(bind=engine)))
+    t.start()
+    try:
+        inicio = None
+        for _ in range(100):
+            time.sleep(0.05)
+            with Session(bind=engine) as s:
+                j = s.get(Job, job.id)
+                if j.status == "EXECUTANDO" and j.batimento_em:
+                    inicio = inicio or j.batimento_em
+                    if j.batimento_em > inicio:
+                        break
+        else:
+            pytest.fail("batimento_em não avançou durante a execução")
+    finally:
+        _liberar.set()
+        t.join(10)
+
+    db.expire_all()
+    assert db.get(Job, job.id).status == "CONCLUIDO"
+
+
+@pytest.mark.parametrize("falhar", [False, True])
+def test_desfecho_descartado_se_outro_worker_assumiu(db, falhar):
+    job = jobs.enfileirar(db, "teste.reassumido", {"falhar": falhar})
+
+    assert jobs.processar_lote(db) == {"concluidos": 0, "reagendados": 0, "falhos": 0}
+    db.expire_all()
+    job = db.get(Job, job.id)
+    assert (job.status, job.worker, job.tentativas, job.resultado) == ("EXECUTANDO", "outro", 0, None)
@@ -0,0 +1,31 @@
+# tests/test_verificar_replica.py
+"""
+Roteamento primário x réplica (DATABASE_READ_URL), via
+`python -m app.scripts.verificar_replica`.
+
+Roda em subprocesso: as engines nascem no import de app.database, e a
+réplica precisa estar no ambiente antes disso (os outros testes já
+importaram o app sem réplica).
+"""
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+RAIZ = Path(__file__).resolve().parent.parent
+
+
+def test_roteamento_primario_replica():
+    env = {**os.environ, "EMAIL_OUTBOX_WORKER": "0", "JOBS_WORKER": "0", "PYTHONPATH": str(RAIZ)}
+    env.pop("DATABASE_READ_URL", None)
+    r = subprocess.run(
+        [sys.executable, "-m", "app.scripts.verificar_replica", "--pis", "200"],
+        cwd=RAIZ,
+        env=env,
+        capture_output=True,
+        text=True,
+        timeout=300,
+    )
+    saida = r.stdout + r.stderr
+    assert r.returncode == 0, saida[-4000:]
+    assert "Roteamento primário/réplica OK" in r.stdout